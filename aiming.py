@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+狙い撃ち弾の一括照準
+
+1フレームに撃たれた狙い撃ち弾（砲台・WAVE型敵・ボス）を AimBatch に集め、
+敵の更新が終わった後にまとめて速度を計算する。弾が多いフレームはnumpyで
+ベクトル化し、少ないフレームはスカラーで計算する（弾の座標の読み出しと
+速度の書き戻しが1発ずつ必要なので、numpyが速くなるのは数百発からになる）。
+
+偏差射撃（lead）を有効にすると、目標が今の移動量のまま動き続けると仮定して
+弾速で到達できる未来位置を狙う（解がなければ現在位置を狙う）。
+
+Usage:
+    python aiming.py                 # スカラーとnumpyの照準コストの比較
+"""
+
+import math
+import numpy as np
+from constants import *
+
+
+def aim_velocities(start_x, start_y, speeds, target_x, target_y, target_vx=0.0, target_vy=0.0, lead=False):
+    """
+    発射位置の配列から目標への速度ベクトルを一括計算
+
+    Args:
+        start_x, start_y: 発射位置の配列
+        speeds: 弾速の配列（またはスカラー）
+        target_x, target_y: 目標位置
+        target_vx, target_vy: 目標の1フレームあたりの移動量（偏差射撃用）
+        lead: Trueなら偏差射撃
+
+    Returns:
+        tuple: (velocity_x配列, velocity_y配列)
+    """
+    sx = np.asarray(start_x, dtype=np.float64)
+    sy = np.asarray(start_y, dtype=np.float64)
+    speeds = np.broadcast_to(np.asarray(speeds, dtype=np.float64), sx.shape)
+    dx = target_x - sx
+    dy = target_y - sy
+
+    if lead and (target_vx or target_vy):
+        # |D + V t| = s t を満たす最小の正のtを解く（a t^2 + b t + c = 0）
+        a = target_vx * target_vx + target_vy * target_vy - speeds * speeds
+        b = 2.0 * (dx * target_vx + dy * target_vy)
+        c = dx * dx + dy * dy
+        with np.errstate(divide='ignore', invalid='ignore'):
+            disc = b * b - 4.0 * a * c
+            root = np.sqrt(np.maximum(disc, 0.0))
+            t1 = (-b - root) / (2.0 * a)
+            t2 = (-b + root) / (2.0 * a)
+            t1 = np.where(t1 > 0, t1, np.inf)
+            t2 = np.where(t2 > 0, t2, np.inf)
+            t = np.minimum(t1, t2)
+            # 目標と弾速が同じ場合は一次方程式
+            linear = np.abs(a) < 1e-9
+            t = np.where(linear, np.where(b < 0, -c / b, np.inf), t)
+            t = np.where((disc >= 0) | linear, t, np.inf)
+        t = np.where(np.isfinite(t), t, 0.0)
+        dx = dx + target_vx * t
+        dy = dy + target_vy * t
+
+    distance = np.sqrt(dx * dx + dy * dy)
+    distance[distance == 0] = 1.0  # ゼロ除算回避
+    scale = speeds / distance
+    return dx * scale, dy * scale
+
+
+def _lead_time(dx, dy, speed, target_vx, target_vy):
+    """aim_velocities() の偏差射撃と同じ解（スカラー版、解がなければ0）"""
+    a = target_vx * target_vx + target_vy * target_vy - speed * speed
+    b = 2.0 * (dx * target_vx + dy * target_vy)
+    c = dx * dx + dy * dy
+    if abs(a) < 1e-9:
+        return -c / b if b < 0 else 0.0
+    disc = b * b - 4.0 * a * c
+    if disc < 0:
+        return 0.0
+    root = math.sqrt(disc)
+    times = [t for t in ((-b - root) / (2.0 * a), (-b + root) / (2.0 * a)) if t > 0]
+    return min(times) if times else 0.0
+
+
+class AimBatch:
+    """
+    1フレーム分の狙い撃ち弾を集めて、敵の更新後にまとめて照準する
+
+    Enemy.shoot() は速度未定の弾を作って add() し、Game.update() が
+    敵の更新ループの後で resolve() を呼ぶ。
+    """
+
+    def __init__(self, lead=AIM_LEAD_TARGETING, vector_min=AIM_BATCH_VECTOR_MIN):
+        self.lead = lead
+        self.vector_min = vector_min
+        self.bullets = []
+        self.speeds = []
+        self.resolved = 0      # 累計照準数
+        self.vectorized = 0    # うちnumpyで計算した数
+
+    def add(self, bullet, speed):
+        """速度未定の弾を登録（発射位置は弾の座標）"""
+        self.bullets.append(bullet)
+        self.speeds.append(speed)
+
+    def __len__(self):
+        return len(self.bullets)
+
+    def resolve(self, target_x, target_y, target_vx=0.0, target_vy=0.0):
+        """
+        登録された弾の速度を設定してバッチを空にする
+
+        Args:
+            target_x, target_y: 目標位置（プレイヤー）
+            target_vx, target_vy: 目標の1フレームあたりの移動量
+        """
+        bullets = self.bullets
+        if not bullets:
+            return
+        speeds = self.speeds
+        count = len(bullets)
+
+        if count >= self.vector_min:
+            vx, vy = aim_velocities([b.x for b in bullets], [b.y for b in bullets], speeds,
+                                    target_x, target_y, target_vx, target_vy, self.lead)
+            for bullet, bvx, bvy in zip(bullets, vx.tolist(), vy.tolist()):
+                bullet.velocity_x = bvx
+                bullet.velocity_y = bvy
+            self.vectorized += count
+        else:
+            lead = self.lead and (target_vx or target_vy)
+            for bullet, speed in zip(bullets, speeds):
+                dx = target_x - bullet.x
+                dy = target_y - bullet.y
+                if lead:
+                    t = _lead_time(dx, dy, speed, target_vx, target_vy)
+                    dx += target_vx * t
+                    dy += target_vy * t
+                distance = math.sqrt(dx * dx + dy * dy) or 1
+                bullet.velocity_x = dx / distance * speed
+                bullet.velocity_y = dy / distance * speed
+
+        self.resolved += count
+        self.bullets = []
+        self.speeds = []
+
+
+if __name__ == "__main__":
+    # 照準だけのコスト（弾の生成は含めない）をスカラーとnumpyで比較
+    import random
+    import time
+    from bullet import Bullet
+
+    random.seed(0)
+    target = (120.0, 300.0, 0.0, -PLAYER_SPEED)
+    print(f"{'shots':>7}{'scalar':>10}{'numpy':>10}{'scalar+lead':>13}{'numpy+lead':>12}  (us per frame)")
+    for count in (4, 16, 64, 256, 1024):
+        bullets = [Bullet(random.uniform(300, SCREEN_WIDTH), random.uniform(0, SCREEN_HEIGHT),
+                          False, 0, 0.0, 0.0) for _ in range(count)]
+        repeats = max(50, 20000 // count)
+        row = []
+        for lead in (False, True):
+            for vector_min in (10 ** 9, 1):
+                batch = AimBatch(lead=lead, vector_min=vector_min)
+                start = time.perf_counter()
+                for _ in range(repeats):
+                    for bullet in bullets:
+                        batch.add(bullet, ENEMY_BULLET_SPEED_TURRET)
+                    batch.resolve(*target)
+                row.append((time.perf_counter() - start) / repeats * 1e6)
+        print(f"{count:>7}{row[0]:>10.1f}{row[1]:>10.1f}{row[2]:>13.1f}{row[3]:>12.1f}")
+    print(f"(numpy is used from {AIM_BATCH_VECTOR_MIN} shots per frame)")
+
+    # スカラー版とベクトル版の偏差射撃が一致するか
+    starts = [(random.uniform(300, SCREEN_WIDTH), random.uniform(0, SCREEN_HEIGHT)) for _ in range(64)]
+    vx, vy = aim_velocities([s[0] for s in starts], [s[1] for s in starts], 5.0, 100.0, 300.0, 1.5, -4.0, lead=True)
+    batch = AimBatch(lead=True, vector_min=10 ** 9)
+    bullets = [Bullet(x, y, False, 0, 0.0, 0.0) for x, y in starts]
+    for b in bullets:
+        batch.add(b, 5.0)
+    batch.resolve(100.0, 300.0, 1.5, -4.0)
+    error = max(max(abs(b.velocity_x - x), abs(b.velocity_y - y)) for b, x, y in zip(bullets, vx, vy))
+    print(f"\nscalar vs vectorized lead solution: max difference {error:.2e}")
@@ -3,6 +3,8 @@ import math
 from constants import *
 
 class Bullet:
+    homing = False
+
     def __init__(self, x, y, is_player_bullet=True, charge_level=0, velocity_x=None, velocity_y=None):
         self.x = x
         self.y = y
@@ -111,6 +113,64 @@ class Bullet:
             pygame.draw.rect(screen, glow_color, glow_rect, 2)
 
 
+class HomingMissile(Bullet):
+    """
+    最寄りの敵を追尾するミサイル（ロックオン武器）
+
+    目標は敵オブジェクトではなく前フレームの目標位置（lock_x, lock_y）で覚え、
+    毎フレーム敵の最近傍インデックスでその付近の敵を探し直す（savestateに
+    座標だけが残るのでロールバック後も同じ目標を追う）。
+    目標を見失ったら自分から近い順に slot 番目の敵を選ぶので、
+    同時に撃った複数のミサイルは別々の敵を狙う。
+    """
+    homing = True
+
+    def __init__(self, x, y, angle_deg, slot=0):
+        angle = math.radians(angle_deg)
+        super().__init__(x, y, True, 0,
+                         HOMING_MISSILE_SPEED * math.cos(angle),
+                         -HOMING_MISSILE_SPEED * math.sin(angle))
+        self.color = CYAN
+        self.slot = slot
+        self.lock_x = None
+        self.lock_y = None
+        self.life = HOMING_LIFETIME
+
+    def steer(self, enemy_index):
+        """
+        目標を選んで旋回する（移動前に毎フレーム呼ぶ）
+
+        Args:
+            enemy_index: 敵の中心座標で作った PointGrid
+        """
+        target = None
+        if self.lock_x is not None:
+            target = enemy_index.nearest(self.lock_x, self.lock_y, HOMING_LOCK_RADIUS)
+        if target is None:
+            candidates = enemy_index.k_nearest(self.x, self.y, self.slot + 1, HOMING_ACQUIRE_RANGE)
+            if candidates:
+                target = candidates[-1]  # slot番目（敵が足りなければ最も遠い候補）
+        if target is None:
+            self.lock_x = self.lock_y = None
+            return
+        _, self.lock_x, self.lock_y = target
+
+        # 目標方向へ最大 HOMING_TURN_RATE 度だけ向きを変える
+        heading = math.atan2(self.velocity_y, self.velocity_x)
+        desired = math.atan2(self.lock_y - self.y, self.lock_x - self.x)
+        turn = (desired - heading + math.pi) % (2 * math.pi) - math.pi
+        limit = math.radians(HOMING_TURN_RATE)
+        heading += max(-limit, min(limit, turn))
+        self.velocity_x = HOMING_MISSILE_SPEED * math.cos(heading)
+        self.velocity_y = HOMING_MISSILE_SPEED * math.sin(heading)
+
+    def update(self):
+        super().update()
+        self.life -= 1
+        if self.life <= 0:
+            self.active = False
+
+
 def create_aimed_bullet(start_x, start_y, target_x, target_y, speed, is_player=False):
     """
     プレイヤーを狙う弾丸を作成
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+ピクセル単位の当たり判定（マスクのキャッシュ）
+
+当たり判定のRectは描画の形（三角形の自機・ひし形のWAVE敵・三角形のCHARGE敵・
+回転する八角形のボス）より大きいので、見た目では外れている弾が当たる。
+Rectが重なったときだけ描画の形のマスクで判定し直すので、精度のための
+コストはRectの判定を通った組み合わせの分しかかからない。
+
+マスクは形とサイズごとに1回だけ作ってキャッシュする。ボスの八角形は
+回転角を量子化し、45度周期なので数通りのマスクで済む。
+四角形の敵（STRAIGHT・TANK・砲台）はRectが形そのものなのでマスク判定しない。
+
+Usage:
+    python collision_masks.py        # Rect判定との比較（外れ判定の数とコスト）
+"""
+
+import pygame
+import math
+from constants import *
+from player import hull_points
+
+
+def _polygon_mask(width, height, points):
+    """多角形を塗りつぶしたマスク（座標はRectの左上基準）"""
+    surface = pygame.Surface((width, height), pygame.SRCALPHA)
+    pygame.draw.polygon(surface, WHITE, points)
+    return pygame.mask.from_surface(surface)
+
+
+def _player_mask(width, height, pose):
+    """
+    自機の三角形（Player.draw() と同じ反動・傾き・脈動の形、Rectの外にはみ出す分は切る）
+
+    Args:
+        width, height: 当たり判定のRectの大きさ
+        pose: Player.hull_pose() の (x方向のずれ, y方向のずれ, 幅, 高さ)
+    """
+    offset_x, offset_y, scaled_width, scaled_height = pose
+    points = hull_points(offset_x + width // 2, offset_y + height // 2, scaled_width, scaled_height)
+    return _polygon_mask(width, height, points)
+
+
+def _diamond_mask(size):
+    """WAVE敵のひし形"""
+    half = size // 2
+    return _polygon_mask(size, size, [(half, 0), (size - 1, half), (half, size - 1), (0, half)])
+
+
+def _triangle_mask(size):
+    """CHARGE敵の左向き三角形"""
+    return _polygon_mask(size, size, [(0, size // 2), (size - 1, 0), (size - 1, size - 1)])
+
+
+def _octagon_mask(size, rotation):
+    """ボスの八角形（rotation度回転）"""
+    center = size // 2
+    points = [(center + center * math.cos(math.radians(i * 45 + rotation)),
+               center + center * math.sin(math.radians(i * 45 + rotation)))
+              for i in range(8)]
+    return _polygon_mask(size, size, points)
+
+
+class MaskCache:
+    """
+    形ごとのマスクのキャッシュとマスク判定のカウンタ
+
+    Game.check_collisions() の先頭で begin_frame() を呼び、Rectの判定を通った
+    組み合わせを overlap() に渡す。
+    """
+
+    def __init__(self, rotation_step=MASK_ROTATION_STEP_DEG):
+        self.rotation_step = rotation_step
+        self.masks = {}
+
+        # このフレームのマスク判定数・うちマスクで外れた数
+        self.tests = 0
+        self.rejected = 0
+        # 累計（main.pyの終了時の表示用）
+        self.frames = 0
+        self.total_tests = 0
+        self.total_rejected = 0
+        self.max_tests = 0
+
+    def begin_frame(self):
+        """フレームごとのカウンタを累計に足してリセット"""
+        if self.frames or self.tests:
+            self.total_tests += self.tests
+            self.total_rejected += self.rejected
+            self.max_tests = max(self.max_tests, self.tests)
+        self.frames += 1
+        self.tests = 0
+        self.rejected = 0
+
+    def _cached(self, key, build, *args):
+        mask = self.masks.get(key)
+        if mask is None:
+            mask = self.masks[key] = build(*args)
+        return mask
+
+    def rect_mask(self, width, height):
+        """Rectそのままの形のマスク（弾など）"""
+        key = ('rect', width, height)
+        mask = self.masks.get(key)
+        if mask is None:
+            mask = self.masks[key] = pygame.Mask((width, height), fill=True)
+        return mask
+
+    def player_mask(self, player):
+        """自機の描画の形のマスク（姿勢ごと、反動・傾き・脈動は整数なので数十通り）"""
+        pose = player.hull_pose()
+        return self._cached(('player', player.width, player.height, pose), _player_mask,
+                            player.width, player.height, pose)
+
+    def enemy_mask(self, enemy):
+        """
+        敵の描画の形のマスク
+
+        Returns:
+            pygame.Mask or None: Rectが形そのものの敵はNone
+        """
+        enemy_type = enemy.enemy_type
+        if enemy_type == ENEMY_TYPE_WAVE:
+            return self._cached(('wave', enemy.size), _diamond_mask, enemy.size)
+        if enemy_type == ENEMY_TYPE_CHARGE:
+            return self._cached(('charge', enemy.size), _triangle_mask, enemy.size)
+        if enemy_type in (ENEMY_TYPE_BOSS_1, ENEMY_TYPE_BOSS_2, ENEMY_TYPE_BOSS_3):
+            # Enemy.draw() の回転（time_alive * 2 度）を量子化、八角形は45度周期
+            step = self.rotation_step
+            rotation = int(round((enemy.time_alive * 2) % 45 / step)) * step % 45
+            return self._cached(('boss', enemy.size, rotation), _octagon_mask, enemy.size, rotation)
+        return None
+
+    def overlap(self, rect, mask, other_rect, other_mask):
+        """
+        Rectが重なった2つの形がピクセル単位で重なっているか
+
+        Args:
+            rect, other_rect: 当たり判定のRect（マスクの左上の位置）
+            mask, other_mask: 形のマスク（NoneならRectそのままの形）
+
+        Returns:
+            bool: 重なっていればTrue
+        """
+        if mask is None and other_mask is None:
+            return True
+        if mask is None:
+            mask = self.rect_mask(rect.width, rect.height)
+        if other_mask is None:
+            other_mask = self.rect_mask(other_rect.width, other_rect.height)
+        self.tests += 1
+        if mask.overlap(other_mask, (other_rect.x - rect.x, other_rect.y - rect.y)) is None:
+            self.rejected += 1
+            return False
+        return True
+
+    def summary(self):
+        """累計の統計（main.pyの終了時の表示用）"""
+        frames = max(self.frames, 1)
+        return {
+            'tests_per_frame': self.total_tests / frames,
+            'max_tests': self.max_tests,
+            'rejected': self.total_rejected,
+            'tests': self.total_tests,
+            'masks': len(self.masks),
+        }
+
+
+if __name__ == "__main__":
+    # ひし形・三角形・八角形の敵にランダムな弾を当て、Rectだけの判定との差とコストを比較
+    import random
+    import time
+    from enemy import Enemy
+    from bullet import Bullet
+
+    random.seed(0)
+    cache = MaskCache()
+    enemies = []
+    for enemy_type in (ENEMY_TYPE_WAVE, ENEMY_TYPE_CHARGE, ENEMY_TYPE_BOSS_1, ENEMY_TYPE_TANK):
+        for _ in range(5):
+            enemy = Enemy(random.randint(100, 600), random.randint(50, 450), enemy_type)
+            enemy.time_alive = random.randint(0, 600)
+            enemy.rect.topleft = (enemy.x, enemy.y)
+            enemies.append(enemy)
+    bullets = []
+    for enemy in enemies:
+        for _ in range(200):
+            bullets.append(Bullet(enemy.x + random.uniform(-BULLET_WIDTH, enemy.size),
+                                  enemy.y + random.uniform(-BULLET_HEIGHT, enemy.size), True))
+
+    frames = 20
+    start = time.perf_counter()
+    for _ in range(frames):
+        rect_hits = sum(1 for b in bullets for e in enemies if b.rect.colliderect(e.rect))
+    rect_time = (time.perf_counter() - start) / frames
+
+    start = time.perf_counter()
+    for _ in range(frames):
+        cache.begin_frame()
+        mask_hits = sum(1 for b in bullets for e in enemies
+                        if b.rect.colliderect(e.rect)
+                        and cache.overlap(e.rect, cache.enemy_mask(e), b.rect, None))
+    mask_time = (time.perf_counter() - start) / frames
+
+    print(f"{len(bullets)} bullets x {len(enemies)} enemies (WAVE, CHARGE, BOSS, TANK)")
+    print(f"  rect only:   {rect_hits} hits, {rect_time * 1000:.2f} ms")
+    print(f"  rect + mask: {mask_hits} hits, {mask_time * 1000:.2f} ms "
+          f"({cache.tests} mask tests, {cache.rejected} rect hits rejected as visual misses)")
+    print(f"  cached masks: {len(cache.masks)}")
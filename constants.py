@@ -24,6 +24,7 @@ PLAYER_HEIGHT = 20
 PLAYER_SPEED = 5
 PLAYER_MAX_LIVES = 3
 PLAYER_INVINCIBILITY_TIME = 2000  # milliseconds
+PLAYER_INVINCIBILITY_FRAMES = PLAYER_INVINCIBILITY_TIME // (1000 // FPS)
 
 # Force settings
 FORCE_SIZE = 29
@@ -66,7 +67,7 @@ CHARGE_LEVEL_2_PIERCE = 2
 CHARGE_LEVEL_3_PIERCE = 3
 
 # Enemy settings
-ENEMY_SPAWN_INTERVAL = 90  # frames (1.5 seconds)
+ENEMY_SPAWN_INTERVAL = 90  # frames (1.5 seconds)、ステージ定義で省略した場合の既定値
 
 # Enemy types
 ENEMY_TYPE_STRAIGHT = 0
@@ -120,13 +121,6 @@ BOSS_3_SCORE = 3000
 BOSS_3_SIZE = 120
 BOSS_3_SHOOT_INTERVAL = 30  # 0.5秒ごと
 
-# Wave 4 Boss spawn settings
-WAVE4_MAX_SIMULTANEOUS_BOSSES = 3      # 最大同時ボス数
-WAVE4_MIN_BOSS_INTERVAL = 600          # 最低出現間隔（フレーム）= 10秒
-WAVE4_INITIAL_BOSS_CHANCE = 0.05       # 初期出現確率（5%）
-WAVE4_MAX_BOSS_CHANCE = 0.25           # 最大出現確率（25%）
-WAVE4_DIFFICULTY_RAMP_TIME = 7200      # 難易度上昇期間（フレーム）= 120秒
-
 # Enemy bullet settings (タイプ別)
 ENEMY_BULLET_SPEED_WAVE = 3      # WAVE敵の弾速（遅め、狙い撃ち弾があるため）
 ENEMY_BULLET_SPEED_TANK = 4      # TANK敵の弾速（中速、3方向拡散のため）
@@ -145,14 +139,18 @@ POWERUP_TYPE_FORCE = 0
 POWERUP_TYPE_SPEED = 1
 POWERUP_TYPE_POWER = 2
 POWERUP_TYPE_3WAY = 3  # 新規：3-Way武器
+POWERUP_TYPE_HOMING = 4  # ホーミングミサイル
 
 # Player weapon types
 WEAPON_TYPE_NORMAL = 0  # 水平射撃のみ
 WEAPON_TYPE_3WAY = 1    # 3方向射撃
+WEAPON_TYPE_HOMING = 2  # 最寄りの敵を追尾するミサイル
+WEAPON_NAMES = {WEAPON_TYPE_NORMAL: "NORMAL", WEAPON_TYPE_3WAY: "3-WAY", WEAPON_TYPE_HOMING: "HOMING"}
 
 # Player weapon fire rates
 WEAPON_NORMAL_DELAY = 10   # frames
 WEAPON_3WAY_DELAY = 15  #frames (1.5x slower to balance 3 bullets)
+WEAPON_HOMING_DELAY = 20  # frames（追尾する分遅く）
 
 # 3-Way settings
 WAY3_ANGLE_DEG = 40  # 度（上下の弾丸の角度）
@@ -161,19 +159,15 @@ WAY3_ANGLE_DEG = 40  # 度（上下の弾丸の角度）
 POWERUP_DURATION_MULTIPLIER = 2  # パワーアップ効果時間の倍率（平均出現間隔の何倍か）
 POWER_EFFECT_DURATION = 2400  # POWER効果の持続時間（フレーム数） = 30秒 × 2 = 60秒
 WAY3_EFFECT_DURATION = 2400   # 3-WAY効果の持続時間（フレーム数） = 30秒 × 2 = 60秒
+HOMING_EFFECT_DURATION = 2400  # HOMING効果の持続時間（フレーム数） = 60秒
 
 # Explosion settings
 EXPLOSION_DURATION = 20  # frames
 EXPLOSION_PARTICLE_COUNT = 8
 
-# Wave system
-WAVE_1_START = 0
-WAVE_1_END = 1800  # 30 seconds
-WAVE_2_START = 1800
-WAVE_2_END = 3600  # 60 seconds
-WAVE_3_START = 3600
-WAVE_3_END = 5400  # 90 seconds
-WAVE_4_START = 5400
+# Wave system（Waveの時間割・敵の構成・ボス・地形パターンはステージ定義ファイルに記述）
+STAGE_FILE = 'stages.json'
+DEFAULT_STAGE = 'default'
 
 # Sound settings
 SOUND_ENABLED = True
@@ -188,11 +182,6 @@ TERRAIN_COLOR = (80, 80, 100)  # 青灰色
 TERRAIN_EDGE_COLOR = (120, 120, 150)  # 明るい縁
 TERRAIN_DAMAGE_COOLDOWN = 30  # 地形ダメージのクールダウン（0.5秒）
 
-# Terrain pattern durations (frames)
-PATTERN_DURATION_EASY = 600  # 10秒
-PATTERN_DURATION_NORMAL = 480  # 8秒
-PATTERN_DURATION_HARD = 360  # 6秒
-
 # Aimed bullet settings
 AIMED_BULLET_CHANCE_WAVE = 0.3  # WAVE敵の狙い撃ち確率
 
@@ -206,3 +195,152 @@ TURRET_SPAWN_CHANCE_WAVE_4 = 0.4
 TURRET_INTERVAL_WAVE_2 = 120  # 2秒
 TURRET_INTERVAL_WAVE_3 = 90   # 1.5秒
 TURRET_INTERVAL_WAVE_4 = 60   # 1秒
+
+# Spatial index settings
+SPATIAL_GRID_CELL_SIZE = 64  # 空間グリッドのセルサイズ（ピクセル）
+POINT_GRID_SCAN_MAX = 48     # 最近傍探索で点がこの数以下ならセルを使わず全点を調べる（python spatial_grid.py で計測）
+
+# Autopilot settings（負荷生成用ボット）
+AUTOPILOT_BUDGET_MS = 0.5       # 1フレームあたりの判断時間上限（ミリ秒）
+AUTOPILOT_LOOKAHEAD = 12        # 危険度を予測する先読みフレーム数
+AUTOPILOT_SAFETY_MARGIN = 6     # 脅威・地形との安全距離（ピクセル）
+AUTOPILOT_PREFERRED_X = 150     # ボットが留まろうとするX座標
+AUTOPILOT_THREAT_SPEED = 8      # 先読みの間に届く脅威を選ぶときの最大の速さ（|vx|+|vy|、敵弾は最大約7）
+
+# Soak test settings（長時間リーク検出）
+SOAK_SAMPLE_SECONDS = 10           # サンプリング間隔（シミュレーション秒）
+SOAK_WARMUP_FRACTION = 0.1         # 傾き検定から除外する立ち上がり区間の割合
+SOAK_TRACEMALLOC_FRAMES = 1        # tracemallocが保持するスタック深さ
+SOAK_SLOPE_T_THRESHOLD = 4.0       # 傾きのt値がこれを超えたら有意
+SOAK_RELATIVE_GROWTH = 0.2         # 期間中の増加量が平均のこの割合を超えたら成長
+SOAK_MIN_GROWTH = 5                # 成長と判定する最小増加量（ノイズ除外）
+
+# Entity budgets（カテゴリ別の同時存在上限、生成時に適用）
+BUDGET_ENEMIES = 40            # 通常敵（ボスは対象外）
+BUDGET_TURRETS = 12            # 地形砲台
+BUDGET_PLAYER_BULLETS = 200
+BUDGET_ENEMY_BULLETS = 300
+BUDGET_POWERUPS = 10
+BUDGET_EXPLOSIONS = 40
+
+# Overload degradation policy（フレーム時間超過時の段階的な負荷軽減）
+DEGRADE_TARGET_FRAME_MS = 1000.0 / FPS  # 目標フレーム時間
+DEGRADE_EMA_ALPHA = 0.1                 # フレーム時間の指数移動平均係数
+DEGRADE_ENGAGE_FRAMES = 30              # 超過がこのフレーム数続いたら1段階上げる
+DEGRADE_RELEASE_FRAMES = 180            # 余裕がこのフレーム数続いたら1段階下げる
+DEGRADE_RELEASE_RATIO = 0.8             # 目標のこの割合を下回ったら「余裕あり」
+DEGRADE_REDUCED_PARTICLES = 3           # レベル1以上での爆発パーティクル数
+DEGRADE_MERGE_RADIUS = 40               # レベル2以上でこの距離内の爆発を統合
+DEGRADE_FIRE_THROTTLE = 2               # レベル3で非ボス敵の射撃をN回に1回に間引く
+
+# Game loop settings（固定タイムステップ）
+SIM_HZ = FPS                    # シミュレーション周波数（移動量は1ステップ単位で調整済み）
+RENDER_FPS = FPS                # 描画フレームレート上限（0なら無制限）
+MAX_SIM_STEPS_PER_FRAME = 5     # 1描画フレームあたりの最大追いつきステップ数
+MAX_FRAME_TIME = 0.25           # 1フレームで加算する経過時間の上限（秒）
+INTERPOLATION_MAX_JUMP = 100    # これ以上動いたらワープとみなし補間しない（ピクセル）
+FRAME_LATENCY_HISTORY = 600     # 入力→画面反映の遅延を集計するフレーム数
+
+# Savestate settings
+SCENARIO_SEED = 1987  # 名前付きシナリオを組み立てる乱数シード
+
+# Two-player co-op / rollback netplay
+PLAYER_COLORS = [BLUE, GREEN]    # プレイヤー番号ごとの機体色
+PLAYER_2_Y_OFFSET = 80           # 2P機の初期位置（1P機からの下方向オフセット）
+NETPLAY_PORT = 7000              # 既定のUDPポート（相手は+1）
+NETPLAY_SEED = 20260101          # 両ピアで共通の乱数シード
+NETPLAY_INPUT_DELAY = 2          # ローカル入力を適用するまでの遅延フレーム数
+NETPLAY_MAX_ROLLBACK = 8         # 予測で先行できる最大フレーム数（超えたら待機）
+NETPLAY_INPUT_REDUNDANCY = 32    # 1パケットに載せる未確認入力の最大数
+NETPLAY_CHECKSUM_INTERVAL = 60   # 状態チェックサムを交換する間隔（フレーム）
+NETPLAY_STATE_HISTORY = NETPLAY_MAX_ROLLBACK + 2  # 保持する過去状態の数
+
+# Spectator stream（観戦用の差分圧縮ストリーム）
+SPECTATOR_PORT = 7500               # 既定のUDPポート
+SPECTATOR_PACKET_BYTES = 1200       # 1フレームあたりの送信量（固定、MTU未満）
+SPECTATOR_POSITION_SCALE = 4        # 座標の量子化（1/4ピクセル）
+SPECTATOR_VELOCITY_SCALE = 64       # 速度の量子化（1/64ピクセル/フレーム）
+SPECTATOR_POSITION_TOLERANCE = 2    # 外挿との差がこれ以下なら座標を送らない（量子化単位）
+SPECTATOR_ACK_WINDOW = 255          # 差分の基準にできる最古のパケット（通し番号の差）
+SPECTATOR_NEW_ENTITY_BOOST = 4      # 未送信エンティティの優先度倍率
+SPECTATOR_CLIENT_TIMEOUT = 5.0      # この秒数ACKがなければ観戦者を切断
+SPECTATOR_POLL_INTERVAL = 0.05      # フレームが来なくてもACK・参加を受け取る間隔（秒、配信スレッド）
+
+# Startup（起動時間の予算）
+STARTUP_BUDGET_MS = 1500     # main.py --startup-profile の最初の描画までの上限
+SOUND_INIT_TIMEOUT = 2.0     # 終了時に効果音の合成完了を待つ最大秒数
+
+# Timer wheel（クールダウン・時限効果のタイマー）
+TIMER_WHEEL_SLOT_BITS = 6    # 1段あたり64スロット
+TIMER_WHEEL_LEVELS = 3       # 64^3フレーム（約73分）まではホイール上、それ以上はoverflow
+
+# Aiming（狙い撃ち弾の一括照準）
+AIM_LEAD_TARGETING = False   # Trueならプレイヤーの移動を見越した偏差射撃
+AIM_BATCH_VECTOR_MIN = 256   # 1フレームの狙い撃ち弾がこの数以上ならnumpyで一括計算（python aiming.py で計測）
+
+# Homing missile（ロックオン武器）
+HOMING_MISSILE_SPEED = 6         # ミサイルの速さ（ピクセル/フレーム）
+HOMING_TURN_RATE = 6             # 1フレームに曲がれる最大角度（度）
+HOMING_LIFETIME = 180            # ミサイルの寿命（フレーム）
+HOMING_LAUNCH_ANGLES = (-30, 30) # 1回の発射で撃つミサイルの初期角度（度、個数=発射数）
+HOMING_ACQUIRE_RANGE = 500       # 新しい目標を探す距離（ピクセル）
+HOMING_LOCK_RADIUS = 40          # ロック中の目標を前フレームの位置からこの距離内で探し直す
+
+# Force laser（前方固定のForceが撃つ貫通ビーム）
+FORCE_LASER_ENABLED = True        # Falseなら前方固定のForceも従来の弾を撃つ
+FORCE_LASER_TICK = 6              # ビームがダメージを与える間隔（フレーム）
+FORCE_LASER_DAMAGE = 1            # 1回あたりのダメージ
+FORCE_LASER_PIERCE = (1, 1, 2, 3, 4, 5)  # パワーレベルごとの貫通数（ボスと地形は貫通しない）
+FORCE_LASER_LINGER = 2            # 射撃をやめてからビームが消えるまで（フレーム）
+FORCE_LASER_WIDTH = 4             # ビームの太さ（描画用）
+
+# Pixel collision（Rectが重なったときだけ描画の形のマスクで判定し直す）
+PIXEL_COLLISION = False          # 既定はRectだけで判定（main.py --pixel-collision で有効）
+MASK_ROTATION_STEP_DEG = 5       # ボスの八角形の回転角の量子化（45度周期なので9通り）
+
+# Render target（内部解像度に描画してウィンドウへ拡大表示）
+RENDER_MODES = ('direct', 'scale', 'sdl')  # 直接描画 / transform.scaleで整数倍 / SDLのSCALED
+RENDER_MODE = 'direct'           # 既定の描画モード（main.py --render-mode で変更）
+RENDER_MODE_WINDOW = 'sdl'       # --window で大きなウィンドウを指定したときの既定（拡大はSDLのレンダラ＝GPU）
+
+# Frame capture（QA用の録画、frame_capture.py）
+CAPTURE_FORMATS = ('raw', 'png', 'pipe')  # RGB24連結 / 連番PNG / エンコーダへパイプ
+CAPTURE_RING_SIZE = 8            # リングバッファのフレーム数（書き出しが追いつかなければ捨てる）
+CAPTURE_PNG_LEVEL = 1            # png形式のzlib圧縮レベル（速さ優先）
+CAPTURE_ENCODER_COMMAND = ("ffmpeg -loglevel error -y -f rawvideo -pix_fmt rgb24 "
+                           "-s {width}x{height} -r {fps} -i - {path}")  # pipe形式のエンコーダ
+
+# Metrics（Prometheus / StatsD、metrics.py）
+METRICS_PREFIX = 'rtype'         # メトリクス名の接頭辞
+METRICS_FLUSH_INTERVAL = 1.0     # textfileの書き出し・StatsDの送信の間隔（秒）
+METRICS_FRAME_BUCKETS_MS = (2, 4, 8, 12, 16.7, 25, 33.3, 50, 100)  # フレーム時間のヒストグラム
+METRICS_STATSD_PACKET_BYTES = 1400  # StatsDの1パケットの上限（MTU未満）
+
+# Score store（ハイスコアとプレイ記録、score_store.py）
+SCORE_DB_PATH = 'scores.db'      # SQLiteのファイル（main.py --scores で変更、--no-scores で無効）
+SCORE_TOP_N = 5                  # ゲームオーバー画面に表示する上位件数
+SCORE_BATCH_SIZE = 64            # 1トランザクションでまとめて書き込む最大件数
+SCORE_FLUSH_INTERVAL = 0.5       # 記録を待ってまとめる時間（秒）
+
+# Live tuning（定数・ステージ定義の再起動なしの反映、live_tuning.py）
+LIVE_TUNING_FILE = 'tuning.cfg'  # チューニングファイル（main.py --tune で指定）
+LIVE_TUNING_POLL_INTERVAL = 0.25  # os.stat の間隔（秒）
+LIVE_TUNING_DEBOUNCE = 0.2       # 最後の変更からこの時間たってから読み直す（秒）
+
+# Trig tables（周期パターン・描画の三角関数の表、trig_tables.py）
+TRIG_SAMPLES_PER_FRAME = 8       # precompute() の1フレームあたりの標本数（誤差は1/16フレーム分の変化量以下）
+
+# Terrain streaming（地形の塊の先読み生成、terrain_streamer.py）
+TERRAIN_STREAM_LOOKAHEAD = 16    # 先読みする塊の数（キューの上限、16塊 = 約13秒分）
+TERRAIN_SURFACE_CACHE_SIZE = 64  # 描画済みの塊のサーフェスを保持する数
+TERRAIN_CHUNK_MARGIN = 5         # 塊のサーフェスの左右の余白（配管とジョイントがセグメントからはみ出す分）
+TERRAIN_CHUNK_COLORKEY = (255, 0, 255)  # 塊のサーフェスの透明色（地形の描画に使わない色）
+
+# Terrain heightmap（列ごとの天井・床の高さ、terrain_heightmap.py）
+TERRAIN_HEIGHTMAP_COLUMN = 2     # 列の幅（スクロール速度・セグメントの位置と揃えるとRect判定と一致）
+TERRAIN_BLOCKS_BULLETS = False   # 既定は無効（main.py --terrain-blocks-bullets で有効）。地形に入った弾を消す（地形の中から撃たれた砲台の弾は抜けられる）
+
+# HUD layers（HUD・オーバーレイの合成レイヤー、layers.py）
+CHARGE_GAUGE_WIDTH = 100         # チャージゲージの大きさ（機体の右に表示）
+CHARGE_GAUGE_HEIGHT = 10
+GAME_OVER_DIM_ALPHA = 200        # ゲームオーバー画面で背景を暗くする黒の不透明度
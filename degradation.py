@@ -0,0 +1,116 @@
+from constants import *
+
+# 負荷軽減レベル
+DEGRADE_LEVEL_NONE = 0
+DEGRADE_LEVEL_REDUCE_PARTICLES = 1  # 爆発パーティクルを削減
+DEGRADE_LEVEL_MERGE_EXPLOSIONS = 2  # 近接する爆発を統合
+DEGRADE_LEVEL_THROTTLE_FIRE = 3     # ボス以外の敵の射撃を間引く
+
+DEGRADE_LEVEL_NAMES = {
+    DEGRADE_LEVEL_NONE: "normal",
+    DEGRADE_LEVEL_REDUCE_PARTICLES: "reduce particles",
+    DEGRADE_LEVEL_MERGE_EXPLOSIONS: "merge explosions",
+    DEGRADE_LEVEL_THROTTLE_FIRE: "throttle enemy fire",
+}
+
+
+class EntityBudgets:
+    """カテゴリ別のエンティティ数上限と、上限で破棄した数の集計"""
+
+    def __init__(self, limits=None):
+        self.limits = {
+            'enemies': BUDGET_ENEMIES,
+            'turrets': BUDGET_TURRETS,
+            'player_bullets': BUDGET_PLAYER_BULLETS,
+            'enemy_bullets': BUDGET_ENEMY_BULLETS,
+            'powerups': BUDGET_POWERUPS,
+            'explosions': BUDGET_EXPLOSIONS,
+        }
+        if limits:
+            self.limits.update(limits)
+        self.dropped = {category: 0 for category in self.limits}
+
+    def room(self, category, current_count):
+        """あと何個追加できるか"""
+        return max(0, self.limits[category] - current_count)
+
+    def admit(self, category, items, current_count):
+        """
+        上限内に収まる分だけを返す（超過分は破棄して集計）
+
+        Args:
+            category: カテゴリ名
+            items: 追加しようとしているエンティティのリスト
+            current_count: 現在の数
+
+        Returns:
+            list: 追加を許可されたエンティティ
+        """
+        room = self.limits[category] - current_count
+        if len(items) <= room:
+            return items
+        room = max(0, room)
+        self.dropped[category] += len(items) - room
+        return items[:room]
+
+
+class DegradationPolicy:
+    """
+    フレーム時間に応じて負荷軽減レベルを上げ下げする
+
+    フレーム時間の指数移動平均が目標を一定フレーム超え続けたら1段階上げ、
+    目標を十分下回り続けたら1段階下げる（ヒステリシス付き）。
+    """
+
+    def __init__(self, target_ms=DEGRADE_TARGET_FRAME_MS, enabled=True):
+        self.target_ms = target_ms
+        self.enabled = enabled
+        self.level = DEGRADE_LEVEL_NONE
+        self.average_ms = 0.0
+        self.over_frames = 0
+        self.under_frames = 0
+
+    def record_frame(self, frame_ms):
+        """1フレーム分の処理時間を記録してレベルを更新"""
+        if not self.enabled:
+            return
+
+        if self.average_ms == 0.0:
+            self.average_ms = frame_ms
+        else:
+            self.average_ms += (frame_ms - self.average_ms) * DEGRADE_EMA_ALPHA
+
+        if self.average_ms > self.target_ms:
+            self.over_frames += 1
+            self.under_frames = 0
+            if self.over_frames >= DEGRADE_ENGAGE_FRAMES and self.level < DEGRADE_LEVEL_THROTTLE_FIRE:
+                self._set_level(self.level + 1)
+                self.over_frames = 0
+        elif self.average_ms < self.target_ms * DEGRADE_RELEASE_RATIO:
+            self.under_frames += 1
+            self.over_frames = 0
+            if self.under_frames >= DEGRADE_RELEASE_FRAMES and self.level > DEGRADE_LEVEL_NONE:
+                self._set_level(self.level - 1)
+                self.under_frames = 0
+        else:
+            self.over_frames = 0
+            self.under_frames = 0
+
+    def _set_level(self, level):
+        action = "engaged" if level > self.level else "released"
+        changed = max(level, self.level)
+        self.level = level
+        print(f"[Degradation] level {changed} ({DEGRADE_LEVEL_NAMES[changed]}) {action}: "
+              f"avg frame {self.average_ms:.1f} ms, target {self.target_ms:.1f} ms")
+
+    def particle_count(self):
+        """新しい爆発のパーティクル数"""
+        if self.level >= DEGRADE_LEVEL_REDUCE_PARTICLES:
+            return DEGRADE_REDUCED_PARTICLES
+        return EXPLOSION_PARTICLE_COUNT
+
+    def merge_explosions(self):
+        return self.level >= DEGRADE_LEVEL_MERGE_EXPLOSIONS
+
+    def throttle_fire(self):
+        return self.level >= DEGRADE_LEVEL_THROTTLE_FIRE
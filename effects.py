@@ -1,10 +1,10 @@
 import pygame
 import random
-import math
 from constants import *
+from trig_tables import ring
 
 class Explosion:
-    def __init__(self, x, y, size=30):
+    def __init__(self, x, y, size=30, particle_count=EXPLOSION_PARTICLE_COUNT):
         self.x = x
         self.y = y
         self.size = size
@@ -13,14 +13,13 @@ class Explosion:
 
         # Create particles
         self.particles = []
-        for i in range(EXPLOSION_PARTICLE_COUNT):
-            angle = (360 / EXPLOSION_PARTICLE_COUNT) * i
+        for cx, cy in ring(particle_count):
             speed = random.uniform(2, 5)
             particle = {
                 'x': x,
                 'y': y,
-                'vx': math.cos(math.radians(angle)) * speed,
-                'vy': math.sin(math.radians(angle)) * speed,
+                'vx': cx * speed,
+                'vy': cy * speed,
                 'size': random.randint(3, 8),
                 'color': random.choice([RED, ORANGE, YELLOW, WHITE])
             }
@@ -2,7 +2,13 @@ import pygame
 import math
 import random
 from constants import *
-from bullet import Bullet
+from bullet import Bullet, create_aimed_bullet
+from trig_tables import octagon_offsets, table
+from layers import label
+
+# ボスのパルスの半径（time_alive で引く表）
+_BOSS_PULSE = table('boss_pulse')
+
 
 class Enemy:
     def __init__(self, x, y, enemy_type):
@@ -85,7 +91,10 @@ class Enemy:
             self.is_boss = True
 
         self.max_hp = self.hp
-        self.shoot_cooldown = self.shoot_interval
+
+        # 射撃タイマー（game.pyのTimerWheelに登録され、発火でshoot_readyが立つ）
+        self.timers = {}
+        self.shoot_ready = False
         self.rect = pygame.Rect(self.x, self.y, self.size, self.size)
 
         # For wave movement
@@ -96,7 +105,23 @@ class Enemy:
         # For charge movement
         self.target_y = None
 
-    def update(self, player_y, player_x=None):
+    def screen_x(self, scroll):
+        """画面上のx座標（砲台は地形と同じワールド座標なので、カメラのスクロール分ずらす）"""
+        if self.enemy_type == ENEMY_TYPE_TURRET:
+            return self.x - scroll
+        return self.x
+
+    def screen_rect(self, scroll):
+        """画面上の当たり判定のRect（砲台以外は self.rect そのもの）"""
+        if self.enemy_type == ENEMY_TYPE_TURRET:
+            return self.rect.move(-scroll, 0)
+        return self.rect
+
+    def update(self, player_y, player_x=None, aim_batch=None, scroll=0):
+        """
+        Args:
+            scroll: 地形のカメラ位置（画面の左端のワールド座標、砲台の画面座標に使う）
+        """
         if not self.active:
             return []
 
@@ -105,8 +130,8 @@ class Enemy:
 
         # Movement based on type
         if self.enemy_type == ENEMY_TYPE_TURRET:
-            # 砲台は地形と一緒にスクロール
-            self.x -= TERRAIN_SCROLL_SPEED
+            # 砲台は地形に固定（ワールド座標のまま動かさない、画面座標は scroll から求める）
+            pass
 
         elif self.enemy_type == ENEMY_TYPE_STRAIGHT:
             # Simple straight movement
@@ -169,38 +194,56 @@ class Enemy:
         self.rect.y = self.y
 
         # Deactivate if off screen
-        if self.x < -self.size - 50:
+        if self.screen_x(scroll) < -self.size - 50:
             self.active = False
 
         # Shooting logic
-        if self.shoot_interval > 0:
-            if self.shoot_cooldown > 0:
-                self.shoot_cooldown -= 1
+        if self.shoot_ready:
+            self.shoot_ready = False
+            # 砲台、WAVE型、ボスの場合はプレイヤー座標を渡す
+            if self.enemy_type in [ENEMY_TYPE_TURRET, ENEMY_TYPE_WAVE, ENEMY_TYPE_BOSS_1, ENEMY_TYPE_BOSS_2, ENEMY_TYPE_BOSS_3] and player_x is not None:
+                bullets = self.shoot(player_x, player_y, aim_batch, scroll)
             else:
-                self.shoot_cooldown = self.shoot_interval
-                # 砲台、WAVE型、ボスの場合はプレイヤー座標を渡す
-                if self.enemy_type in [ENEMY_TYPE_TURRET, ENEMY_TYPE_WAVE, ENEMY_TYPE_BOSS_1, ENEMY_TYPE_BOSS_2, ENEMY_TYPE_BOSS_3] and player_x is not None:
-                    bullets = self.shoot(player_x, player_y)
-                else:
-                    bullets = self.shoot()
+                bullets = self.shoot()
 
         return bullets
 
-    def shoot(self, player_x=None, player_y=None):
-        """Enemy shoots bullets"""
+    def on_timer(self, name):
+        """射撃タイマー発火（次のupdate()で撃つ）"""
+        self.shoot_ready = True
+
+    def _aimed_bullet(self, x, y, player_x, player_y, speed, aim_batch):
+        """
+        プレイヤー狙いの弾を作成
+
+        aim_batchがあれば速度未定の弾を登録し、照準は敵の更新後にまとめて行う
+        """
+        if aim_batch is None:
+            return create_aimed_bullet(x, y, player_x, player_y, speed, False)
+        bullet = Bullet(x, y, False, 0, 0.0, 0.0)
+        aim_batch.add(bullet, speed)
+        return bullet
+
+    def shoot(self, player_x=None, player_y=None, aim_batch=None, scroll=0):
+        """
+        Enemy shoots bullets
+
+        Args:
+            aim_batch: 狙い撃ち弾の照準をまとめるAimBatch（Noneなら1発ずつ計算）
+            scroll: 地形のカメラ位置（砲台の弾は画面座標で撃つ）
+        """
         bullets = []
 
         if self.enemy_type == ENEMY_TYPE_WAVE:
             # 30%の確率でプレイヤー狙い撃ち、70%で通常弾
             if player_x is not None and player_y is not None and random.random() < AIMED_BULLET_CHANCE_WAVE:
-                from bullet import create_aimed_bullet
-                bullet = create_aimed_bullet(
+                bullet = self._aimed_bullet(
                     self.x,
                     self.y + self.size // 2,
                     player_x,
                     player_y,
                     ENEMY_BULLET_SPEED_WAVE,  # 速度3に変更
-                    False
+                    aim_batch
                 )
             else:
                 # 通常の左方向弾（速度を明示的に指定）
@@ -237,14 +280,13 @@ class Enemy:
         elif self.enemy_type == ENEMY_TYPE_TURRET:
             # プレイヤー狙い撃ち弾
             if player_x is not None and player_y is not None:
-                from bullet import create_aimed_bullet
-                bullet = create_aimed_bullet(
-                    self.x + self.size // 2,
+                bullet = self._aimed_bullet(
+                    self.x - scroll + self.size // 2,
                     self.y + self.size // 2,
                     player_x,
                     player_y,
                     ENEMY_BULLET_SPEED_TURRET,  # 速度5に変更
-                    False
+                    aim_batch
                 )
                 bullets.append(bullet)
 
@@ -268,15 +310,14 @@ class Enemy:
         elif self.enemy_type == ENEMY_TYPE_BOSS_2:
             # Boss 2: Aimed shot + 2 side bullets
             if player_x is not None and player_y is not None:
-                from bullet import create_aimed_bullet
                 # Aimed bullet at player
-                bullet = create_aimed_bullet(
+                bullet = self._aimed_bullet(
                     self.x,
                     self.y + self.size // 2,
                     player_x,
                     player_y,
                     ENEMY_BULLET_SPEED,
-                    False
+                    aim_batch
                 )
                 bullets.append(bullet)
 
@@ -298,15 +339,14 @@ class Enemy:
         elif self.enemy_type == ENEMY_TYPE_BOSS_3:
             # Boss 3: 5-way radial spread
             if player_x is not None and player_y is not None:
-                from bullet import create_aimed_bullet
                 # Aimed bullet
-                bullet = create_aimed_bullet(
+                bullet = self._aimed_bullet(
                     self.x,
                     self.y + self.size // 2,
                     player_x,
                     player_y,
                     ENEMY_BULLET_SPEED,
-                    False
+                    aim_batch
                 )
                 bullets.append(bullet)
 
@@ -335,9 +375,14 @@ class Enemy:
             return True  # Enemy destroyed
         return False
 
-    def draw(self, screen):
+    def draw(self, screen, scroll=0):
+        """
+        Args:
+            scroll: 地形のカメラ位置（砲台をワールド座標から画面座標に直す、補間済み）
+        """
         if not self.active:
             return
+        x = self.screen_x(scroll)
 
         # Draw enemy based on type
         if self.enemy_type == ENEMY_TYPE_STRAIGHT:
@@ -384,7 +429,7 @@ class Enemy:
         elif self.enemy_type == ENEMY_TYPE_TURRET:
             # 砲台として描画
             # ベース（台座）
-            base_rect = pygame.Rect(self.x, self.y, self.size, self.size)
+            base_rect = pygame.Rect(x, self.y, self.size, self.size)
             pygame.draw.rect(screen, DARK_GRAY, base_rect)
             pygame.draw.rect(screen, self.color, base_rect, 2)
 
@@ -395,13 +440,13 @@ class Enemy:
             pygame.draw.line(
                 screen,
                 self.color,
-                (self.x, barrel_center_y),
-                (self.x - barrel_length, barrel_center_y),
+                (x, barrel_center_y),
+                (x - barrel_length, barrel_center_y),
                 4
             )
 
             # コア（中心の光）
-            core_center = (int(self.x + self.size // 2), int(barrel_center_y))
+            core_center = (int(x + self.size // 2), int(barrel_center_y))
             pygame.draw.circle(screen, RED, core_center, 5)
 
         elif self.enemy_type in [ENEMY_TYPE_BOSS_1, ENEMY_TYPE_BOSS_2, ENEMY_TYPE_BOSS_3]:
@@ -411,12 +456,8 @@ class Enemy:
 
             # 外側の八角形
             radius = self.size // 2
-            octagon_points = []
-            for i in range(8):
-                angle = math.radians(i * 45 + self.time_alive * 2)
-                px = center_x + radius * math.cos(angle)
-                py = center_y + radius * math.sin(angle)
-                octagon_points.append((px, py))
+            octagon_points = [(center_x + dx, center_y + dy)
+                              for dx, dy in octagon_offsets(radius, self.time_alive * 2)]
             pygame.draw.polygon(screen, self.color, octagon_points)
             pygame.draw.polygon(screen, WHITE, octagon_points, 3)
 
@@ -425,13 +466,12 @@ class Enemy:
             pygame.draw.circle(screen, RED, (center_x, center_y), core_radius)
 
             # パルスエフェクト
-            pulse = int(10 + abs(math.sin(self.time_alive * 0.1) * 10))
+            pulse = _BOSS_PULSE.at(self.time_alive)
             pygame.draw.circle(screen, YELLOW, (center_x, center_y), pulse, 2)
 
             # ボスナンバー表示（中央に）
             boss_num = self.enemy_type - ENEMY_TYPE_BOSS_1 + 1
-            font = pygame.font.Font(None, 24)
-            text = font.render(f"B{boss_num}", True, WHITE)
+            text = label(24, f"B{boss_num}", WHITE)
             text_rect = text.get_rect(center=(center_x, center_y))
             screen.blit(text, text_rect)
 
@@ -439,7 +479,7 @@ class Enemy:
         if self.hp < self.max_hp:
             bar_width = self.size
             bar_height = 4
-            bar_x = self.x
+            bar_x = x
             bar_y = self.y - 8
 
             # Background
@@ -13,9 +13,13 @@ class Force:
 
         self.rect = pygame.Rect(self.x, self.y, self.size, self.size)
 
-        # Shooting
-        self.shoot_cooldown = 0
+        # Shooting（クールダウンはgame.pyのTimerWheelが数える）
         self.shoot_delay = 10
+        self.timers = {}
+        self.timer_wheel = None  # game.pyから設定される
+
+        # 前方固定時のビームの長さ（0=発射していない、game.pyが毎フレーム計算）
+        self.beam_length = 0
 
     def activate(self, x, y):
         """Activate the force (from powerup)"""
@@ -91,17 +95,30 @@ class Force:
         self.rect.x = self.x
         self.rect.y = self.y
 
-        # Update cooldown
-        if self.shoot_cooldown > 0:
-            self.shoot_cooldown -= 1
+    @property
+    def beam_on(self):
+        """ビームを発射中か（射撃ボタンを押している間'beam'タイマーが延長される）"""
+        return self.state == FORCE_ATTACHED_FRONT and 'beam' in self.timers
+
+    def beam_origin(self):
+        """ビームの始点（Forceの前端中央）"""
+        return self.x + self.size, self.y + self.size / 2
+
+    def on_timer(self, name):
+        """タイマー発火（'shoot'は消えれば撃てる、'beam'は消えればビーム終了）"""
 
     def shoot(self):
         """Force shoots bullets (synchronized with player)"""
         if not self.active:
             return []
 
-        if self.shoot_cooldown <= 0:
-            self.shoot_cooldown = self.shoot_delay
+        if FORCE_LASER_ENABLED and self.state == FORCE_ATTACHED_FRONT:
+            # 前方固定ならビーム（当たり判定とダメージはgame.pyが毎フレーム行う）
+            self.timer_wheel.schedule(self, 'beam', FORCE_LASER_LINGER)
+            return []
+
+        if 'shoot' not in self.timers:
+            self.timer_wheel.schedule(self, 'shoot', self.shoot_delay)
 
             # Shoot from the front of the force
             bullet_x = self.x + self.size
@@ -118,6 +135,14 @@ class Force:
         if not self.active:
             return
 
+        # Beam
+        if self.beam_length > 0:
+            start_x = int(self.x + self.size)
+            beam_y = int(self.y + self.size // 2)
+            end_x = int(start_x + self.beam_length)
+            pygame.draw.line(screen, CYAN, (start_x, beam_y), (end_x, beam_y), FORCE_LASER_WIDTH)
+            pygame.draw.line(screen, WHITE, (start_x, beam_y), (end_x, beam_y), 1)
+
         # Draw main orange circle
         center_x = int(self.x + self.size // 2)
         center_y = int(self.y + self.size // 2)
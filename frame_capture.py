@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+ゲーム画面の非同期キャプチャ（QA用の録画）
+
+描画が終わった内部サーフェスを pygame.surfarray.pixels2d で、あらかじめ確保した
+リングバッファの空きバッファへ32bitのピクセルのまま行順にコピーするだけにして、
+RGB24への変換とファイルへの書き出しはバックグラウンドのスレッドで行う。
+書き出しが追いつかずに空きバッファがないフレームは捨てる（ゲームループは
+書き出しを待たない）。
+
+pixels3d でRGBの3バイトずつ取り出すと列順・1バイト単位のコピーになり、
+800x600で約2.4msかかる。32bitのまま行順にコピーすれば約0.2msで済む。
+
+形式:
+    raw   RGB24の生フレームを1ファイルに連結
+          （例: ffmpeg -f rawvideo -pix_fmt rgb24 -s 800x600 -r 60 -i capture.rgb out.mp4）
+    png   ディレクトリに連番PNG（frame_000000.png, ...）
+    pipe  RGB24のフレームをエンコーダのプロセスの標準入力へ送る（CAPTURE_ENCODER_COMMAND）
+
+Usage:
+    python frame_capture.py          # キャプチャなし／あり（形式ごと）のフレーム時間の比較
+"""
+
+import os
+import queue
+import shlex
+import subprocess
+import struct
+import threading
+import time
+import zlib
+import numpy as np
+import pygame
+from constants import *
+
+
+def _png_chunk(kind, data):
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+
+def encode_png(rgb, level=CAPTURE_PNG_LEVEL):
+    """
+    行順のRGB24配列をPNGにする
+
+    pygame.image.save はエンコード中もGILを持ったままなのでゲームループが止まる。
+    zlib.compress は圧縮中にGILを手放すので、ライタースレッドで使える。
+
+    Args:
+        rgb: (高さ, 幅, 3) のuint8配列
+        level: zlibの圧縮レベル
+    """
+    height, width, _ = rgb.shape
+    rows = np.empty((height, width * 3 + 1), dtype=np.uint8)
+    rows[:, 0] = 0  # フィルタなし
+    rows[:, 1:] = rgb.reshape(height, width * 3)
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + _png_chunk(b'IHDR', header)
+            + _png_chunk(b'IDAT', zlib.compress(rows, level)) + _png_chunk(b'IEND', b''))
+
+
+class FrameCapture:
+    """
+    プリアロケートしたリングバッファとバックグラウンドの書き出しスレッド
+
+    Game.capture に設定すると、描画のたびに capture(surface) が呼ばれ、
+    Game.shutdown() で close() される。
+    """
+
+    def __init__(self, path, format='raw', size=(SCREEN_WIDTH, SCREEN_HEIGHT),
+                 ring_size=CAPTURE_RING_SIZE, encoder_command=CAPTURE_ENCODER_COMMAND, fps=SIM_HZ):
+        """
+        Args:
+            path: 出力先（raw: ファイル、png: ディレクトリ、pipe: エンコーダに渡す出力ファイル）
+            format: 'raw', 'png', 'pipe'
+            size: キャプチャするサーフェスのサイズ
+            ring_size: リングバッファのフレーム数（書き出しの遅れを吸収できるフレーム数）
+            encoder_command: pipe形式のコマンド（{width} {height} {fps} {path} を置換）
+            fps: pipe形式でエンコーダに伝えるフレームレート
+        """
+        if format not in CAPTURE_FORMATS:
+            raise ValueError(f"unknown capture format '{format}' (available: {', '.join(CAPTURE_FORMATS)})")
+        self.path = path
+        self.format = format
+        self.size = size
+        width, height = size
+
+        # 32bitピクセルの (高さ, 幅)：サーフェスのメモリと同じ行順
+        self.buffers = np.empty((ring_size, height, width), dtype=np.uint32)
+        self.rgb = np.empty((height, width, 3), dtype=np.uint8)  # ライタースレッドの変換先
+        self.channels = None  # R, G, B のバイト位置（最初のキャプチャで決める）
+        self.free = queue.Queue()
+        self.filled = queue.Queue()
+        for index in range(ring_size):
+            self.free.put(index)
+
+        self.output = None
+        self.process = None
+        if format == 'raw':
+            self.output = open(path, 'wb')
+        elif format == 'png':
+            os.makedirs(path, exist_ok=True)
+        else:
+            command = encoder_command.format(width=width, height=height, fps=fps, path=path)
+            self.process = subprocess.Popen(shlex.split(command), stdin=subprocess.PIPE)
+            self.output = self.process.stdin
+
+        # 統計（キャプチャはメインスレッド、書き出しはライタースレッドだけが更新する）
+        self.captured = 0
+        self.dropped = 0
+        self.written = 0
+        self.capture_ms = 0.0
+        self.max_capture_ms = 0.0
+        self.write_ms = 0.0
+        self.error = None
+
+        self.writer = threading.Thread(target=self._write_loop, name="frame-capture", daemon=True)
+        self.writer.start()
+
+    def capture(self, surface):
+        """
+        サーフェスを空きバッファへコピーして書き出しを依頼（空きがなければ捨てる）
+
+        Args:
+            surface: 描画が終わった32bitのサーフェス（サイズは size と同じ）
+        """
+        start = time.perf_counter()
+        if self.channels is None:
+            if surface.get_bytesize() != 4:
+                self.error = ValueError(f"{surface.get_bitsize()}-bit surfaces are not supported")
+            else:
+                # リトルエンディアンの32bit値でのバイト位置
+                self.channels = [shift // 8 for shift in surface.get_shifts()[:3]]
+        if self.error is not None:
+            self.dropped += 1
+            return
+        try:
+            index = self.free.get_nowait()
+        except queue.Empty:
+            self.dropped += 1
+            return
+        # pixels2d は (幅, 高さ) でサーフェスをロックする参照なので、転置して行順にコピーしてすぐ手放す
+        np.copyto(self.buffers[index], pygame.surfarray.pixels2d(surface).T)
+        self.filled.put(index)
+
+        elapsed = (time.perf_counter() - start) * 1000
+        self.captured += 1
+        self.capture_ms += elapsed
+        self.max_capture_ms = max(self.max_capture_ms, elapsed)
+
+    def _write_loop(self):
+        """ライタースレッド：コピー済みのバッファを書き出して空きに戻す"""
+        while True:
+            index = self.filled.get()
+            if index is None:
+                return
+            start = time.perf_counter()
+            try:
+                if self.error is None:
+                    self._write(self.buffers[index])
+                    self.written += 1
+            except OSError as e:
+                # 書き出せなくなったら以後のフレームは捨てる（ゲームは止めない）
+                self.error = e
+            self.write_ms += (time.perf_counter() - start) * 1000
+            self.free.put(index)
+
+    def _write(self, frame):
+        # 32bitピクセル → 行順のRGB24
+        height, width = frame.shape
+        pixels = frame.view(np.uint8).reshape(height, width, 4)
+        rgb = self.rgb
+        for channel, offset in enumerate(self.channels):
+            rgb[..., channel] = pixels[..., offset]
+        if self.format == 'png':
+            with open(os.path.join(self.path, f"frame_{self.written:06d}.png"), 'wb') as f:
+                f.write(encode_png(rgb))
+        else:
+            self.output.write(rgb)
+
+    def close(self):
+        """残りのフレームを書き出してスレッドとファイル（エンコーダ）を閉じる"""
+        self.filled.put(None)
+        self.writer.join()
+        if self.output is not None:
+            try:
+                self.output.close()
+            except OSError as e:
+                self.error = self.error or e
+        if self.process is not None:
+            self.process.wait()
+        if self.error is not None:
+            print(f"Warning: frame capture stopped: {self.error}")
+
+    def summary(self):
+        """キャプチャの統計（main.pyの終了時の表示用）"""
+        captured = max(self.captured, 1)
+        return {
+            'captured': self.captured,
+            'dropped': self.dropped,
+            'written': self.written,
+            'avg_capture_ms': self.capture_ms / captured,
+            'max_capture_ms': self.max_capture_ms,
+            'avg_write_ms': self.write_ms / max(self.written, 1),
+        }
+
+
+if __name__ == "__main__":
+    # 自動操縦のゲームを60Hzで描画し、キャプチャなし・raw・pngで1フレームの処理時間
+    # （更新・描画・キャプチャ、待ち時間を除く）を比較。書き出しは待ち時間に進む。
+    # pngは書き出しが1フレームより遅いので、待たずに捨てていることを確かめる
+    import argparse
+    import shutil
+    import tempfile
+
+    parser = argparse.ArgumentParser(description="Frame capture benchmark")
+    parser.add_argument('--frames', type=int, default=300)
+    args = parser.parse_args()
+
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    from game import Game
+    from input_provider import AutopilotInput
+
+    game = Game(input_provider=AutopilotInput(), headless=True, immortal=True, interpolate=False)
+    game.sound_manager.enabled = False
+    game.skip_to_wave(4)
+    for _ in range(600):
+        game.update()
+
+    directory = tempfile.mkdtemp(prefix="capture_")
+    try:
+        print(f"{'mode':>6}{'frame':>9}{'capture':>10}{'max':>8}{'written':>9}{'dropped':>9}  (ms, {args.frames} frames)")
+        for format in (None, 'raw', 'png'):
+            capture = None
+            if format is not None:
+                path = os.path.join(directory, 'capture.rgb' if format == 'raw' else 'png')
+                capture = FrameCapture(path, format)
+            busy = 0.0
+            next_frame = time.perf_counter()
+            for _ in range(args.frames):
+                start = time.perf_counter()
+                game.update()
+                game._draw_live()
+                if capture is not None:
+                    capture.capture(game.screen)
+                busy += time.perf_counter() - start
+                next_frame += 1.0 / SIM_HZ
+                time.sleep(max(0.0, next_frame - time.perf_counter()))
+            frame_ms = busy / args.frames * 1000
+            if capture is None:
+                print(f"{'none':>6}{frame_ms:>9.2f}")
+                continue
+            capture.close()
+            stats = capture.summary()
+            print(f"{format:>6}{frame_ms:>9.2f}{stats['avg_capture_ms']:>10.2f}{stats['max_capture_ms']:>8.2f}"
+                  f"{stats['written']:>9}{stats['dropped']:>9}   (write {stats['avg_write_ms']:.2f} ms/frame)")
+    finally:
+        shutil.rmtree(directory)
@@ -0,0 +1,202 @@
+import time
+import pygame
+from collections import namedtuple, deque
+from constants import *
+from player import Player
+from force import Force
+from enemy import Enemy
+from bullet import Bullet
+from powerup import PowerUp
+from effects import Explosion
+from terrain import TerrainSegment
+
+# === 描画用の不変ビュー ===
+# 各ビューはエンティティのdraw()が参照する属性だけを持つnamedtuple。
+# draw()はクラスから借りているので、既存の描画コードがそのまま使える。
+
+
+class PlayerView(namedtuple('PlayerView', [
+        'x', 'y', 'width', 'height', 'invincible', 'blink_timer', 'recoil_offset',
+        'tilt_angle', 'idle_timer', 'shake_timer', 'shake_intensity',
+        'charging', 'charge_level', 'charge_time', 'color'])):
+    __slots__ = ()
+    hull_pose = Player.hull_pose
+    draw = Player.draw
+
+    @classmethod
+    def capture(cls, p):
+        return cls(p.x, p.y, p.width, p.height, p.invincible, p.blink_timer, p.recoil_offset,
+                   p.tilt_angle, p.idle_timer, p.shake_timer, p.shake_intensity,
+                   p.charging, p.charge_level, p.charge_time, p.color)
+
+
+class ForceView(namedtuple('ForceView', ['x', 'y', 'size', 'state', 'beam_length'])):
+    __slots__ = ()
+    active = True
+    draw = Force.draw
+
+    @classmethod
+    def capture(cls, f):
+        return cls(f.x, f.y, f.size, f.state, f.beam_length)
+
+
+class EnemyView(namedtuple('EnemyView', [
+        'enemy_type', 'x', 'y', 'rect_x', 'rect_y', 'size', 'color', 'time_alive', 'hp', 'max_hp'])):
+    __slots__ = ()
+    active = True
+    screen_x = Enemy.screen_x
+    draw = Enemy.draw  # 砲台はワールド座標のまま、描画時に terrain_scroll で画面座標に直す
+
+    @property
+    def rect(self):
+        # Rectへの代入は四捨五入、生成は切り捨てなので整数座標を別に保持する
+        return pygame.Rect(self.rect_x, self.rect_y, self.size, self.size)
+
+    @classmethod
+    def capture(cls, e):
+        return cls(e.enemy_type, e.x, e.y, e.rect.x, e.rect.y, e.size, e.color,
+                   e.time_alive, e.hp, e.max_hp)
+
+
+class BulletView(namedtuple('BulletView', [
+        'x', 'y', 'width', 'height', 'color', 'is_player_bullet', 'charge_level'])):
+    __slots__ = ()
+    active = True
+    draw = Bullet.draw
+
+    @property
+    def rect(self):
+        return pygame.Rect(self.x, self.y, self.width, self.height)
+
+    @classmethod
+    def capture(cls, b):
+        # 弾の描画はRectのみ参照するので整数座標で保持
+        return cls(b.rect.x, b.rect.y, b.width, b.height, b.color, b.is_player_bullet, b.charge_level)
+
+
+class PowerUpView(namedtuple('PowerUpView', ['x', 'y', 'size', 'color', 'name'])):
+    __slots__ = ()
+    active = True
+    draw = PowerUp.draw
+
+    @classmethod
+    def capture(cls, p):
+        return cls(p.x, p.y, p.size, p.color, p.name)
+
+
+class ExplosionView(namedtuple('ExplosionView', ['x', 'y', 'size', 'timer', 'particles'])):
+    __slots__ = ()
+    active = True
+    draw = Explosion.draw
+
+    @classmethod
+    def capture(cls, e):
+        particles = tuple({'x': p['x'], 'y': p['y'], 'size': p['size'], 'color': p['color']}
+                          for p in e.particles)
+        return cls(e.x, e.y, e.size, e.timer, particles)
+
+
+class TerrainView(namedtuple('TerrainView', ['x', 'top_height', 'bottom_height', 'width'])):
+    __slots__ = ()
+    draw = TerrainSegment.draw
+    _draw_details = TerrainSegment._draw_details
+
+    @classmethod
+    def capture(cls, s):
+        return cls(s.x, s.top_height, s.bottom_height, s.width)
+
+
+# HUD（draw_ui / draw_game_over）の入力
+HudState = namedtuple('HudState', [
+    'score', 'lives', 'wave_text', 'force_count', 'weapon_type',
+    'weapon_effect_timer', 'power_level', 'power_effect_timer',
+    'charging', 'charge_time', 'charge_level', 'player_x', 'player_y', 'player_width',
+    'lives_2'])
+
+
+# 1フレーム分の描画に必要な全情報
+FrameSnapshot = namedtuple('FrameSnapshot', [
+    'frame', 'input_time', 'stars', 'segments', 'terrain_scroll', 'players', 'forces', 'enemies',
+    'player_bullets', 'enemy_bullets', 'powerups', 'explosions', 'hud', 'game_over'])
+
+
+def capture_frame(game, frame, input_time):
+    """
+    ゲームの現在状態から描画用スナップショットを作成
+
+    Args:
+        game: Game
+        frame: シミュレーションステップ番号
+        input_time: このステップが使った入力のサンプリング時刻（perf_counter）
+
+    Returns:
+        FrameSnapshot
+    """
+    return FrameSnapshot(
+        frame,
+        input_time,
+        tuple((s['x'], s['y'], s['speed']) for s in game.stars),
+        tuple(TerrainView.capture(s) for s in game.terrain_manager.segments),
+        game.terrain_manager.scroll,
+        tuple(PlayerView.capture(p) for p in game.visible_players()),
+        tuple(ForceView.capture(f) for f in game.forces if f.active),
+        tuple(EnemyView.capture(e) for e in game.enemies if e.active),
+        tuple(BulletView.capture(b) for b in game.player_bullets if b.active),
+        tuple(BulletView.capture(b) for b in game.enemy_bullets if b.active),
+        tuple(PowerUpView.capture(p) for p in game.powerups if p.active),
+        tuple(ExplosionView.capture(e) for e in game.explosions if e.active),
+        game.hud_state(),
+        game.game_over,
+    )
+
+
+class SnapshotBuffer:
+    """
+    ダブルバッファ - シミュレーションスレッドが書き、描画スレッドが読む
+
+    書き込み側は常に裏側のスロットへ書いてから表裏のインデックスを
+    入れ替える。参照の代入はGILの下でアトミックなのでロックは不要で、
+    読み込み側は常に完成したスナップショットだけを見る。
+    """
+
+    def __init__(self):
+        self._slots = [None, None]
+        self._front = 0
+        self.published = 0
+
+    def publish(self, snapshot):
+        back = 1 - self._front
+        self._slots[back] = snapshot
+        self._front = back
+        self.published += 1
+
+    def latest(self):
+        return self._slots[self._front]
+
+
+class LatencyTracker:
+    """入力サンプリングから画面反映（flip）までの遅延を集計"""
+
+    def __init__(self, history=FRAME_LATENCY_HISTORY):
+        self.samples = deque(maxlen=history)
+
+    def record(self, input_time, photon_time=None):
+        if input_time is None:
+            return
+        if photon_time is None:
+            photon_time = time.perf_counter()
+        self.samples.append((photon_time - input_time) * 1000)
+
+    def summary(self):
+        """平均・中央値・95パーセンタイル・最大（ミリ秒）"""
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        n = len(ordered)
+        return {
+            'count': n,
+            'avg_ms': sum(ordered) / n,
+            'p50_ms': ordered[n // 2],
+            'p95_ms': ordered[min(n - 1, int(n * 0.95))],
+            'max_ms': ordered[-1],
+        }
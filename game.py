@@ -1,6 +1,12 @@
+import os
+import time
+import threading
+from collections import deque
+import numpy as np
 import pygame
 import random
 from constants import *
+from input_provider import KeyState, KeyboardInput
 from player import Player
 from force import Force
 from enemy import Enemy
@@ -10,22 +16,167 @@ from effects import Explosion
 from wave_manager import WaveManager
 from sound_manager import SoundManager
 from terrain_manager import TerrainManager
+from timer_wheel import TimerWheel
+from aiming import AimBatch
+from spatial_grid import SpatialGrid, PointGrid
+from collision_masks import MaskCache
+from render_target import RenderTarget
+from layers import LayerCompositor, render_lines
+from degradation import EntityBudgets, DegradationPolicy
+from frame_snapshot import HudState, SnapshotBuffer, LatencyTracker, capture_frame
+
+
+def _render_charge_gauge(surface, key):
+    """チャージゲージのレイヤー（key は (進み具合の幅, 色)）"""
+    charge_width, color = key
+    surface.fill(DARK_GRAY)
+    surface.fill(color, (0, 0, charge_width, CHARGE_GAUGE_HEIGHT))
+
 
 class Game:
-    def __init__(self):
-        pygame.init()
-        self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    def __init__(self, input_provider=None, headless=False, immortal=False,
+                 render_fps=RENDER_FPS, interpolate=True, threaded=False, players=1,
+                 stage=DEFAULT_STAGE, render_mode=RENDER_MODE, window_size=None,
+                 pixel_collision=PIXEL_COLLISION, terrain_blocks_bullets=TERRAIN_BLOCKS_BULLETS):
+        """
+        Args:
+            input_provider: 入力プロバイダ（Noneならキーボード）
+            headless: Trueならダミードライバで画面・音声なしに動かす
+            immortal: Trueならプレイヤーのライフが減らない（負荷生成用）
+            render_fps: 描画フレームレート上限（0なら無制限、シミュレーションはSIM_HZ固定）
+            interpolate: 描画時に前ステップとの間を補間するか
+            threaded: シミュレーションを別スレッドで実行し、描画はスナップショットから行う
+            players: プレイヤー数（2なら協力プレイ、2P機の入力はupdate()に渡す）
+            stage: ステージ名（stages.json）
+            render_mode: 描画モード（'direct', 'scale', 'sdl'、render_target.py）
+            window_size: scaleモードのウィンドウサイズ（Noneなら画面に収まる最大の整数倍）
+            pixel_collision: Rectが重なったときに描画の形のマスクで判定し直すか
+            terrain_blocks_bullets: 地形に入った弾を消すか
+        """
+        if headless:
+            os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+            os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+        # 起動時間の内訳（main.py --startup-profile）
+        self.startup_timings = {}
+        start = time.perf_counter()
+
+        # 使うモジュールだけ初期化（pygame.init()はミキサーも開くので、
+        # SoundManagerが別パラメータで開き直す分の時間が無駄になる）
+        pygame.display.init()
+        pygame.font.init()
+        self.startup_timings['pygame_init_ms'] = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        # 描画は常に内部解像度のサーフェスへ（表示時にウィンドウへ拡大）
+        self.render_target = RenderTarget(render_mode, window_size)
+        self.screen = self.render_target.surface
         pygame.display.set_caption("R-TYPE Clone")
+        self.startup_timings['display_ms'] = (time.perf_counter() - start) * 1000
         self.clock = pygame.time.Clock()
         self.running = True
-        self.game_over = False
 
-        # Sound manager
+        self.headless = headless
+        self.immortal = immortal
+        self.render_fps = render_fps
+        self.interpolate = interpolate
+        self.player_count = players
+        self.stage = stage
+
+        # Fixed timestep loop statistics
+        self.sim_steps = 0
+        self.dropped_sim_time = 0.0  # 追いつき上限で切り捨てた時間（秒）
+
+        # Threaded simulation / render split
+        self.threaded = threaded
+        self.snapshot_buffer = SnapshotBuffer()
+        self.pending_events = deque()    # 描画スレッド → シミュレーションスレッド
+        self.step_times = deque()        # シミュレーションスレッド → 描画スレッド（1ステップの処理時間ms）
+        self.latched_input = None        # 描画スレッドがサンプリングした (KeyState, 時刻)
+        self.simulation_error = None
+
+        # Input-to-photon latency
+        self.latency = LatencyTracker()
+        self.last_input_time = None
+        self.latency_step = 0
+        self.input_provider = input_provider if input_provider is not None else KeyboardInput()
+
+        # Sound manager（ミキサー初期化と効果音の合成はバックグラウンド）
         self.sound_manager = SoundManager()
 
+        # Quick save slot (F5 / F9)
+        self.quick_save = None
+
+        # Spectator stream (SpectatorServer, main.pyから設定)
+        self.spectator = None
+
+        # Frame capture (FrameCapture, main.pyから設定)
+        self.capture = None
+
+        # Metrics exporter (MetricsExporter, main.pyから設定)
+        self.metrics = None
+
+        # High scores / session records (ScoreStore, main.pyから設定)
+        self.score_store = None
+
+        # Live tuning (LiveTuning, main.pyから設定)
+        self.live_tuning = None
+
+        # Terrain streaming (TerrainStreamer, main.pyから設定)
+        self.terrain_streamer = None
+        self.collision_tests = 0  # 最新ステップの当たり判定の組み合わせ数
+
+        # Entity budgets & overload degradation
+        self.budgets = EntityBudgets()
+        self.degradation = DegradationPolicy()
+        self.fire_throttle_counter = 0
+
+        # 1フレーム分の狙い撃ち弾をまとめて照準する
+        self.aim_batch = AimBatch()
+        self.enemy_index = PointGrid()
+        self.enemy_grid = SpatialGrid()
+
+        # ピクセル単位の当たり判定（Rectの判定を通った組み合わせだけマスクで判定し直す）
+        self.mask_cache = MaskCache() if pixel_collision else None
+        self.terrain_blocks_bullets = terrain_blocks_bullets
+
+        # Font
+        start = time.perf_counter()
+        self.font = pygame.font.Font(None, 36)
+        self.small_font = pygame.font.Font(None, 24)
+        self.startup_timings['fonts_ms'] = (time.perf_counter() - start) * 1000
+
+        # HUD・ゲームオーバー画面の合成レイヤー（入力が変わったときだけ描き直す）
+        self.layers = self._create_layers()
+
+        self.reset()
+
+    def reset(self):
+        """ゲーム状態を初期化（開始時・リスタート時）"""
+        self.game_over = False
+
+        # このプレイの記録（score_store.py）
+        self.session_start = time.time()
+        self.session_sim_steps = self.sim_steps
+        self.session_frames = 0
+        self.session_frame_ms = 0.0
+        self.session_max_frame_ms = 0.0
+        self.session_dropped_sim_time = self.dropped_sim_time
+        self.session_recorded = False
+        self.session_ranked = True  # Waveの飛ばし・状態の読み込みでFalse（ランキングに載せない）
+
+        # クールダウン・時限効果のタイマー
+        self.timer_wheel = TimerWheel()
+
         # Game objects
-        self.player = Player()
-        self.player.sound_manager = self.sound_manager  # Give player access to sound
+        self.players = []
+        for index in range(self.player_count):
+            player = Player(index)
+            player.sound_manager = self.sound_manager  # Give player access to sound
+            player.immortal = self.immortal
+            player.timer_wheel = self.timer_wheel
+            self.players.append(player)
+        self.player = self.players[0]  # 1P（Forceの持ち主）
 
         # === Force system (3-Force support) ===
         self.forces = []  # Force配列（最大3つ）
@@ -35,6 +186,8 @@ class Game:
         self.forces.append(Force(FORCE_POSITION_CENTER))
         self.forces.append(Force(FORCE_POSITION_TOP))
         self.forces.append(Force(FORCE_POSITION_BOTTOM))
+        for force in self.forces:
+            force.timer_wheel = self.timer_wheel
         # =====================================
 
         self.enemies = []
@@ -44,19 +197,16 @@ class Game:
         self.explosions = []
 
         # Wave manager
-        self.wave_manager = WaveManager()
+        self.wave_manager = WaveManager(self.stage)
 
         # Terrain manager
-        self.terrain_manager = TerrainManager()
+        self.terrain_manager = TerrainManager(random.getrandbits(32))
+        self.prev_terrain_scroll = None  # 補間の始点（_store_previous_positions）
         self.terrain_damage_cooldown = 0  # 地形ダメージのクールダウン
 
         # Score
         self.score = 0
 
-        # Font
-        self.font = pygame.font.Font(None, 36)
-        self.small_font = pygame.font.Font(None, 24)
-
         # Background stars
         self.stars = []
         for _ in range(100):
@@ -65,76 +215,129 @@ class Game:
             speed = random.uniform(0.5, 2)
             self.stars.append({'x': x, 'y': y, 'speed': speed})
 
+    def skip_to_wave(self, wave):
+        """指定Waveから開始する（ソークテスト・負荷生成用、このプレイはランキングに載せない）"""
+        self.wave_manager.jump_to_wave(wave)
+        self.session_ranked = False
+
     def handle_events(self):
         for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                self.running = False
-
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_ESCAPE:
-                    self.running = False
-
-                # Force toggle (中央Forceのみ)
-                if event.key == pygame.K_c:
-                    if self.force_count > 0:
-                        self.forces[FORCE_POSITION_CENTER].toggle_state()
-                        self.sound_manager.play_force_toggle()
-
-                # Mute toggle
-                if event.key == pygame.K_m:
-                    self.sound_manager.toggle_mute()
-
-                # Weapon toggle (V key)
-                if event.key == pygame.K_v:
-                    self.player.toggle_weapon()
+            self.render_target.handle_event(event)
+            self.handle_event(event)
 
-                # Normal shooting (Z key)
-                if event.key == pygame.K_z:
-                    new_bullets = self.player.shoot()
-                    self.player_bullets.extend(new_bullets)
+    def handle_event(self, event):
+        """イベント1件を処理（スレッドモードではシミュレーションスレッドで呼ばれる）"""
+        if event.type == pygame.QUIT:
+            self.running = False
 
-                    # All active Forces also shoot
-                    for force in self.forces:
-                        if force.active:
-                            force_bullets = force.shoot()
-                            self.player_bullets.extend(force_bullets)
-
-                # Restart on game over
-                if self.game_over and event.key == pygame.K_r:
-                    self.__init__()
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_ESCAPE:
+                self.running = False
 
-    def update(self):
+            # Force toggle (中央Forceのみ)
+            if event.key == pygame.K_c:
+                if self.force_count > 0:
+                    self.forces[FORCE_POSITION_CENTER].toggle_state()
+                    self.sound_manager.play_force_toggle()
+
+            # Mute toggle
+            if event.key == pygame.K_m:
+                self.sound_manager.toggle_mute()
+
+            # Weapon toggle (V key)
+            if event.key == pygame.K_v:
+                self.player.toggle_weapon()
+
+            # Normal shooting (Z key)
+            if event.key == pygame.K_z:
+                new_bullets = self.player.shoot()
+                self.add_player_bullets(new_bullets)
+
+                # All active Forces also shoot
+                for force in self.forces:
+                    if force.active:
+                        force_bullets = force.shoot()
+                        self.add_player_bullets(force_bullets)
+
+            # Restart on game over
+            if self.game_over and event.key == pygame.K_r:
+                self.reset()
+
+            # Quick save / quick load
+            if event.key == pygame.K_F5:
+                from savestate import save_state
+                self.quick_save = save_state(self)
+            if event.key == pygame.K_F9 and self.quick_save is not None:
+                from savestate import load_state
+                load_state(self, self.quick_save)
+
+    def update(self, inputs=None):
+        """
+        1フレーム分のシミュレーション
+
+        Args:
+            inputs: プレイヤーごとのキー状態（Noneなら入力プロバイダから1Pの入力を取得）。
+                    指定時はForceの切り替えもキー状態から行い、ゲームオーバー後の
+                    自動リスタートはしない（ロールバック対戦で全ピアの結果を揃えるため）
+        """
         if self.game_over:
+            # ボット操作時は自動でリスタート
+            if inputs is None and self.input_provider.auto_restart:
+                self.reset()
             return
 
-        # Get keys for continuous input
-        keys = pygame.key.get_pressed()
-
-        # Update player (returns charge bullets if any)
-        charge_bullets = self.player.update(keys)
-        if charge_bullets:
-            self.player_bullets.extend(charge_bullets)
-            # All active Forces shoot when player releases charge
-            for force in self.forces:
-                if force.active:
-                    force_bullets = force.shoot()
-                    self.player_bullets.extend(force_bullets)
+        # 時刻が来たタイマーだけ発火（無敵・時限効果の終了、射撃可能フラグ）
+        self.timer_wheel.advance()
 
-        # Continuous shooting when Z is held
-        if keys[pygame.K_z]:
-            new_bullets = self.player.shoot()
-            self.player_bullets.extend(new_bullets)
-
-            for force in self.forces:
-                if force.active:
-                    force_bullets = force.shoot()
-                    self.player_bullets.extend(force_bullets)
+        if inputs is None:
+            # Get keys for continuous input
+            if self.latched_input is not None and isinstance(self.input_provider, KeyboardInput):
+                keys = self.latched_input[0]
+            else:
+                keys = self.input_provider.get_keys(self)
+            inputs = [keys] + [KeyState()] * (len(self.players) - 1)
+            force_from_keys = False
+        else:
+            force_from_keys = True
+
+        for player, keys in zip(self.players, inputs):
+            if player.lives <= 0:
+                continue  # 協力プレイで先に撃墜された機体
+
+            # Force toggle（押した瞬間のみ、1PのForce）
+            if force_from_keys and player is self.player:
+                if keys[pygame.K_c] and not player.force_button_held and self.force_count > 0:
+                    self.forces[FORCE_POSITION_CENTER].toggle_state()
+                    self.sound_manager.play_force_toggle()
+                player.force_button_held = keys[pygame.K_c]
+
+            # Update player (returns charge bullets if any)
+            charge_bullets = player.update(keys)
+            if charge_bullets:
+                self.add_player_bullets(charge_bullets)
+                # All active Forces shoot when player releases charge
+                if player is self.player:
+                    self._force_shoot()
+
+            # Continuous shooting when Z is held
+            if keys[pygame.K_z]:
+                new_bullets = player.shoot()
+                self.add_player_bullets(new_bullets)
+                if player is self.player:
+                    self._force_shoot()
 
         # Update Forces (複数対応)
         for force in self.forces:
             force.update(self.player.x, self.player.y, self.player.width, self.player.height)
+        self._fire_beams()
 
         # Update bullets
+        # ホーミングミサイルは移動前に敵の最近傍インデックスで目標を選んで旋回
+        missiles = [b for b in self.player_bullets if b.homing]
+        if missiles:
+            self._build_enemy_index()
+            for missile in missiles:
+                missile.steer(self.enemy_index)
         for bullet in self.player_bullets:
             bullet.update()
         self.player_bullets = [b for b in self.player_bullets if b.active]
@@ -144,24 +347,25 @@ class Game:
         self.enemy_bullets = [b for b in self.enemy_bullets if b.active]
 
         # Update enemies and spawn new ones
+        # Wave変更・地形パターン切り替えは地形マネージャーにも通知される
         old_wave = self.wave_manager.current_wave
-        self.wave_manager.update()
+        new_enemies = self.wave_manager.update(self.terrain_manager)
         if self.wave_manager.current_wave != old_wave:
             self.sound_manager.play_wave_change()
-            # Wave変更時に地形マネージャーにも通知
-            self.terrain_manager.set_wave(self.wave_manager.current_wave)
-
-        new_enemy = self.wave_manager.spawn_enemy()
-        if new_enemy:
-            self.enemies.append(new_enemy)
+        if new_enemies:
+            self.add_enemies(new_enemies)
 
+        target = self.target_player()
+        scroll = self.terrain_manager.scroll
         for enemy in self.enemies:
             # 砲台、WAVE型敵、ボスはプレイヤー座標も渡す（狙い撃ち弾のため）
             if enemy.enemy_type in [ENEMY_TYPE_TURRET, ENEMY_TYPE_WAVE, ENEMY_TYPE_BOSS_1, ENEMY_TYPE_BOSS_2, ENEMY_TYPE_BOSS_3]:
-                new_bullets = enemy.update(self.player.y, self.player.x)
+                new_bullets = enemy.update(target.y, target.x, self.aim_batch, scroll)
             else:
-                new_bullets = enemy.update(self.player.y)
-            self.enemy_bullets.extend(new_bullets)
+                new_bullets = enemy.update(target.y)
+            if new_bullets:
+                self.add_enemy_bullets(new_bullets, hasattr(enemy, 'is_boss'))
+        self.aim_batch.resolve(target.x, target.y, target.move_x, target.move_y)
         self.enemies = [e for e in self.enemies if e.active]
 
         # Update powerups
@@ -175,11 +379,15 @@ class Game:
         self.explosions = [e for e in self.explosions if e.active]
 
         # Update terrain
-        self.terrain_manager.update()
+        self.terrain_manager.update(self.terrain_streamer)
+
+        if self.terrain_blocks_bullets:
+            self._block_bullets()
 
         # 地形から新しく生成された砲台を取得
         new_turrets = self.terrain_manager.get_new_turrets()
-        self.enemies.extend(new_turrets)
+        if new_turrets:
+            self.add_enemies(new_turrets)
 
         # 地形ダメージクールダウン
         if self.terrain_damage_cooldown > 0:
@@ -195,50 +403,294 @@ class Game:
         # Collision detection
         self.check_collisions()
 
-        # Check game over
-        if self.player.lives <= 0 and not self.game_over:
+        # Check game over（全員撃墜で終了）
+        if not self.game_over and all(p.lives <= 0 for p in self.players):
             self.sound_manager.play_game_over()
             self.game_over = True
+            self.end_session()
+
+    def end_session(self, completed=True):
+        """
+        このプレイの記録をスコアストアに渡す（1プレイにつき1回）
+
+        ランキングに載せるのは、キーボードで無敵なしに最後まで遊んだプレイだけ
+        （自動操縦・無敵・Waveの飛ばし・状態の読み込み・途中終了は記録だけ残す）。
+        """
+        if self.score_store is None or self.session_recorded:
+            return
+        self.session_recorded = True
+        ranked = (completed and self.session_ranked and not self.immortal
+                  and isinstance(self.input_provider, KeyboardInput))
+        frames = self.session_frames
+        self.score_store.record({
+            'stage': self.stage,
+            'score': self.score,
+            'wave': self.wave_manager.current_wave,
+            'started_at': self.session_start,
+            'duration': time.time() - self.session_start,
+            'completed': int(completed),
+            'players': self.player_count,
+            'sim_steps': self.sim_steps - self.session_sim_steps,
+            'frames': frames,
+            'avg_frame_ms': self.session_frame_ms / frames if frames else 0.0,
+            'max_frame_ms': self.session_max_frame_ms,
+            'dropped_sim_ms': (self.dropped_sim_time - self.session_dropped_sim_time) * 1000,
+            'ranked': int(ranked),
+        })
+
+    def _block_bullets(self):
+        """
+        地形に入った弾を消す（自機弾・敵弾の中心を1回の配列判定でまとめて調べる）
+
+        1フレーム前の位置も地形の中だった弾（天井・床に埋まった砲台の弾）は消さない。
+        """
+        bullets = self.player_bullets + self.enemy_bullets
+        if not bullets:
+            return
+        x = np.array([b.x + b.width / 2 for b in bullets])
+        y = np.array([b.y + b.height / 2 for b in bullets])
+        vx = np.array([b.velocity_x for b in bullets])
+        vy = np.array([b.velocity_y for b in bullets])
+        inside = self.terrain_manager.blocked(np.concatenate((x, x - vx)), np.concatenate((y, y - vy)))
+        count = len(bullets)
+        entered = inside[:count] & ~inside[count:]
+        if not entered.any():
+            return
+        for index in np.flatnonzero(entered).tolist():
+            bullets[index].active = False
+        self.player_bullets = [b for b in self.player_bullets if b.active]
+        self.enemy_bullets = [b for b in self.enemy_bullets if b.active]
+
+    def _force_shoot(self):
+        """有効なForceが全て射撃"""
+        for force in self.forces:
+            if force.active:
+                force_bullets = force.shoot()
+                self.add_player_bullets(force_bullets)
+
+    def _build_enemy_index(self):
+        """有効な敵の中心座標で最近傍インデックスを作り直す（ホーミングミサイル用）"""
+        index = self.enemy_index
+        index.clear()
+        scroll = self.terrain_manager.scroll
+        for enemy in self.enemies:
+            if enemy.active:
+                index.insert(enemy, enemy.screen_x(scroll) + enemy.size / 2, enemy.y + enemy.size / 2)
+
+    def _fire_beams(self):
+        """
+        前方固定のForceのビーム
+
+        Forceの前端から右へレイを飛ばし、地形に当たる距離までの敵を近い順に
+        貫通数だけ削る。ボスと地形はビームを止める。
+        """
+        beams = []
+        for force in self.forces:
+            if force.active and force.beam_on:
+                beams.append(force)
+            else:
+                force.beam_length = 0
+        if not beams:
+            return
+
+        grid = self.enemy_grid
+        grid.clear()
+        scroll = self.terrain_manager.scroll
+        rects = {}  # 敵 → 画面座標の (x, y, width, height)
+        for enemy in self.enemies:
+            if enemy.active:
+                rect = rects[enemy] = tuple(enemy.screen_rect(scroll))
+                grid.insert(enemy, *rect)
+        pierce = FORCE_LASER_PIERCE[min(self.player.power_level, len(FORCE_LASER_PIERCE) - 1)]
+
+        for force in beams:
+            x, y = force.beam_origin()
+            length = max(SCREEN_WIDTH - x, 0)
+            wall = self.terrain_manager.raycast(x, y, 1, 0, length)
+            if wall is not None:
+                length = wall
+
+            hits = []
+            for distance, enemy in grid.raycast(x, y, 1, 0, length, rects.__getitem__):
+                hits.append(enemy)
+                if len(hits) >= pierce or (hasattr(enemy, 'is_boss') and enemy.is_boss):
+                    length = distance
+                    break
+            force.beam_length = length
+
+            if 'laser_tick' not in force.timers:
+                force.timer_wheel.schedule(force, 'laser_tick', FORCE_LASER_TICK)
+                for enemy in hits:
+                    if enemy.active and enemy.take_damage(FORCE_LASER_DAMAGE):
+                        self._on_enemy_destroyed(enemy)
+
+    def alive_players(self):
+        """撃墜されていないプレイヤー"""
+        return [p for p in self.players if p.lives > 0]
+
+    def target_player(self):
+        """敵が狙うプレイヤー（生存している最初の機体）"""
+        for player in self.players:
+            if player.lives > 0:
+                return player
+        return self.player
+
+    # === Spawning (entity budgets) ===
+
+    def add_player_bullets(self, bullets):
+        """プレイヤー弾を上限内で追加"""
+        if bullets:
+            self.player_bullets.extend(
+                self.budgets.admit('player_bullets', bullets, len(self.player_bullets)))
+
+    def add_enemy_bullets(self, bullets, critical=False):
+        """
+        敵弾を上限内で追加
+
+        Args:
+            bullets: 追加する弾
+            critical: ボスの弾ならTrue（負荷軽減の間引き対象外）
+        """
+        if not critical and self.degradation.throttle_fire():
+            self.fire_throttle_counter += 1
+            if self.fire_throttle_counter % DEGRADE_FIRE_THROTTLE != 0:
+                return
+        self.enemy_bullets.extend(
+            self.budgets.admit('enemy_bullets', bullets, len(self.enemy_bullets)))
+
+    def add_enemies(self, enemies):
+        """敵を上限内で追加（ボスはWave進行に関わるので常に追加）"""
+        turret_count = None
+        enemy_count = None
+        for enemy in enemies:
+            if hasattr(enemy, 'is_boss'):
+                self._admit_enemy(enemy)
+                continue
+
+            if enemy.enemy_type == ENEMY_TYPE_TURRET:
+                if turret_count is None:
+                    turret_count = sum(1 for e in self.enemies if e.enemy_type == ENEMY_TYPE_TURRET)
+                if not self.budgets.admit('turrets', [enemy], turret_count):
+                    continue
+                turret_count += 1
+            else:
+                if enemy_count is None:
+                    enemy_count = sum(1 for e in self.enemies
+                                      if e.enemy_type != ENEMY_TYPE_TURRET and not hasattr(e, 'is_boss'))
+                if not self.budgets.admit('enemies', [enemy], enemy_count):
+                    continue
+                enemy_count += 1
+            self._admit_enemy(enemy)
+
+    def _admit_enemy(self, enemy):
+        """敵を追加して射撃タイマーを登録"""
+        self.enemies.append(enemy)
+        if enemy.shoot_interval > 0:
+            # カウントダウン方式（0になった次のフレームで撃つ）と同じ間隔
+            period = enemy.shoot_interval + 1
+            self.timer_wheel.schedule(enemy, 'shoot', period, period)
+
+    def add_powerup(self, powerup):
+        """パワーアップを上限内で追加"""
+        self.powerups.extend(self.budgets.admit('powerups', [powerup], len(self.powerups)))
+
+    def spawn_explosion(self, x, y, size=30):
+        """
+        爆発を生成（負荷軽減レベルに応じてパーティクル削減・近接爆発の統合）
+        """
+        if self.degradation.merge_explosions():
+            radius_sq = DEGRADE_MERGE_RADIUS * DEGRADE_MERGE_RADIUS
+            for explosion in self.explosions:
+                if explosion.active and (explosion.x - x) ** 2 + (explosion.y - y) ** 2 <= radius_sq:
+                    # 既存の爆発を大きくして代用
+                    explosion.size = max(explosion.size, size)
+                    explosion.timer = max(explosion.timer, EXPLOSION_DURATION // 2)
+                    return
+
+        if self.budgets.room('explosions', len(self.explosions)) <= 0:
+            self.budgets.dropped['explosions'] += 1
+            return
+        self.explosions.append(Explosion(x, y, size, self.degradation.particle_count()))
+
+    def _on_enemy_destroyed(self, enemy):
+        """敵を倒したときの得点・爆発・ボス撃破・パワーアップのドロップ"""
+        self.score += enemy.score
+        self.sound_manager.play_explosion()
+        x = enemy.screen_x(self.terrain_manager.scroll)
+        self.spawn_explosion(
+            x + enemy.size // 2,
+            enemy.y + enemy.size // 2,
+            enemy.size
+        )
+
+        # ボスが倒された場合は次のWaveに進行
+        if hasattr(enemy, 'is_boss') and enemy.is_boss:
+            self.wave_manager.on_boss_defeated()
+
+        # Chance to drop powerup
+        if random.random() < 0.2:  # 20% chance
+            powerup_type = random.choice([
+                POWERUP_TYPE_FORCE,
+                POWERUP_TYPE_SPEED,
+                POWERUP_TYPE_POWER,
+                POWERUP_TYPE_3WAY,
+                POWERUP_TYPE_HOMING
+            ])
+            self.add_powerup(PowerUp(
+                x,
+                enemy.y + enemy.size // 2,
+                powerup_type
+            ))
+
+    def _precise_hit(self, a, a_rect, b, b_rect):
+        """
+        Rectが重なった2つのエンティティの精密判定（ピクセル判定が無効ならTrue）
+
+        プレイヤーと敵は描画の形のマスク、弾などはRectそのままの形で判定する。
+        a_rect, b_rect は画面座標の当たり判定のRect（砲台は Enemy.screen_rect()）。
+        """
+        masks = self.mask_cache
+        if masks is None:
+            return True
+        return masks.overlap(a_rect, self._shape_mask(a), b_rect, self._shape_mask(b))
+
+    def _shape_mask(self, entity):
+        if isinstance(entity, Player):
+            return self.mask_cache.player_mask(entity)
+        if isinstance(entity, Enemy):
+            return self.mask_cache.enemy_mask(entity)
+        return None
 
     def check_collisions(self):
+        if self.mask_cache is not None:
+            self.mask_cache.begin_frame()
+
+        # 総当たりの組み合わせ数（metrics.py）
+        player_count = len(self.players)
+        self.collision_tests = (len(self.player_bullets) * len(self.enemies)
+                                + len(self.enemy_bullets) * (len(self.forces) + player_count)
+                                + (len(self.enemies) + len(self.powerups)) * player_count)
+
+        # 敵の画面座標のRect（砲台はワールド座標に固定なので、ここで1回だけ直す）
+        scroll = self.terrain_manager.scroll
+        targets = [(enemy, enemy.screen_rect(scroll)) for enemy in self.enemies]
+
         # Player bullets vs enemies
         for bullet in self.player_bullets[:]:
             if not bullet.active:
                 continue
 
-            for enemy in self.enemies[:]:
+            for enemy, enemy_rect in targets:
                 if not enemy.active:
                     continue
 
-                if bullet.rect.colliderect(enemy.rect):
+                if bullet.rect.colliderect(enemy_rect) and self._precise_hit(enemy, enemy_rect,
+                                                                            bullet, bullet.rect):
                     bullet.hit()
                     if enemy.take_damage(bullet.damage):
-                        # Enemy destroyed
-                        self.score += enemy.score
-                        self.sound_manager.play_explosion()
-                        self.explosions.append(Explosion(
-                            enemy.x + enemy.size // 2,
-                            enemy.y + enemy.size // 2,
-                            enemy.size
-                        ))
-
-                        # ボスが倒された場合は次のWaveに進行
-                        if hasattr(enemy, 'is_boss') and enemy.is_boss:
-                            self.wave_manager.on_boss_defeated()
-
-                        # Chance to drop powerup
-                        if random.random() < 0.2:  # 20% chance
-                            powerup_type = random.choice([
-                                POWERUP_TYPE_FORCE,
-                                POWERUP_TYPE_SPEED,
-                                POWERUP_TYPE_POWER,
-                                POWERUP_TYPE_3WAY
-                            ])
-                            self.powerups.append(PowerUp(
-                                enemy.x,
-                                enemy.y + enemy.size // 2,
-                                powerup_type
-                            ))
+                        self._on_enemy_destroyed(enemy)
+
+        players = self.alive_players()
 
         # Enemy bullets vs player
         for bullet in self.enemy_bullets[:]:
@@ -259,43 +711,47 @@ class Game:
                 continue
 
             # Check player hit
-            if bullet.rect.colliderect(self.player.rect):
-                bullet.active = False
-                if self.player.take_damage():
-                    self.sound_manager.play_player_hit()
-                    self.explosions.append(Explosion(
-                        self.player.x + self.player.width // 2,
-                        self.player.y + self.player.height // 2,
-                        30
-                    ))
+            for player in players:
+                if bullet.rect.colliderect(player.rect) and self._precise_hit(player, player.rect,
+                                                                              bullet, bullet.rect):
+                    bullet.active = False
+                    self._damage_player(player, 30)
+                    break
 
         # Enemy collision with player
-        for enemy in self.enemies[:]:
+        for enemy, enemy_rect in targets:
             if not enemy.active:
                 continue
 
-            if enemy.rect.colliderect(self.player.rect):
+            hit_player = None
+            for player in players:
+                if enemy_rect.colliderect(player.rect) and self._precise_hit(player, player.rect,
+                                                                             enemy, enemy_rect):
+                    hit_player = player
+                    break
+
+            if hit_player is not None:
                 enemy.active = False
-                if self.player.take_damage():
-                    self.sound_manager.play_player_hit()
-                    self.explosions.append(Explosion(
-                        self.player.x + self.player.width // 2,
-                        self.player.y + self.player.height // 2,
-                        30
-                    ))
+                self._damage_player(hit_player, 30)
                 self.sound_manager.play_explosion()
-                self.explosions.append(Explosion(
-                    enemy.x + enemy.size // 2,
+                self.spawn_explosion(
+                    enemy_rect.x + enemy.size // 2,
                     enemy.y + enemy.size // 2,
                     enemy.size
-                ))
+                )
 
         # Powerup collection
         for powerup in self.powerups[:]:
             if not powerup.active:
                 continue
 
-            if powerup.rect.colliderect(self.player.rect):
+            collector = None
+            for player in players:
+                if powerup.rect.colliderect(player.rect):
+                    collector = player
+                    break
+
+            if collector is not None:
                 powerup.active = False
                 self.sound_manager.play_powerup()
 
@@ -312,170 +768,528 @@ class Game:
                         self.force_count = 3
                     # 3つ既に取得済みの場合は無視
                 elif powerup.powerup_type == POWERUP_TYPE_SPEED:
-                    self.player.add_speed()
+                    collector.add_speed()
                 elif powerup.powerup_type == POWERUP_TYPE_POWER:
-                    self.player.add_power()
+                    collector.add_power()
                 elif powerup.powerup_type == POWERUP_TYPE_3WAY:
-                    self.player.set_weapon_type(WEAPON_TYPE_3WAY)
+                    collector.set_weapon_type(WEAPON_TYPE_3WAY)
+                elif powerup.powerup_type == POWERUP_TYPE_HOMING:
+                    collector.set_weapon_type(WEAPON_TYPE_HOMING)
 
-        # Terrain collision with player
+        # Terrain collision with player（クールダウンは全機共通）
         if self.terrain_damage_cooldown <= 0:
-            if self.terrain_manager.check_collision(self.player.rect):
-                if self.player.take_damage():
-                    self.sound_manager.play_player_hit()
-                    self.explosions.append(Explosion(
-                        self.player.x + self.player.width // 2,
-                        self.player.y + self.player.height // 2,
-                        20  # 小さめの爆発
-                    ))
-                    self.terrain_damage_cooldown = TERRAIN_DAMAGE_COOLDOWN
-
-    def draw(self):
+            for player in players:
+                if self.terrain_manager.check_collision(player.rect):
+                    if self._damage_player(player, 20):  # 小さめの爆発
+                        self.terrain_damage_cooldown = TERRAIN_DAMAGE_COOLDOWN
+
+    def _damage_player(self, player, explosion_size):
+        """プレイヤー被弾（無敵中でなければ爆発を出してTrueを返す）"""
+        if player.take_damage():
+            self.sound_manager.play_player_hit()
+            self.spawn_explosion(
+                player.x + player.width // 2,
+                player.y + player.height // 2,
+                explosion_size
+            )
+            return True
+        return False
+
+    def step(self):
+        """固定タイムステップ1回分のシミュレーション"""
+        if self.live_tuning is not None and self.live_tuning.pending:
+            self.live_tuning.apply(self)  # ステップの合間に反映
+        self._store_previous_positions()
+        if self.latched_input is not None and isinstance(self.input_provider, KeyboardInput):
+            # スレッドモード：描画スレッドがサンプリングした入力の時刻
+            self.last_input_time = self.latched_input[1]
+        else:
+            self.last_input_time = time.perf_counter()
+        self.update()
+        self.sim_steps += 1
+        if self.spectator is not None:
+            self.spectator.publish(self)
+        if self.metrics is not None:
+            self.metrics.record_step(self)
+
+    def _interpolated_objects(self):
+        """描画時に位置を補間するオブジェクト（地形セグメントと背景の星は別扱い）"""
+        yield from self.players
+        yield from self.forces
+        yield from self.enemies
+        yield from self.player_bullets
+        yield from self.enemy_bullets
+        yield from self.powerups
+
+    def _store_previous_positions(self):
+        """ステップ前の位置を記録（補間の始点）"""
+        if not self.interpolate:
+            return
+        for obj in self._interpolated_objects():
+            obj.prev_x = obj.x
+            obj.prev_y = obj.y
+        self.prev_terrain_scroll = self.terrain_manager.scroll
+        for star in self.stars:
+            star['prev_x'] = star['x']
+
+    def _apply_interpolation(self, alpha):
+        """
+        前ステップと現ステップの間の位置に一時的に動かす
+
+        Returns:
+            tuple: 元に戻すための保存値
+        """
+        saved_objects = []
+        for obj in self._interpolated_objects():
+            prev_x = getattr(obj, 'prev_x', None)
+            if prev_x is None:
+                continue  # このステップで生成された
+            x = obj.x
+            y = obj.y
+            dx = x - prev_x
+            dy = y - obj.prev_y
+            if abs(dx) > INTERPOLATION_MAX_JUMP or abs(dy) > INTERPOLATION_MAX_JUMP:
+                continue
+            saved_objects.append((obj, x, y))
+            obj.x = prev_x + dx * alpha
+            obj.y = obj.prev_y + dy * alpha
+            obj.rect.x = obj.x
+            obj.rect.y = obj.y
+
+        saved_stars = []
+        for star in self.stars:
+            prev_x = star.get('prev_x')
+            if prev_x is not None and abs(star['x'] - prev_x) <= INTERPOLATION_MAX_JUMP:
+                saved_stars.append((star, star['x']))
+                star['x'] = prev_x + (star['x'] - prev_x) * alpha
+
+        return saved_objects, saved_stars
+
+    def _restore_positions(self, saved):
+        """_apply_interpolation で動かした位置を元に戻す"""
+        saved_objects, saved_stars = saved
+        for obj, x, y in saved_objects:
+            obj.x = x
+            obj.y = y
+            obj.rect.x = x
+            obj.rect.y = y
+        for star, x in saved_stars:
+            star['x'] = x
+
+    def draw(self, alpha=1.0):
+        """
+        描画
+
+        Args:
+            alpha: 前ステップから現ステップまでの補間係数（0.0〜1.0）
+        """
+        saved = None
+        terrain_scroll = self.terrain_manager.scroll
+        if self.interpolate and alpha < 1.0:
+            saved = self._apply_interpolation(alpha)
+            # 地形はスクロール量だけを補間する
+            prev_scroll = self.prev_terrain_scroll
+            if prev_scroll is not None and abs(terrain_scroll - prev_scroll) <= INTERPOLATION_MAX_JUMP:
+                terrain_scroll = prev_scroll + (terrain_scroll - prev_scroll) * alpha
+
+        self._draw_live(terrain_scroll)
+
+        if saved is not None:
+            self._restore_positions(saved)
+
+        self.render_target.present()
+        if self.latency_step != self.sim_steps:
+            self.latency_step = self.sim_steps
+            self.latency.record(self.last_input_time)
+
+    def _draw_scene(self, stars, segments, terrain_scroll, players, forces, enemies,
+                    player_bullets, enemy_bullets, powerups, explosions, hud, game_over):
+        """
+        シーンを描画（ライブのエンティティでもスナップショットのビューでも同じコード）
+
+        Args:
+            stars: (x, y, speed) の列
+            segments: ワールド座標の地形セグメントの列
+            terrain_scroll: 画面の左端のワールド座標（地形はここで1回だけ画面座標に直す）
+            その他: draw(screen) を持つオブジェクトの列
+        """
         # Clear screen
         self.screen.fill(BLACK)
 
         # Draw stars
-        for star in self.stars:
-            size = int(star['speed'])
+        for x, y, speed in stars:
+            size = int(speed)
             pygame.draw.circle(
                 self.screen,
                 WHITE,
-                (int(star['x']), int(star['y'])),
+                (int(x), int(y)),
                 max(1, size)
             )
 
         # Draw terrain (before player but after stars)
-        self.terrain_manager.draw(self.screen)
+        if self.terrain_streamer is not None:
+            self.terrain_streamer.draw(self.screen, segments, terrain_scroll)
+        else:
+            for segment in segments:
+                segment.draw(self.screen, terrain_scroll)
 
         # Draw game objects
-        self.player.draw(self.screen)
+        for player in players:
+            player.draw(self.screen)
 
         # Draw Forces (複数対応)
-        for force in self.forces:
+        for force in forces:
             force.draw(self.screen)
 
-        for enemy in self.enemies:
-            enemy.draw(self.screen)
+        for enemy in enemies:
+            enemy.draw(self.screen, terrain_scroll)
 
-        for bullet in self.player_bullets:
+        for bullet in player_bullets:
             bullet.draw(self.screen)
 
-        for bullet in self.enemy_bullets:
+        for bullet in enemy_bullets:
             bullet.draw(self.screen)
 
-        for powerup in self.powerups:
+        for powerup in powerups:
             powerup.draw(self.screen)
 
-        for explosion in self.explosions:
+        for explosion in explosions:
             explosion.draw(self.screen)
 
-        # Draw UI
-        self.draw_ui()
-
-        # Draw game over screen
-        if self.game_over:
-            self.draw_game_over()
-
-        pygame.display.flip()
+        # Draw UI（HUDとゲームオーバー画面のレイヤーを更新して、まとめて重ねる）
+        self.draw_ui(hud)
+        if game_over:
+            self.draw_game_over(hud)
+        else:
+            self.layers.hide('dim', 'game_over')
+        self.layers.compose(self.screen)
+
+    def _draw_live(self, terrain_scroll=None):
+        """
+        ゲームオブジェクトを直接描画
+
+        Args:
+            terrain_scroll: 地形のスクロール量（補間済み、Noneなら現在のステップ）
+        """
+        if terrain_scroll is None:
+            terrain_scroll = self.terrain_manager.scroll
+        self._draw_scene(
+            ((star['x'], star['y'], star['speed']) for star in self.stars),
+            self.terrain_manager.segments,
+            terrain_scroll,
+            self.visible_players(),
+            self.forces,
+            self.enemies,
+            self.player_bullets,
+            self.enemy_bullets,
+            self.powerups,
+            self.explosions,
+            self.hud_state(),
+            self.game_over,
+        )
+
+    def draw_snapshot(self, snapshot):
+        """スナップショットを描画（スレッドモードの描画スレッド用）"""
+        self._draw_scene(
+            snapshot.stars,
+            snapshot.segments,
+            snapshot.terrain_scroll,
+            snapshot.players,
+            snapshot.forces,
+            snapshot.enemies,
+            snapshot.player_bullets,
+            snapshot.enemy_bullets,
+            snapshot.powerups,
+            snapshot.explosions,
+            snapshot.hud,
+            snapshot.game_over,
+        )
+
+    def visible_players(self):
+        """描画するプレイヤー（協力プレイでは撃墜された機体を消す）"""
+        if len(self.players) == 1:
+            return self.players
+        return self.alive_players() or self.players[:1]
+
+    def hud_state(self):
+        """HUD描画に必要な値をまとめて返す"""
+        player = self.player
+        return HudState(
+            self.score,
+            player.lives,
+            self.wave_manager.get_wave_text(),
+            self.force_count,
+            player.weapon_type,
+            player.weapon_effect_timer,
+            player.power_level,
+            self.timer_wheel.remaining(player, 'power_effect'),
+            player.charging,
+            player.charge_time,
+            player.charge_level,
+            player.x,
+            player.y,
+            player.width,
+            self.players[1].lives if len(self.players) > 1 else None,
+        )
+
+    def _create_layers(self):
+        """HUD・ゲームオーバー画面のレイヤー（layers.py、下から重ねる順）"""
+        layers = LayerCompositor()
+        layers.add('score', (SCREEN_WIDTH // 2, 40), position=(10, 10))
+        layers.add('lives', (SCREEN_WIDTH // 2, 30), position=(10, 50))
+        layers.add('wave', (100, 30), position=(SCREEN_WIDTH - 100, 10))
+        layers.add('charge', (CHARGE_GAUGE_WIDTH, CHARGE_GAUGE_HEIGHT), _render_charge_gauge, per_pixel=False)
+        layers.add('status', (SCREEN_WIDTH - 20, 90), position=(10, 80))
+        layers.add('dim', (SCREEN_WIDTH, SCREEN_HEIGHT), lambda surface, key: surface.fill(BLACK),
+                   alpha=GAME_OVER_DIM_ALPHA, per_pixel=False)
+        layers.add('game_over', (SCREEN_WIDTH, SCREEN_HEIGHT), self._render_game_over)
+        return layers
+
+    def draw_ui(self, hud):
+        """HUDのレイヤーを更新（描き直すのは表示する文字や値が変わったレイヤーだけ）"""
+        layers = self.layers
 
-    def draw_ui(self):
         # Score
-        score_text = self.font.render(f"Score: {self.score}", True, WHITE)
-        self.screen.blit(score_text, (10, 10))
+        layers.show('score', ((self.font, f"Score: {hud.score}", WHITE, 'topleft', (0, 0)),))
 
         # Lives
-        lives_text = self.small_font.render(f"Lives: {self.player.lives}", True, WHITE)
-        self.screen.blit(lives_text, (10, 50))
+        if hud.lives_2 is None:
+            lives = f"Lives: {hud.lives}"
+        else:
+            lives = f"Lives: 1P {hud.lives}  2P {hud.lives_2}"
+        layers.show('lives', ((self.small_font, lives, WHITE, 'topleft', (0, 0)),))
 
         # Wave
-        wave_text = self.small_font.render(self.wave_manager.get_wave_text(), True, CYAN)
-        self.screen.blit(wave_text, (SCREEN_WIDTH - 100, 10))
-
-        # Charge gauge
-        if self.player.charging:
-            gauge_width = 100
-            gauge_height = 10
-            gauge_x = self.player.x + self.player.width + 10
-            gauge_y = self.player.y
-
-            # Background
-            pygame.draw.rect(
-                self.screen,
-                DARK_GRAY,
-                (gauge_x, gauge_y, gauge_width, gauge_height)
-            )
+        layers.show('wave', ((self.small_font, hud.wave_text, CYAN, 'topleft', (0, 0)),))
 
-            # Charge progress
-            charge_progress = min(1.0, self.player.charge_time / CHARGE_LEVEL_3_TIME)
-            charge_width = int(gauge_width * charge_progress)
+        # Charge gauge（機体の右に表示、レイヤーは位置だけ動かす）
+        if hud.charging:
+            charge_progress = min(1.0, hud.charge_time / CHARGE_LEVEL_3_TIME)
 
             # Color based on level
-            if self.player.charge_level >= 3:
+            if hud.charge_level >= 3:
                 color = RED
-            elif self.player.charge_level >= 2:
+            elif hud.charge_level >= 2:
                 color = YELLOW
             else:
                 color = WHITE
 
-            pygame.draw.rect(
-                self.screen,
-                color,
-                (gauge_x, gauge_y, charge_width, gauge_height)
-            )
+            layers.show('charge', (int(CHARGE_GAUGE_WIDTH * charge_progress), color),
+                        (hud.player_x + hud.player_width + 10, hud.player_y))
+        else:
+            layers.hide('charge')
+
+        # Force / Weapon / Power（表示する行だけ上から詰める）
+        lines = []
 
         # Force indicator (複数対応)
-        if self.force_count > 0:
-            force_text = self.small_font.render(f"FORCE: {self.force_count} Active", True, ORANGE)
-            self.screen.blit(force_text, (10, 80))
+        if hud.force_count > 0:
+            lines.append((self.small_font, f"FORCE: {hud.force_count} Active", ORANGE, 'topleft', (0, 0)))
 
         # Weapon type indicator
-        weapon_name = "NORMAL" if self.player.weapon_type == WEAPON_TYPE_NORMAL else "3-WAY"
-        if self.player.way3_effect_timer > 0:
-            # 3-WAY効果の残り時間を表示
-            time_left = self.player.way3_effect_timer / FPS
-            weapon_text = self.small_font.render(f"WEAPON: {weapon_name} ({time_left:.1f}s)", True, CYAN)
+        weapon_name = WEAPON_NAMES.get(hud.weapon_type, "NORMAL")
+        if hud.weapon_effect_timer > 0:
+            # 武器の時限効果の残り時間を表示
+            time_left = hud.weapon_effect_timer / FPS
+            weapon = f"WEAPON: {weapon_name} ({time_left:.1f}s)"
         else:
-            weapon_text = self.small_font.render(f"WEAPON: {weapon_name}", True, CYAN)
-        self.screen.blit(weapon_text, (10, 110 if self.force_count > 0 else 80))
+            weapon = f"WEAPON: {weapon_name}"
+        lines.append((self.small_font, weapon, CYAN, 'topleft', (0, 30 * len(lines))))
 
         # Power level indicator
-        if self.player.power_level > 1:
-            fire_rate = int(100 * (0.8 ** min(self.player.power_level - 1, 3)))
-            if self.player.power_effect_timer > 0:
+        if hud.power_level > 1:
+            fire_rate = int(100 * (0.8 ** min(hud.power_level - 1, 3)))
+            if hud.power_effect_timer > 0:
                 # POWER効果の残り時間を表示
-                time_left = self.player.power_effect_timer / FPS
-                power_text = self.small_font.render(f"POWER: Lv.{self.player.power_level} (Fire Rate: {fire_rate}%) ({time_left:.1f}s)", True, RED)
+                time_left = hud.power_effect_timer / FPS
+                power = f"POWER: Lv.{hud.power_level} (Fire Rate: {fire_rate}%) ({time_left:.1f}s)"
             else:
-                power_text = self.small_font.render(f"POWER: Lv.{self.player.power_level} (Fire Rate: {fire_rate}%)", True, RED)
-            self.screen.blit(power_text, (10, 140 if self.force_count > 0 else 110))
-
-    def draw_game_over(self):
-        # Semi-transparent overlay
-        overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-        overlay.set_alpha(200)
-        overlay.fill(BLACK)
-        self.screen.blit(overlay, (0, 0))
-
-        # Game Over text
-        game_over_text = self.font.render("GAME OVER", True, RED)
-        text_rect = game_over_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 50))
-        self.screen.blit(game_over_text, text_rect)
-
-        # Final score
-        score_text = self.font.render(f"Final Score: {self.score}", True, WHITE)
-        score_rect = score_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2))
-        self.screen.blit(score_text, score_rect)
-
-        # Restart instruction
-        restart_text = self.small_font.render("Press R to Restart or ESC to Quit", True, WHITE)
-        restart_rect = restart_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 50))
-        self.screen.blit(restart_text, restart_rect)
-
-    def run(self):
+                power = f"POWER: Lv.{hud.power_level} (Fire Rate: {fire_rate}%)"
+            lines.append((self.small_font, power, RED, 'topleft', (0, 30 * len(lines))))
+        layers.show('status', tuple(lines))
+
+    def draw_game_over(self, hud):
+        """ゲームオーバー画面のレイヤーを表示（描き直すのはスコアか上位N件が変わったときだけ）"""
+        # Semi-transparent overlay（黒の塗りつぶしは最初の1回だけ）
+        self.layers.show('dim', None)
+        # High scores（書き込みスレッドがキャッシュした上位N件、不変のタプル）
+        top_scores = self.score_store.top_scores if self.score_store is not None else ()
+        self.layers.show('game_over', (hud.score, top_scores))
+
+    def _render_game_over(self, surface, key):
+        """ゲームオーバー画面の文字（key は (スコア, 上位N件)）"""
+        score, top_scores = key
+        center_x = SCREEN_WIDTH // 2
+        center_y = SCREEN_HEIGHT // 2
+        lines = [
+            # Game Over text
+            (self.font, "GAME OVER", RED, 'center', (center_x, center_y - 50)),
+            # Final score
+            (self.font, f"Final Score: {score}", WHITE, 'center', (center_x, center_y)),
+            # Restart instruction
+            (self.small_font, "Press R to Restart or ESC to Quit", WHITE, 'center', (center_x, center_y + 50)),
+        ]
+        if top_scores:
+            y = center_y + 90
+            lines.append((self.small_font, "HIGH SCORES", YELLOW, 'center', (center_x, y)))
+            for rank, (top_score, wave, _) in enumerate(top_scores, 1):
+                color = CYAN if top_score == score else WHITE
+                lines.append((self.small_font, f"{rank}. {top_score:>8}   WAVE {wave}", color,
+                              'center', (center_x, y + rank * 24)))
+        return render_lines(surface, lines)
+
+    def run(self, max_frames=None):
+        """
+        固定タイムステップのゲームループ
+
+        経過時間をアキュムレータに貯め、SIM_HZ刻みでupdate()を必要回数実行する。
+        描画はrender_fpsで行い、残り時間の割合で位置を補間する。
+
+        Args:
+            max_frames: このシミュレーションステップ数で終了（Noneなら無制限）
+        """
+        if self.threaded:
+            self._run_threaded(max_frames)
+            return
+
+        sim_dt = 1.0 / SIM_HZ
+        accumulator = 0.0
+        previous = time.perf_counter()
+
         while self.running:
+            now = time.perf_counter()
+            # 長い停止（ウィンドウ移動など）で一気に進まないよう上限を設ける
+            accumulator += min(now - previous, MAX_FRAME_TIME)
+            previous = now
+
             self.handle_events()
-            self.update()
-            self.draw()
-            self.clock.tick(FPS)
 
+            steps = 0
+            while accumulator >= sim_dt and steps < MAX_SIM_STEPS_PER_FRAME:
+                self.step()
+                accumulator -= sim_dt
+                steps += 1
+                if max_frames is not None and self.sim_steps >= max_frames:
+                    self.running = False
+                    break
+
+            # 追いつけない分は切り捨て（spiral of death回避）
+            if accumulator >= sim_dt:
+                dropped = accumulator - accumulator % sim_dt
+                self.dropped_sim_time += dropped
+                accumulator -= dropped
+
+            self.draw(accumulator / sim_dt)
+            if self.capture is not None:
+                self.capture.capture(self.screen)
+            self._record_frame((time.perf_counter() - now) * 1000)
+            self.clock.tick(self.render_fps)
+
+        self.shutdown()
+
+    def _record_frame(self, frame_ms):
+        """描画1フレームの処理時間を負荷軽減・メトリクス・プレイ記録へ"""
+        self.degradation.record_frame(frame_ms)
+        if self.metrics is not None:
+            self.metrics.record_frame(frame_ms)
+        self.session_frames += 1
+        self.session_frame_ms += frame_ms
+        if frame_ms > self.session_max_frame_ms:
+            self.session_max_frame_ms = frame_ms
+
+    def shutdown(self):
+        """pygameを終了（合成中のサウンドスレッドが終了後のミキサーに触らないよう待つ）"""
+        if self.capture is not None:
+            self.capture.close()
+        if self.metrics is not None:
+            self.metrics.close()
+        if self.live_tuning is not None:
+            self.live_tuning.close()
+        if self.terrain_streamer is not None:
+            self.terrain_streamer.close()
+        if self.spectator is not None:
+            self.spectator.close()
+        if self.score_store is not None:
+            self.end_session(completed=False)  # ゲームオーバー前に終了したプレイ
+            self.score_store.close()
+        self.sound_manager.wait_ready(SOUND_INIT_TIMEOUT)
         pygame.quit()
+
+    def _run_threaded(self, max_frames):
+        """
+        シミュレーション／描画の2スレッド構成
+
+        メインスレッド：イベント取得・入力サンプリング・スナップショット描画
+        ワーカースレッド：固定タイムステップでupdate()し、スナップショットを公開
+        """
+        worker = threading.Thread(target=self._simulation_loop, args=(max_frames,),
+                                  name="simulation", daemon=True)
+        self.latched_input = (KeyState.from_pressed(pygame.key.get_pressed()), time.perf_counter())
+        worker.start()
+
+        last_frame = -1
+        while self.running:
+            frame_start = time.perf_counter()
+
+            # pygameのイベントはメインスレッドでしか取得できない
+            for event in pygame.event.get():
+                self.render_target.handle_event(event)
+                if event.type == pygame.QUIT or (
+                        event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
+                    self.running = False
+                else:
+                    self.pending_events.append(event)
+            self.latched_input = (KeyState.from_pressed(pygame.key.get_pressed()),
+                                  time.perf_counter())
+
+            snapshot = self.snapshot_buffer.latest()
+            if snapshot is not None and snapshot.frame != last_frame:
+                last_frame = snapshot.frame
+                self.draw_snapshot(snapshot)
+                self.render_target.present()
+                if self.capture is not None:
+                    self.capture.capture(self.screen)
+                self.latency.record(snapshot.input_time)
+                # 描画と、前の描画以降で最も重かったシミュレーションステップの遅い方
+                # （負荷軽減が減らすエンティティのコストはシミュレーション側に出る）
+                frame_ms = (time.perf_counter() - frame_start) * 1000
+                while self.step_times:
+                    frame_ms = max(frame_ms, self.step_times.popleft())
+                self._record_frame(frame_ms)
+
+            self.clock.tick(self.render_fps)
+
+        worker.join()
+        self.shutdown()
+        if self.simulation_error is not None:
+            raise self.simulation_error
+
+    def _simulation_loop(self, max_frames):
+        """ワーカースレッド：固定タイムステップでシミュレーションを進める"""
+        sim_dt = 1.0 / SIM_HZ
+        next_step = time.perf_counter()
+        try:
+            while self.running:
+                while self.pending_events:
+                    self.handle_event(self.pending_events.popleft())
+
+                step_start = time.perf_counter()
+                self.step()
+                self.snapshot_buffer.publish(
+                    capture_frame(self, self.sim_steps, self.last_input_time))
+                self.step_times.append((time.perf_counter() - step_start) * 1000)
+                if max_frames is not None and self.sim_steps >= max_frames:
+                    self.running = False
+                    break
+
+                next_step += sim_dt
+                now = time.perf_counter()
+                if next_step > now:
+                    time.sleep(next_step - now)  # GILを解放
+                elif now - next_step > MAX_FRAME_TIME:
+                    # 追いつけない分は切り捨て
+                    self.dropped_sim_time += now - next_step
+                    next_step = now
+        except Exception as e:
+            self.simulation_error = e
+            self.running = False
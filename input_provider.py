@@ -0,0 +1,243 @@
+import time
+import pygame
+from constants import *
+from spatial_grid import SpatialGrid
+
+# ボタンとビットの対応（KeyStateで使用）
+INPUT_LEFT = 1 << 0
+INPUT_RIGHT = 1 << 1
+INPUT_UP = 1 << 2
+INPUT_DOWN = 1 << 3
+INPUT_SHOOT = 1 << 4
+INPUT_CHARGE = 1 << 5
+INPUT_FORCE = 1 << 6
+
+_KEY_BITS = {
+    pygame.K_LEFT: INPUT_LEFT,
+    pygame.K_RIGHT: INPUT_RIGHT,
+    pygame.K_UP: INPUT_UP,
+    pygame.K_DOWN: INPUT_DOWN,
+    pygame.K_z: INPUT_SHOOT,
+    pygame.K_x: INPUT_CHARGE,
+    pygame.K_c: INPUT_FORCE,
+}
+
+
+class KeyState:
+    """
+    pygame.key.get_pressed() 互換のキー状態
+
+    ゲームが参照するボタンだけをビットマスクで保持する。
+    keys[pygame.K_LEFT] のように添字アクセスできるので、
+    Player.update / Game.update はそのまま受け取れる。
+    """
+    __slots__ = ('bits',)
+
+    def __init__(self, bits=0):
+        self.bits = bits
+
+    def __getitem__(self, key):
+        bit = _KEY_BITS.get(key)
+        if bit is None:
+            return False
+        return (self.bits & bit) != 0
+
+    @classmethod
+    def from_pressed(cls, pressed):
+        """pygame.key.get_pressed() の結果からKeyStateを作成"""
+        bits = 0
+        for key, bit in _KEY_BITS.items():
+            if pressed[key]:
+                bits |= bit
+        return cls(bits)
+
+
+class KeyboardInput:
+    """キーボード入力（通常プレイ）"""
+
+    # ゲームオーバー時に自動でリスタートしない
+    auto_restart = False
+
+    def get_keys(self, game):
+        return pygame.key.get_pressed()
+
+
+class AutopilotInput:
+    """
+    自動操縦ボット - 敵弾・敵・地形を避けながら撃ち続ける
+
+    負荷生成・ソークテスト用。毎フレーム、先読みの間に自機に届きうる脅威
+    （敵弾と敵）だけを Rect.collidelistall で選んで空間グリッドに登録し、
+    数フレーム先の脅威の位置をサンプルフレームごとに1回のグリッドクエリで求め、
+    9方向の移動候補それぞれの危険度をそれと突き合わせて評価する。
+    予算 budget_ms はグリッドの構築から数え、構築は予算の半分で打ち切り
+    （近くの脅威がそれでも多すぎるとき）、評価は各候補の前に期限を確かめて
+    それまでの最良候補を採用するので、計測対象のフレーム時間を歪めない。
+    """
+
+    auto_restart = True
+
+    # 評価する移動方向（前回の選択を先頭に並べ替えて使う）
+    MOVES = [(0, 0), (0, -1), (0, 1), (-1, 0), (1, 0),
+             (-1, -1), (-1, 1), (1, -1), (1, 1)]
+
+    # 危険度を評価する未来フレーム
+    SAMPLE_STEPS = (2, 6, AUTOPILOT_LOOKAHEAD)
+
+    def __init__(self, budget_ms=AUTOPILOT_BUDGET_MS, fire=True, player_index=0):
+        """
+        Args:
+            budget_ms: 1回の判断にかける時間の上限
+            fire: 撃ち続けるか
+            player_index: 操縦する機体（0=1P, 1=2P）
+        """
+        self.budget = budget_ms / 1000.0
+        self.player_index = player_index
+        self.fire = fire
+        self.grid = SpatialGrid()
+        self.last_move = (0, 0)
+
+        # 統計（ボット自身のコスト計測用）
+        self.decisions = 0
+        self.budget_overruns = 0        # 評価しきれなかった候補があった判断
+        self.truncated_builds = 0       # 近くの脅威を登録しきれなかった判断
+        self.last_decision_ms = 0.0
+        self.total_decision_ms = 0.0
+
+    def get_keys(self, game):
+        start = time.perf_counter()
+        deadline = start + self.budget
+        build_deadline = start + self.budget / 2
+        player = game.players[self.player_index]
+
+        # 1. 先読みの間に自機の届く範囲へ入りうる脅威だけを空間グリッドに登録（速度付き）
+        reach = (player.speed + AUTOPILOT_THREAT_SPEED) * AUTOPILOT_LOOKAHEAD + AUTOPILOT_SAFETY_MARGIN
+        area = player.rect.inflate(reach * 2, reach * 2)
+        grid = self.grid
+        grid.clear()
+        max_speed = 0.0
+        truncated = False
+        enemies = game.enemies
+        scroll = game.terrain_manager.scroll
+        rects = [enemy.screen_rect(scroll) for enemy in enemies]
+        for i in area.collidelistall(rects):
+            enemy = enemies[i]
+            if enemy.active:
+                vx = -TERRAIN_SCROLL_SPEED if enemy.enemy_type == ENEMY_TYPE_TURRET else -enemy.speed
+                grid.insert_rect((rects[i], vx, 0), rects[i])
+                max_speed = max(max_speed, abs(vx))
+        bullets = game.enemy_bullets
+        for n, i in enumerate(area.collidelistall([bullet.rect for bullet in bullets]), 1):
+            bullet = bullets[i]
+            if bullet.active:
+                grid.insert_rect((bullet.rect, bullet.velocity_x, bullet.velocity_y), bullet.rect)
+                max_speed = max(max_speed, abs(bullet.velocity_x) + abs(bullet.velocity_y))
+            if n % 32 == 0 and time.perf_counter() > build_deadline:
+                truncated = True
+                break
+
+        # 2. プレイヤー前方の地形の隙間（天井の下端・床の上端）
+        top_limit, bottom_limit = self._terrain_band(game.terrain_manager, player)
+
+        # 3. 各サンプルフレームで自機の届く範囲にある脅威の未来位置
+        #    （移動候補に依らないので、グリッドクエリは候補ごとではなくフレームごとに1回）
+        futures = []
+        for step in self.SAMPLE_STEPS:
+            spread = (player.speed + max_speed) * step + AUTOPILOT_SAFETY_MARGIN
+            candidates = grid.query(player.x - spread, player.y - spread,
+                                    player.width + spread * 2, player.height + spread * 2)
+            futures.append((step, [(rect.x + vx * step, rect.y + vy * step, rect.width, rect.height)
+                                   for rect, vx, vy in candidates]))
+
+        # 4. 移動候補を評価（各候補の前に期限を確かめる、前回の選択から）
+        moves = [self.last_move] + [m for m in self.MOVES if m != self.last_move]
+        best_move = self.last_move
+        best_cost = None
+        overrun = False
+        for move in moves:
+            if best_cost is not None and time.perf_counter() > deadline:
+                overrun = True
+                break
+            cost = self._evaluate(player, move, futures, top_limit, bottom_limit)
+            if best_cost is None or cost < best_cost:
+                best_cost = cost
+                best_move = move
+
+        self.last_move = best_move
+
+        bits = INPUT_SHOOT if self.fire else 0
+        dx, dy = best_move
+        if dx < 0:
+            bits |= INPUT_LEFT
+        elif dx > 0:
+            bits |= INPUT_RIGHT
+        if dy < 0:
+            bits |= INPUT_UP
+        elif dy > 0:
+            bits |= INPUT_DOWN
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.decisions += 1
+        self.last_decision_ms = elapsed_ms
+        self.total_decision_ms += elapsed_ms
+        if overrun:
+            self.budget_overruns += 1
+        if truncated:
+            self.truncated_builds += 1
+
+        return KeyState(bits)
+
+    def _terrain_band(self, terrain_manager, player):
+        """プレイヤーの前後にある地形から安全な上下範囲を求める"""
+        # セグメントはワールド座標なので、範囲の方をスクロール量だけずらす
+        left = player.x - TERRAIN_SEGMENT_WIDTH // 2 + terrain_manager.scroll
+        right = player.x + player.width + AUTOPILOT_LOOKAHEAD * player.speed + terrain_manager.scroll
+        top_limit = 0
+        bottom_limit = SCREEN_HEIGHT
+        for segment in terrain_manager.segments:
+            if segment.x + segment.width < left or segment.x > right:
+                continue
+            top_limit = max(top_limit, segment.top_height)
+            bottom_limit = min(bottom_limit, SCREEN_HEIGHT - segment.bottom_height)
+        return top_limit, bottom_limit
+
+    def _evaluate(self, player, move, futures, top_limit, bottom_limit):
+        """移動候補の危険度（小さいほど良い）"""
+        dx, dy = move
+        speed = player.speed
+        cost = 0.0
+        m = AUTOPILOT_SAFETY_MARGIN
+
+        for step, threats in futures:
+            px = max(0, min(player.x + dx * speed * step, SCREEN_WIDTH - player.width))
+            py = max(0, min(player.y + dy * speed * step, SCREEN_HEIGHT - player.height))
+
+            # 脅威：step フレーム後の位置で重なるものを数える
+            left = px - m
+            right = px + player.width + m
+            top = py - m
+            bottom = py + player.height + m
+            for tx, ty, tw, th in threats:
+                if tx < right and tx + tw > left and ty < bottom and ty + th > top:
+                    # 近い未来の衝突ほど重い
+                    cost += 1000.0 / step
+
+            # 地形：安全範囲からはみ出す分だけペナルティ
+            if py < top_limit + m:
+                cost += (top_limit + m - py) * 20
+            if py + player.height > bottom_limit - m:
+                cost += (py + player.height - bottom_limit + m) * 20
+
+        # 好ましい位置（画面左寄り・通路中央）へ緩やかに引き寄せる
+        final_x = player.x + dx * speed * self.SAMPLE_STEPS[-1]
+        final_y = player.y + dy * speed * self.SAMPLE_STEPS[-1]
+        center_y = (top_limit + bottom_limit) / 2 - player.height / 2
+        cost += abs(final_x - AUTOPILOT_PREFERRED_X) * 0.05
+        cost += abs(final_y - center_y) * 0.02
+        return cost
+
+    def average_decision_ms(self):
+        """1回あたりの平均判断時間（ミリ秒）"""
+        if self.decisions == 0:
+            return 0.0
+        return self.total_decision_ms / self.decisions
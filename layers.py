@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+HUD・オーバーレイの合成レイヤー（入力が変わったときだけ描き直すサーフェス）
+
+HUD（スコア・残機・Wave・武器の状態・チャージゲージ）やゲームオーバー画面は、
+起動時に1回だけ作ってディスプレイのピクセル形式に変換したレイヤーのサーフェスに描く。
+毎フレームの描画では show() で各レイヤーに入力（キー）を渡すだけで、キーが前回と
+違うレイヤーだけ描き直し、表示中のレイヤーは compose() で1回の blits() で画面に重ねる。
+ポーズやメニューの画面も add() でレイヤーを足して show() / hide() するだけで重ねられる。
+
+文字の描画（Font.render）は新しいサーフェスを作るので、キーが変わったフレームにしか
+起きない。ボス番号・パワーアップの文字のように種類の少ないラベルは label() で
+1回だけ作って使い回す。このモジュールで作ったサーフェスは数えていて
+（surfaces_created）、compose() がフレームごとの数を集計する（summary()）。
+
+Usage:
+    python layers.py                 # 毎フレーム描き直す場合との時間・サーフェス生成数の比較
+"""
+
+import pygame
+from constants import *
+
+# このモジュールで作ったサーフェスの数（フレームごとの生成数の計測用）
+surfaces_created = 0
+
+# 未描画のレイヤーのキー（どのキーとも等しくない）
+_UNSET = object()
+
+
+def _count(n=1):
+    global surfaces_created
+    surfaces_created += n
+
+
+def _prepare(surface, per_pixel):
+    """ディスプレイのピクセル形式に変換（ディスプレイがなければそのまま）"""
+    if pygame.display.get_surface() is None:
+        return surface
+    _count()
+    return surface.convert_alpha() if per_pixel else surface.convert()
+
+
+def render_text(font, text, color):
+    """文字のサーフェスを作る（作った数を数える Font.render）"""
+    _count()
+    return font.render(text, True, color)
+
+
+_fonts = {}
+_labels = {}
+
+
+def label(size, text, color):
+    """
+    使い回す文字のサーフェス（ボス番号・パワーアップの文字など種類の少ないもの）
+
+    Args:
+        size: フォントの大きさ（pygame.font.Font(None, size)）
+        text: 文字列
+        color: 色
+    """
+    key = (size, text, color)
+    surface = _labels.get(key)
+    if surface is None:
+        font = _fonts.get(size)
+        if font is None:
+            font = _fonts[size] = pygame.font.Font(None, size)
+        surface = _labels[key] = _prepare(render_text(font, text, color), True)
+    return surface
+
+
+def render_lines(surface, lines):
+    """
+    既定のレイヤーの描画：文字の行を描く
+
+    Args:
+        surface: レイヤーのサーフェス（透明に塗り直したもの）
+        lines: (font, text, color, anchor, point) の列（anchorは 'topleft' や 'center'、
+               pointはレイヤーの左上からの位置）
+
+    Returns:
+        pygame.Rect: 描いた範囲
+    """
+    area = pygame.Rect(0, 0, 0, 0)
+    for font, text, color, anchor, point in lines:
+        text_surface = render_text(font, text, color)
+        rect = text_surface.get_rect(**{anchor: point})
+        # 透明なレイヤーにはアルファをそのまま写す（画面に直接blitしたときと同じ見た目になる）
+        surface.blit(text_surface, rect, special_flags=pygame.BLEND_RGBA_MAX)
+        area = area.union(rect) if area.width else rect
+    return area.clip(surface.get_rect())
+
+
+class Layer:
+    """
+    1枚のレイヤー（持ち続けるサーフェスと、最後に描いたときのキー）
+
+    render(surface, key) はキーだけから描く（前回描いた範囲を透明に塗り直したサーフェスに描く）。
+    描いた範囲の Rect を返すと、compose() はその範囲だけを画面に重ねる
+    （大きなレイヤーの透明な部分をblitしない）。Noneならサーフェス全体。
+    """
+
+    def __init__(self, name, size, render=render_lines, position=(0, 0), alpha=None, per_pixel=True):
+        """
+        Args:
+            name: レイヤー名
+            size: サーフェスの大きさ
+            render: 描画関数 render(surface, key)
+            position: 画面上の左上の位置
+            alpha: レイヤー全体の不透明度（Noneなら不透明、per_pixel=False のとき）
+            per_pixel: ピクセルごとのアルファを持つか（文字は True、塗りつぶしは False）
+        """
+        self.name = name
+        self.render = render
+        self.position = position
+        surface = pygame.Surface(size, pygame.SRCALPHA if per_pixel else 0)
+        _count()
+        self.surface = _prepare(surface, per_pixel)
+        if alpha is not None:
+            self.surface.set_alpha(alpha)
+        self.area = self.surface.get_rect()  # 最後に描いた範囲
+        self.key = _UNSET
+        self.visible = False
+        self.rebuilds = 0
+
+    def update(self, key):
+        """キーが変わっていれば描き直す（描き直したらTrue）"""
+        if key == self.key:
+            return False
+        self.surface.fill((0, 0, 0, 0), self.area)
+        area = self.render(self.surface, key)
+        self.area = self.surface.get_rect() if area is None else area
+        self.key = key
+        self.rebuilds += 1
+        return True
+
+    def blit_args(self):
+        """blits() の1要素（描いた範囲だけを、レイヤーの位置からの同じ場所へ）"""
+        x, y = self.position
+        return self.surface, (x + self.area.x, y + self.area.y), self.area
+
+
+class LayerCompositor:
+    """
+    レイヤーの集まりと、表示中のレイヤーを1回で重ねる compose()
+
+    レイヤーは add() した順に下から重なる。Game.layers が持ち、draw_ui() と
+    draw_game_over() が show() / hide() し、_draw_scene() の最後に compose() する。
+    """
+
+    def __init__(self):
+        self.layers = {}   # 名前 → Layer（追加順）
+        self._blits = []   # 表示中のレイヤーの (surface, dest, area)
+        self._dirty = False
+
+        # 統計（compose() の間に作られたサーフェスの数）
+        self.frames = 0
+        self.clean_frames = 0       # サーフェスを1枚も作らなかったフレーム
+        self.frame_surfaces = 0     # 最新のフレームで作った数
+        self.max_frame_surfaces = 0
+        self._counted = surfaces_created
+
+    def add(self, name, size, render=render_lines, position=(0, 0), alpha=None, per_pixel=True):
+        """レイヤーを追加（引数は Layer と同じ、いちばん上に重なる）"""
+        layer = self.layers[name] = Layer(name, size, render, position, alpha, per_pixel)
+        self._counted = surfaces_created  # レイヤーを作った分はフレームの生成数に入れない
+        return layer
+
+    def show(self, name, key, position=None):
+        """
+        レイヤーをこのフレームで表示する
+
+        Args:
+            name: レイヤー名
+            key: 描画の入力（前回と等しければ描き直さない）
+            position: 画面上の位置（Noneなら変えない）
+        """
+        layer = self.layers[name]
+        if layer.update(key) and layer.visible:
+            self._dirty = True  # 描いた範囲が変わった
+        if position is not None and position != layer.position:
+            layer.position = position
+            self._dirty = True
+        if not layer.visible:
+            layer.visible = True
+            self._dirty = True
+
+    def hide(self, *names):
+        """レイヤーを隠す"""
+        for name in names:
+            layer = self.layers[name]
+            if layer.visible:
+                layer.visible = False
+                self._dirty = True
+
+    def invalidate(self):
+        """すべてのレイヤーを次の show() で描き直させる"""
+        for layer in self.layers.values():
+            layer.key = _UNSET
+
+    def compose(self, screen):
+        """表示中のレイヤーを1回の blits() で重ね、このフレームのサーフェスの生成数を数える"""
+        if self._dirty:
+            self._blits = [layer.blit_args() for layer in self.layers.values() if layer.visible]
+            self._dirty = False
+        if self._blits:
+            screen.blits(self._blits, doreturn=False)
+
+        created = surfaces_created - self._counted
+        self._counted = surfaces_created
+        self.frames += 1
+        self.frame_surfaces = created
+        if created == 0:
+            self.clean_frames += 1
+        elif created > self.max_frame_surfaces:
+            self.max_frame_surfaces = created
+
+    def summary(self):
+        """レイヤーの統計（main.pyの終了時の表示用）"""
+        return {
+            'frames': self.frames,
+            'clean_frames': self.clean_frames,
+            'max_frame_surfaces': self.max_frame_surfaces,
+            'rebuilds': {name: layer.rebuilds for name, layer in self.layers.items()},
+            'labels': len(_labels),
+        }
+
+
+if __name__ == "__main__":
+    # スコアや時限効果の残り時間が変わり続けるHUDを、毎フレーム描き直す場合
+    # （invalidate() してから show()、以前の draw_ui() と同じ数の Font.render）と、
+    # キーが変わったときだけ描き直す場合で、時間・サーフェスの生成数・画面を比べる
+    import os
+    import time
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+    pygame.init()
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    font = pygame.font.Font(None, 36)
+    small_font = pygame.font.Font(None, 24)
+    frames = 3600
+
+    def hud_keys(frame):
+        score = frame // 40 * 100                      # 約0.7秒ごとに撃破
+        weapon_time = max(0, 600 - frame % 900) / FPS  # 時限武器の残り時間
+        weapon = f"WEAPON: SPREAD ({weapon_time:.1f}s)" if weapon_time > 0 else "WEAPON: NORMAL"
+        return (((font, f"Score: {score}", WHITE, 'topleft', (0, 0)),),
+                ((small_font, f"Lives: {3 - frame // 1200}", WHITE, 'topleft', (0, 0)),),
+                ((small_font, f"WAVE {1 + frame // 900}", CYAN, 'topleft', (0, 0)),),
+                ((small_font, "FORCE: 1 Active", ORANGE, 'topleft', (0, 0)),
+                 (small_font, weapon, CYAN, 'topleft', (0, 30))))
+
+    def play(cached):
+        compositor = LayerCompositor()
+        compositor.add('score', (SCREEN_WIDTH // 2, 40), position=(10, 10))
+        compositor.add('lives', (SCREEN_WIDTH // 2, 30), position=(10, 50))
+        compositor.add('wave', (100, 30), position=(SCREEN_WIDTH - 100, 10))
+        compositor.add('status', (SCREEN_WIDTH - 20, 90), position=(10, 80))
+        elapsed = 0.0
+        for frame in range(frames):
+            screen.fill(BLACK)
+            start = time.perf_counter()
+            if not cached:
+                compositor.invalidate()
+            for name, key in zip(('score', 'lives', 'wave', 'status'), hud_keys(frame)):
+                compositor.show(name, key)
+            compositor.compose(screen)
+            elapsed += time.perf_counter() - start
+        return compositor, elapsed / frames * 1e6, pygame.image.tobytes(screen, 'RGB')
+
+    immediate, immediate_us, immediate_pixels = play(False)
+    cached, cached_us, cached_pixels = play(True)
+    assert immediate_pixels == cached_pixels, "cached layers differ from redrawing every frame"
+
+    # レイヤーを通した文字は、画面に直接blitした文字とピクセル単位で同じ
+    direct = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)).convert()
+    direct.fill(DARK_GRAY)
+    direct.blit(font.render("Score: 12345", True, WHITE), (10, 10))
+    layered = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)).convert()
+    layered.fill(DARK_GRAY)
+    compositor = LayerCompositor()
+    compositor.add('score', (SCREEN_WIDTH // 2, 40), position=(10, 10))
+    compositor.show('score', ((font, "Score: 12345", WHITE, 'topleft', (0, 0)),))
+    compositor.compose(layered)
+    assert pygame.image.tobytes(direct, 'RGB') == pygame.image.tobytes(layered, 'RGB'), "layer text differs"
+
+    print(f"HUD over {frames} frames: cached layers match redrawing every frame")
+    for label_text, compositor, us in (("every frame", immediate, immediate_us), ("cached", cached, cached_us)):
+        stats = compositor.summary()
+        print(f"  {label_text:<12} {us:7.1f} us/frame, {stats['clean_frames']} of {stats['frames']} frames "
+              f"without new surfaces (max {stats['max_frame_surfaces']}/frame), rebuilds {stats['rebuilds']}")
+    pygame.quit()
@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""
+定数とステージ定義のライブチューニング（再起動なしで反映）
+
+チューニングファイル（constants.py と同じ `名前 = 値` の行）とステージ定義
+（stages.json）を監視スレッドが os.stat でポーリングし、変更が落ち着いてから
+（デバウンス）読み直す。チューニングファイルは前回から文字列が変わった行だけを
+ast.literal_eval で解釈する。
+
+ファイルの読み込み・解釈とステージ定義のコンパイルはすべて監視スレッドで行い、
+ゲームのスレッドはできあがった値を受け取るだけ。反映はステップの合間に Game.step() が
+apply() を呼んで行う（監視スレッドはゲームの状態に触らない。ステップ中の判定は pending の1回だけ）。
+
+    1. `from constants import *` した各モジュールの同名のグローバルを書き換える
+       → 以後に作る Enemy・Bullet や、発射時に読む敵弾の速度などに反映
+    2. 生成時に定数をコピーしている属性は、既存のインスタンスも書き換える
+       （_INSTANCE_FIELDS：敵の速度・スコア・HP・射撃間隔、自機弾の速度・威力、
+       TerrainManagerの出現間隔・セグメント幅）
+    3. stages.json が変わったら、または ENEMY_SPAWN_INTERVAL が変わったら、監視スレッドが
+       全ステージをコンパイルし直し、apply() がステージ定義の辞書ごと差し替える
+       → WaveManagerは次の出現から新しい定義を使う。進行中・予定済みのWaveが
+       新しい定義にない（Waveが減った）ときは差し替えない
+
+関数の既定引数に使われた定数（起動時に評価済み）と飛行中の敵弾の速度は変わらない。
+ファイルから行を消しても値は元に戻らない（元の値を書けば戻る）。
+
+Usage:
+    python live_tuning.py            # ファイルを書き換えて反映を確認
+"""
+
+import ast
+import os
+import sys
+import threading
+import time
+import constants
+from constants import *
+from enemy import Enemy
+import wave_manager
+
+
+def _enemy_fields():
+    """敵の種類ごとの定数 → 生成時にコピーされる属性"""
+    prefixes = {
+        ENEMY_TYPE_STRAIGHT: 'ENEMY_STRAIGHT', ENEMY_TYPE_WAVE: 'ENEMY_WAVE',
+        ENEMY_TYPE_CHARGE: 'ENEMY_CHARGE', ENEMY_TYPE_TANK: 'ENEMY_TANK',
+        ENEMY_TYPE_TURRET: 'ENEMY_TURRET', ENEMY_TYPE_BOSS_1: 'BOSS_1',
+        ENEMY_TYPE_BOSS_2: 'BOSS_2', ENEMY_TYPE_BOSS_3: 'BOSS_3',
+    }
+    fields = {}
+    for enemy_type, prefix in prefixes.items():
+        fields[f'{prefix}_SPEED'] = ('enemies', enemy_type, 'speed')
+        fields[f'{prefix}_SCORE'] = ('enemies', enemy_type, 'score')
+        fields[f'{prefix}_HP'] = ('enemies', enemy_type, 'hp')
+        fields[f'{prefix}_SHOOT_INTERVAL'] = ('enemies', enemy_type, 'shoot_interval')
+    return fields
+
+
+# 定数名 → (対象, 絞り込み, 属性)
+_INSTANCE_FIELDS = _enemy_fields()
+_INSTANCE_FIELDS.update({
+    'BULLET_SPEED': ('player_bullets', None, 'speed'),
+    'BULLET_DAMAGE': ('player_bullets', 0, 'damage'),
+    'CHARGE_LEVEL_1_DAMAGE': ('player_bullets', 1, 'damage'),
+    'CHARGE_LEVEL_2_DAMAGE': ('player_bullets', 2, 'damage'),
+    'CHARGE_LEVEL_3_DAMAGE': ('player_bullets', 3, 'damage'),
+    'TERRAIN_SPAWN_INTERVAL': ('terrain', None, 'spawn_interval'),
+    'TERRAIN_SEGMENT_WIDTH': ('terrain', None, 'segment_width'),
+})
+
+# ステージ定義の既定値に使われる定数
+_STAGE_DEFAULTS = ('ENEMY_SPAWN_INTERVAL',)
+
+
+def _compatible(old, new):
+    """同じ種類の値か（intとfloatは相互に可）"""
+    numbers = (int, float)
+    if isinstance(old, bool) or isinstance(new, bool):
+        return isinstance(old, bool) and isinstance(new, bool)
+    if isinstance(old, numbers):
+        return isinstance(new, numbers)
+    return type(old) is type(new)
+
+
+class LiveTuning:
+    """
+    チューニングファイルとステージ定義の監視（監視スレッド）と反映（ゲームのスレッド）
+
+    Game.live_tuning に設定すると、Game.step() が pending のときだけ apply(game) を呼び、
+    Game.shutdown() で close() される。
+    """
+
+    def __init__(self, path=LIVE_TUNING_FILE, stage_path=None,
+                 poll_interval=LIVE_TUNING_POLL_INTERVAL, debounce=LIVE_TUNING_DEBOUNCE):
+        """
+        Args:
+            path: チューニングファイル
+            stage_path: ステージ定義（Noneなら wave_manager と同じ STAGE_FILE）
+            poll_interval: os.stat の間隔（秒）
+            debounce: 最後の変更からこの時間、変化がなければ読み直す（秒、書きかけを読まない）
+        """
+        if stage_path is None:
+            stage_path = os.path.join(os.path.dirname(os.path.abspath(wave_manager.__file__)), STAGE_FILE)
+        self.path = path
+        self.stage_path = stage_path
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+
+        self.lines = {}           # 名前 → 前回解釈した値の文字列
+        self.rejected = set()     # 前回の読み込みで報告した行（同じ行は繰り返し報告しない）
+        self.lock = threading.Lock()
+        self.changes = {}         # 反映待ちの定数（名前 → 値）
+        self.stages = None        # 反映待ちのステージ定義（compile_stages() の結果）
+        self.pending = False      # ゲームのスレッドが見るフラグ
+        self.applied = 0          # 反映した定数の累計
+        self.reloads = 0          # ファイルを読み直した回数
+
+        # ファイルごとの (見えている状態, その状態になった時刻, 読み込み済みの状態)
+        self.watch = {path: [None, 0.0, None], stage_path: [self._signature(stage_path), 0.0, None]}
+        self.watch[stage_path][2] = self.watch[stage_path][0]  # 起動時のステージ定義は読み込み済み
+
+        self.stop = threading.Event()
+        self.watcher = threading.Thread(target=self._poll_loop, name="live-tuning", daemon=True)
+        self.watcher.start()
+
+    @staticmethod
+    def _signature(path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    # ------------------------------------------------------------------
+    # 監視スレッド
+
+    def _poll_loop(self):
+        while not self.stop.wait(self.poll_interval):
+            self.poll()
+
+    def poll(self, now=None):
+        """各ファイルを stat し、変化が落ち着いたものを読み直す"""
+        now = time.perf_counter() if now is None else now
+        for path, state in self.watch.items():
+            signature = self._signature(path)
+            if signature != state[0]:
+                state[0] = signature
+                state[1] = now
+                continue
+            if signature is None or signature == state[2] or now - state[1] < self.debounce:
+                continue
+            state[2] = signature
+            self.reloads += 1
+            if path == self.path:
+                self._read_tuning()
+            else:
+                self._compile_stages()
+
+    def _read_tuning(self):
+        """チューニングファイルの変わった行だけを解釈して反映待ちにする"""
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                text = f.read()
+        except OSError as e:
+            print(f"Live tuning: cannot read {self.path}: {e}")
+            return
+
+        changes = {}
+        rejected = set()
+
+        def reject(number, line, message):
+            # 前回も報告した行は黙って飛ばす（直すか消すまで毎回出さない）
+            if line not in self.rejected:
+                print(f"Live tuning: {self.path}:{number}: {message}")
+            rejected.add(line)
+
+        for number, line in enumerate(text.splitlines(), 1):
+            line = line.split('#', 1)[0].strip()
+            if not line:
+                continue
+            name, separator, raw = line.partition('=')
+            name, raw = name.strip(), raw.strip()
+            if not separator or not name.isidentifier():
+                reject(number, line, "expected NAME = value")
+                continue
+            if self.lines.get(name) == raw:
+                continue  # 前回から変わっていない行は解釈しない
+            if not hasattr(constants, name):
+                reject(number, line, f"unknown constant {name}")
+                continue
+            try:
+                value = ast.literal_eval(raw)
+            except (ValueError, SyntaxError):
+                reject(number, line, f"cannot parse value of {name}: {raw}")
+                continue
+            if not _compatible(getattr(constants, name), value):
+                reject(number, line, f"{name} must be {type(getattr(constants, name)).__name__}, "
+                                     f"got {type(value).__name__}")
+                continue
+            self.lines[name] = raw
+            changes[name] = value
+        self.rejected = rejected
+
+        if changes:
+            with self.lock:
+                self.changes.update(changes)
+                self.pending = True
+            if any(name in changes for name in _STAGE_DEFAULTS):
+                self._compile_stages()
+
+    def _compile_stages(self):
+        """ステージ定義を読み直してコンパイルし、反映待ちにする（失敗したら今の定義のまま）"""
+        with self.lock:
+            spawn_interval = self.changes.get('ENEMY_SPAWN_INTERVAL', constants.ENEMY_SPAWN_INTERVAL)
+        try:
+            stages = wave_manager.compile_stages(self.stage_path, spawn_interval)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"Live tuning: stage definitions not reloaded: {e}")
+            return
+        with self.lock:
+            self.stages = stages
+            self.pending = True
+
+    # ------------------------------------------------------------------
+    # ゲームのスレッド
+
+    def apply(self, game):
+        """反映待ちの変更をゲームに適用（ステップの合間に呼ぶ）"""
+        with self.lock:
+            changes, self.changes = self.changes, {}
+            stages, self.stages = self.stages, None
+            self.pending = False
+
+        for name, value in changes.items():
+            old = getattr(constants, name)
+            if old == value:
+                continue
+            modules = self._rebind(name, old, value)
+            instances = self._update_instances(game, name, old, value)
+            self.applied += 1
+            print(f"Live tuning: {name} {old!r} -> {value!r} ({modules} modules, {instances} instances)")
+
+        if stages is not None:
+            self._install_stages(game, stages)
+
+    def _rebind(self, name, old, value):
+        """`from constants import *` で束縛された同名のグローバルを書き換える"""
+        count = 0
+        for module in list(sys.modules.values()):
+            namespace = getattr(module, '__dict__', None)
+            if namespace is not None and namespace.get(name, self) is old:
+                namespace[name] = value
+                count += 1
+        return count
+
+    def _update_instances(self, game, name, old, value):
+        """生成時に定数をコピーした属性を既存のインスタンスで書き換える"""
+        target = _INSTANCE_FIELDS.get(name)
+        if target is None:
+            return 0
+        collection, kind, attribute = target
+        count = 0
+
+        if collection == 'terrain':
+            setattr(game.terrain_manager, attribute, value)
+            return 1
+
+        if collection == 'player_bullets':
+            for bullet in game.player_bullets:
+                if bullet.homing or (kind is not None and bullet.charge_level != kind):
+                    continue
+                if attribute == 'speed':
+                    bullet.speed = value
+                    if bullet.velocity_y == 0:
+                        bullet.velocity_x = value
+                else:
+                    bullet.damage = value
+                count += 1
+            return count
+
+        for enemy in game.enemies:
+            if enemy.enemy_type != kind:
+                continue
+            if attribute == 'hp':
+                # 受けたダメージは保ったまま最大HPを変える
+                enemy.max_hp = value
+                enemy.hp = max(1, enemy.hp + value - old)
+            elif attribute == 'shoot_interval':
+                enemy.shoot_interval = value
+                self._reschedule_shoot(game, enemy)
+            else:
+                setattr(enemy, attribute, value)
+            count += 1
+        return count
+
+    @staticmethod
+    def _reschedule_shoot(game, enemy):
+        """射撃タイマーの周期を新しい間隔にする（Game._admit_enemy と同じ周期）"""
+        wheel = game.timer_wheel
+        if enemy.shoot_interval <= 0:
+            wheel.cancel(enemy, 'shoot')
+            return
+        period = enemy.shoot_interval + 1
+        remaining = wheel.remaining(enemy, 'shoot') if wheel.pending(enemy, 'shoot') else period
+        wheel.schedule(enemy, 'shoot', min(remaining, period), period)
+
+    @staticmethod
+    def _install_stages(game, stages):
+        """コンパイル済みのステージ定義に差し替える（進行中・予定済みのWaveがなくなるなら差し替えない）"""
+        manager = game.wave_manager
+        stage = stages.get(manager.stage)
+        if stage is None:
+            print(f"Live tuning: stage definitions not reloaded: stage '{manager.stage}' was removed")
+            return
+        # 今のWaveと、開始イベントを積んであるWave（WaveManager._wave が引く番号）
+        in_use = max([manager.wave_index] +
+                     [arg for _, _, kind, arg in manager.events if kind == wave_manager.EVENT_WAVE])
+        if in_use >= len(stage.waves):
+            print(f"Live tuning: stage definitions not reloaded: stage '{manager.stage}' now has "
+                  f"{len(stage.waves)} waves, but wave #{in_use + 1} is in use")
+            return
+        wave_manager.install_stages(stages)
+        print(f"Live tuning: stage '{manager.stage}' reloaded")
+
+    def close(self):
+        self.stop.set()
+        self.watcher.join()
+
+
+if __name__ == "__main__":
+    # 一時ファイルに書いた値が、実行中の敵・地形・以後の敵弾に反映されることを確認
+    import json
+    import tempfile
+
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    import enemy as enemy_module
+    from game import Game
+
+    game = Game(headless=True, immortal=True)
+    game.sound_manager.enabled = False
+    game.skip_to_wave(4)
+    tank = Enemy(600, 200, ENEMY_TYPE_TANK)
+    game._admit_enemy(tank)
+
+    # ステージ定義は一時ファイルにコピーして書き換える
+    directory = tempfile.mkdtemp(prefix="tuning_")
+    path = os.path.join(directory, 'tuning.cfg')
+    stage_path = os.path.join(directory, 'stages.json')
+    with open(os.path.join(os.path.dirname(os.path.abspath(wave_manager.__file__)), STAGE_FILE),
+              encoding='utf-8') as f:
+        stages = json.load(f)
+    with open(stage_path, 'w', encoding='utf-8') as f:
+        json.dump(stages, f)
+    tuning = LiveTuning(path, stage_path, poll_interval=0.02, debounce=0.05)
+    game.live_tuning = tuning
+
+    def write(target, text):
+        reloads = tuning.reloads
+        with open(target, 'w', encoding='utf-8') as f:
+            f.write(text)
+        deadline = time.perf_counter() + 2.0
+        while tuning.reloads == reloads and time.perf_counter() < deadline:
+            time.sleep(0.01)
+        game.step()
+
+    tuning_text = "# live tuning\nENEMY_BULLET_SPEED_TANK = 7\nTERRAIN_SPAWN_INTERVAL = 40\nENEMY_TANK_HP = 12\n"
+    write(path, tuning_text)
+    print(f"  enemy.ENEMY_BULLET_SPEED_TANK = {enemy_module.ENEMY_BULLET_SPEED_TANK}, "
+          f"terrain spawn_interval = {game.terrain_manager.spawn_interval}, "
+          f"tank hp = {tank.hp}/{tank.max_hp}, new tank hp = {Enemy(0, 0, ENEMY_TYPE_TANK).hp}")
+
+    # 解釈できない行は1回だけ報告される（次の読み直しでは黙る）
+    write(path, tuning_text + "ENEMY_TANK_SPEED = 'fast'\nNOT_A_CONSTANT = 1\n")
+    write(path, tuning_text + "ENEMY_TANK_SPEED = 'fast'\nNOT_A_CONSTANT = 1\nENEMY_TANK_SCORE = 250\n")
+
+    # ステージ定義の変更（1Wave目の出現間隔）はコンパイル済みの定義の差し替えだけ
+    stages[game.stage]['waves'][0]['spawn_interval'] = 45
+    write(stage_path, json.dumps(stages))
+    print(f"  wave 1 spawn interval = {wave_manager.load_stage(game.stage).waves[0].spawn_interval}")
+
+    # 進行中のWave（Wave 4）がなくなる定義は差し替えない
+    stages[game.stage]['waves'] = stages[game.stage]['waves'][:1]
+    write(stage_path, json.dumps(stages))
+    for _ in range(10):
+        game.step()
+    print(f"  after removing waves: {len(wave_manager.load_stage(game.stage).waves)} waves loaded, "
+          f"current wave {game.wave_manager._wave.number}")
+    tuning.close()
+
+    # 監視のコスト（変更なしの1回分のポーリング）
+    start = time.perf_counter()
+    for _ in range(1000):
+        tuning.poll()
+    poll_us = (time.perf_counter() - start) / 1000 * 1e6
+    print(f"  poll (2 files, unchanged): {poll_us:.1f} us on the watcher thread; "
+          f"{tuning.applied} constants applied, {tuning.reloads} reloads")
+    os.remove(path)
+    os.remove(stage_path)
+    os.rmdir(directory)
@@ -10,6 +10,24 @@ Controls:
 - C: Toggle Force position (Front/Back/Detached)
 - ESC: Quit game
 - R: Restart (when game over)
+- F5 / F9: Quick save / quick load
+
+Options:
+- --autopilot: Let the built-in bot play (load generation / soak testing)
+- --wave N: Start from wave N (e.g. --wave 4)
+- --immortal: Player never loses lives
+- --headless: Run without a window or audio device
+- --max-frames N: Quit after N simulation steps
+- --render-fps N: Render rate cap, independent of the 60 Hz simulation (0 = uncapped)
+- --no-interpolation: Draw the latest simulation step without interpolation
+- --threaded: Run the simulation on a worker thread and render snapshots
+- --stage NAME: Stage definition from stages.json (waves, enemies, bosses, terrain patterns)
+- --scenario NAME: Start from a named savestate (e.g. wave4_three_bosses)
+- --netplay-port PORT --netplay-peer HOST:PORT --player 1|2: Two-player co-op over UDP (rollback netcode)
+- --input-delay N: Netplay input delay in frames
+- --spectate-port PORT: Stream the game to spectators (python spectator.py --connect HOST:PORT)
+- --startup-profile: Report time to first frame (import / pygame init / mixer / sound synthesis / first draw)
+  and exit with status 1 if it exceeds --startup-budget-ms
 
 Features:
 - Force orb system with attach/detach mechanics
@@ -20,9 +38,211 @@ Features:
 - Visual explosion effects
 """
 
-from game import Game
+import time
+_PROCESS_START = time.perf_counter()
+
+import argparse
+from constants import (RENDER_FPS, NETPLAY_INPUT_DELAY, STARTUP_BUDGET_MS, SOUND_INIT_TIMEOUT,
+                       DEFAULT_STAGE, RENDER_MODES, RENDER_MODE, RENDER_MODE_WINDOW,
+                       CAPTURE_FORMATS, SCORE_DB_PATH, PIXEL_COLLISION, TERRAIN_BLOCKS_BULLETS)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="R-TYPE Clone")
+    parser.add_argument('--autopilot', action='store_true',
+                        help='let the built-in bot play')
+    parser.add_argument('--wave', type=int, default=1,
+                        help='start from the given wave (1-4)')
+    parser.add_argument('--immortal', action='store_true',
+                        help='player never loses lives')
+    parser.add_argument('--headless', action='store_true',
+                        help='run without a window or audio device')
+    parser.add_argument('--pixel-collision', action='store_true', default=PIXEL_COLLISION,
+                        help='recheck rect hits against the drawn shapes')
+    parser.add_argument('--terrain-blocks-bullets', action='store_true', default=TERRAIN_BLOCKS_BULLETS,
+                        help='bullets that hit the terrain disappear')
+    parser.add_argument('--max-frames', type=int, default=None,
+                        help='quit after the given number of simulation steps')
+    parser.add_argument('--render-fps', type=int, default=RENDER_FPS,
+                        help='render rate cap (0 = uncapped); simulation stays at SIM_HZ')
+    parser.add_argument('--no-interpolation', action='store_true',
+                        help='draw the latest simulation step without interpolation')
+    parser.add_argument('--threaded', action='store_true',
+                        help='run the simulation on a worker thread and render snapshots')
+    parser.add_argument('--stage', default=DEFAULT_STAGE,
+                        help='stage name from stages.json')
+    parser.add_argument('--scenario', default=None,
+                        help='start from a named savestate (see savestate.py --list)')
+    parser.add_argument('--netplay-port', type=int, default=None,
+                        help='local UDP port for two-player co-op')
+    parser.add_argument('--netplay-peer', default=None,
+                        help='peer address for two-player co-op (HOST:PORT)')
+    parser.add_argument('--player', type=int, choices=(1, 2), default=1,
+                        help='which ship this peer controls in co-op')
+    parser.add_argument('--input-delay', type=int, default=NETPLAY_INPUT_DELAY,
+                        help='netplay input delay in frames')
+    parser.add_argument('--spectate-port', type=int, default=None,
+                        help='stream the game to spectators on this UDP port')
+    parser.add_argument('--render-mode', choices=RENDER_MODES, default=None,
+                        help='direct: draw to the window / scale: integer upscale on the CPU '
+                             '(flat frame time only up to about 2x) / sdl: pygame.SCALED, upscaled '
+                             'by the SDL renderer on the GPU (default with --window, otherwise direct)')
+    parser.add_argument('--window', type=window_size, default=None, metavar='WxH',
+                        help='window size for --render-mode sdl/scale (default: largest integer multiple)')
+    parser.add_argument('--capture', default=None, metavar='PATH',
+                        help='record every drawn frame (raw: file, png: directory, pipe: encoder output)')
+    parser.add_argument('--capture-format', choices=CAPTURE_FORMATS, default='raw',
+                        help='raw: concatenated RGB24 / png: numbered PNGs / pipe: CAPTURE_ENCODER_COMMAND')
+    parser.add_argument('--metrics-port', type=int, default=None,
+                        help='serve Prometheus metrics on http://127.0.0.1:PORT/metrics')
+    parser.add_argument('--metrics-textfile', default=None, metavar='PATH',
+                        help='write Prometheus metrics to this file (node_exporter textfile collector)')
+    parser.add_argument('--statsd', default=None, metavar='HOST:PORT',
+                        help='send metrics to a StatsD server over UDP')
+    parser.add_argument('--scores', default=SCORE_DB_PATH, metavar='PATH',
+                        help='SQLite file for high scores and session records')
+    parser.add_argument('--no-scores', action='store_true',
+                        help='do not save sessions or show high scores')
+    parser.add_argument('--tune', default=None, metavar='PATH',
+                        help='watch a NAME = value file (and stages.json) and apply changes live')
+    parser.add_argument('--no-terrain-stream', action='store_true',
+                        help='generate and draw terrain chunks on the game thread instead of a look-ahead worker')
+    parser.add_argument('--startup-profile', action='store_true',
+                        help='report time to first frame and check it against the budget')
+    parser.add_argument('--startup-budget-ms', type=float, default=STARTUP_BUDGET_MS,
+                        help='time-to-first-frame budget for --startup-profile')
+    args = parser.parse_args()
+    if args.render_mode is None:
+        args.render_mode = RENDER_MODE_WINDOW if args.window is not None else RENDER_MODE
+    return args
+
+def window_size(text):
+    """'1920x1080' 形式のウィンドウサイズ"""
+    try:
+        width, height = (int(v) for v in text.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected WxH, got '{text}'")
+    return width, height
+
+def run_startup_profile(args):
+    """
+    最初の描画までの時間を内訳付きで表示し、予算と比較する
+
+    Returns:
+        int: 予算内なら0、超過なら1（CIの終了ステータス用）
+    """
+    start = time.perf_counter()
+    import pygame
+    pygame_import_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    from game import Game
+    game_import_ms = (time.perf_counter() - start) * 1000
+    import_ms = (time.perf_counter() - _PROCESS_START) * 1000
+
+    start = time.perf_counter()
+    game = Game(headless=args.headless, render_mode=args.render_mode, window_size=args.window)
+    game_init_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    game.draw()
+    first_draw_ms = (time.perf_counter() - start) * 1000
+    first_frame_ms = (time.perf_counter() - _PROCESS_START) * 1000
+
+    sound = game.sound_manager
+    sound_ready = sound.ready.is_set()
+    sound.wait_ready(SOUND_INIT_TIMEOUT)
+
+    timings = game.startup_timings
+    other_init_ms = game_init_ms - sum(timings.values())
+    print("\nStartup profile (since main.py started):")
+    print(f"  import            {import_ms:8.1f} ms  (pygame {pygame_import_ms:.1f} ms, "
+          f"game modules {game_import_ms:.1f} ms)")
+    print(f"  pygame init       {timings['pygame_init_ms']:8.1f} ms  (display + font modules)")
+    print(f"  display           {timings['display_ms']:8.1f} ms")
+    print(f"  fonts             {timings['fonts_ms']:8.1f} ms")
+    print(f"  game state        {other_init_ms:8.1f} ms")
+    print(f"  first draw        {first_draw_ms:8.1f} ms")
+    print(f"  time to first frame {first_frame_ms:6.1f} ms")
+    print(f"  background: mixer init {sound.mixer_init_ms:.1f} ms, sound synthesis "
+          f"{sound.synthesis_ms:.1f} ms ({'ready' if sound_ready else 'still running'} at first frame)")
+
+    game.shutdown()
+    within = first_frame_ms <= args.startup_budget_ms
+    print(f"Startup budget {args.startup_budget_ms:.0f} ms: {'PASS' if within else 'FAIL'}")
+    return 0 if within else 1
+
+def attach_spectator(game, args):
+    """観戦配信を有効化"""
+    if args.spectate_port is not None:
+        from spectator import SpectatorServer
+        game.spectator = SpectatorServer(args.spectate_port)
+
+def attach_capture(game, args):
+    """フレームキャプチャを有効化"""
+    if args.capture is not None:
+        from frame_capture import FrameCapture
+        game.capture = FrameCapture(args.capture, args.capture_format, game.screen.get_size())
+
+def attach_metrics(game, args):
+    """メトリクスのエクスポートを有効化"""
+    if args.metrics_port is not None or args.metrics_textfile is not None or args.statsd is not None:
+        from metrics import MetricsExporter
+        statsd = None
+        if args.statsd is not None:
+            host, port = args.statsd.rsplit(':', 1)
+            statsd = (host, int(port))
+        game.metrics = MetricsExporter(args.metrics_port, args.metrics_textfile, statsd)
+
+def attach_score_store(game, args):
+    """ハイスコアとプレイ記録の保存を有効化"""
+    if not args.no_scores:
+        from score_store import ScoreStore
+        game.score_store = ScoreStore(args.scores, game.stage)
+
+def attach_live_tuning(game, args):
+    """定数・ステージ定義のライブチューニングを有効化"""
+    if args.tune is not None:
+        from live_tuning import LiveTuning
+        game.live_tuning = LiveTuning(args.tune)
+        print(f"Live tuning: watching {args.tune} and {game.live_tuning.stage_path}")
+
+def attach_terrain_streamer(game, args):
+    """地形の塊の先読み生成を有効化"""
+    if not args.no_terrain_stream:
+        from terrain_streamer import TerrainStreamer
+        game.terrain_streamer = TerrainStreamer()
+
+def run_netplay(args):
+    """2人協力プレイ（両ピアで同じオプションを指定して起動する）"""
+    from netplay import UdpTransport, RollbackSession, create_netplay_game, print_metrics, run_netplay
+
+    host, port = args.netplay_peer.rsplit(':', 1)
+    index = args.player - 1
+    input_provider = None
+    if args.autopilot:
+        from input_provider import AutopilotInput
+        input_provider = AutopilotInput(player_index=index)
+
+    game = create_netplay_game(input_provider=input_provider, headless=args.headless,
+                               immortal=args.immortal, stage=args.stage,
+                               pixel_collision=args.pixel_collision,
+                               terrain_blocks_bullets=args.terrain_blocks_bullets)
+    if args.wave > 1:
+        game.skip_to_wave(args.wave)
+    attach_spectator(game, args)
+    transport = UdpTransport(args.netplay_port, (host, int(port)))
+    session = RollbackSession(game, index, transport, args.input_delay)
+    print(f"Netplay: player {args.player}, port {args.netplay_port} <-> {args.netplay_peer}")
+    run_netplay(game, session, max_frames=args.max_frames)
+    transport.close()
+    print_metrics(f"P{args.player}", session.metrics())
 
 def main():
+    args = parse_args()
+    if args.startup_profile:
+        raise SystemExit(run_startup_profile(args))
+
+    from game import Game
+
     print("=" * 60)
     print("R-TYPE CLONE")
     print("=" * 60)
@@ -31,12 +251,83 @@ def main():
     print("  Z          - Shoot (hold for auto-fire)")
     print("  X          - Charge Shot (hold to charge)")
     print("  C          - Toggle Force (Front/Back/Detached)")
+    print("  F5 / F9    - Quick save / Quick load")
     print("  ESC        - Quit")
     print("\nStarting game...")
     print("=" * 60)
 
-    game = Game()
-    game.run()
+    if args.netplay_port is not None and args.netplay_peer:
+        run_netplay(args)
+        return
+
+    input_provider = None
+    if args.autopilot:
+        from input_provider import AutopilotInput
+        input_provider = AutopilotInput()
+
+    game = Game(input_provider=input_provider, headless=args.headless, immortal=args.immortal,
+                render_fps=args.render_fps, interpolate=not args.no_interpolation,
+                threaded=args.threaded, stage=args.stage, render_mode=args.render_mode,
+                window_size=args.window, pixel_collision=args.pixel_collision,
+                terrain_blocks_bullets=args.terrain_blocks_bullets)
+    attach_spectator(game, args)
+    attach_capture(game, args)
+    attach_metrics(game, args)
+    attach_score_store(game, args)
+    attach_live_tuning(game, args)
+    attach_terrain_streamer(game, args)
+    if args.scenario:
+        from savestate import load_scenario
+        load_scenario(game, args.scenario)
+    elif args.wave > 1:
+        game.skip_to_wave(args.wave)
+    game.run(max_frames=args.max_frames)
+
+    latency = game.latency.summary()
+    if latency:
+        print(f"\nInput-to-photon latency: avg {latency['avg_ms']:.1f} ms, "
+              f"p50 {latency['p50_ms']:.1f} ms, p95 {latency['p95_ms']:.1f} ms, "
+              f"max {latency['max_ms']:.1f} ms ({latency['count']} frames)")
+
+    if game.mask_cache is not None:
+        masks = game.mask_cache.summary()
+        print(f"\nPixel collision: {masks['tests_per_frame']:.2f} mask tests/frame "
+              f"(max {masks['max_tests']}), {masks['rejected']} of {masks['tests']} rect hits "
+              f"rejected, {masks['masks']} cached masks")
+
+    if game.capture is not None:
+        capture = game.capture.summary()
+        print(f"\nCapture: {capture['written']} frames written to {args.capture}, "
+              f"{capture['dropped']} dropped, capture avg {capture['avg_capture_ms']:.2f} ms "
+              f"(max {capture['max_capture_ms']:.2f} ms), writer {capture['avg_write_ms']:.2f} ms/frame")
+
+    if game.spectator is not None and game.spectator.frames:
+        spectator = game.spectator.summary()
+        print(f"\nSpectators: {spectator['frames']} frames, {spectator['encodes']} encodes for "
+              f"{spectator['packets']} packets, handoff {spectator['avg_handoff_ms']:.2f} ms on the game thread, "
+              f"encode {spectator['avg_encode_ms']:.2f} ms on the server thread")
+
+    if game.terrain_streamer is not None:
+        terrain = game.terrain_streamer.summary()
+        print(f"\nTerrain streaming: {terrain['hits']} chunks ready, {terrain['misses']} generated "
+              f"on the game thread, {terrain['discarded']} discarded, worker {terrain['avg_generate_ms']:.2f} ms/chunk")
+
+    layers = game.layers.summary()
+    if layers['frames']:
+        rebuilds = ", ".join(f"{name} {count}" for name, count in layers['rebuilds'].items() if count)
+        print(f"\nHUD layers: {layers['clean_frames']} of {layers['frames']} frames created no surfaces "
+              f"(max {layers['max_frame_surfaces']}/frame), rebuilds: {rebuilds}, {layers['labels']} cached labels")
+
+    if game.score_store is not None and game.score_store.top_scores:
+        best = game.score_store.top_scores[0][0]
+        print(f"\nScores: session saved to {args.scores} (score {game.score}, "
+              f"best {best} on stage '{game.stage}')")
+
+    if args.autopilot:
+        print(f"\nAutopilot: {input_provider.decisions} decisions, "
+              f"avg {input_provider.average_decision_ms():.3f} ms, "
+              f"{input_provider.budget_overruns} budget overruns, "
+              f"{input_provider.truncated_builds} truncated threat builds")
 
     print("\nThanks for playing!")
 
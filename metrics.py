@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+キオスク運用向けのメトリクス（Prometheus / StatsD）
+
+ゲームのスレッドは1ステップ・1フレームごとに数値のタプルをキューへ入れるだけで、
+カウンタ・ゲージ・ヒストグラムへの集計、Prometheusのテキスト形式の提供
+（ローカルのHTTPエンドポイント・textfile）、StatsDへのUDP送信は
+すべて集計スレッドで行う。
+
+メトリクス（接頭辞 METRICS_PREFIX）:
+    frame_seconds            描画1フレームの処理時間（ヒストグラム、--threaded では描画と
+                             シミュレーションステップの遅い方）
+    sim_steps_total          シミュレーションのステップ数
+    enemies / player_bullets / enemy_bullets / explosions / terrain_segments
+                             最新ステップのエンティティ数（ゲージ）
+    collision_tests          最新ステップの当たり判定の組み合わせ数（ゲージ）
+    collision_tests_total / mask_tests_total
+                             当たり判定の組み合わせ数・マスク判定数の累計
+    sounds_played_total      再生した効果音の数
+    wave                     現在のWave
+
+Usage:
+    python metrics.py                # 記録のコストとエクスポートの確認
+"""
+
+import os
+import queue
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from constants import *
+
+
+class Counter:
+    """単調増加するカウンタ"""
+    kind = 'counter'
+
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def samples(self):
+        return [(self.name, self.value)]
+
+
+class Gauge:
+    """最新の値"""
+    kind = 'gauge'
+
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self.value = 0
+
+    def set(self, value):
+        self.value = value
+
+    def samples(self):
+        return [(self.name, self.value)]
+
+
+class Histogram:
+    """累積バケットのヒストグラム（Prometheusの le ラベル形式）"""
+    kind = 'histogram'
+
+    def __init__(self, name, help, buckets):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+    def samples(self):
+        samples = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            samples.append((f'{self.name}_bucket{{le="{bound:g}"}}', cumulative))
+        samples.append((f'{self.name}_bucket{{le="+Inf"}}', self.count))
+        samples.append((f'{self.name}_sum', self.sum))
+        samples.append((f'{self.name}_count', self.count))
+        return samples
+
+
+class MetricsExporter:
+    """
+    ゲームのメトリクスの記録（ノンブロッキング）と集計・エクスポート
+
+    Game.metrics に設定すると、Game.step() が record_step(game)、
+    ゲームループが record_frame(frame_ms) を呼び、Game.shutdown() で close() される。
+    """
+
+    def __init__(self, port=None, textfile=None, statsd=None, prefix=METRICS_PREFIX,
+                 interval=METRICS_FLUSH_INTERVAL):
+        """
+        Args:
+            port: PrometheusのHTTPエンドポイントのポート（127.0.0.1、Noneなら提供しない）
+            textfile: Prometheusのtextfileの出力先（node_exporterのtextfile collector用）
+            statsd: StatsDの (host, port)（Noneなら送信しない）
+            prefix: メトリクス名の接頭辞
+            interval: textfileの書き出し・StatsDの送信の間隔（秒）
+        """
+        self.prefix = prefix
+        self.interval = interval
+        self.textfile = textfile
+        self.lock = threading.Lock()  # 集計スレッドとHTTPスレッドの間
+        self.queue = queue.SimpleQueue()
+
+        self.metrics = []
+        self.frame_seconds = self._add(Histogram(
+            'frame_seconds', 'Time spent updating and drawing one rendered frame',
+            [b / 1000 for b in METRICS_FRAME_BUCKETS_MS]))
+        self.sim_steps = self._add(Counter('sim_steps_total', 'Simulation steps'))
+        self.enemies = self._add(Gauge('enemies', 'Active enemies'))
+        self.player_bullets = self._add(Gauge('player_bullets', 'Active player bullets'))
+        self.enemy_bullets = self._add(Gauge('enemy_bullets', 'Active enemy bullets'))
+        self.explosions = self._add(Gauge('explosions', 'Active explosions'))
+        self.terrain_segments = self._add(Gauge('terrain_segments', 'Terrain segments on screen'))
+        self.collision_tests = self._add(Gauge('collision_tests', 'Collision pairs tested in the last step'))
+        self.collision_tests_total = self._add(Counter('collision_tests_total', 'Collision pairs tested'))
+        self.mask_tests_total = self._add(Counter('mask_tests_total', 'Pixel mask collision tests'))
+        self.sounds_played = self._add(Counter('sounds_played_total', 'Sound effects played'))
+        self.wave = self._add(Gauge('wave', 'Current wave'))
+        self.last_sounds = 0
+
+        # StatsD：フレーム時間は送信までためて、1パケットにまとめる
+        self.statsd = statsd
+        self.statsd_socket = None
+        self.statsd_timings = []
+        self.statsd_sent = {}  # カウンタの前回送信値
+        if statsd is not None:
+            self.statsd_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.statsd_socket.setblocking(False)
+        self.statsd_packets = 0
+
+        self.server = None
+        if port is not None:
+            self.server = ThreadingHTTPServer(('127.0.0.1', port), self._handler())
+            self.server.daemon_threads = True
+            threading.Thread(target=self.server.serve_forever, name="metrics-http", daemon=True).start()
+
+        self.worker = threading.Thread(target=self._aggregate_loop, name="metrics", daemon=True)
+        self.worker.start()
+
+    def _add(self, metric):
+        metric.name = f'{self.prefix}_{metric.name}'
+        self.metrics.append(metric)
+        return metric
+
+    # ------------------------------------------------------------------
+    # ゲームのスレッドから呼ぶ（キューに入れるだけ）
+
+    def record_step(self, game):
+        """シミュレーション1ステップ後の数値を記録"""
+        mask_tests = game.mask_cache.tests if game.mask_cache is not None else 0
+        self.queue.put(('step', len(game.enemies), len(game.player_bullets), len(game.enemy_bullets),
+                        len(game.explosions), len(game.terrain_manager.segments), game.collision_tests,
+                        mask_tests, game.sound_manager.played, game.wave_manager.current_wave))
+
+    def record_frame(self, frame_ms):
+        """描画1フレームの処理時間を記録"""
+        self.queue.put(('frame', frame_ms))
+
+    # ------------------------------------------------------------------
+    # 集計スレッド
+
+    def _aggregate_loop(self):
+        next_flush = time.perf_counter() + self.interval
+        while True:
+            try:
+                sample = self.queue.get(timeout=max(0.0, next_flush - time.perf_counter()))
+            except queue.Empty:
+                sample = ()
+            if sample is None:
+                self._flush()
+                return
+            if sample:
+                with self.lock:
+                    self._apply(sample)
+            if time.perf_counter() >= next_flush:
+                self._flush()
+                next_flush += self.interval
+
+    def _apply(self, sample):
+        if sample[0] == 'frame':
+            self.frame_seconds.observe(sample[1] / 1000)
+            if self.statsd is not None:
+                self.statsd_timings.append(sample[1])
+            return
+        (_, enemies, player_bullets, enemy_bullets, explosions, segments,
+         collision_tests, mask_tests, sounds, wave) = sample
+        self.sim_steps.inc()
+        self.enemies.set(enemies)
+        self.player_bullets.set(player_bullets)
+        self.enemy_bullets.set(enemy_bullets)
+        self.explosions.set(explosions)
+        self.terrain_segments.set(segments)
+        self.collision_tests.set(collision_tests)
+        self.collision_tests_total.inc(collision_tests)
+        self.mask_tests_total.inc(mask_tests)
+        self.sounds_played.inc(max(0, sounds - self.last_sounds))  # SoundManagerの累計からの差分
+        self.last_sounds = sounds
+        self.wave.set(wave)
+
+    def _flush(self):
+        """textfileの書き出しとStatsDの送信"""
+        if self.textfile is not None:
+            text = self.render()
+            temporary = f'{self.textfile}.tmp'
+            try:
+                with open(temporary, 'w') as f:
+                    f.write(text)
+                os.replace(temporary, self.textfile)  # 読み手に書きかけを見せない
+            except OSError as e:
+                print(f"Warning: metrics textfile not written: {e}")
+                self.textfile = None
+        if self.statsd is not None:
+            self._send_statsd()
+
+    def _send_statsd(self):
+        with self.lock:
+            lines = []
+            for metric in self.metrics:
+                if metric.kind == 'gauge':
+                    lines.append(f'{metric.name}:{metric.value}|g')
+                elif metric.kind == 'counter':
+                    # StatsDのカウンタは加算なので、前回送信からの増分を送る
+                    delta = metric.value - self.statsd_sent.get(metric.name, 0)
+                    self.statsd_sent[metric.name] = metric.value
+                    lines.append(f'{metric.name}:{delta}|c')
+            timings, self.statsd_timings = self.statsd_timings, []
+        name = self.frame_seconds.name.replace('_seconds', '_ms')
+        lines += [f'{name}:{ms:.3f}|ms' for ms in timings]
+
+        packet = []
+        size = 0
+        for line in lines:
+            if packet and size + len(line) + 1 > METRICS_STATSD_PACKET_BYTES:
+                self._send_packet(packet)
+                packet, size = [], 0
+            packet.append(line)
+            size += len(line) + 1
+        if packet:
+            self._send_packet(packet)
+
+    def _send_packet(self, lines):
+        try:
+            self.statsd_socket.sendto('\n'.join(lines).encode(), self.statsd)
+            self.statsd_packets += 1
+        except OSError:
+            pass  # 送信できなくてもゲームには関係ない（UDP、次の間隔で再送）
+
+    # ------------------------------------------------------------------
+
+    def render(self):
+        """Prometheusのテキスト形式"""
+        lines = []
+        with self.lock:
+            for metric in self.metrics:
+                lines.append(f'# HELP {metric.name} {metric.help}')
+                lines.append(f'# TYPE {metric.name} {metric.kind}')
+                for name, value in metric.samples():
+                    lines.append(f'{name} {value:g}' if isinstance(value, float) else f'{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def _handler(self):
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = exporter.render().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # アクセスログは出さない
+
+        return Handler
+
+    def close(self):
+        """残りのサンプルを集計して最後の書き出し・送信をしてから止める"""
+        self.queue.put(None)
+        self.worker.join()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+        if self.statsd_socket is not None:
+            self.statsd_socket.close()
+
+
+if __name__ == "__main__":
+    # ゲームのスレッド側の記録コストと、HTTP・StatsDで実際に取り出せることを確認
+    import urllib.request
+
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    from game import Game
+    from input_provider import AutopilotInput
+
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind(('127.0.0.1', 0))
+    receiver.settimeout(0.5)
+
+    game = Game(input_provider=AutopilotInput(), headless=True, immortal=True, interpolate=False)
+    game.sound_manager.enabled = False
+    exporter = MetricsExporter(port=0, statsd=receiver.getsockname(), interval=0.2)
+    game.metrics = exporter
+    game.skip_to_wave(4)
+
+    steps = 600
+    start = time.perf_counter()
+    for _ in range(steps):
+        exporter.record_step(game)
+        exporter.record_frame(1.0)
+    record_us = (time.perf_counter() - start) / steps * 1e6
+    for _ in range(steps):
+        game.step()
+        exporter.record_frame(2.5)
+    time.sleep(0.5)  # 集計スレッドがキューを空にして送信するまで
+
+    port = exporter.server.server_address[1]
+    text = urllib.request.urlopen(f'http://127.0.0.1:{port}/metrics').read().decode()
+    exporter.close()
+    packets = 0
+    try:
+        while True:
+            receiver.recv(4096)
+            packets += 1
+    except socket.timeout:
+        pass
+
+    print(f"record_step + record_frame on the game thread: {record_us:.2f} us per step")
+    print(f"Prometheus endpoint http://127.0.0.1:{port}/metrics "
+          f"({len(text.splitlines())} lines), for example:")
+    for line in text.splitlines():
+        if line.startswith(('rtype_sim_steps_total', 'rtype_enemies', 'rtype_collision_tests ',
+                            'rtype_frame_seconds_count', 'rtype_wave')):
+            print(f"  {line}")
+    print(f"StatsD: {exporter.statsd_packets} packets sent, {packets} received")
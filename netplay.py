@@ -0,0 +1,586 @@
+#!/usr/bin/env python3
+"""
+ロールバック方式の2人協力プレイ（UDP）
+
+両ピアがゲーム全体をシミュレーションし、毎フレームの入力（1バイト）だけを
+交換する。相手の入力がまだ届いていないフレームは直前の確定入力で予測して
+進め、実際の入力が届いて予測と違っていたら、そのフレームの状態を
+savestate.restore_state() で戻して現在フレームまで再シミュレーションする。
+
+Usage:
+    python netplay.py                                  # ローカルホストで2ピアを自動操縦で対戦
+    python netplay.py --latency 80 --jitter 20 --loss 0.1 --frames 3600
+    python netplay.py --bench                          # 最大深さのロールバック1回のコスト
+    python main.py --netplay-port 7000 --netplay-peer 127.0.0.1:7001 --player 1
+    python main.py --netplay-port 7001 --netplay-peer 127.0.0.1:7000 --player 2
+"""
+
+import heapq
+import marshal
+import random
+import socket
+import struct
+import time
+import zlib
+from collections import deque
+import pygame
+from constants import *
+from input_provider import KeyState
+from savestate import capture_state, restore_state
+
+# パケット種別
+PACKET_INPUT = 1
+PACKET_CHECKSUM = 2
+
+# 入力パケット：種別、相手から受信済みの最終フレーム（ack）、先頭フレーム、入力数
+_INPUT_HEADER = struct.Struct('<BiiB')
+# チェックサムパケット：種別、フレーム、CRC32
+_CHECKSUM_PACKET = struct.Struct('<BiI')
+
+
+def state_checksum(state):
+    """
+    capture_state() の値のCRC32（ピア間の同期確認用）
+
+    marshalのバージョン3以降は同一オブジェクトを参照で書き出すため、
+    プロセスごとに出力が変わりうる。参照を使わないバージョン2で直列化する。
+    """
+    return zlib.crc32(marshal.dumps(state, 2))
+
+
+class UdpTransport:
+    """ノンブロッキングUDPソケット"""
+
+    def __init__(self, local_port, peer_address):
+        """
+        Args:
+            local_port: 待ち受けポート
+            peer_address: 相手の (host, port)
+        """
+        self.peer_address = peer_address
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(('0.0.0.0', local_port))
+        self.sock.setblocking(False)
+
+    def send(self, data):
+        try:
+            self.sock.sendto(data, self.peer_address)
+        except OSError:
+            pass  # 相手がまだ起動していない（ICMP unreachable）
+
+    def receive(self):
+        """届いているパケットを全て返す"""
+        packets = []
+        while True:
+            try:
+                data, _ = self.sock.recvfrom(2048)
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError:
+                continue  # WindowsのICMPエラー
+            packets.append(data)
+        return packets
+
+    def close(self):
+        self.sock.close()
+
+
+class LossyTransport:
+    """
+    送信側に遅延・揺らぎ・パケットロスを加えるラッパー（テスト用）
+
+    乱数は専用のRandomを使い、ゲームの乱数状態には触れない。
+    """
+
+    def __init__(self, inner, latency_ms=0.0, jitter_ms=0.0, loss=0.0, seed=None):
+        self.inner = inner
+        self.latency = latency_ms / 1000.0
+        self.jitter = jitter_ms / 1000.0
+        self.loss = loss
+        self.random = random.Random(seed)
+        self.queue = []     # (送信時刻, 通し番号, データ)
+        self.sequence = 0
+        self.dropped = 0
+
+    def send(self, data):
+        if self.random.random() < self.loss:
+            self.dropped += 1
+            return
+        delay = self.latency + self.random.uniform(-self.jitter, self.jitter)
+        heapq.heappush(self.queue, (time.perf_counter() + max(0.0, delay), self.sequence, data))
+        self.sequence += 1
+        self._flush()
+
+    def receive(self):
+        self._flush()
+        return self.inner.receive()
+
+    def _flush(self):
+        now = time.perf_counter()
+        while self.queue and self.queue[0][0] <= now:
+            self.inner.send(heapq.heappop(self.queue)[2])
+
+    def close(self):
+        self.inner.close()
+
+
+class RollbackSession:
+    """
+    GGPO方式の予測・ロールバック
+
+    毎フレーム advance() にローカル入力を渡すと、
+      1. 受信した相手の入力で予測が外れていたらロールバックして再シミュレーション
+      2. 予測で先行しすぎていなければ1フレーム進める
+      3. 未確認のローカル入力をまとめて送信（ロス対策で冗長に送る）
+    を行う。ゲームの状態は capture_state() で毎フレーム保存する。
+    """
+
+    def __init__(self, game, local_index, transport,
+                 input_delay=NETPLAY_INPUT_DELAY, max_rollback=NETPLAY_MAX_ROLLBACK):
+        """
+        Args:
+            game: Game（players=2で作成し、両ピアで同じシードからreset()済みのもの）
+            local_index: このピアが操作する機体（0 または 1）
+            transport: send(bytes) / receive() -> [bytes] を持つ通信路
+            input_delay: ローカル入力を適用するまでの遅延フレーム数
+            max_rollback: 相手の確定入力より先に進める最大フレーム数
+        """
+        self.game = game
+        self.local_index = local_index
+        self.transport = transport
+        self.input_delay = input_delay
+        self.max_rollback = max_rollback
+
+        self.frame = 0                  # 次にシミュレーションするフレーム
+        self.local_inputs = {}          # フレーム -> ローカル入力ビット
+        self.remote_inputs = {}         # フレーム -> 相手の確定入力ビット
+        self.predicted = {}             # フレーム -> シミュレーションに使った相手の入力
+        self.confirmed_frame = -1       # 相手の入力が連続して揃っている最終フレーム
+        self.remote_ack = -1            # 相手が受信済みのローカル入力の最終フレーム
+        self.states = {}                # フレーム -> そのフレームを進める前の状態
+        self.rollback_from = None       # 再シミュレーションが必要な最初のフレーム
+
+        # 入力遅延分のフレームは無入力で確定
+        for frame in range(input_delay):
+            self.local_inputs[frame] = 0
+
+        # 同期確認（チェックサム）
+        self.local_checksums = {}
+        self.remote_checksums = {}
+        self.next_checksum_frame = NETPLAY_CHECKSUM_INTERVAL
+        self.checksums_compared = 0
+        self.desyncs = []
+
+        # 計測
+        self.rollbacks = 0
+        self.rollback_frames = 0
+        self.max_rollback_depth = 0
+        self.resim_ms = deque(maxlen=FRAME_LATENCY_HISTORY)
+        self.frame_ms = deque(maxlen=FRAME_LATENCY_HISTORY)
+        self.stalls = 0
+        self.packets_sent = 0
+        self.packets_received = 0
+
+    # === 入力 ===
+
+    def _inputs_for(self, frame):
+        """フレームの入力（相手の分は確定値か予測値）を [1P, 2P] の順で返す"""
+        local = self.local_inputs[frame]
+        remote = self.remote_inputs.get(frame)
+        if remote is None:
+            # 予測：最後に確定した相手の入力が続くとみなす
+            remote = self.remote_inputs.get(self.confirmed_frame, 0)
+        self.predicted[frame] = remote
+        bits = [KeyState(local), KeyState(remote)]
+        if self.local_index == 1:
+            bits.reverse()
+        return bits
+
+    def _simulate(self, frame):
+        """状態を保存してから1フレーム進める"""
+        game = self.game
+        self.states[frame] = capture_state(game)
+        game.update(self._inputs_for(frame))
+        game.sim_steps += 1
+
+    # === 通信 ===
+
+    def poll(self):
+        """受信処理（予測が外れたフレームを記録するだけで再シミュレーションはしない）"""
+        for data in self.transport.receive():
+            if not data:
+                continue
+            self.packets_received += 1
+            if data[0] == PACKET_INPUT:
+                self._receive_inputs(data)
+            elif data[0] == PACKET_CHECKSUM:
+                _, frame, checksum = _CHECKSUM_PACKET.unpack_from(data)
+                self.remote_checksums[frame] = checksum
+        self._compare_checksums()
+
+    def _receive_inputs(self, data):
+        _, ack, start, count = _INPUT_HEADER.unpack_from(data)
+        self.remote_ack = max(self.remote_ack, ack)
+        payload = data[_INPUT_HEADER.size:_INPUT_HEADER.size + count]
+        for offset, bits in enumerate(payload):
+            frame = start + offset
+            if frame <= self.confirmed_frame or frame in self.remote_inputs:
+                continue  # 再送で届いた確定済みの入力
+            self.remote_inputs[frame] = bits
+            predicted = self.predicted.get(frame)
+            if predicted is not None and predicted != bits and frame < self.frame:
+                if self.rollback_from is None or frame < self.rollback_from:
+                    self.rollback_from = frame
+        while self.confirmed_frame + 1 in self.remote_inputs:
+            self.confirmed_frame += 1
+
+    def _send_inputs(self):
+        """相手が未受信のローカル入力をまとめて送信"""
+        start = max(self.remote_ack + 1, max(self.local_inputs) - NETPLAY_INPUT_REDUNDANCY + 1)
+        end = max(self.local_inputs)
+        payload = bytes(self.local_inputs[f] for f in range(start, end + 1))
+        header = _INPUT_HEADER.pack(PACKET_INPUT, self.confirmed_frame, start, len(payload))
+        self.transport.send(header + payload)
+        self.packets_sent += 1
+
+    # === 進行 ===
+
+    def _rollback(self):
+        """予測が外れたフレームまで戻して現在フレームまで再シミュレーション"""
+        start = self.rollback_from
+        self.rollback_from = None
+        if start is None or start not in self.states:
+            return
+        depth = self.frame - start
+        began = time.perf_counter()
+
+        sound = self.game.sound_manager
+        sound_enabled = sound.enabled
+        sound.enabled = False  # 再シミュレーション中は効果音を鳴らさない
+        try:
+            restore_state(self.game, self.states[start])
+            for frame in range(start, self.frame):
+                self._simulate(frame)
+        finally:
+            sound.enabled = sound_enabled
+
+        self.resim_ms.append((time.perf_counter() - began) * 1000)
+        self.rollbacks += 1
+        self.rollback_frames += depth
+        self.max_rollback_depth = max(self.max_rollback_depth, depth)
+
+    def synchronize(self):
+        """受信と必要なロールバックだけ行う（フレームは進めない）"""
+        self.poll()
+        self._rollback()
+        self._take_checksums()
+
+    def advance(self, local_bits):
+        """
+        ローカル入力を登録して1フレーム進める
+
+        Args:
+            local_bits: KeyState.bits
+
+        Returns:
+            bool: 進めたらTrue（相手を待つため止まったらFalse）
+        """
+        began = time.perf_counter()
+        self.synchronize()
+
+        if self.frame - self.confirmed_frame > self.max_rollback:
+            # 予測で先行しすぎ：相手の入力を待つ（入力は再送）
+            self.stalls += 1
+            self._send_inputs()
+            return False
+
+        self.local_inputs[self.frame + self.input_delay] = local_bits
+        self._simulate(self.frame)
+        self.frame += 1
+        self._send_inputs()
+        self._discard_history()
+        self.frame_ms.append((time.perf_counter() - began) * 1000)
+        return True
+
+    def _discard_history(self):
+        """ロールバックで戻り得ないフレームの状態と入力を捨てる"""
+        oldest = min(self.frame - NETPLAY_STATE_HISTORY, self.confirmed_frame)
+        for table in (self.states, self.predicted):
+            for frame in [f for f in table if f < oldest]:
+                del table[frame]
+        keep_inputs = min(oldest, self.remote_ack) - 1
+        for table in (self.local_inputs, self.remote_inputs):
+            for frame in [f for f in table if f < keep_inputs]:
+                del table[frame]
+
+    # === 同期確認 ===
+
+    def _take_checksums(self):
+        """入力が全て確定したフレームの状態のチェックサムを送る"""
+        frame = self.next_checksum_frame
+        while frame <= self.confirmed_frame + 1 and frame <= self.frame:
+            if frame == self.frame:
+                state = capture_state(self.game)  # 現在フレーム（まだ保存していない）
+            else:
+                state = self.states[frame]
+            checksum = state_checksum(state)
+            self.local_checksums[frame] = checksum
+            self.transport.send(_CHECKSUM_PACKET.pack(PACKET_CHECKSUM, frame, checksum))
+            frame += NETPLAY_CHECKSUM_INTERVAL
+        self.next_checksum_frame = frame
+        self._compare_checksums()
+
+    def _compare_checksums(self):
+        for frame in [f for f in self.remote_checksums if f in self.local_checksums]:
+            if self.remote_checksums.pop(frame) != self.local_checksums.pop(frame):
+                self.desyncs.append(frame)
+                print(f"[Netplay] DESYNC at frame {frame}")
+            self.checksums_compared += 1
+
+    def metrics(self):
+        """ロールバックのコスト集計"""
+        resim = sorted(self.resim_ms)
+        frames = sorted(self.frame_ms)
+        n = len(resim)
+        return {
+            'frames': self.frame,
+            'rollbacks': self.rollbacks,
+            'rollback_frames': self.rollback_frames,
+            'avg_rollback_depth': self.rollback_frames / self.rollbacks if self.rollbacks else 0.0,
+            'max_rollback_depth': self.max_rollback_depth,
+            'resim_avg_ms': sum(resim) / n if n else 0.0,
+            'resim_p95_ms': resim[min(n - 1, int(n * 0.95))] if n else 0.0,
+            'resim_max_ms': resim[-1] if n else 0.0,
+            'frame_p95_ms': frames[min(len(frames) - 1, int(len(frames) * 0.95))] if frames else 0.0,
+            'frame_max_ms': frames[-1] if frames else 0.0,
+            'stalls': self.stalls,
+            'packets_sent': self.packets_sent,
+            'packets_received': self.packets_received,
+            'checksums_compared': self.checksums_compared,
+            'desyncs': len(self.desyncs),
+        }
+
+
+def create_netplay_game(seed=NETPLAY_SEED, **game_args):
+    """両ピアで同じ初期状態になる2人用のGameを作成"""
+    from game import Game
+
+    game = Game(players=2, **game_args)
+    # フレーム時間に依存する負荷軽減はピア間で結果が変わるので無効化
+    game.degradation.enabled = False
+    random.seed(seed)
+    game.reset()
+    return game
+
+
+def run_netplay(game, session, max_frames=None):
+    """
+    対戦のメインループ（SIM_HZ固定、描画はロールバック後の最新状態）
+
+    Args:
+        game: create_netplay_game() で作ったGame
+        session: RollbackSession
+        max_frames: このフレーム数で終了（Noneなら無制限）
+    """
+    provider = game.input_provider
+    while game.running:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                game.running = False
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_ESCAPE:
+                    game.running = False
+                elif event.key == pygame.K_m:
+                    game.sound_manager.toggle_mute()
+
+        keys = provider.get_keys(game)
+        bits = keys.bits if isinstance(keys, KeyState) else KeyState.from_pressed(keys).bits
+        if session.advance(bits) and game.spectator is not None:
+            game.spectator.publish(game)
+        if max_frames is not None and session.frame >= max_frames:
+            game.running = False
+
+        game.draw()
+        game.clock.tick(SIM_HZ)
+
+    game.shutdown()
+
+
+def print_metrics(label, metrics):
+    """ロールバック計測値を表示"""
+    print(f"[{label}] {metrics['frames']} frames, {metrics['rollbacks']} rollbacks "
+          f"(avg depth {metrics['avg_rollback_depth']:.1f}, max {metrics['max_rollback_depth']}), "
+          f"{metrics['stalls']} stalls")
+    print(f"[{label}] resim avg {metrics['resim_avg_ms']:.2f} ms, p95 {metrics['resim_p95_ms']:.2f} ms, "
+          f"max {metrics['resim_max_ms']:.2f} ms; frame p95 {metrics['frame_p95_ms']:.2f} ms, "
+          f"max {metrics['frame_max_ms']:.2f} ms")
+    print(f"[{label}] packets {metrics['packets_sent']} sent / {metrics['packets_received']} received, "
+          f"{metrics['checksums_compared']} checksums compared, {metrics['desyncs']} desyncs")
+
+
+# === ローカルホスト試験 ===
+
+def _peer_main(index, ports, options, results):
+    """試験用ピア（別プロセス）：自動操縦で frames フレーム進めて結果を返す"""
+    from input_provider import AutopilotInput
+
+    local_port, peer_port = ports[index], ports[1 - index]
+    transport = LossyTransport(UdpTransport(local_port, ('127.0.0.1', peer_port)),
+                               options['latency'], options['jitter'], options['loss'],
+                               seed=index)
+    bot = AutopilotInput(player_index=index)
+    game = create_netplay_game(options['seed'], input_provider=bot, headless=True,
+                               immortal=options['immortal'])
+    game.sound_manager.enabled = False
+    session = RollbackSession(game, index, transport, options['input_delay'], options['max_rollback'])
+
+    frames = options['frames']
+    frame_dt = 1.0 / SIM_HZ
+    next_frame = time.perf_counter()
+    while session.frame < frames:
+        session.advance(bot.get_keys(game).bits)
+        if options['draw']:
+            game.draw()
+        next_frame += frame_dt
+        delay = next_frame - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+    # 最終フレームまで相手の入力が揃うのを待ち、最終状態を確定させる
+    deadline = time.perf_counter() + 10.0
+    while session.confirmed_frame < frames - 1 and time.perf_counter() < deadline:
+        session._send_inputs()
+        session.synchronize()
+        time.sleep(0.005)
+    final_checksum = state_checksum(capture_state(game))
+
+    # 相手が最終状態を確定できるよう、しばらく入力を送り続ける
+    linger = time.perf_counter() + 1.0
+    while time.perf_counter() < linger:
+        session._send_inputs()
+        session.synchronize()
+        time.sleep(0.005)
+
+    metrics = session.metrics()
+    metrics['final_checksum'] = final_checksum
+    metrics['confirmed'] = session.confirmed_frame >= frames - 1
+    metrics['lost_packets'] = transport.dropped
+    metrics['score'] = game.score
+    results.put((index, metrics))
+    transport.close()
+    pygame.quit()
+
+
+def run_harness(options):
+    """2つのピアを別プロセスで起動し、ロールバックのコストと同期を確認"""
+    import multiprocessing
+
+    ctx = multiprocessing.get_context('spawn')
+    results = ctx.Queue()
+    ports = (options['port'], options['port'] + 1)
+    peers = [ctx.Process(target=_peer_main, args=(i, ports, options, results)) for i in range(2)]
+    for peer in peers:
+        peer.start()
+    reports = dict(results.get() for _ in peers)
+    for peer in peers:
+        peer.join()
+
+    print(f"Netplay harness: {options['frames']} frames, latency {options['latency']:.0f} ms "
+          f"+/-{options['jitter']:.0f} ms, loss {options['loss'] * 100:.0f}%, "
+          f"input delay {options['input_delay']}, max rollback {options['max_rollback']}")
+    for index in (0, 1):
+        print_metrics(f"P{index + 1}", reports[index])
+
+    frame_budget_ms = 1000.0 / SIM_HZ
+    worst = max(r['frame_max_ms'] for r in reports.values())
+    in_sync = (reports[0]['final_checksum'] == reports[1]['final_checksum'] and
+               all(r['confirmed'] and r['desyncs'] == 0 for r in reports.values()))
+    print(f"Worst frame (including rollback): {worst:.2f} ms "
+          f"({'within' if worst <= frame_budget_ms else 'OVER'} {frame_budget_ms:.1f} ms budget)")
+    print("Final state:", "IN SYNC" if in_sync else "DESYNC")
+    return 0 if in_sync else 1
+
+
+def benchmark_rollback(scenario='wave4_three_bosses', depth=NETPLAY_MAX_ROLLBACK,
+                       warmup=300, iterations=50):
+    """
+    重いシナリオで「復元＋depthフレームの再シミュレーション」1回の時間を計測
+
+    ウォームアップは撃たずに進める（撃つとボスを倒してしまい、計測する場面が
+    軽くなる）。ボスが弾を撒いた状態から、撃ちながらのdepthフレームを測る。
+
+    Returns:
+        dict: 中央値・最大（ミリ秒）と計測開始時点のエンティティ数
+    """
+    from savestate import load_scenario
+    from input_provider import INPUT_SHOOT
+
+    game = create_netplay_game(headless=True, immortal=True)
+    game.sound_manager.enabled = False
+    load_scenario(game, scenario)
+    idle = [KeyState(), KeyState()]
+    for _ in range(warmup):
+        game.update(idle)
+
+    counts = {
+        'enemies': len(game.enemies),
+        'bosses': sum(1 for enemy in game.enemies if getattr(enemy, 'is_boss', False)),
+        'bullets': len(game.player_bullets) + len(game.enemy_bullets),
+    }
+    inputs = [KeyState(INPUT_SHOOT), KeyState(INPUT_SHOOT)]
+    samples = []
+    for _ in range(iterations):
+        state = capture_state(game)
+        began = time.perf_counter()
+        restore_state(game, state)
+        for _ in range(depth):
+            capture_state(game)
+            game.update(inputs)
+        samples.append((time.perf_counter() - began) * 1000)
+        restore_state(game, state)
+    samples.sort()
+    pygame.quit()
+    return {
+        'median_ms': samples[len(samples) // 2],
+        'max_ms': samples[-1],
+        **counts,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Rollback netplay localhost harness")
+    parser.add_argument('--frames', type=int, default=1800)
+    parser.add_argument('--latency', type=float, default=50.0, help='one-way latency (ms)')
+    parser.add_argument('--jitter', type=float, default=10.0, help='latency jitter (ms)')
+    parser.add_argument('--loss', type=float, default=0.05, help='packet loss ratio')
+    parser.add_argument('--input-delay', type=int, default=NETPLAY_INPUT_DELAY)
+    parser.add_argument('--max-rollback', type=int, default=NETPLAY_MAX_ROLLBACK)
+    parser.add_argument('--port', type=int, default=NETPLAY_PORT)
+    parser.add_argument('--seed', type=int, default=NETPLAY_SEED)
+    parser.add_argument('--mortal', action='store_true', help='players can die')
+    parser.add_argument('--draw', action='store_true', help='also draw every frame')
+    parser.add_argument('--bench', action='store_true',
+                        help='measure one max-depth rollback on a heavy scenario')
+    args = parser.parse_args()
+
+    if args.bench:
+        result = benchmark_rollback(depth=args.max_rollback)
+        print(f"Rollback of {args.max_rollback} frames (from {result['enemies']} enemies incl. "
+              f"{result['bosses']} bosses, {result['bullets']} bullets): median {result['median_ms']:.2f} ms, "
+              f"max {result['max_ms']:.2f} ms (frame budget {1000.0 / SIM_HZ:.1f} ms)")
+        raise SystemExit(0)
+
+    raise SystemExit(run_harness({
+        'frames': args.frames,
+        'latency': args.latency,
+        'jitter': args.jitter,
+        'loss': args.loss,
+        'input_delay': args.input_delay,
+        'max_rollback': args.max_rollback,
+        'port': args.port,
+        'seed': args.seed,
+        'immortal': not args.mortal,
+        'draw': args.draw,
+    }))
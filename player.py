@@ -2,28 +2,56 @@ import pygame
 import random
 import math
 from constants import *
-from bullet import Bullet
+from bullet import Bullet, HomingMissile
+
+# 描画専用の乱数（シミュレーション用のグローバル乱数を消費しないため）
+# 描画回数がピアごとに異なってもロールバック対戦の同期が崩れない
+_cosmetic_random = random.Random()
+
+# 時限効果つきの武器タイプと、その効果時間のタイマー名・持続時間
+WEAPON_EFFECTS = {
+    WEAPON_TYPE_3WAY: ('way3_effect', WAY3_EFFECT_DURATION),
+    WEAPON_TYPE_HOMING: ('homing_effect', HOMING_EFFECT_DURATION),
+}
+
+
+def hull_points(center_x, center_y, scaled_width, scaled_height):
+    """自機の三角形の頂点（描画と当たり判定のマスクで共有）"""
+    return [
+        (center_x + scaled_width // 2, center_y),  # 先端（右）
+        (center_x - scaled_width // 2, center_y - scaled_height // 2),  # 左上
+        (center_x - scaled_width // 2, center_y + scaled_height // 2)   # 左下
+    ]
+
 
 class Player:
-    def __init__(self):
+    def __init__(self, index=0):
+        """
+        Args:
+            index: プレイヤー番号（0=1P, 1=2P）
+        """
+        self.index = index
         self.x = 100
-        self.y = SCREEN_HEIGHT // 2
+        self.y = SCREEN_HEIGHT // 2 + PLAYER_2_Y_OFFSET * index
+        self.color = PLAYER_COLORS[index]
         self.width = PLAYER_WIDTH
         self.height = PLAYER_HEIGHT
         self.speed = PLAYER_SPEED
+        self.move_x = 0  # 前フレームからの移動量（敵の偏差射撃用）
+        self.move_y = 0
         self.lives = PLAYER_MAX_LIVES
         self.power_level = 1
         self.base_power_level = 1  # 時限効果なしの基本パワーレベル
         self.weapon_type = WEAPON_TYPE_NORMAL  # 射撃タイプ
 
-        # 時限効果タイマー
-        self.power_effect_timer = 0  # POWER効果の残り時間
-        self.way3_effect_timer = 0   # 3-WAY効果の残り時間
+        # タイマー（'shoot', 'invincible', 'power_effect', 'way3_effect', 'homing_effect', 'shake'）
+        # 発火フレームを持ち、カウントダウンはgame.pyのTimerWheelが行う
+        self.timers = {}
+        self.timer_wheel = None  # game.pyから設定される
 
         self.rect = pygame.Rect(self.x, self.y, self.width, self.height)
 
         # Shooting
-        self.shoot_cooldown = 0
         self.shoot_delay = 10  # frames between shots
 
         # Charge shot
@@ -34,21 +62,68 @@ class Player:
 
         # Invincibility
         self.invincible = False
-        self.invincible_timer = 0
-        self.blink_timer = 0
 
         # Sound manager (set by game.py)
         self.sound_manager = None
 
+        # 不死モード（負荷生成用、game.pyから設定される）
+        self.immortal = False
+
+        # Forceボタンの前フレームの状態（押した瞬間を検出、対戦モード用）
+        self.force_button_held = False
+
         # Animation state variables
         self.engine_timer = 0           # エンジン炎用タイマー
         self.tilt_angle = 0.0           # 傾き角度（-1.0 ~ 1.0）
         self.recoil_offset = 0.0        # 射撃反動オフセット
         self.idle_timer = 0             # アイドルホバリングタイマー
-        self.shake_timer = 0            # 被弾シェイクタイマー
         self.shake_intensity = 3        # シェイク強度
 
+    # === タイマーの残り時間（HUD・描画用） ===
+
+    @property
+    def invincible_timer(self):
+        return self.timer_wheel.remaining(self, 'invincible')
+
+    @property
+    def blink_timer(self):
+        """無敵になってからの経過フレーム（点滅の位相）"""
+        if not self.invincible:
+            return 0
+        return PLAYER_INVINCIBILITY_FRAMES - self.invincible_timer
+
+    @property
+    def power_effect_timer(self):
+        return self.timer_wheel.remaining(self, 'power_effect')
+
+    @property
+    def way3_effect_timer(self):
+        return self.timer_wheel.remaining(self, 'way3_effect')
+
+    @property
+    def weapon_effect_timer(self):
+        """今の武器の時限効果の残りフレーム（通常射撃なら0）"""
+        effect = WEAPON_EFFECTS.get(self.weapon_type)
+        return self.timer_wheel.remaining(self, effect[0]) if effect else 0
+
+    @property
+    def shake_timer(self):
+        return self.timer_wheel.remaining(self, 'shake')
+
+    def on_timer(self, name):
+        """タイマー発火（TimerWheelから呼ばれる）"""
+        if name == 'invincible':
+            self.invincible = False
+        elif name == 'power_effect':
+            # POWER効果が切れた：パワーレベルを元に戻す
+            self.power_level = self.base_power_level
+        elif name in ('way3_effect', 'homing_effect'):
+            # 武器の時限効果が切れた：通常射撃に戻す
+            self.weapon_type = WEAPON_TYPE_NORMAL
+
     def update(self, keys):
+        old_x, old_y = self.x, self.y
+
         # Movement
         if keys[pygame.K_LEFT]:
             self.x -= self.speed
@@ -62,35 +137,12 @@ class Player:
         # Keep player on screen
         self.x = max(0, min(self.x, SCREEN_WIDTH - self.width))
         self.y = max(0, min(self.y, SCREEN_HEIGHT - self.height))
+        self.move_x = self.x - old_x
+        self.move_y = self.y - old_y
 
         self.rect.x = self.x
         self.rect.y = self.y
 
-        # Update cooldowns
-        if self.shoot_cooldown > 0:
-            self.shoot_cooldown -= 1
-
-        # Update invincibility
-        if self.invincible:
-            self.invincible_timer -= 1
-            self.blink_timer += 1
-            if self.invincible_timer <= 0:
-                self.invincible = False
-                self.blink_timer = 0
-
-        # Update timed powerup effects
-        if self.power_effect_timer > 0:
-            self.power_effect_timer -= 1
-            if self.power_effect_timer <= 0:
-                # POWER効果が切れた：パワーレベルを元に戻す
-                self.power_level = self.base_power_level
-
-        if self.way3_effect_timer > 0:
-            self.way3_effect_timer -= 1
-            if self.way3_effect_timer <= 0:
-                # 3-WAY効果が切れた：通常射撃に戻す
-                self.weapon_type = WEAPON_TYPE_NORMAL
-
         # === Animation Updates ===
 
         # 1. 傾きアニメーションの更新
@@ -114,11 +166,7 @@ class Player:
         elif self.recoil_offset > 0:
             self.recoil_offset = 0
 
-        # 4. シェイクタイマーの更新
-        if self.shake_timer > 0:
-            self.shake_timer -= 1
-
-        # 5. エンジンタイマー
+        # 4. エンジンタイマー
         self.engine_timer += 1
 
         # Charge shot logic
@@ -167,15 +215,19 @@ class Player:
 
     def shoot(self):
         """Shoot normal bullets (Z key)"""
-        if self.shoot_cooldown <= 0:
+        if 'shoot' not in self.timers:
             # パワーレベルによる連射間隔の短縮（最大3レベルまで）
             power_multiplier = 0.8 ** min(self.power_level - 1, 3)
 
             # 武器タイプに応じてクールダウンを設定
             if self.weapon_type == WEAPON_TYPE_3WAY:
-                self.shoot_cooldown = int(WEAPON_3WAY_DELAY * power_multiplier)
+                cooldown = int(WEAPON_3WAY_DELAY * power_multiplier)
+            elif self.weapon_type == WEAPON_TYPE_HOMING:
+                cooldown = int(WEAPON_HOMING_DELAY * power_multiplier)
             else:
-                self.shoot_cooldown = int(WEAPON_NORMAL_DELAY * power_multiplier)
+                cooldown = int(WEAPON_NORMAL_DELAY * power_multiplier)
+            if cooldown > 0:
+                self.timer_wheel.schedule(self, 'shoot', cooldown)
 
             self.recoil_offset = -3  # 反動追加
             if self.sound_manager:
@@ -206,6 +258,11 @@ class Player:
                 vy_down = -BULLET_SPEED * math.sin(angle_down)  # 下方向は正
                 bullets.append(Bullet(base_x, base_y - 2, True, 0, vx_down, vy_down))
 
+            elif self.weapon_type == WEAPON_TYPE_HOMING:
+                # ホーミングミサイル（同時に撃った弾は近い順に別々の敵を狙う）
+                for slot, angle in enumerate(HOMING_LAUNCH_ANGLES):
+                    bullets.append(HomingMissile(base_x, base_y, angle, slot))
+
             return bullets
         return []
 
@@ -225,10 +282,11 @@ class Player:
     def take_damage(self):
         """Player takes damage"""
         if not self.invincible:
-            self.lives -= 1
+            if not self.immortal:
+                self.lives -= 1
             self.invincible = True
-            self.invincible_timer = PLAYER_INVINCIBILITY_TIME // (1000 // FPS)
-            self.shake_timer = 10  # シェイク追加
+            self.timer_wheel.schedule(self, 'invincible', PLAYER_INVINCIBILITY_FRAMES)
+            self.timer_wheel.schedule(self, 'shake', 10)  # シェイク追加
             return True
         return False
 
@@ -242,29 +300,39 @@ class Player:
         # 時限効果として一時的にパワーレベルを上げる
         self.power_level = min(self.power_level + 1, 5)
         # タイマーを加算（効果時間積み上げ）
-        self.power_effect_timer += POWER_EFFECT_DURATION
+        self.timer_wheel.schedule(self, 'power_effect', self.power_effect_timer + POWER_EFFECT_DURATION)
 
     def toggle_weapon(self):
         """武器タイプを切り替え（Vキーで呼ばれる）"""
         if self.weapon_type == WEAPON_TYPE_NORMAL:
             self.weapon_type = WEAPON_TYPE_3WAY
+        elif self.weapon_type == WEAPON_TYPE_3WAY:
+            self.weapon_type = WEAPON_TYPE_HOMING
         else:
             self.weapon_type = WEAPON_TYPE_NORMAL
 
     def set_weapon_type(self, weapon_type):
         """武器タイプを設定（時限効果）"""
+        # 別の武器に持ち替えたら前の武器の効果時間は捨てる
+        for other, (name, _) in WEAPON_EFFECTS.items():
+            if other != weapon_type:
+                self.timer_wheel.cancel(self, name)
         self.weapon_type = weapon_type
-        # 3-WAYの場合は時限効果タイマーを加算
-        if weapon_type == WEAPON_TYPE_3WAY:
-            self.way3_effect_timer += WAY3_EFFECT_DURATION
+        # 時限効果つきの武器はタイマーを加算（効果時間積み上げ）
+        effect = WEAPON_EFFECTS.get(weapon_type)
+        if effect:
+            name, duration = effect
+            self.timer_wheel.schedule(self, name, self.timer_wheel.remaining(self, name) + duration)
 
-    def draw(self, screen):
-        # Blink effect when invincible
-        if self.invincible and self.blink_timer % 10 < 5:
-            return
+    def hull_pose(self):
+        """
+        描画する三角形の姿勢（シミュレーションの状態だけから決まる部分）
 
-        # === アニメーションオフセットの計算 ===
+        Player.draw() と当たり判定のマスク（collision_masks.py）が同じ形を使う。
 
+        Returns:
+            tuple: (x方向のずれ, y方向のずれ, 脈動を適用した幅, 高さ)
+        """
         # 1. 射撃反動オフセット
         recoil_x = int(self.recoil_offset)
 
@@ -276,37 +344,42 @@ class Player:
         if self.idle_timer > 0:
             idle_y = int(math.sin(self.idle_timer * 0.05) * 2)
 
-        # 4. 被弾シェイク
-        shake_x = 0
-        shake_y = 0
-        if self.shake_timer > 0:
-            shake_x = random.randint(-self.shake_intensity, self.shake_intensity)
-            shake_y = random.randint(-self.shake_intensity, self.shake_intensity)
-
         # 5. チャージ脈動
         pulse_scale = 1.0
         if self.charging and self.charge_level > 0:
             pulse_scale = 1.0 + math.sin(self.charge_time * 0.2) * 0.1 * self.charge_level
 
+        return (recoil_x, tilt_y + idle_y,
+                int(self.width * pulse_scale), int(self.height * pulse_scale))
+
+    def draw(self, screen):
+        # Blink effect when invincible
+        if self.invincible and self.blink_timer % 10 < 5:
+            return
+
+        # === アニメーションオフセットの計算 ===
+
+        # 1〜3, 5. 射撃反動・傾き・アイドルホバリングのオフセットとチャージ脈動
+        offset_x, offset_y, scaled_width, scaled_height = self.hull_pose()
+
+        # 4. 被弾シェイク（見た目だけなので当たり判定には含めない）
+        shake_x = 0
+        shake_y = 0
+        if self.shake_timer > 0:
+            shake_x = _cosmetic_random.randint(-self.shake_intensity, self.shake_intensity)
+            shake_y = _cosmetic_random.randint(-self.shake_intensity, self.shake_intensity)
+
         # === 総合オフセット ===
-        total_offset_x = self.x + recoil_x + shake_x
-        total_offset_y = self.y + tilt_y + idle_y + shake_y
+        total_offset_x = self.x + offset_x + shake_x
+        total_offset_y = self.y + offset_y + shake_y
 
         # === プレイヤー三角形の描画 ===
         center_x = total_offset_x + self.width // 2
         center_y = total_offset_y + self.height // 2
 
-        # 脈動を適用したサイズ
-        scaled_width = int(self.width * pulse_scale)
-        scaled_height = int(self.height * pulse_scale)
-
         # 三角形の頂点（脈動適用）
-        points = [
-            (center_x + scaled_width // 2, center_y),  # 先端（右）
-            (center_x - scaled_width // 2, center_y - scaled_height // 2),  # 左上
-            (center_x - scaled_width // 2, center_y + scaled_height // 2)   # 左下
-        ]
-        pygame.draw.polygon(screen, BLUE, points)
+        points = hull_points(center_x, center_y, scaled_width, scaled_height)
+        pygame.draw.polygon(screen, self.color, points)
 
         # === エンジン噴射エフェクト ===
         # 三角形の左側（後方）から炎を描画
@@ -315,7 +388,7 @@ class Player:
         flame_y2 = center_y + scaled_height // 4  # 下の炎
 
         # フレームごとにランダムな長さ
-        flame_length = 5 + random.randint(0, 5)
+        flame_length = 5 + _cosmetic_random.randint(0, 5)
 
         # 2本の炎を描画
         pygame.draw.line(screen, ORANGE,
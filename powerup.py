@@ -1,5 +1,6 @@
 import pygame
 from constants import *
+from layers import label
 
 class PowerUp:
     def __init__(self, x, y, powerup_type):
@@ -22,6 +23,9 @@ class PowerUp:
         elif powerup_type == POWERUP_TYPE_POWER:
             self.color = RED
             self.name = "POWER"
+        elif powerup_type == POWERUP_TYPE_HOMING:
+            self.color = YELLOW
+            self.name = "HOMING"
         else:  # POWERUP_TYPE_3WAY
             self.color = CYAN
             self.name = "3WAY"
@@ -61,9 +65,8 @@ class PowerUp:
         pygame.draw.polygon(screen, WHITE, points, 2)
 
         # Draw letter indicator
-        font = pygame.font.Font(None, 16)
         letter = self.name[0]  # F, S, or P
-        text = font.render(letter, True, WHITE)
+        text = label(16, letter, WHITE)
         text_rect = text.get_rect(center=(center_x, center_y))
         screen.blit(text, text_rect)
 
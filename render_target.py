@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+内部解像度の描画先とウィンドウへの拡大表示
+
+ゲームは常に SCREEN_WIDTH×SCREEN_HEIGHT の内部サーフェスに描画し、
+表示のときだけウィンドウの大きさに拡大する。描画（塗りつぶし・図形・文字）の
+コストはウィンドウがどれだけ大きくても内部解像度の分しかかからない。
+拡大のコストはモードで違う：sdl はSDLのレンダラ（GPU）が拡大するので、表示まで
+含めたフレーム時間が800×600から4Kまでほぼ一定。scale はメインスレッドのCPUで
+拡大するので、ウィンドウの画素数に比例して増える（一定なのは2倍程度まで）。
+大きなウィンドウには sdl を使う（main.py --window の既定）。
+
+モード:
+    direct  ウィンドウのサーフェスに直接描画（従来どおり、ウィンドウは内部解像度）
+    scale   内部サーフェス（ディスプレイのピクセル形式に一度だけ変換済み）を
+            pygame.transform.scale で整数倍に拡大してウィンドウ中央に表示。
+            ウィンドウのサイズ変更に追従し、余白は黒
+    sdl     pygame.SCALED：SDLのレンダラが拡大する（GPUがあればGPUで、整数倍の余白はSDLが黒で埋める）。
+            ウィンドウの大きさは window_size（Noneなら画面に収まる最大の整数倍をSDLが選ぶ）
+
+Usage:
+    python render_target.py          # ウィンドウサイズごとの描画・表示コストの計測
+"""
+
+import os
+import pygame
+from constants import *
+
+
+class RenderTarget:
+    """
+    ゲームが描画するサーフェス（surface）と、それをウィンドウに表示する present()
+
+    ウィンドウのサイズ変更イベントはメインスレッドで handle_event() に渡す。
+    """
+
+    def __init__(self, mode=RENDER_MODE, window_size=None):
+        """
+        Args:
+            mode: 'direct', 'scale', 'sdl'
+            window_size: sdl・scaleモードのウィンドウサイズ（Noneなら内部解像度の整数倍で画面に収まる最大）
+        """
+        if mode not in RENDER_MODES:
+            raise ValueError(f"unknown render mode '{mode}' (available: {', '.join(RENDER_MODES)})")
+        self.mode = mode
+        self.internal_size = (SCREEN_WIDTH, SCREEN_HEIGHT)
+        self.scale = 1
+        self.offset = (0, 0)
+        self.dest = None  # 拡大先（ウィンドウのサブサーフェス）
+
+        if mode == 'direct':
+            self.window = pygame.display.set_mode(self.internal_size)
+            self.surface = self.window
+        elif mode == 'sdl':
+            self.window = pygame.display.set_mode(self.internal_size, pygame.SCALED | pygame.RESIZABLE)
+            self.surface = self.window
+            if window_size is not None:
+                # 論理解像度は内部解像度のまま、ウィンドウだけ大きくする（拡大はSDLのレンダラ）
+                from pygame._sdl2.video import Window
+                Window.from_display_module().size = window_size
+            window_w, window_h = pygame.display.get_window_size()
+            self.scale = max(1, min(window_w // SCREEN_WIDTH, window_h // SCREEN_HEIGHT))
+        else:
+            self.window = pygame.display.set_mode(window_size or self._default_window_size(),
+                                                  pygame.RESIZABLE)
+            # ピクセル形式はここで一度だけディスプレイに合わせる（毎フレームの変換を避ける）
+            self.surface = pygame.Surface(self.internal_size).convert(self.window)
+            self._layout()
+
+    def _default_window_size(self):
+        """内部解像度の整数倍で画面に収まる最大のサイズ"""
+        info = pygame.display.Info()
+        width, height = self.internal_size
+        if info.current_w <= 0 or info.current_h <= 0:
+            return self.internal_size
+        scale = max(1, min(info.current_w // width, info.current_h // height))
+        return width * scale, height * scale
+
+    def _layout(self):
+        """ウィンドウの大きさから倍率と表示位置を決める"""
+        window_w, window_h = self.window.get_size()
+        width, height = self.internal_size
+        scale = min(window_w // width, window_h // height)
+        if scale >= 1:
+            size = (width * scale, height * scale)
+        else:
+            # 内部解像度より小さいウィンドウは縦横比を保って縮小
+            ratio = min(window_w / width, window_h / height)
+            size = (max(1, int(width * ratio)), max(1, int(height * ratio)))
+        self.scale = max(scale, 1)
+        self.offset = ((window_w - size[0]) // 2, (window_h - size[1]) // 2)
+        self.window.fill(BLACK)
+        self.dest = None if size == self.internal_size else self.window.subsurface(
+            pygame.Rect(self.offset, size))
+
+    def handle_event(self, event):
+        """ウィンドウのサイズ変更に追従する（scaleモードのみ）"""
+        if self.mode == 'scale' and event.type == pygame.VIDEORESIZE:
+            self.window = pygame.display.get_surface()
+            self._layout()
+
+    def present(self):
+        """内部サーフェスをウィンドウに表示"""
+        if self.mode == 'scale':
+            if self.dest is None:
+                self.window.blit(self.surface, self.offset)
+            else:
+                pygame.transform.scale(self.surface, self.dest.get_size(), self.dest)
+        pygame.display.flip()
+
+
+if __name__ == "__main__":
+    # 1フレームの描画（内部解像度）と表示（ウィンドウへの拡大＋flip）の合計を、モードとウィンドウサイズごとに計測。
+    # 表示のコストは実際のビデオドライバでないと測れないので、ディスプレイがなければ
+    # offscreenドライバ（SDLのレンダラあり）を使う。dummyドライバでは sdl モードを測れない
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Render target benchmark")
+    parser.add_argument('--frames', type=int, default=60)
+    args = parser.parse_args()
+
+    if not (os.environ.get('DISPLAY') or os.environ.get('WAYLAND_DISPLAY')):
+        os.environ.setdefault('SDL_VIDEODRIVER', 'offscreen')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    from game import Game
+    from input_provider import AutopilotInput
+
+    game = Game(input_provider=AutopilotInput(), headless=True, immortal=True, interpolate=False)
+    game.sound_manager.enabled = False
+    game.skip_to_wave(4)
+    for _ in range(900):
+        game.update()
+
+    driver = pygame.display.get_driver()
+    modes = ('scale', 'sdl') if driver != 'dummy' else ('scale',)
+    print(f"video driver: {driver}, renderer: {os.environ.get('SDL_RENDER_DRIVER', 'SDL default')}")
+    print(f"{'mode':>6}{'window':>11}{'scale':>7}{'draw':>9}{'present':>10}{'total':>9}  (ms per frame)")
+    totals = {}
+    for mode in modes:
+        for window_size in ((800, 600), (1280, 720), (1600, 1200), (1920, 1080), (2560, 1440), (3840, 2160)):
+            target = RenderTarget(mode, window_size)
+            game.render_target = target
+            game.screen = target.surface
+            game.layers.invalidate()
+            for _ in range(5):  # ウィンドウ・テクスチャの作り直しを計測から外す
+                game._draw_live()
+                target.present()
+
+            draw = present = 0.0
+            for _ in range(args.frames):
+                start = time.perf_counter()
+                game._draw_live()
+                middle = time.perf_counter()
+                target.present()
+                end = time.perf_counter()
+                draw += middle - start
+                present += end - middle
+
+            draw = draw / args.frames * 1000
+            present = present / args.frames * 1000
+            totals.setdefault(mode, []).append(draw + present)
+            print(f"{mode:>6}{window_size[0]:>6}x{window_size[1]:<5}{target.scale:>6}x{draw:>9.2f}"
+                  f"{present:>10.2f}{draw + present:>9.2f}")
+
+    for mode, times in totals.items():
+        print(f"{mode}: total frame time at 3840x2160 is {times[-1] / times[0]:.2f}x that at 800x600")
+    if driver == 'dummy':
+        print("(dummy video driver: 'sdl' mode has no renderer here, so only 'scale' is measured)")
@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+ゲーム状態のスナップショット保存・復元
+
+Game全体（プレイヤー、Force、敵、弾、パワーアップ、爆発、WaveManager、タイマー、
+TerrainManager、スコア、乱数状態）をバージョン付きのバイナリに変換する。
+
+エンティティは「クラス名・フィールド名の組」ごとに値のタプルだけを並べ、
+marshalで直列化する。復元は __init__ を通さずに __dict__ を差し替えるので、
+数百エンティティでも1ミリ秒未満で終わる。
+
+Usage:
+    python savestate.py              # 保存・復元のベンチマーク
+    python savestate.py --list       # 名前付きシナリオ一覧
+"""
+
+import marshal
+import random
+import struct
+import zlib
+import pygame
+from constants import *
+from player import Player
+from force import Force
+from enemy import Enemy
+from bullet import Bullet, HomingMissile
+from powerup import PowerUp
+from effects import Explosion
+from terrain import TerrainSegment
+from wave_manager import WaveManager
+from terrain_manager import TerrainManager
+from terrain_heightmap import TerrainHeightmap
+
+SAVESTATE_MAGIC = b'RTSS'
+SAVESTATE_VERSION = 7  # 2: 協力プレイ対応（プレイヤーをリストで保存）、3: Waveのイベントキュー、4: タイマー、5: 地形の種と塊の番号、6: 地形のワールド座標、7: 砲台のワールド座標
+SAVESTATE_FLAG_COMPRESSED = 1
+
+# ヘッダ：マジック、バージョン、フラグ、ペイロード長
+_HEADER = struct.Struct('<4sHHI')
+
+# 保存対象のクラス（名前で直列化する）
+_CLASSES = {cls.__name__: cls for cls in (
+    Player, Force, Enemy, Bullet, HomingMissile, PowerUp, Explosion, TerrainSegment, WaveManager,
+    TerrainManager)}
+
+# pygame.Rectの属性（タプルで保存して復元時に作り直す）
+_RECT_FIELDS = ('rect', 'top_rect', 'bottom_rect')
+
+def _copy_dicts(items):
+    return [dict(item) for item in items]
+
+
+# 可変のコンテナを持つ属性と複製方法（浅いコピーでは状態がライブのオブジェクトと共有されるので個別に複製）
+_NESTED_FIELDS = {
+    Explosion: (('particles', _copy_dicts),),
+    WaveManager: (('events', list),),
+    Player: (('timers', dict),),
+    Force: (('timers', dict),),
+    Enemy: (('timers', dict),),
+}
+
+# 保存しない属性（実行環境への参照や、別途保存するリスト）
+_TRANSIENT_FIELDS = {
+    Player: ('sound_manager', 'timer_wheel'),
+    Force: ('timer_wheel',),
+    TerrainManager: ('segments', 'new_turrets', 'heightmap'),
+}
+
+# Game本体のスカラー属性
+_GAME_FIELDS = ('score', 'game_over', 'force_count', 'terrain_damage_cooldown',
+                'sim_steps', 'fire_throttle_counter')
+
+
+def _encode_list(objects):
+    """
+    エンティティのリストを順序を保ったまま (クラス名, 属性辞書) の区間に変換
+
+    同じクラスが続く区間はクラス名を1回だけ持つ。属性名の文字列は
+    marshalが参照として共有するので、辞書のままでもサイズは増えない。
+
+    Returns:
+        list: [(クラス名, [属性辞書, ...]), ...]
+    """
+    runs = []
+    last_cls = None
+    for obj in objects:
+        cls = type(obj)
+        d = dict(obj.__dict__)
+        for k in _TRANSIENT_FIELDS.get(cls, ()):
+            d.pop(k, None)
+        for k, copy_field in _NESTED_FIELDS.get(cls, ()):
+            d[k] = copy_field(d[k])
+        for k in _RECT_FIELDS:
+            rect = d.get(k)
+            if rect is not None:
+                d[k] = (rect.x, rect.y, rect.width, rect.height)
+        if cls is not last_cls:
+            runs.append((cls.__name__, [d]))
+            last_cls = cls
+        else:
+            runs[-1][1].append(d)
+    return runs
+
+
+def _decode_list(runs, copy=True):
+    """
+    _encode_list() の逆変換（__init__ を通さずにオブジェクトを復元）
+
+    Args:
+        copy: 属性辞書を複製するか（同じ状態を何度も復元する場合はTrue）
+    """
+    objects = []
+    append = objects.append
+    Rect = pygame.Rect
+    for class_name, rows in runs:
+        cls = _CLASSES[class_name]
+        new = cls.__new__
+        rect_fields = [k for k in _RECT_FIELDS if k in rows[0]]
+        nested_fields = _NESTED_FIELDS.get(cls, ()) if copy else ()
+        for d in rows:
+            if copy:
+                d = d.copy()
+                for k, copy_field in nested_fields:
+                    d[k] = copy_field(d[k])
+            for k in rect_fields:
+                d[k] = Rect(d[k])
+            obj = new(cls)
+            obj.__dict__ = d
+            append(obj)
+    return objects
+
+
+def capture_state(game):
+    """
+    ゲーム状態をmarshal可能なタプルとして取り出す（直列化なし）
+
+    ロールバックのように同一プロセス内で保存・復元を繰り返す場合は、
+    serialize()を通さずにこの値をそのまま restore_state() に渡せる。
+    """
+    tm = game.terrain_manager
+    return (
+        tuple(getattr(game, name) for name in _GAME_FIELDS),
+        _encode_list(game.players),
+        _encode_list(game.forces),
+        _encode_list(game.enemies),
+        _encode_list(game.player_bullets),
+        _encode_list(game.enemy_bullets),
+        _encode_list(game.powerups),
+        _encode_list(game.explosions),
+        _encode_list([game.wave_manager]),
+        _encode_list([tm]),
+        _encode_list(tm.segments),
+        _encode_list(tm.new_turrets),
+        [dict(star) for star in game.stars],
+        random.getstate(),
+        game.timer_wheel.now,
+    )
+
+
+def restore_state(game, state, copy=True):
+    """
+    capture_state() の値からゲーム状態を復元
+
+    Args:
+        copy: stateを再利用するならTrue（Falseならstate内の辞書をそのまま使う）
+    """
+    (game_values, players, forces, enemies, player_bullets, enemy_bullets, powerups,
+     explosions, wave_manager, terrain_manager, segments, new_turrets, stars, rng, timer_now) = state
+
+    for name, value in zip(_GAME_FIELDS, game_values):
+        setattr(game, name, value)
+
+    game.players = _decode_list(players, copy)
+    for player in game.players:
+        player.sound_manager = game.sound_manager
+        player.immortal = game.immortal
+    game.player = game.players[0]
+    game.forces = _decode_list(forces, copy)
+    game.enemies = _decode_list(enemies, copy)
+    game.player_bullets = _decode_list(player_bullets, copy)
+    game.enemy_bullets = _decode_list(enemy_bullets, copy)
+    game.powerups = _decode_list(powerups, copy)
+    game.explosions = _decode_list(explosions, copy)
+    game.wave_manager = _decode_list(wave_manager, copy)[0]
+
+    tm = _decode_list(terrain_manager, copy)[0]
+    tm.segments = _decode_list(segments, copy)
+    tm.new_turrets = _decode_list(new_turrets, copy)
+    tm.heightmap = TerrainHeightmap.from_segments(tm.segments)
+    game.terrain_manager = tm
+
+    game.stars = [dict(star) for star in stars]
+    random.setstate(rng)
+
+    # タイマーはエンティティのtimers辞書から登録し直す
+    wheel = game.timer_wheel
+    for entity in game.players + game.forces:
+        entity.timer_wheel = wheel
+    wheel.rebuild(timer_now, game.players + game.forces + game.enemies)
+
+
+def serialize(state, compress=False):
+    """capture_state() の値をバージョン付きバイナリに変換"""
+    payload = marshal.dumps(state)
+    flags = 0
+    if compress:
+        payload = zlib.compress(payload)
+        flags |= SAVESTATE_FLAG_COMPRESSED
+    return _HEADER.pack(SAVESTATE_MAGIC, SAVESTATE_VERSION, flags, len(payload)) + payload
+
+
+def deserialize(data):
+    """serialize() のバイナリを capture_state() の値に戻す"""
+    magic, version, flags, length = _HEADER.unpack_from(data)
+    if magic != SAVESTATE_MAGIC:
+        raise ValueError("not a savestate")
+    if version != SAVESTATE_VERSION:
+        raise ValueError(f"unsupported savestate version {version} (expected {SAVESTATE_VERSION})")
+    payload = data[_HEADER.size:_HEADER.size + length]
+    if flags & SAVESTATE_FLAG_COMPRESSED:
+        payload = zlib.decompress(payload)
+    return marshal.loads(payload)
+
+
+def save_state(game, compress=False):
+    """ゲーム状態をバイナリで返す"""
+    return serialize(capture_state(game), compress)
+
+
+def load_state(game, data):
+    """save_state() のバイナリからゲーム状態を復元（このプレイはランキングに載せない）"""
+    # デシリアライズ直後の辞書は他から参照されないので複製不要
+    restore_state(game, deserialize(data), copy=False)
+    game.session_ranked = False
+
+
+def save_state_file(game, path):
+    """ゲーム状態をファイルに保存（圧縮あり）"""
+    with open(path, 'wb') as f:
+        f.write(save_state(game, compress=True))
+
+
+def load_state_file(game, path):
+    """ファイルからゲーム状態を復元"""
+    with open(path, 'rb') as f:
+        load_state(game, f.read())
+
+
+# === 名前付きシナリオ ===
+# 各ビルダーは決まった乱数シードから状態を組み立てる。初回の load_scenario()
+# で組み立てて保存し、2回目以降は保存済みバイナリを復元するだけになる。
+
+def _prepare(game, wave, terrain_frames):
+    """指定Waveの開始直後の状態を作る（地形は指定フレーム分スクロール済み）"""
+    random.seed(SCENARIO_SEED)
+    game.reset()
+    game.wave_manager.jump_to_wave(wave)
+    game.wave_manager.update(game.terrain_manager)
+    for _ in range(terrain_frames):
+        game.terrain_manager.update()
+    game.terrain_manager.get_new_turrets()  # 初期状態では砲台なし
+
+
+def _give_forces(game, count):
+    """Forceを付与（1つ目は中央、2つ目で上下）"""
+    forces = [FORCE_POSITION_CENTER, FORCE_POSITION_TOP, FORCE_POSITION_BOTTOM][:count]
+    for position in forces:
+        game.forces[position].activate(game.player.x, game.player.y)
+    game.force_count = count
+
+
+def _spawn_boss(game, enemy_type, y):
+    boss = Enemy(600, y, enemy_type)
+    game.add_enemies([boss])
+    return boss
+
+
+def _build_wave1_start(game):
+    _prepare(game, 1, 0)
+
+
+def _build_wave4_start(game):
+    _prepare(game, 4, TERRAIN_SPAWN_INTERVAL * 9)
+
+
+def _build_wave3_boss(game):
+    _prepare(game, 3, TERRAIN_SPAWN_INTERVAL * 9)
+    _spawn_boss(game, ENEMY_TYPE_BOSS_3, SCREEN_HEIGHT // 2)
+    game.wave_manager.register_boss()
+    _give_forces(game, 1)
+
+
+def _build_wave4_three_bosses(game):
+    _prepare(game, 4, TERRAIN_SPAWN_INTERVAL * 9)
+    for i, enemy_type in enumerate((ENEMY_TYPE_BOSS_1, ENEMY_TYPE_BOSS_2, ENEMY_TYPE_BOSS_3)):
+        _spawn_boss(game, enemy_type, SCREEN_HEIGHT // 4 * (i + 1))
+        game.wave_manager.register_boss()
+    _give_forces(game, 3)
+    game.player.add_power()
+
+
+SCENARIOS = {
+    'wave1_start': _build_wave1_start,
+    'wave3_boss': _build_wave3_boss,
+    'wave4_start': _build_wave4_start,
+    'wave4_three_bosses': _build_wave4_three_bosses,
+}
+
+_scenario_cache = {}
+
+
+def load_scenario(game, name):
+    """
+    名前付きシナリオを読み込む
+
+    Args:
+        game: Game
+        name: SCENARIOSのキー（例："wave4_three_bosses"）
+    """
+    data = _scenario_cache.get(name)
+    if data is None:
+        if name not in SCENARIOS:
+            raise KeyError(f"unknown scenario '{name}' (available: {', '.join(SCENARIOS)})")
+        SCENARIOS[name](game)
+        data = save_state(game)
+        _scenario_cache[name] = data
+    load_state(game, data)
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Savestate benchmark / scenario library")
+    parser.add_argument('--list', action='store_true', help='list named scenarios')
+    parser.add_argument('--iterations', type=int, default=1000)
+    args = parser.parse_args()
+
+    if args.list:
+        for name in SCENARIOS:
+            print(name)
+        raise SystemExit(0)
+
+    from game import Game
+    from input_provider import AutopilotInput
+
+    # 自動操縦の判断時間の打ち切りは実行速度で結果が変わるので、再現性を確かめるここでは打ち切らない
+    game = Game(input_provider=AutopilotInput(budget_ms=float('inf')), headless=True, immortal=True)
+    game.sound_manager.enabled = False
+    load_scenario(game, 'wave4_three_bosses')
+    for _ in range(1200):
+        game.update()
+
+    data = save_state(game)
+    print(f"State: {len(game.enemies)} enemies, {len(game.player_bullets)} player bullets, "
+          f"{len(game.enemy_bullets)} enemy bullets, {len(game.terrain_manager.segments)} segments")
+    print(f"Size: {len(data):,} bytes ({len(save_state(game, compress=True)):,} compressed)")
+
+    start = time.perf_counter()
+    for _ in range(args.iterations):
+        save_state(game)
+    print(f"save:    {(time.perf_counter() - start) / args.iterations * 1000:.3f} ms")
+
+    start = time.perf_counter()
+    for _ in range(args.iterations):
+        load_state(game, data)
+    print(f"restore: {(time.perf_counter() - start) / args.iterations * 1000:.3f} ms")
+
+    # 復元後に同じ入力で進めれば同じ状態になる
+    load_state(game, data)
+    for _ in range(300):
+        game.update()
+    first = save_state(game)
+    load_state(game, data)
+    for _ in range(300):
+        game.update()
+    print("deterministic replay:", "OK" if save_state(game) == first else "MISMATCH")
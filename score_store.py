@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+ハイスコアとプレイ記録の保存（SQLite、書き込みは別スレッド）
+
+1プレイ（開始からゲームオーバー・終了まで）ごとにスコア・到達Wave・プレイ時間・
+フレーム時間の統計を sessions テーブルに保存する。ゲームのスレッドは record() で
+キューに入れるだけで、接続を持つ書き込みスレッドがまとめて1トランザクションで
+書き込み、そのあとステージごとの上位N件を読み直してキャッシュする。
+ゲームオーバー画面はキャッシュ（不変のタプル）を読むだけなのでディスクを待たない。
+
+ランキングに載るのは ranked = 1 のプレイだけ（ゲームオーバーまで普通に遊んだプレイ。
+自動操縦・無敵・シナリオ読み込み・Waveの飛ばし・途中終了は記録だけ残す）。
+上位N件の問い合わせは (stage, ranked, score DESC) のインデックスだけで済む
+（数千〜数万プレイでも全件の並べ替えをしない）。
+
+Usage:
+    python score_store.py            # 書き込みと問い合わせの時間の計測
+"""
+
+import queue
+import sqlite3
+import threading
+import time
+from constants import *
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    stage TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    wave INTEGER NOT NULL,
+    started_at REAL NOT NULL,
+    duration REAL NOT NULL,
+    completed INTEGER NOT NULL,
+    players INTEGER NOT NULL,
+    sim_steps INTEGER NOT NULL,
+    frames INTEGER NOT NULL,
+    avg_frame_ms REAL NOT NULL,
+    max_frame_ms REAL NOT NULL,
+    dropped_sim_ms REAL NOT NULL,
+    ranked INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+_INDEX = """
+DROP INDEX IF EXISTS sessions_leaderboard;
+CREATE INDEX IF NOT EXISTS sessions_ranked_leaderboard ON sessions (stage, ranked, score DESC);
+"""
+
+# record() に渡す辞書のキー（列の順）
+SESSION_FIELDS = ('stage', 'score', 'wave', 'started_at', 'duration', 'completed', 'players',
+                  'sim_steps', 'frames', 'avg_frame_ms', 'max_frame_ms', 'dropped_sim_ms', 'ranked')
+
+_INSERT = f"INSERT INTO sessions ({', '.join(SESSION_FIELDS)}) VALUES ({', '.join('?' * len(SESSION_FIELDS))})"
+_TOP = ("SELECT score, wave, started_at FROM sessions WHERE stage = ? AND ranked = 1 "
+        "ORDER BY score DESC LIMIT ?")
+
+
+class ScoreStore:
+    """
+    プレイ記録のSQLiteへの非同期書き込みと、ステージごとの上位N件のキャッシュ
+
+    Game.score_store に設定すると、ゲームオーバー（または終了）時に record() され、
+    draw_game_over() が top_scores を表示し、Game.shutdown() で close() される。
+    """
+
+    def __init__(self, path=SCORE_DB_PATH, stage=DEFAULT_STAGE, top_n=SCORE_TOP_N,
+                 batch_size=SCORE_BATCH_SIZE, flush_interval=SCORE_FLUSH_INTERVAL):
+        """
+        Args:
+            path: SQLiteのファイル（':memory:' も可）
+            stage: 上位N件をキャッシュするステージ
+            top_n: キャッシュする件数
+            batch_size: 1トランザクションでまとめて書き込む最大件数
+            flush_interval: 記録を待ってまとめる時間（秒）
+        """
+        self.path = path
+        self.stage = stage
+        self.top_n = top_n
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.SimpleQueue()
+
+        # 書き込みスレッドだけが更新する（読み手はタプルを丸ごと読む）
+        self.top_scores = ()   # ((score, wave, started_at), ...)
+        self.written = 0
+        self.batches = 0
+        self.write_ms = 0.0
+        self.error = None
+
+        self.ready = threading.Event()
+        self.writer = threading.Thread(target=self._write_loop, name="score-store", daemon=True)
+        self.writer.start()
+
+    def record(self, session):
+        """
+        1プレイの記録を書き込み待ちに入れる（ゲームのスレッドから呼ぶ、ブロックしない）
+
+        Args:
+            session: SESSION_FIELDS をキーに持つ辞書
+        """
+        self.queue.put(tuple(session[name] for name in SESSION_FIELDS))
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path)
+        # WAL：書き込み中も読み手を止めず、コミットごとのfsyncを減らす
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.executescript(_SCHEMA)
+        columns = {row[1] for row in connection.execute("PRAGMA table_info(sessions)")}
+        if 'ranked' not in columns:
+            # 以前の形式のファイル：自動操縦などのプレイと区別できないので、既存の記録はランキングに載せない
+            connection.execute("ALTER TABLE sessions ADD COLUMN ranked INTEGER NOT NULL DEFAULT 0")
+        connection.executescript(_INDEX)
+        return connection
+
+    def _write_loop(self):
+        """書き込みスレッド：記録をまとめて書き込み、上位N件を読み直す"""
+        try:
+            connection = self._connect()
+            self._refresh(connection)
+        except sqlite3.Error as e:
+            self.error = e
+            self.ready.set()
+            print(f"Warning: score store disabled: {e}")
+            return
+        self.ready.set()
+
+        closing = False
+        while not closing:
+            row = self.queue.get()
+            if row is None:
+                break
+            rows = [row]
+            deadline = time.perf_counter() + self.flush_interval
+            while len(rows) < self.batch_size:
+                try:
+                    row = self.queue.get(timeout=max(0.0, deadline - time.perf_counter()))
+                except queue.Empty:
+                    break
+                if row is None:
+                    closing = True
+                    break
+                rows.append(row)
+
+            start = time.perf_counter()
+            try:
+                with connection:
+                    connection.executemany(_INSERT, rows)
+                self._refresh(connection)
+            except sqlite3.Error as e:
+                print(f"Warning: {len(rows)} score records not saved: {e}")
+                continue
+            self.write_ms += (time.perf_counter() - start) * 1000
+            self.written += len(rows)
+            self.batches += 1
+        connection.close()
+
+    def _refresh(self, connection):
+        self.top_scores = tuple(connection.execute(_TOP, (self.stage, self.top_n)).fetchall())
+
+    def close(self):
+        """残りの記録を書き込んでから接続を閉じる"""
+        self.queue.put(None)
+        self.writer.join()
+
+
+if __name__ == "__main__":
+    # 数千プレイ分の記録の書き込みと、上位N件の問い合わせ（インデックスあり・なし）の時間
+    import argparse
+    import os
+    import random
+    import tempfile
+
+    parser = argparse.ArgumentParser(description="Score store benchmark")
+    parser.add_argument('--sessions', type=int, default=20000)
+    args = parser.parse_args()
+
+    random.seed(0)
+    stages = ('default', 'endless', 'boss_rush')
+
+    def session():
+        score = int(random.paretovariate(1.5) * 1000)
+        return {'stage': random.choice(stages), 'score': score, 'wave': min(1 + score // 3000, 9),
+                'started_at': time.time(), 'duration': random.uniform(30, 900), 'completed': 1,
+                'players': 1, 'sim_steps': random.randint(1000, 50000), 'frames': 1000,
+                'avg_frame_ms': random.uniform(1, 4), 'max_frame_ms': random.uniform(4, 30),
+                'dropped_sim_ms': 0.0, 'ranked': int(random.random() < 0.8)}
+
+    directory = tempfile.mkdtemp(prefix="scores_")
+    path = os.path.join(directory, 'scores.db')
+    store = ScoreStore(path, stage='default')
+    store.ready.wait()
+
+    records = [session() for _ in range(args.sessions)]
+    start = time.perf_counter()
+    for record in records:
+        store.record(record)
+    record_us = (time.perf_counter() - start) / len(records) * 1e6
+    store.close()
+
+    print(f"{args.sessions} sessions")
+    print(f"  record() on the game thread: {record_us:.2f} us per session")
+    print(f"  writer: {store.batches} transactions, {store.write_ms / store.batches:.2f} ms per batch "
+          f"of up to {store.batch_size} (incl. top-{store.top_n} refresh)")
+
+    connection = sqlite3.connect(path)
+    repeats = 200
+    for label, query in (("top-N (index)", _TOP),
+                         ("top-N (no index)", _TOP.replace("FROM sessions", "FROM sessions NOT INDEXED"))):
+        plan = connection.execute(f"EXPLAIN QUERY PLAN {query}", ('default', SCORE_TOP_N)).fetchall()
+        start = time.perf_counter()
+        for _ in range(repeats):
+            connection.execute(query, ('default', SCORE_TOP_N)).fetchall()
+        elapsed = (time.perf_counter() - start) / repeats * 1000
+        print(f"  {label:<17} {elapsed:.3f} ms   plan: {plan[-1][-1]}")
+    connection.close()
+
+    print(f"  cached top {SCORE_TOP_N}: {[score for score, _, _ in store.top_scores]}")
+    os.remove(path)
+    for suffix in ('-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    os.rmdir(directory)
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Wave 4 ソークテスト / リーク検出
+
+ヘッドレスのゲームを自動操縦ボットで指定時間（シミュレーション時間）回し、
+一定間隔でエンティティ数・tracemallocの確保量・RSSを記録する。
+各系列に最小二乗法の傾き検定をかけ、単調増加しているものを報告する。
+
+Usage:
+    python soak_test.py --hours 2
+    python soak_test.py --hours 0.5 --no-draw --json soak.json
+"""
+
+import argparse
+import json
+import math
+import os
+import time
+import tracemalloc
+from constants import *
+
+
+def read_rss_bytes():
+    """現在のRSS（バイト）を返す。取得できない環境ではピーク値で代用"""
+    try:
+        with open('/proc/self/statm') as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linuxはキロバイト、macOSはバイト
+        return peak if peak > 1 << 32 else peak * 1024
+    except ImportError:
+        return 0
+
+
+def slope_test(times, values):
+    """
+    最小二乗法で傾きとそのt値を求める
+
+    Returns:
+        tuple: (傾き[単位/時間], t値)
+    """
+    n = len(times)
+    if n < 3:
+        return 0.0, 0.0
+    mean_t = sum(times) / n
+    mean_v = sum(values) / n
+    sxx = sum((t - mean_t) ** 2 for t in times)
+    if sxx == 0:
+        return 0.0, 0.0
+    sxy = sum((t - mean_t) * (v - mean_v) for t, v in zip(times, values))
+    slope = sxy / sxx
+    intercept = mean_v - slope * mean_t
+    residual = sum((v - (intercept + slope * t)) ** 2 for t, v in zip(times, values))
+    if residual == 0:
+        return slope, math.inf if slope != 0 else 0.0
+    stderr = math.sqrt(residual / (n - 2) / sxx)
+    return slope, slope / stderr
+
+
+class SoakHarness:
+    """ヘッドレスゲームを長時間回してリソース推移を記録する"""
+
+    def __init__(self, hours=1.0, sample_seconds=SOAK_SAMPLE_SECONDS,
+                 draw=True, trace=True, top_allocators=10):
+        self.hours = hours
+        self.sample_interval = max(1, int(sample_seconds * FPS))
+        self.draw = draw
+        self.trace = trace
+        self.top_allocators = top_allocators
+        self.samples = []
+
+    def _sample(self, game, frame):
+        """現在のエンティティ数とメモリ使用量を記録"""
+        enemies = game.enemies
+        bosses_alive = sum(1 for e in enemies if getattr(e, 'is_boss', False))
+        sample = {
+            'hours': frame / FPS / 3600.0,
+            'enemies': len(enemies),
+            'bosses_alive': bosses_alive,
+            'turrets': sum(1 for e in enemies if e.enemy_type == ENEMY_TYPE_TURRET),
+            'player_bullets': len(game.player_bullets),
+            'enemy_bullets': len(game.enemy_bullets),
+            'powerups': len(game.powerups),
+            'explosions': len(game.explosions),
+            'terrain_segments': len(game.terrain_manager.segments),
+            'pending_turrets': len(game.terrain_manager.new_turrets),
+            # 生存ボス数との差（撃破以外で消えたボスはカウントが戻らない）
+            'boss_count_drift': game.wave_manager.active_boss_count - bosses_alive,
+            'rss_bytes': read_rss_bytes(),
+        }
+        if self.trace:
+            # ハーネス自身（サンプル列など）の確保分は除外する
+            snapshot = self._take_snapshot()
+            sample['traced_bytes'] = sum(stat.size for stat in snapshot.statistics('filename'))
+        self.samples.append(sample)
+
+    def _take_snapshot(self):
+        """ハーネスとtracemalloc自身を除いたスナップショット"""
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, tracemalloc.__file__),
+        ))
+
+    def run(self):
+        """ソークテストを実行してレポートを返す"""
+        from game import Game
+        from input_provider import AutopilotInput
+
+        total_frames = int(self.hours * 3600 * FPS)
+        warmup_frames = int(total_frames * SOAK_WARMUP_FRACTION)
+
+        game = Game(input_provider=AutopilotInput(), headless=True, immortal=True)
+        game.sound_manager.enabled = False
+        game.skip_to_wave(4)
+
+        if self.trace:
+            tracemalloc.start(SOAK_TRACEMALLOC_FRAMES)
+        baseline_snapshot = None
+
+        start = time.perf_counter()
+        for frame in range(1, total_frames + 1):
+            game.update()
+            if self.draw:
+                game.draw()
+
+            if frame == warmup_frames and self.trace:
+                baseline_snapshot = self._take_snapshot()
+
+            if frame % self.sample_interval == 0:
+                self._sample(game, frame)
+
+            if frame % (FPS * 600) == 0:
+                elapsed = time.perf_counter() - start
+                print(f"  {frame / FPS / 3600:.2f}h simulated ({elapsed:.0f}s wall)")
+
+        report = {
+            'hours': self.hours,
+            'frames': total_frames,
+            'wall_seconds': time.perf_counter() - start,
+            'samples': len(self.samples),
+            'series': self._analyze(warmup_frames / FPS / 3600.0),
+            'top_allocators': [],
+        }
+
+        if self.trace:
+            final_snapshot = self._take_snapshot()
+            if baseline_snapshot is None:
+                baseline_snapshot = final_snapshot
+            stats = final_snapshot.compare_to(baseline_snapshot, 'lineno')
+            for stat in stats[:self.top_allocators]:
+                frame_info = stat.traceback[0]
+                report['top_allocators'].append({
+                    'location': f"{frame_info.filename}:{frame_info.lineno}",
+                    'size_bytes': stat.size,
+                    'size_diff_bytes': stat.size_diff,
+                    'count': stat.count,
+                })
+            tracemalloc.stop()
+
+        return report
+
+    def _analyze(self, warmup_hours):
+        """各系列の傾き検定（ウォームアップ後のサンプルのみ）"""
+        samples = [s for s in self.samples if s['hours'] >= warmup_hours]
+        if not samples:
+            return {}
+        times = [s['hours'] for s in samples]
+        duration = max(times[-1] - times[0], 1e-9)
+
+        results = {}
+        for key in samples[0]:
+            if key == 'hours':
+                continue
+            values = [s[key] for s in samples]
+            slope, t_value = slope_test(times, values)
+            mean = sum(values) / len(values)
+            growth = slope * duration
+            # 有意に増加し、かつ期間中の増加量が平均の一定割合を超えたら成長と判定
+            growing = (t_value > SOAK_SLOPE_T_THRESHOLD and
+                       growth > max(SOAK_MIN_GROWTH, abs(mean) * SOAK_RELATIVE_GROWTH))
+            results[key] = {
+                'first': values[0],
+                'last': values[-1],
+                'max': max(values),
+                'mean': mean,
+                'slope_per_hour': slope,
+                't_value': t_value,
+                'growing': growing,
+            }
+        return results
+
+
+def print_report(report):
+    """レポートを標準出力に表示"""
+    print("=" * 60)
+    print(f"SOAK REPORT: {report['hours']}h simulated, {report['frames']} frames, "
+          f"{report['wall_seconds']:.0f}s wall, {report['samples']} samples")
+    print("=" * 60)
+    print(f"{'series':<18}{'first':>12}{'last':>12}{'max':>12}{'slope/h':>14}{'t':>8}")
+    for key, r in report['series'].items():
+        flag = "  <-- GROWING" if r['growing'] else ""
+        print(f"{key:<18}{r['first']:>12.0f}{r['last']:>12.0f}{r['max']:>12.0f}"
+              f"{r['slope_per_hour']:>14.1f}{r['t_value']:>8.1f}{flag}")
+
+    if report['top_allocators']:
+        print("\nTop allocators since warm-up:")
+        for a in report['top_allocators']:
+            print(f"  {a['size_diff_bytes']:+12,d} B  {a['size_bytes']:>12,d} B  "
+                  f"{a['count']:>8d} blocks  {a['location']}")
+
+    growing = [k for k, r in report['series'].items() if r['growing']]
+    print()
+    if growing:
+        print(f"UNBOUNDED GROWTH SUSPECTED: {', '.join(growing)}")
+    else:
+        print("No unbounded growth detected.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Wave 4 soak test / leak detector")
+    parser.add_argument('--hours', type=float, default=1.0,
+                        help='simulated hours to run')
+    parser.add_argument('--sample-seconds', type=float, default=SOAK_SAMPLE_SECONDS,
+                        help='simulated seconds between samples')
+    parser.add_argument('--no-draw', action='store_true',
+                        help='skip draw() (update only)')
+    parser.add_argument('--no-tracemalloc', action='store_true',
+                        help='disable tracemalloc (faster, no allocator report)')
+    parser.add_argument('--json', default=None,
+                        help='write the full report and samples as JSON')
+    args = parser.parse_args()
+
+    harness = SoakHarness(hours=args.hours, sample_seconds=args.sample_seconds,
+                          draw=not args.no_draw, trace=not args.no_tracemalloc)
+    report = harness.run()
+    print_report(report)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(dict(report, raw_samples=harness.samples), f, indent=2)
+
+    growing = [k for k, r in report['series'].items() if r['growing']]
+    return 1 if growing else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
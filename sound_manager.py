@@ -1,34 +1,76 @@
+import threading
+import time
 import pygame
-import numpy as np
 from constants import *
 
 class SoundManager:
     """Manages all game sound effects with procedural generation"""
 
-    def __init__(self):
+    def __init__(self, background=True):
+        """
+        Args:
+            background: Trueならミキサー初期化と効果音の合成を別スレッドで行う
+                        （起動を待たせない。合成が終わるまでの効果音は鳴らない）
+        """
+        self.enabled = SOUND_ENABLED
+        self.volume = SOUND_VOLUME_MASTER
+        self.muted = False
+        self.sounds = {}
+        self.charge_channel = None
+        self.played = 0  # 再生した効果音の累計（metrics.py）
+
+        # 起動時間の計測（main.py --startup-profile）
+        self.mixer_init_ms = 0.0
+        self.synthesis_ms = 0.0
+        self.ready = threading.Event()
+
+        if not self.enabled:
+            # サウンド無効ならミキサーもNumPyも読み込まない
+            self.ready.set()
+        elif background:
+            threading.Thread(target=self._initialize, name="sound-init", daemon=True).start()
+        else:
+            self._initialize()
+
+    def _initialize(self):
+        """ミキサー初期化と全効果音の合成"""
         try:
+            start = time.perf_counter()
             # Initialize pygame mixer
             pygame.mixer.init(frequency=SOUND_SAMPLE_RATE, size=-16, channels=2, buffer=512)
             pygame.mixer.set_num_channels(16)  # Allow multiple sounds simultaneously
 
-            self.enabled = SOUND_ENABLED
-            self.volume = SOUND_VOLUME_MASTER
-            self.muted = False
-
             # Reserved channel for charge loop
             self.charge_channel = pygame.mixer.Channel(0)
+            self.mixer_init_ms = (time.perf_counter() - start) * 1000
 
             # Pre-generate all sound effects
-            self.sounds = {}
+            start = time.perf_counter()
             self._generate_all_sounds()
+            self.synthesis_ms = (time.perf_counter() - start) * 1000
 
             print("Sound system initialized successfully")
         except Exception as e:
             print(f"Warning: Sound system initialization failed: {e}")
             self.enabled = False
+        finally:
+            self.ready.set()
+
+    def wait_ready(self, timeout=None):
+        """初期化の完了を待つ（完了していればTrue）"""
+        return self.ready.wait(timeout)
+
+    def _play(self, name):
+        """効果音を再生（合成前・無効・ミュート時は何もしない）"""
+        if self.enabled and not self.muted:
+            sound = self.sounds.get(name)
+            if sound is not None:
+                sound.play()
+                self.played += 1
 
     def _generate_sine_wave(self, frequency, duration, volume=0.5):
         """Generate a sine wave"""
+        import numpy as np  # 合成時のみ読み込む
         samples = int(SOUND_SAMPLE_RATE * duration)
         wave = np.sin(2 * np.pi * frequency * np.arange(samples) / SOUND_SAMPLE_RATE)
         wave = (wave * volume * 32767).astype(np.int16)
@@ -38,6 +80,7 @@ class SoundManager:
 
     def _generate_sweep(self, start_freq, end_freq, duration, volume=0.5):
         """Generate a frequency sweep (rising or falling pitch)"""
+        import numpy as np
         samples = int(SOUND_SAMPLE_RATE * duration)
         freq_range = np.linspace(start_freq, end_freq, samples)
         phase = 2 * np.pi * np.cumsum(freq_range) / SOUND_SAMPLE_RATE
@@ -48,6 +91,7 @@ class SoundManager:
 
     def _generate_noise(self, duration, volume=0.5, decay_time=0.1):
         """Generate noise with exponential decay (explosion-like)"""
+        import numpy as np
         samples = int(SOUND_SAMPLE_RATE * duration)
         noise = np.random.uniform(-1, 1, samples)
         envelope = np.exp(-np.arange(samples) / (SOUND_SAMPLE_RATE * decay_time))
@@ -58,6 +102,7 @@ class SoundManager:
 
     def _generate_square_wave(self, frequency, duration, volume=0.3):
         """Generate a square wave (8-bit style)"""
+        import numpy as np
         samples = int(SOUND_SAMPLE_RATE * duration)
         wave = np.sign(np.sin(2 * np.pi * frequency * np.arange(samples) / SOUND_SAMPLE_RATE))
         wave = (wave * volume * 32767).astype(np.int16)
@@ -66,6 +111,7 @@ class SoundManager:
 
     def _generate_all_sounds(self):
         """Pre-generate all sound effects"""
+        import numpy as np
         # Player shoot
         self.sounds['player_shoot'] = self._generate_sine_wave(600, 0.05, 0.4)
 
@@ -115,13 +161,11 @@ class SoundManager:
 
     def play_player_shoot(self):
         """Play player normal shot sound"""
-        if self.enabled and not self.muted:
-            self.sounds['player_shoot'].play()
+        self._play('player_shoot')
 
     def play_charge_start(self):
         """Play charge start sound"""
-        if self.enabled and not self.muted:
-            self.sounds['charge_start'].play()
+        self._play('charge_start')
 
     def play_charge_loop(self, level):
         """Play continuous charge sound (level 1-3)"""
@@ -132,12 +176,15 @@ class SoundManager:
         sound_key = f'charge_loop_{level}'
 
         # Only play if not already playing
-        if not self.charge_channel.get_busy():
-            self.charge_channel.play(self.sounds[sound_key], loops=-1)  # Loop forever
+        sound = self.sounds.get(sound_key)
+        if sound is not None and not self.charge_channel.get_busy():
+            self.charge_channel.play(sound, loops=-1)  # Loop forever
+            self.played += 1
 
     def stop_charge_loop(self):
         """Stop the charge loop sound"""
-        self.charge_channel.stop()
+        if self.charge_channel is not None:
+            self.charge_channel.stop()
 
     def play_charge_release(self, level):
         """Play charge shot release sound (level 1-3)"""
@@ -145,48 +192,39 @@ class SoundManager:
             return
 
         level = max(1, min(3, level))  # Clamp to 1-3
-        sound_key = f'charge_release_{level}'
-        self.sounds[sound_key].play()
+        self._play(f'charge_release_{level}')
 
     def play_force_toggle(self):
         """Play Force toggle sound"""
-        if self.enabled and not self.muted:
-            self.sounds['force_toggle'].play()
+        self._play('force_toggle')
 
     def play_force_absorb(self):
         """Play Force bullet absorption sound"""
-        if self.enabled and not self.muted:
-            self.sounds['force_absorb'].play()
+        self._play('force_absorb')
 
     def play_explosion(self, size='normal'):
         """Play explosion sound"""
-        if self.enabled and not self.muted:
-            self.sounds['explosion'].play()
+        self._play('explosion')
 
     def play_enemy_shoot(self):
         """Play enemy shoot sound"""
-        if self.enabled and not self.muted:
-            self.sounds['enemy_shoot'].play()
+        self._play('enemy_shoot')
 
     def play_powerup(self):
         """Play powerup collection sound"""
-        if self.enabled and not self.muted:
-            self.sounds['powerup'].play()
+        self._play('powerup')
 
     def play_player_hit(self):
         """Play player hit sound"""
-        if self.enabled and not self.muted:
-            self.sounds['player_hit'].play()
+        self._play('player_hit')
 
     def play_game_over(self):
         """Play game over sound"""
-        if self.enabled and not self.muted:
-            self.sounds['game_over'].play()
+        self._play('game_over')
 
     def play_wave_change(self):
         """Play wave change sound"""
-        if self.enabled and not self.muted:
-            self.sounds['wave_change'].play()
+        self._play('wave_change')
 
     def set_volume(self, volume):
         """Set master volume (0.0 to 1.0)"""
@@ -205,7 +243,7 @@ if __name__ == "__main__":
     import time
 
     print("Testing SoundManager...")
-    sm = SoundManager()
+    sm = SoundManager(background=False)
 
     print("Player shoot...")
     sm.play_player_shoot()
@@ -0,0 +1,435 @@
+import heapq
+import math
+from constants import *
+
+
+def _item_rect(item):
+    rect = item.rect
+    return rect.x, rect.y, rect.width, rect.height
+
+
+class SpatialGrid:
+    """
+    一様グリッドによる空間インデックス
+
+    毎フレーム clear() → insert() で作り直して使う。
+    矩形クエリは重なるセルのみを走査するので、エンティティ総数ではなく
+    クエリ範囲内の密度に比例したコストで済む。
+    """
+
+    def __init__(self, cell_size=SPATIAL_GRID_CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.count = 0
+
+    def clear(self):
+        """全エントリを削除"""
+        self.cells.clear()
+        self.count = 0
+
+    def _cell_range(self, x, y, width, height):
+        cs = self.cell_size
+        return (int(x // cs), int(y // cs),
+                int((x + max(width, 1) - 1) // cs), int((y + max(height, 1) - 1) // cs))
+
+    def insert(self, item, x, y, width, height):
+        """
+        アイテムを矩形範囲のセルに登録
+
+        Args:
+            item: 登録するオブジェクト
+            x, y, width, height: アイテムの外接矩形
+        """
+        cx0, cy0, cx1, cy1 = self._cell_range(x, y, width, height)
+        cells = self.cells
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                bucket = cells.get((cx, cy))
+                if bucket is None:
+                    cells[(cx, cy)] = [item]
+                else:
+                    bucket.append(item)
+        self.count += 1
+
+    def insert_rect(self, item, rect):
+        """pygame.Rectでアイテムを登録"""
+        self.insert(item, rect.x, rect.y, rect.width, rect.height)
+
+    def query(self, x, y, width, height):
+        """
+        矩形範囲と重なるセルのアイテムを重複なしで返す
+
+        Returns:
+            list: 候補アイテム（厳密な判定は呼び出し側で行う）
+        """
+        cx0, cy0, cx1, cy1 = self._cell_range(x, y, width, height)
+        cells = self.cells
+        result = []
+        seen = set()
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                bucket = cells.get((cx, cy))
+                if bucket is None:
+                    continue
+                for item in bucket:
+                    key = id(item)
+                    if key not in seen:
+                        seen.add(key)
+                        result.append(item)
+        return result
+
+    def query_rect(self, rect):
+        """pygame.Rectで矩形クエリ"""
+        return self.query(rect.x, rect.y, rect.width, rect.height)
+
+    def raycast(self, x, y, dx, dy, max_distance, rect_of=_item_rect):
+        """
+        レイと交わるアイテムを近い順に返す（ジェネレータ）
+
+        DDAでレイが通るセルだけを順に辿り、セル内のアイテムとレイの交差距離を
+        求める。複数セルにまたがるアイテムは最初のセルで一度だけ判定し、
+        今のセルを出る距離より手前の交差から順に返すので、順序は厳密で、
+        コストはアイテム総数ではなくレイが通るセル数とその密度で決まる。
+        途中で止めれば（貫通数に達したなど）それ以降のセルは調べない。
+
+        Args:
+            x, y: レイの始点
+            dx, dy: レイの向き（正規化不要）
+            max_distance: レイの長さ
+            rect_of: アイテムの矩形 (x, y, width, height) を返す関数
+
+        Yields:
+            tuple: (始点から交差点までの距離, item)
+        """
+        length = math.hypot(dx, dy)
+        if length == 0:
+            return
+        dx /= length
+        dy /= length
+        inv_x = 1.0 / dx if dx else None
+        inv_y = 1.0 / dy if dy else None
+
+        cs = self.cell_size
+        cx, cy = int(x // cs), int(y // cs)
+        inf = float('inf')
+        if dx > 0:
+            step_x, next_x, delta_x = 1, ((cx + 1) * cs - x) * inv_x, cs * inv_x
+        elif dx < 0:
+            step_x, next_x, delta_x = -1, (cx * cs - x) * inv_x, -cs * inv_x
+        else:
+            step_x, next_x, delta_x = 0, inf, inf
+        if dy > 0:
+            step_y, next_y, delta_y = 1, ((cy + 1) * cs - y) * inv_y, cs * inv_y
+        elif dy < 0:
+            step_y, next_y, delta_y = -1, (cy * cs - y) * inv_y, -cs * inv_y
+        else:
+            step_y, next_y, delta_y = 0, inf, inf
+
+        cells = self.cells
+        seen = set()
+        pending = []  # (交差距離, 通し番号, item) のヒープ
+        seq = 0
+        entry = 0.0
+        while entry <= max_distance:
+            exit_distance = min(next_x, next_y, max_distance)
+            bucket = cells.get((cx, cy))
+            if bucket is not None:
+                for item in bucket:
+                    key = id(item)
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    # スラブ法：x・yそれぞれの区間に入っている距離の共通部分
+                    rx, ry, rw, rh = rect_of(item)
+                    if inv_x is not None:
+                        t0 = (rx - x) * inv_x
+                        t1 = (rx + rw - x) * inv_x
+                        near, far = (t0, t1) if t0 < t1 else (t1, t0)
+                    elif rx <= x < rx + rw:
+                        near, far = -inf, inf
+                    else:
+                        continue
+                    if inv_y is not None:
+                        t0 = (ry - y) * inv_y
+                        t1 = (ry + rh - y) * inv_y
+                        if t0 > t1:
+                            t0, t1 = t1, t0
+                        near = max(near, t0)
+                        far = min(far, t1)
+                    elif not ry <= y < ry + rh:
+                        continue
+                    near = max(near, 0.0)
+                    if near < far and near <= max_distance:
+                        heapq.heappush(pending, (near, seq, item))
+                        seq += 1
+
+            # このセルを出るまでに交わるものは確定（後のセルのアイテムはもっと遠い）
+            while pending and pending[0][0] <= exit_distance:
+                distance, _, item = heapq.heappop(pending)
+                yield distance, item
+
+            if next_x < next_y:
+                entry = next_x
+                next_x += delta_x
+                cx += step_x
+            else:
+                entry = next_y
+                next_y += delta_y
+                cy += step_y
+            if entry == inf:
+                break
+
+        while pending:
+            distance, _, item = heapq.heappop(pending)
+            yield distance, item
+
+
+class PointGrid:
+    """
+    点の一様グリッド（最近傍・k近傍クエリ用）
+
+    各アイテムを1点として1セルに登録する。クエリ点のセルから外側へ
+    リング状にセルを調べ、残りのリングに今の候補より近い点があり得なく
+    なった時点で打ち切るので、全アイテムを走査せずに済む。
+    アイテムが少ないとリング探索のほうが遅いので、scan_max個以下なら
+    全点を直接調べる。毎フレーム clear() → insert() で作り直して使う。
+    """
+
+    def __init__(self, cell_size=SPATIAL_GRID_CELL_SIZE, scan_max=POINT_GRID_SCAN_MAX):
+        self.cell_size = cell_size
+        self.scan_max = scan_max
+        self.cells = {}
+        self.points = []
+        self.count = 0
+        self.bounds = None  # 登録済みセルの範囲 (cx0, cy0, cx1, cy1)
+
+    def clear(self):
+        """全エントリを削除"""
+        self.cells.clear()
+        self.points = []
+        self.count = 0
+        self.bounds = None
+
+    def insert(self, item, x, y):
+        """アイテムを点(x, y)として登録"""
+        cs = self.cell_size
+        cx, cy = int(x // cs), int(y // cs)
+        bucket = self.cells.get((cx, cy))
+        if bucket is None:
+            self.cells[(cx, cy)] = [(x, y, item)]
+        else:
+            bucket.append((x, y, item))
+        self.points.append((x, y, item))
+        self.count += 1
+
+        b = self.bounds
+        if b is None:
+            self.bounds = (cx, cy, cx, cy)
+        elif not (b[0] <= cx <= b[2] and b[1] <= cy <= b[3]):
+            self.bounds = (min(b[0], cx), min(b[1], cy), max(b[2], cx), max(b[3], cy))
+
+    def _ring_cells(self, qx, qy, r):
+        """クエリセルからチェビシェフ距離rのセル（登録範囲内のみ）"""
+        if r == 0:
+            return [(qx, qy)]
+        bx0, by0, bx1, by1 = self.bounds
+        cells = []
+        x0, x1 = max(qx - r, bx0), min(qx + r, bx1)
+        for cy in (qy - r, qy + r):
+            if by0 <= cy <= by1:
+                cells.extend((cx, cy) for cx in range(x0, x1 + 1))
+        y0, y1 = max(qy - r + 1, by0), min(qy + r - 1, by1)
+        for cx in (qx - r, qx + r):
+            if bx0 <= cx <= bx1:
+                cells.extend((cx, cy) for cy in range(y0, y1 + 1))
+        return cells
+
+    def k_nearest(self, x, y, k, max_distance=None):
+        """
+        (x, y) に近い順にk個のアイテムを返す
+
+        Args:
+            max_distance: これより遠いアイテムは返さない
+
+        Returns:
+            list: [(item, x, y), ...]（近い順）
+        """
+        if not self.count or k <= 0:
+            return []
+        limit = max_distance * max_distance if max_distance is not None else float('inf')
+        if self.count <= self.scan_max:
+            scored = []
+            for px, py, item in self.points:
+                dx = px - x
+                dy = py - y
+                d2 = dx * dx + dy * dy
+                if d2 <= limit:
+                    scored.append((d2, len(scored), px, py, item))
+            return [(item, px, py) for _, _, px, py, item in heapq.nsmallest(k, scored)]
+
+        cs = self.cell_size
+        qx, qy = int(x // cs), int(y // cs)
+        fx, fy = x - qx * cs, y - qy * cs
+        edge = min(fx, cs - fx, fy, cs - fy)
+        bx0, by0, bx1, by1 = self.bounds
+        max_ring = max(qx - bx0, bx1 - qx, qy - by0, by1 - qy)
+
+        # 候補k個の最大ヒープ（距離の符号を反転して保持）
+        best = []
+        seq = 0
+        cells = self.cells
+        for r in range(max_ring + 1):
+            if r > 0:
+                # リングr上の点は少なくとも (r-1)*セル幅 + セル端までの距離 だけ離れている
+                lower = (r - 1) * cs + edge
+                lower *= lower
+                if lower > limit or (len(best) == k and lower > -best[0][0]):
+                    break
+            for cell in self._ring_cells(qx, qy, r):
+                bucket = cells.get(cell)
+                if bucket is None:
+                    continue
+                for px, py, item in bucket:
+                    dx = px - x
+                    dy = py - y
+                    d2 = dx * dx + dy * dy
+                    if d2 > limit:
+                        continue
+                    if len(best) < k:
+                        heapq.heappush(best, (-d2, seq, px, py, item))
+                        seq += 1
+                    elif d2 < -best[0][0]:
+                        heapq.heapreplace(best, (-d2, seq, px, py, item))
+                        seq += 1
+        best.sort(key=lambda e: (-e[0], e[1]))
+        return [(item, px, py) for _, _, px, py, item in best]
+
+    def nearest(self, x, y, max_distance=None):
+        """
+        (x, y) に最も近いアイテム
+
+        Returns:
+            tuple or None: (item, x, y)
+        """
+        result = self.k_nearest(x, y, 1, max_distance)
+        return result[0] if result else None
+
+
+if __name__ == "__main__":
+    # ホーミング弾の目標選択を想定：敵N体のインデックスを毎フレーム作り直し、
+    # 弾M発がそれぞれ最近傍・3近傍を引く。全敵を走査する場合と比較する
+    import random
+    import time
+
+    random.seed(0)
+    missiles = 48
+    frames = 200
+    print(f"{'enemies':>8}{'build':>10}{'nearest':>10}{'3-nearest':>11}{'scan':>10}  "
+          f"(us per frame, {missiles} missiles)")
+    for enemy_count in (10, 30, 50, 100, 200, 1000):
+        enemies = [(random.uniform(0, SCREEN_WIDTH), random.uniform(0, SCREEN_HEIGHT))
+                   for _ in range(enemy_count)]
+        shots = [(random.uniform(0, SCREEN_WIDTH), random.uniform(0, SCREEN_HEIGHT))
+                 for _ in range(missiles)]
+        grid = PointGrid()
+
+        start = time.perf_counter()
+        for _ in range(frames):
+            grid.clear()
+            for i, (ex, ey) in enumerate(enemies):
+                grid.insert(i, ex, ey)
+        build = (time.perf_counter() - start) / frames * 1e6
+
+        start = time.perf_counter()
+        for _ in range(frames):
+            for sx, sy in shots:
+                grid.nearest(sx, sy)
+        nearest = (time.perf_counter() - start) / frames * 1e6
+
+        start = time.perf_counter()
+        for _ in range(frames):
+            for sx, sy in shots:
+                grid.k_nearest(sx, sy, 3)
+        k_nearest = (time.perf_counter() - start) / frames * 1e6
+
+        start = time.perf_counter()
+        for _ in range(frames):
+            for sx, sy in shots:
+                min(range(enemy_count),
+                    key=lambda i: (enemies[i][0] - sx) ** 2 + (enemies[i][1] - sy) ** 2)
+        scan = (time.perf_counter() - start) / frames * 1e6
+
+        # 全走査と結果が一致するか
+        for sx, sy in shots:
+            expected = min(range(enemy_count),
+                           key=lambda i: (enemies[i][0] - sx) ** 2 + (enemies[i][1] - sy) ** 2)
+            found = grid.nearest(sx, sy)[0]
+            assert enemies[found] == enemies[expected], "nearest mismatch"
+
+        print(f"{enemy_count:>8}{build:>10.1f}{nearest:>10.1f}{k_nearest:>11.1f}{scan:>10.1f}")
+    print(f"(cells are searched above {POINT_GRID_SCAN_MAX} enemies, direct scan below)")
+
+    # ビーム：レイの当たり順を全走査と比較し、1本あたりのコストが敵数に依存しないことを確認
+    def brute_force(rects, x, y, dx, dy, max_distance):
+        hits = []
+        for i, (rx, ry, rw, rh) in enumerate(rects):
+            near, far = 0.0, max_distance
+            for origin, direction, lo, hi in ((x, dx, rx, rx + rw), (y, dy, ry, ry + rh)):
+                if direction == 0:
+                    if not lo <= origin < hi:
+                        near, far = 1, 0
+                    continue
+                t0, t1 = sorted(((lo - origin) / direction, (hi - origin) / direction))
+                near, far = max(near, t0), min(far, t1)
+            if near < far:
+                hits.append((near, i))
+        return [i for _, i in sorted(hits)]
+
+    beams = 3
+    print(f"\n{'enemies':>8}{'build':>10}{'raycast':>10}{'scan':>10}  (us per frame, {beams} beams)")
+    for enemy_count in (10, 50, 200, 1000):
+        rects = [(random.randint(0, SCREEN_WIDTH), random.randint(0, SCREEN_HEIGHT),
+                  random.randint(20, 60), random.randint(20, 60)) for _ in range(enemy_count)]
+        grid = SpatialGrid()
+        for i, r in enumerate(rects):
+            grid.insert(i, *r)
+        rect_of = rects.__getitem__
+        origins = [(100.0, random.uniform(0, SCREEN_HEIGHT)) for _ in range(beams)]
+
+        # 水平・斜め・垂直のレイで当たり順を比較
+        for _ in range(200):
+            x, y = random.uniform(0, SCREEN_WIDTH), random.uniform(0, SCREEN_HEIGHT)
+            dx, dy = random.choice(((1, 0), (0, -1), (random.uniform(-1, 1), random.uniform(-1, 1))))
+            if dx == dy == 0:
+                continue
+            length = math.hypot(dx, dy)
+            got = list(grid.raycast(x, y, dx, dy, 600, rect_of))
+            # 距離の昇順であること（同じ距離の当たりは見つけた順なので番号順に並べて比較）
+            assert all(a[0] <= b[0] for a, b in zip(got, got[1:])), "hit order mismatch"
+            assert [i for _, i in sorted(got)] == brute_force(rects, x, y, dx / length, dy / length, 600), \
+                "hit set mismatch"
+
+        start = time.perf_counter()
+        for _ in range(frames):
+            grid.clear()
+            for i, r in enumerate(rects):
+                grid.insert(i, *r)
+        build = (time.perf_counter() - start) / frames * 1e6
+
+        # ビームは貫通数（最大5）で止まる
+        start = time.perf_counter()
+        for _ in range(frames):
+            for x, y in origins:
+                for n, _ in enumerate(grid.raycast(x, y, 1, 0, SCREEN_WIDTH - x, rect_of)):
+                    if n >= 4:
+                        break
+        cast = (time.perf_counter() - start) / frames * 1e6
+
+        start = time.perf_counter()
+        for _ in range(frames):
+            for x, y in origins:
+                brute_force(rects, x, y, 1, 0, SCREEN_WIDTH - x)[:5]
+        scan = (time.perf_counter() - start) / frames * 1e6
+
+        print(f"{enemy_count:>8}{build:>10.1f}{cast:>10.1f}{scan:>10.1f}")
+    print("hit order matches brute force")
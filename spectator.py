@@ -0,0 +1,998 @@
+#!/usr/bin/env python3
+"""
+観戦用ストリーム（差分圧縮・固定帯域）
+
+ゲーム側の SpectatorServer が毎フレームのエンティティ状態（敵・弾・パワーアップ・
+地形セグメント・爆発）を量子化し、観戦者が受信確認（ACK）済みの状態との差分だけを
+UDPで送る。観戦者側は2つ目のシミュレーションを走らせず、受け取った状態を
+frame_snapshot のビュー経由で既存の描画コードに渡すだけ。
+
+- 各エンティティには安定したIDを振り、基準はエンティティごとに
+  「観戦者がACKした最新パケットでの状態」。パケット中の各レコードは基準との
+  差分フィールドだけを持つ（ビットマスク）。
+- 弾・地形・パワーアップは速度で外挿できるので、外挿値との差が許容範囲内なら
+  座標も送らない。
+- 1フレームの送信量は SPECTATOR_PACKET_BYTES で固定。送りきれない分は
+  優先度アキュムレータで後回しにし、観戦者側は外挿で埋める。
+
+Usage:
+    python main.py --spectate-port 7500                 # ゲーム側（配信）
+    python spectator.py --connect 127.0.0.1:7500         # 観戦者
+    python spectator.py --bench --bullets 3000 --loss 0.05
+"""
+
+import socket
+import struct
+import threading
+import time
+from collections import deque
+from operator import attrgetter
+import pygame
+from constants import *
+from frame_snapshot import (PlayerView, ForceView, EnemyView, BulletView, PowerUpView,
+                            TerrainView, ExplosionView, HudState, FrameSnapshot)
+
+# パケット種別
+PACKET_FRAME = 1
+PACKET_ACK = 2
+PACKET_HELLO = 3
+
+# エンティティ種別
+KIND_ENEMY = 0
+KIND_PLAYER_BULLET = 1
+KIND_ENEMY_BULLET = 2
+KIND_POWERUP = 3
+KIND_SEGMENT = 4
+KIND_EXPLOSION = 5
+
+# 種別ごとのフィールドの型（structの書式文字、順序がフィールド番号）
+_FIELDS = {
+    # x, y, enemy_type, size, color, time_alive, hp, max_hp
+    KIND_ENEMY: 'hhBHIHHH',
+    # x, y, vx, vy, width, height, color, charge_level
+    KIND_PLAYER_BULLET: 'hhhhBBIB',
+    KIND_ENEMY_BULLET: 'hhhhBBIB',
+    # x, y, powerup_type
+    KIND_POWERUP: 'hhB',
+    # x, top_height, bottom_height, width
+    KIND_SEGMENT: 'hHHH',
+    # x, y, size
+    KIND_EXPLOSION: 'hhH',
+}
+
+# 外挿するフィールド：(フィールド番号, 速度フィールド番号 or None, 一定の増分, 剰余 or None)
+_LINEAR = {
+    KIND_ENEMY: ((5, None, 1, 0x10000),),  # time_alive
+    KIND_PLAYER_BULLET: ((0, 2, 0, None), (1, 3, 0, None)),
+    KIND_ENEMY_BULLET: ((0, 2, 0, None), (1, 3, 0, None)),
+    KIND_POWERUP: ((0, None, -POWERUP_SPEED * SPECTATOR_POSITION_SCALE, None),),
+    KIND_SEGMENT: ((0, None, -TERRAIN_SCROLL_SPEED * SPECTATOR_POSITION_SCALE, None),),
+}
+
+# 帯域が足りないときに優先するもの（1フレームごとにアキュムレータへ加算）
+# 敵は外挿しないので、弾が大量にあっても毎フレーム近く送れる値にする
+_PRIORITY = {
+    KIND_ENEMY: 16,
+    KIND_SEGMENT: 6,
+    KIND_POWERUP: 6,
+    KIND_EXPLOSION: 4,
+    KIND_ENEMY_BULLET: 2,
+    KIND_PLAYER_BULLET: 1,
+}
+
+# 外挿フィールド以外がこの番号以降にまとまっている種別（タプル比較で高速判定）
+_STATIC_FROM = {
+    KIND_PLAYER_BULLET: 2,
+    KIND_ENEMY_BULLET: 2,
+    KIND_POWERUP: 1,
+    KIND_SEGMENT: 1,
+}
+
+_FULL_MASK = {kind: (1 << len(fmt)) - 1 for kind, fmt in _FIELDS.items()}
+_TOLERANT = {kind: frozenset(entry[0] for entry in _LINEAR.get(kind, ())) for kind in _FIELDS}
+
+_FRAME_HEADER = struct.Struct('<BII')        # 種別, 通し番号, フレーム
+# score, lives, lives_2(-1=なし), wave, game_over, force_count, weapon_type,
+# weapon_effect_timer, power_level, power_effect_timer, プレイヤー数, Force数
+_HUD = struct.Struct('<IbbBBBBHBHBB')
+_PLAYER = struct.Struct('<hhBBBbBBH')        # x, y, index, invincible, blink, tilt, charging, charge_level, charge_time
+_FORCE = struct.Struct('<hhBH')              # x, y, state, beam_length
+_COUNTS = struct.Struct('<HH')               # 削除数, レコード数
+_REMOVAL = struct.Struct('<I')
+_RECORD = struct.Struct('<IBBB')             # id, 種別, 基準の古さ（0=完全）, マスク
+_ACK = struct.Struct('<BI')
+
+_record_structs = {}
+
+
+def _record_struct(kind, mask):
+    """マスクで選んだフィールドだけのstruct（キャッシュ）"""
+    key = (kind, mask)
+    s = _record_structs.get(key)
+    if s is None:
+        fmt = _FIELDS[kind]
+        s = struct.Struct('<' + ''.join(c for i, c in enumerate(fmt) if mask & (1 << i)))
+        _record_structs[key] = s
+    return s
+
+
+def _q(value):
+    """座標を量子化（int16に収める）"""
+    v = int(round(value * SPECTATOR_POSITION_SCALE))
+    return -32768 if v < -32768 else 32767 if v > 32767 else v
+
+
+def _qv(value):
+    """速度を量子化"""
+    v = int(round(value * SPECTATOR_VELOCITY_SCALE))
+    return -32768 if v < -32768 else 32767 if v > 32767 else v
+
+
+def _rgb(color):
+    return (color[0] << 16) | (color[1] << 8) | color[2]
+
+
+_rgb_cache = {}
+
+
+def _color(packed):
+    return ((packed >> 16) & 0xFF, (packed >> 8) & 0xFF, packed & 0xFF)
+
+
+def predict(kind, state, dt):
+    """
+    量子化済みの状態を dt フレーム先へ外挿（送信側・受信側で同じ整数演算）
+    """
+    linear = _LINEAR.get(kind)
+    if not linear or dt == 0:
+        return state
+    s = list(state)
+    for field, vel, rate, modulo in linear:
+        if vel is not None:
+            s[field] = state[field] + (state[vel] * dt * SPECTATOR_POSITION_SCALE) // SPECTATOR_VELOCITY_SCALE
+        else:
+            s[field] = state[field] + rate * dt
+        if modulo is not None:
+            s[field] %= modulo
+    return tuple(s)
+
+
+class EntityIds:
+    """
+    エンティティに安定したIDを振る（オブジェクト自体には属性を追加しない）
+
+    id(obj) をキーにし、オブジェクトへの参照も持つので、登録中に
+    同じid()が別オブジェクトに再利用されることはない。毎フレーム
+    begin_frame() → get() → end_frame() で、そのフレームに出てこなかった
+    オブジェクトを手放す。
+    """
+
+    def __init__(self):
+        self._ids = {}
+        self._current = {}
+        self._next = 1
+
+    def begin_frame(self):
+        self._current = {}
+
+    def get(self, obj):
+        key = id(obj)
+        entry = self._ids.get(key)
+        if entry is None:
+            entry = (self._next, obj)
+            self._next += 1
+        self._current[key] = entry
+        return entry[0]
+
+    def end_frame(self):
+        self._ids = self._current
+
+
+# copy_world() がゲームのスレッドでエンティティから写す属性（attrgetterはCで値のタプルを作る）
+# 敵と弾は数が多いので、毎フレーム変わる属性だけを写す。生成時に決まって変わらない属性
+# （敵の種類・大きさ・色・最大HP、弾の大きさ・色・チャージ段階）は配信スレッドがオブジェクトから読む
+_ENEMY_ATTRS = attrgetter('active', 'x', 'y', 'time_alive', 'hp')
+_BULLET_ATTRS = attrgetter('active', 'x', 'y', 'velocity_x', 'velocity_y')
+_POWERUP_ATTRS = attrgetter('active', 'x', 'y', 'powerup_type')
+_SEGMENT_ATTRS = attrgetter('x', 'top_height', 'bottom_height', 'width')
+_EXPLOSION_ATTRS = attrgetter('active', 'x', 'y', 'size')
+
+
+def copy_world(game):
+    """
+    現在フレームの観戦用の生の値（ゲームのスレッドで呼ぶ、値を写すだけ）
+
+    HUD・プレイヤー・Forceは数が少ないのでここでバイト列にし、エンティティは
+    オブジェクト（IDを振るため）と属性の値のタプルのリストを写す。
+    量子化・差分・エンコードは quantize_world() 以降でサーバーのスレッドが行う。
+
+    Returns:
+        tuple: (フレーム, HUD・プレイヤー・Forceのバイト列, 地形のスクロール量, {種別: (オブジェクト, 値)})
+    """
+    players = game.visible_players()
+    forces = [f for f in game.forces if f.active]
+    p1 = game.player
+    parts = [_HUD.pack(
+        min(game.score, 0xFFFFFFFF),
+        max(-128, min(p1.lives, 127)),
+        max(-128, min(game.players[1].lives, 127)) if len(game.players) > 1 else -1,
+        game.wave_manager.current_wave,
+        game.game_over,
+        game.force_count,
+        p1.weapon_type,
+        min(p1.weapon_effect_timer, 0xFFFF),
+        p1.power_level,
+        min(p1.power_effect_timer, 0xFFFF),
+        len(players),
+        len(forces),
+    )]
+    for p in players:
+        parts.append(_PLAYER.pack(_q(p.x), _q(p.y), p.index, p.invincible, p.blink_timer & 0xFF,
+                                  int(p.tilt_angle * 100), p.charging, p.charge_level,
+                                  min(p.charge_time, 0xFFFF)))
+    for f in forces:
+        parts.append(_FORCE.pack(_q(f.x), _q(f.y), f.state, min(int(f.beam_length), 0xFFFF)))
+
+    groups = {}
+    for kind, objects, attrs in ((KIND_ENEMY, game.enemies, _ENEMY_ATTRS),
+                                 (KIND_PLAYER_BULLET, game.player_bullets, _BULLET_ATTRS),
+                                 (KIND_ENEMY_BULLET, game.enemy_bullets, _BULLET_ATTRS),
+                                 (KIND_POWERUP, game.powerups, _POWERUP_ATTRS),
+                                 (KIND_SEGMENT, game.terrain_manager.segments, _SEGMENT_ATTRS),
+                                 (KIND_EXPLOSION, game.explosions, _EXPLOSION_ATTRS)):
+        objects = list(objects)
+        groups[kind] = (objects, list(map(attrs, objects)))
+    return game.sim_steps, b''.join(parts), game.terrain_manager.scroll, groups
+
+
+def quantize_world(raw, ids):
+    """
+    copy_world() の値を量子化してIDを振る（サーバーのスレッドで呼ぶ、全観戦者で共有）
+
+    Returns:
+        tuple: (フレーム, HUD・プレイヤー・Forceのバイト列, {id: (種別, 量子化済みタプル)})
+    """
+    frame, header, scroll, groups = raw
+    entities = {}
+    ids.begin_frame()
+    get_id = ids.get
+    rgb = _rgb_cache
+    objects, values = groups[KIND_ENEMY]
+    for e, (active, x, y, time_alive, hp) in zip(objects, values):
+        if active:
+            if e.enemy_type == ENEMY_TYPE_TURRET:
+                x -= scroll  # 砲台はワールド座標、セグメントと同じく画面座標で送る
+            entities[get_id(e)] = (KIND_ENEMY, (
+                _q(x), _q(y), e.enemy_type, e.size, _rgb(e.color),
+                time_alive & 0xFFFF, max(0, min(hp, 0xFFFF)), min(e.max_hp, 0xFFFF)))
+    for kind in (KIND_PLAYER_BULLET, KIND_ENEMY_BULLET):
+        # 弾は数が多いので量子化を展開（画面外±50pxで消えるのでint16の範囲に収まる）
+        objects, values = groups[kind]
+        for b, (active, x, y, vx, vy) in zip(objects, values):
+            if active:
+                color = b.color
+                packed = rgb.get(color)
+                if packed is None:
+                    packed = rgb[color] = _rgb(color)
+                entities[get_id(b)] = (kind, (
+                    round(x * SPECTATOR_POSITION_SCALE), round(y * SPECTATOR_POSITION_SCALE),
+                    round(vx * SPECTATOR_VELOCITY_SCALE), round(vy * SPECTATOR_VELOCITY_SCALE),
+                    min(int(b.width), 255), min(int(b.height), 255), packed, b.charge_level))
+    objects, values = groups[KIND_POWERUP]
+    for p, (active, x, y, powerup_type) in zip(objects, values):
+        if active:
+            entities[get_id(p)] = (KIND_POWERUP, (_q(x), _q(y), powerup_type))
+    objects, values = groups[KIND_SEGMENT]
+    for s, (x, top_height, bottom_height, width) in zip(objects, values):
+        # セグメントは画面座標で送る
+        entities[get_id(s)] = (KIND_SEGMENT, (_q(x - scroll), top_height, bottom_height, width))
+    objects, values = groups[KIND_EXPLOSION]
+    for e, (active, x, y, size) in zip(objects, values):
+        if active:
+            entities[get_id(e)] = (KIND_EXPLOSION, (_q(x), _q(y), min(int(size), 0xFFFF)))
+    ids.end_frame()
+
+    return frame, header, entities
+
+
+def capture_world(game, ids):
+    """現在フレームの観戦用状態（copy_world() と quantize_world() を続けて行う、ベンチマーク用）"""
+    return quantize_world(copy_world(game), ids)
+
+
+class SpectatorStream:
+    """
+    観戦者1人分の送信側状態
+
+    acked: id -> (通し番号, フレーム, 状態) 観戦者が受け取ったと確認できた最新の状態（差分の基準）
+    sent:  通し番号 -> (送ったレコード, 送った削除) ACKが来たら acked に反映する
+    """
+
+    def __init__(self, packet_bytes=SPECTATOR_PACKET_BYTES):
+        self.packet_bytes = packet_bytes
+        self.seq = 0
+        self.acked = {}
+        self.accumulator = {}
+        self.known = set()              # 一度でも送ったID（削除通知が必要）
+        self.pending_removals = set()
+        self.sent = {}
+
+        # 統計
+        self.packets = 0
+        self.bytes_sent = 0
+        self.records_sent = 0
+        self.deferred = 0               # 帯域不足で後回しにしたレコード数
+
+    def encode(self, world):
+        """1フレーム分のパケットを作成（サイズは packet_bytes 以下）"""
+        frame, header, entities = world
+        seq = self.seq
+        self.seq += 1
+
+        # 消えたエンティティは削除を通知（ACKされるまで毎回送る）
+        gone = self.known.difference(entities)
+        if gone:
+            self.pending_removals.update(gone)
+            self.known.difference_update(gone)
+            for entity_id in gone:
+                self.acked.pop(entity_id, None)
+                self.accumulator.pop(entity_id, None)
+
+        budget = self.packet_bytes - _FRAME_HEADER.size - len(header) - _COUNTS.size
+        removals = []
+        for entity_id in self.pending_removals:
+            if budget < _REMOVAL.size:
+                break
+            removals.append(entity_id)
+            budget -= _REMOVAL.size
+
+        # 送る必要のあるエンティティを優先度順に
+        acked = self.acked
+        accumulator = self.accumulator
+        candidates = []
+        for entity_id, (kind, state) in entities.items():
+            base = acked.get(entity_id)
+            if base is None or seq - base[0] > SPECTATOR_ACK_WINDOW:
+                age = 0
+                mask = _FULL_MASK[kind]
+                predicted = state
+                boost = SPECTATOR_NEW_ENTITY_BOOST
+            else:
+                age = seq - base[0]
+                base_state = base[2]
+                static_from = _STATIC_FROM.get(kind)
+                if static_from is not None and state[static_from:] == base_state[static_from:]:
+                    # 等速で動いているだけなら座標の外挿誤差だけを見る
+                    dt = frame - base[1]
+                    within = True
+                    for field, vel, rate, _ in _LINEAR[kind]:
+                        if vel is not None:
+                            guess = base_state[field] + (base_state[vel] * dt * SPECTATOR_POSITION_SCALE) // SPECTATOR_VELOCITY_SCALE
+                        else:
+                            guess = base_state[field] + rate * dt
+                        if abs(state[field] - guess) > SPECTATOR_POSITION_TOLERANCE:
+                            within = False
+                            break
+                    if within:
+                        continue
+                predicted = predict(kind, base_state, frame - base[1])
+                mask = 0
+                tolerant = _TOLERANT[kind]
+                for i, (current, guess) in enumerate(zip(state, predicted)):
+                    if current != guess and not (
+                            i in tolerant and abs(current - guess) <= SPECTATOR_POSITION_TOLERANCE):
+                        mask |= 1 << i
+                if mask == 0:
+                    continue
+                boost = 1
+            priority = accumulator.get(entity_id, 0) + _PRIORITY[kind] * boost
+            accumulator[entity_id] = priority
+            candidates.append((priority, entity_id, kind, state, mask, predicted, age))
+        candidates.sort(key=lambda c: c[0], reverse=True)
+
+        records = []
+        chunks = []
+        min_record = _RECORD.size + 2
+        for priority, entity_id, kind, state, mask, predicted, age in candidates:
+            if budget < min_record:
+                break
+            fields = _record_struct(kind, mask)
+            size = _RECORD.size + fields.size
+            if size > budget:
+                continue
+            budget -= size
+            chunks.append(_RECORD.pack(entity_id, kind, age, mask))
+            chunks.append(fields.pack(*[v for i, v in enumerate(state) if mask & (1 << i)]))
+            # 観戦者側で復元される状態（送らなかったフィールドは外挿値）
+            if age:
+                state = tuple(v if mask & (1 << i) else predicted[i] for i, v in enumerate(state))
+            records.append((entity_id, frame, state))
+            accumulator[entity_id] = 0
+            self.known.add(entity_id)
+        self.deferred += len(candidates) - len(records)
+
+        self.sent[seq] = (records, removals)
+        stale = seq - SPECTATOR_ACK_WINDOW
+        if stale in self.sent:
+            del self.sent[stale]  # ロスしたとみなす
+
+        data = b''.join([_FRAME_HEADER.pack(PACKET_FRAME, seq, frame), header,
+                         _COUNTS.pack(len(removals), len(records))] +
+                        [_REMOVAL.pack(entity_id) for entity_id in removals] + chunks)
+        self.packets += 1
+        self.bytes_sent += len(data)
+        self.records_sent += len(records)
+        return data
+
+    def fork(self):
+        """
+        同じ状態のコピー（ストリームを共有していた観戦者のACKが分かれたとき）
+
+        sent のレコード・削除のリストは送ったあと書き換えないので、辞書と集合だけ写す。
+        """
+        other = SpectatorStream(self.packet_bytes)
+        other.seq = self.seq
+        other.acked = dict(self.acked)
+        other.accumulator = dict(self.accumulator)
+        other.known = set(self.known)
+        other.pending_removals = set(self.pending_removals)
+        other.sent = dict(self.sent)
+        return other
+
+    def acknowledge(self, seq):
+        """観戦者から通し番号 seq の受信確認を受けた"""
+        entry = self.sent.pop(seq, None)
+        if entry is None:
+            return
+        records, removals = entry
+        acked = self.acked
+        known = self.known
+        for entity_id, frame, state in records:
+            if entity_id not in known:
+                continue  # その後に削除された
+            base = acked.get(entity_id)
+            if base is None or base[0] < seq:
+                acked[entity_id] = (seq, frame, state)
+        self.pending_removals.difference_update(removals)
+
+
+class SpectatorServer:
+    """
+    観戦配信（ゲーム側）
+
+    ゲームのスレッドは publish() で copy_world() の値を置くだけで、受信・量子化・
+    差分・エンコード・送信は配信スレッドが行う（配信が間に合わなければ古いフレームは
+    捨てて最新だけを送る。差分の基準はACK済みの状態なので抜けたフレームは問題ない）。
+
+    HELLO/ACKを送ってきたアドレスを観戦者として登録する。状態が同じ観戦者
+    （同じフレームに参加した観戦者や、同じパケットをACKし続けている観戦者）は
+    SpectatorStream を共有し、1回のエンコードを全員に送る。ACKが分かれたら
+    その時点の状態を fork() して別々にする。
+    """
+
+    def __init__(self, port=SPECTATOR_PORT, packet_bytes=SPECTATOR_PACKET_BYTES):
+        self.packet_bytes = packet_bytes
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(('0.0.0.0', port))
+        self.sock.setblocking(False)
+        self.ids = EntityIds()
+        # アドレス -> [SpectatorStream, 最終受信時刻, 次のエンコードまでに届いたACKの通し番号]
+        # （配信スレッドだけが更新する。ゲームのスレッドは空かどうかを見るだけ）
+        self.clients = {}
+        self._fresh = None              # このフレームに参加した観戦者が共有する新しいストリーム
+
+        # ゲームのスレッドが置く最新の copy_world()（配信スレッドが取ったらNone）
+        self.pending = None
+        self.wake = threading.Event()
+        self.closed = False
+
+        # 統計
+        self.handoff_ms = deque(maxlen=FRAME_LATENCY_HISTORY)  # ゲームのスレッド
+        self.encode_ms = deque(maxlen=FRAME_LATENCY_HISTORY)   # 配信スレッド（量子化〜送信）
+        self.frames = 0
+        self.encodes = 0
+        self.packets = 0
+
+        self.worker = threading.Thread(target=self._serve_loop, name="spectator", daemon=True)
+        self.worker.start()
+        print(f"[Spectator] serving on UDP port {port}")
+
+    def publish(self, game):
+        """現在フレームを配信スレッドに渡す（ゲームのスレッドから呼ぶ、値を写すだけ）"""
+        if not self.clients:
+            return
+        start = time.perf_counter()
+        self.pending = copy_world(game)
+        self.wake.set()
+        self.handoff_ms.append((time.perf_counter() - start) * 1000)
+
+    def _serve_loop(self):
+        """配信スレッド：ACKを受け取り、置かれたフレームがあれば送る"""
+        while not self.closed:
+            self.wake.wait(SPECTATOR_POLL_INTERVAL)
+            self.wake.clear()
+            self._poll()
+            raw = self.pending
+            self.pending = None
+            if raw is None or not self.clients:
+                continue
+            start = time.perf_counter()
+            self._send(quantize_world(raw, self.ids))
+            self.encode_ms.append((time.perf_counter() - start) * 1000)
+
+    def _poll(self):
+        now = time.perf_counter()
+        while True:
+            try:
+                data, address = self.sock.recvfrom(64)
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError:
+                if self.closed:
+                    return
+                continue
+            client = self.clients.get(address)
+            if client is None:
+                # 同じフレームに参加した観戦者は同じ（空の）状態から始まるので共有する
+                if self._fresh is None:
+                    self._fresh = SpectatorStream(self.packet_bytes)
+                client = self.clients[address] = [self._fresh, now, set()]
+                print(f"[Spectator] {address[0]}:{address[1]} joined")
+            client[1] = now
+            if data[0] == PACKET_ACK and len(data) >= _ACK.size:
+                client[2].add(_ACK.unpack_from(data)[1])
+
+        for address in [a for a, c in self.clients.items() if now - c[1] > SPECTATOR_CLIENT_TIMEOUT]:
+            del self.clients[address]
+            print(f"[Spectator] {address[0]}:{address[1]} timed out")
+
+    def _send(self, world):
+        """観戦者をストリームとACKでまとめ、まとまりごとに1回エンコードして送る"""
+        groups = {}
+        for address, client in self.clients.items():
+            key = (id(client[0]), frozenset(client[2]))
+            client[2].clear()
+            members = groups.get(key)
+            if members is None:
+                groups[key] = [(address, client)]
+            else:
+                members.append((address, client))
+
+        # ACKが分かれたストリームは、ACKを反映する前の状態を先にすべて写しておく
+        claimed = set()
+        batches = []
+        for (stream_id, acks), members in groups.items():
+            stream = members[0][1][0]
+            if stream_id in claimed:
+                stream = stream.fork()
+                for _, client in members:
+                    client[0] = stream
+            claimed.add(stream_id)
+            batches.append((stream, acks, members))
+
+        for stream, acks, members in batches:
+            for seq in acks:
+                stream.acknowledge(seq)
+            data = stream.encode(world)
+            self.encodes += 1
+            for address, _ in members:
+                try:
+                    self.sock.sendto(data, address)
+                    self.packets += 1
+                except OSError:
+                    pass
+        self._fresh = None
+        self.frames += 1
+
+    def summary(self):
+        """配信の統計（main.pyの終了時の表示用）"""
+        handoff = list(self.handoff_ms)
+        encode = list(self.encode_ms)
+        return {
+            'frames': self.frames,
+            'encodes': self.encodes,
+            'packets': self.packets,
+            'avg_handoff_ms': sum(handoff) / max(len(handoff), 1),
+            'avg_encode_ms': sum(encode) / max(len(encode), 1),
+        }
+
+    def close(self):
+        """配信スレッドを止めてソケットを閉じる"""
+        self.closed = True
+        self.wake.set()
+        self.worker.join()
+        self.sock.close()
+
+
+class SpectatorClient:
+    """
+    観戦者側の受信状態
+
+    エンティティごとに最近のパケットでの状態を保持し、差分は
+    「通し番号 - 基準の古さ」のパケットでの状態に適用して復元する。
+    """
+
+    def __init__(self):
+        self.latest_seq = -1
+        self.frame = 0
+        self.header = None
+        self.entities = {}              # id -> (通し番号, フレーム, 種別, 状態)
+        self.history = {}               # id -> {通し番号: (フレーム, 状態)}
+        self.removed = {}               # id -> 削除を受け取った通し番号（遅れて届いたレコードを無視）
+        self.explosions = {}            # id -> ローカルのExplosion（パーティクルは観戦者側で生成）
+        self.explosion_frame = 0
+        self.stars = None
+
+        # 統計
+        self.packets = 0
+        self.bytes_received = 0
+        self.undecodable = 0
+
+    def receive(self, data):
+        """
+        フレームパケットを適用
+
+        Returns:
+            int or None: ACKすべき通し番号
+        """
+        if not data or data[0] != PACKET_FRAME:
+            return None
+        _, seq, frame = _FRAME_HEADER.unpack_from(data)
+        if seq + SPECTATOR_ACK_WINDOW <= self.latest_seq:
+            return None  # 古すぎる（基準として使われない）
+        self.packets += 1
+        self.bytes_received += len(data)
+
+        offset = _FRAME_HEADER.size
+        hud = _HUD.unpack_from(data, offset)
+        offset += _HUD.size
+        players = []
+        for _ in range(hud[10]):
+            players.append(_PLAYER.unpack_from(data, offset))
+            offset += _PLAYER.size
+        forces = []
+        for _ in range(hud[11]):
+            forces.append(_FORCE.unpack_from(data, offset))
+            offset += _FORCE.size
+        if seq > self.latest_seq:
+            self.latest_seq = seq
+            self.frame = frame
+            self.header = (hud, players, forces)
+
+        removal_count, record_count = _COUNTS.unpack_from(data, offset)
+        offset += _COUNTS.size
+        for _ in range(removal_count):
+            entity_id = _REMOVAL.unpack_from(data, offset)[0]
+            offset += _REMOVAL.size
+            self.entities.pop(entity_id, None)
+            self.history.pop(entity_id, None)
+            self.explosions.pop(entity_id, None)
+            self.removed[entity_id] = seq
+
+        for _ in range(record_count):
+            entity_id, kind, age, mask = _RECORD.unpack_from(data, offset)
+            offset += _RECORD.size
+            fields = _record_struct(kind, mask)
+            values = fields.unpack_from(data, offset)
+            offset += fields.size
+            if entity_id in self.removed:
+                continue
+
+            history = self.history.setdefault(entity_id, {})
+            if age == 0:
+                state = values
+            else:
+                base = history.get(seq - age)
+                if base is None:
+                    self.undecodable += 1
+                    continue
+                predicted = predict(kind, base[1], frame - base[0])
+                it = iter(values)
+                state = tuple(next(it) if mask & (1 << i) else v for i, v in enumerate(predicted))
+            history[seq] = (frame, state)
+            current = self.entities.get(entity_id)
+            if current is None or current[0] < seq:
+                self.entities[entity_id] = (seq, frame, kind, state)
+
+        if seq % 64 == 0:
+            self._trim(seq)
+        return seq
+
+    def _trim(self, seq):
+        """基準として使われなくなった古い状態を捨てる"""
+        oldest = seq - SPECTATOR_ACK_WINDOW
+        for entity_id, history in self.history.items():
+            if len(history) > 1:
+                newest = max(history)
+                for s in [s for s in history if s < oldest and s != newest]:
+                    del history[s]
+        for entity_id in [i for i, s in self.removed.items() if s < oldest]:
+            del self.removed[entity_id]
+
+    def world_positions(self):
+        """現在フレームへ外挿した各エンティティの状態 {id: (種別, 状態)}"""
+        frame = self.frame
+        return {entity_id: (kind, predict(kind, state, frame - state_frame))
+                for entity_id, (_, state_frame, kind, state) in self.entities.items()}
+
+    def snapshot(self):
+        """描画用のFrameSnapshotを作る（エンティティは現在フレームへ外挿）"""
+        from effects import Explosion
+
+        if self.header is None:
+            return None
+        hud, players, forces = self.header
+        scale = SPECTATOR_POSITION_SCALE
+
+        enemies, player_bullets, enemy_bullets, powerups, segments, explosion_ids = [], [], [], [], [], []
+        for entity_id, (kind, s) in self.world_positions().items():
+            if kind == KIND_ENEMY:
+                x, y = s[0] / scale, s[1] / scale
+                enemies.append(EnemyView(s[2], x, y, int(round(x)), int(round(y)), s[3],
+                                         _color(s[4]), s[5], s[6], s[7]))
+            elif kind == KIND_PLAYER_BULLET or kind == KIND_ENEMY_BULLET:
+                view = BulletView(int(round(s[0] / scale)), int(round(s[1] / scale)), s[4], s[5],
+                                  _color(s[6]), kind == KIND_PLAYER_BULLET, s[7])
+                (player_bullets if kind == KIND_PLAYER_BULLET else enemy_bullets).append(view)
+            elif kind == KIND_POWERUP:
+                size, color, name = _powerup_style(s[2])
+                powerups.append(PowerUpView(s[0] / scale, s[1] / scale, size, color, name))
+            elif kind == KIND_SEGMENT:
+                segments.append(TerrainView(s[0] / scale, s[1], s[2], s[3]))
+            elif kind == KIND_EXPLOSION:
+                explosion_ids.append(entity_id)
+                if entity_id not in self.explosions:
+                    self.explosions[entity_id] = Explosion(s[0] / scale, s[1] / scale, s[2])
+
+        # 爆発のパーティクルはローカルで進める
+        steps = min(self.frame - self.explosion_frame, MAX_SIM_STEPS_PER_FRAME)
+        self.explosion_frame = self.frame
+        explosions = []
+        for entity_id in explosion_ids:
+            explosion = self.explosions[entity_id]
+            for _ in range(max(steps, 0)):
+                explosion.update()
+            if explosion.active:
+                explosions.append(ExplosionView.capture(explosion))
+
+        player_views = []
+        for x, y, index, invincible, blink, tilt, charging, charge_level, charge_time in players:
+            player_views.append(PlayerView(x / scale, y / scale, PLAYER_WIDTH, PLAYER_HEIGHT,
+                                           bool(invincible), blink, 0.0, tilt / 100.0, 0, 0, 0,
+                                           bool(charging), charge_level, charge_time,
+                                           PLAYER_COLORS[index]))
+        force_views = tuple(ForceView(x / scale, y / scale, FORCE_SIZE, state, beam)
+                            for x, y, state, beam in forces)
+
+        if self.stars is None:
+            import random
+            rng = random.Random(0)
+            self.stars = [[rng.randint(0, SCREEN_WIDTH), rng.randint(0, SCREEN_HEIGHT), rng.uniform(0.5, 2)]
+                          for _ in range(100)]
+        for star in self.stars:
+            star[0] -= star[2] * max(steps, 0)
+            if star[0] < 0:
+                star[0] += SCREEN_WIDTH
+
+        (score, lives, lives_2, wave, game_over, force_count, weapon_type,
+         weapon_timer, power_level, power_timer, _, _) = hud
+        p1 = player_views[0] if player_views else None
+        hud_state = HudState(
+            score, lives, f"WAVE {wave}", force_count, weapon_type, weapon_timer, power_level,
+            power_timer,
+            p1.charging if p1 else False, p1.charge_time if p1 else 0, p1.charge_level if p1 else 0,
+            p1.x if p1 else 0, p1.y if p1 else 0, PLAYER_WIDTH,
+            lives_2 if lives_2 >= 0 else None)
+
+        return FrameSnapshot(self.frame, None, tuple(tuple(s) for s in self.stars), tuple(segments), 0,
+                             tuple(player_views), force_views, tuple(enemies), tuple(player_bullets),
+                             tuple(enemy_bullets), tuple(powerups), tuple(explosions),
+                             hud_state, bool(game_over))
+
+
+_powerup_styles = {}
+
+
+def _powerup_style(powerup_type):
+    """パワーアップ種別ごとの (size, color, name)"""
+    style = _powerup_styles.get(powerup_type)
+    if style is None:
+        from powerup import PowerUp
+        p = PowerUp(0, 0, powerup_type)
+        style = _powerup_styles[powerup_type] = (p.size, p.color, p.name)
+    return style
+
+
+def run_viewer(host, port, render_mode=RENDER_MODE):
+    """観戦者ウィンドウ（Gameの描画コードを借りてスナップショットを描く）"""
+    from game import Game
+    from render_target import RenderTarget
+
+    class SpectatorViewer:
+        _draw_scene = Game._draw_scene
+        draw_ui = Game.draw_ui
+        draw_game_over = Game.draw_game_over
+        _create_layers = Game._create_layers
+        _render_game_over = Game._render_game_over
+        score_store = None  # ハイスコアは表示しない
+        terrain_streamer = None
+
+        def __init__(self):
+            pygame.init()
+            self.render_target = RenderTarget(render_mode)
+            self.screen = self.render_target.surface
+            pygame.display.set_caption("R-TYPE Clone - Spectator")
+            self.font = pygame.font.Font(None, 36)
+            self.small_font = pygame.font.Font(None, 24)
+            self.layers = self._create_layers()
+
+    viewer = SpectatorViewer()
+    clock = pygame.time.Clock()
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setblocking(False)
+    server = (host, port)
+    client = SpectatorClient()
+    last_hello = 0.0
+    last_title = time.perf_counter()
+    last_bytes = 0
+
+    running = True
+    while running:
+        for event in pygame.event.get():
+            viewer.render_target.handle_event(event)
+            if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
+                running = False
+
+        now = time.perf_counter()
+        if client.packets == 0 and now - last_hello > 1.0:
+            sock.sendto(bytes([PACKET_HELLO]), server)
+            last_hello = now
+
+        while True:
+            try:
+                data, _ = sock.recvfrom(4096)
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError:
+                break
+            seq = client.receive(data)
+            if seq is not None:
+                sock.sendto(_ACK.pack(PACKET_ACK, seq), server)
+
+        snapshot = client.snapshot()
+        if snapshot is not None:
+            viewer._draw_scene(snapshot.stars, snapshot.segments, snapshot.terrain_scroll,
+                               snapshot.players, snapshot.forces,
+                               snapshot.enemies, snapshot.player_bullets, snapshot.enemy_bullets,
+                               snapshot.powerups, snapshot.explosions, snapshot.hud, snapshot.game_over)
+            viewer.render_target.present()
+
+        if now - last_title >= 1.0:
+            rate = (client.bytes_received - last_bytes) / (now - last_title) / 1024
+            pygame.display.set_caption(f"R-TYPE Clone - Spectator ({rate:.1f} KiB/s, "
+                                       f"{len(client.entities)} entities)")
+            last_title = now
+            last_bytes = client.bytes_received
+        clock.tick(FPS)
+
+    sock.close()
+    pygame.quit()
+
+
+def run_benchmark(frames=600, bullets=3000, loss=0.05, ack_delay=4, packet_bytes=SPECTATOR_PACKET_BYTES):
+    """
+    ループバックでの帯域・エンコード時間・観戦者側の誤差を計測
+
+    ゲームに弾を bullets 個まで足して回し、パケットを一定確率で落とし、
+    ACKは ack_delay フレーム遅れて届くものとする。
+    """
+    import random
+    from game import Game
+    from bullet import Bullet
+    from input_provider import AutopilotInput
+    from savestate import load_scenario
+
+    game = Game(input_provider=AutopilotInput(), headless=True, immortal=True)
+    game.sound_manager.enabled = False
+    load_scenario(game, 'wave4_three_bosses')
+    rng = random.Random(0)
+
+    ids = EntityIds()
+    stream = SpectatorStream(packet_bytes)
+    client = SpectatorClient()
+    acks = deque()
+    sizes, handoff_ms, capture_ms, encode_ms, errors, coverage = [], [], [], [], [], []
+
+    for frame in range(frames):
+        game.update()
+        game.sim_steps += 1
+        # 負荷用の弾を補充（エンティティ上限を無視して直接追加）
+        while len(game.enemy_bullets) < bullets:
+            game.enemy_bullets.append(Bullet(rng.uniform(0, SCREEN_WIDTH), rng.uniform(0, SCREEN_HEIGHT),
+                                             False, 0, rng.uniform(-6, -1), rng.uniform(-2, 2)))
+
+        # ゲームのスレッドの分（copy_world）と配信スレッドの分（quantize_world・encode）
+        start = time.perf_counter()
+        raw = copy_world(game)
+        copied = time.perf_counter()
+        world = quantize_world(raw, ids)
+        captured = time.perf_counter()
+        data = stream.encode(world)
+        handoff_ms.append((copied - start) * 1000)
+        capture_ms.append((captured - copied) * 1000)
+        encode_ms.append((time.perf_counter() - captured) * 1000)
+        sizes.append(len(data))
+
+        if rng.random() >= loss:
+            seq = client.receive(data)
+            if seq is not None and rng.random() >= loss:
+                acks.append((frame + ack_delay, seq))
+        while acks and acks[0][0] <= frame:
+            stream.acknowledge(acks.popleft()[1])
+
+        # 観戦者側の外挿位置と真の位置の差（ピクセル）
+        if frame >= frames // 2:
+            seen = client.world_positions()
+            present = 0
+            for entity_id, (kind, state) in world[2].items():
+                mine = seen.get(entity_id)
+                if mine is None:
+                    continue
+                present += 1
+                errors.append(max(abs(state[0] - mine[1][0]),
+                                  abs(state[1] - mine[1][1]) if kind != KIND_SEGMENT else 0)
+                              / SPECTATOR_POSITION_SCALE)
+            coverage.append(present / max(1, len(world[2])))
+
+    pygame.quit()
+    errors.sort()
+    encode_ms.sort()
+    capture_ms.sort()
+    n = len(errors)
+    return {
+        'entities': len(world[2]),
+        'avg_bytes': sum(sizes) / len(sizes),
+        'max_bytes': max(sizes),
+        'handoff_avg_ms': sum(handoff_ms) / len(handoff_ms),
+        'handoff_p95_ms': sorted(handoff_ms)[int(len(handoff_ms) * 0.95)],
+        'capture_avg_ms': sum(capture_ms) / len(capture_ms),
+        'encode_avg_ms': sum(encode_ms) / len(encode_ms),
+        'encode_p95_ms': encode_ms[int(len(encode_ms) * 0.95)],
+        'coverage': sum(coverage) / len(coverage) if coverage else 0.0,
+        'error_p50_px': errors[n // 2] if n else 0.0,
+        'error_p95_px': errors[int(n * 0.95)] if n else 0.0,
+        'error_max_px': errors[-1] if n else 0.0,
+        'deferred_per_frame': stream.deferred / frames,
+        'undecodable': client.undecodable,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Spectator stream viewer / benchmark")
+    parser.add_argument('--connect', default=f"127.0.0.1:{SPECTATOR_PORT}",
+                        help='spectator server address (HOST:PORT)')
+    parser.add_argument('--render-mode', choices=RENDER_MODES, default=RENDER_MODE,
+                        help='viewer window mode (see render_target.py)')
+    parser.add_argument('--bench', action='store_true', help='run the loopback benchmark')
+    parser.add_argument('--frames', type=int, default=600)
+    parser.add_argument('--bullets', type=int, default=3000)
+    parser.add_argument('--loss', type=float, default=0.05)
+    args = parser.parse_args()
+
+    if args.bench:
+        r = run_benchmark(args.frames, args.bullets, args.loss)
+        print(f"{r['entities']} entities, {args.loss * 100:.0f}% loss")
+        print(f"packet: avg {r['avg_bytes']:.0f} B, max {r['max_bytes']} B "
+              f"({r['avg_bytes'] * FPS / 1024:.1f} KiB/s at {FPS} Hz)")
+        print(f"game thread: handoff avg {r['handoff_avg_ms']:.2f} ms, p95 {r['handoff_p95_ms']:.2f} ms")
+        print(f"server thread: quantize {r['capture_avg_ms']:.2f} ms, encode avg {r['encode_avg_ms']:.2f} ms, "
+              f"p95 {r['encode_p95_ms']:.2f} ms per distinct stream; "
+              f"{r['deferred_per_frame']:.0f} records deferred/frame")
+        print(f"viewer: {r['coverage'] * 100:.1f}% of entities known, position error "
+              f"p50 {r['error_p50_px']:.2f} px, p95 {r['error_p95_px']:.2f} px, max {r['error_max_px']:.1f} px, "
+              f"{r['undecodable']} undecodable records")
+    else:
+        host, port = args.connect.rsplit(':', 1)
+        run_viewer(host, int(port), args.render_mode)
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+地形の高さマップ（列ごとの天井・床の高さのnumpy配列）
+
+TerrainManager のセグメント（Rect 2つ）と同じ地形を、幅 TERRAIN_HEIGHTMAP_COLUMN の
+列ごとの天井の下端・床の上端の配列で持つ。列はワールド座標で固定で、配列は画面幅より
+少し広いリングバッファ（ワールドの列番号 % 列数）。スクロールしても配列は書き換えず、
+判定のときに画面座標をスクロール量でワールド座標に直すだけ。セグメントの追加は
+列の区間への書き込みで、前のセグメントとの隙間（リングに残った古い列）もそこで空に戻す。
+
+判定は列の添字を計算して高さと比べるだけなので、Rectは区間の max/min 1回、
+弾の座標の配列は1回のベクトル演算でまとめて判定できる。列ごとに高さを持つので、
+傾斜（直前の高さからの補間）も同じ判定のまま表せる（add_segment() の ramp）。
+
+Usage:
+    python terrain_heightmap.py      # セグメントのRect判定との一致と、弾の一括判定の時間の比較
+"""
+
+import math
+import numpy as np
+import pygame
+from constants import *
+
+
+class TerrainHeightmap:
+    """
+    列ごとの天井・床の高さのリングバッファ
+
+    ceiling[i] は天井の下端（y < ceiling が地形）、floor[i] は床の上端（y >= floor が地形）。
+    列の境目をまたぐセグメントは、その列を天井は低く・床は高く（地形が広い側に）まとめる。
+    """
+
+    def __init__(self, column_width=TERRAIN_HEIGHTMAP_COLUMN,
+                 span=SCREEN_WIDTH + 2 * TERRAIN_SEGMENT_WIDTH):
+        """
+        Args:
+            column_width: 列の幅（ピクセル）
+            span: 保持する幅（画面幅 + 生成済みで画面に入る前のセグメント分）
+        """
+        self.column_width = column_width
+        self.columns = int(math.ceil(span / column_width))
+        self.ceiling = np.zeros(self.columns, dtype=np.int32)
+        self.floor = np.full(self.columns, SCREEN_HEIGHT, dtype=np.int32)
+        self.end = None  # 書き込み済みの右端の列（ワールドの列番号、この列は含まない）
+
+    @classmethod
+    def from_segments(cls, segments):
+        """セグメント（ワールド座標）の列から作り直す（セーブデータの復元用）"""
+        heightmap = cls()
+        for segment in segments:
+            heightmap.add_segment(segment.x, segment.top_height, segment.bottom_height, segment.width)
+        return heightmap
+
+    def _fill(self, start, end, ceiling, floor):
+        """ワールドの列番号 [start, end) の高さを設定（リングの折り返しを分割）"""
+        columns = self.columns
+        end = min(end, start + columns)
+        while start < end:
+            i = start % columns
+            n = min(end - start, columns - i)
+            self.ceiling[i:i + n] = ceiling
+            self.floor[i:i + n] = floor
+            start += n
+
+    def _merge(self, column, ceiling, floor):
+        """列の境目をまたぐ端の列：地形が広い側に合わせる"""
+        i = column % self.columns
+        self.ceiling[i] = max(self.ceiling[i], ceiling)
+        self.floor[i] = min(self.floor[i], floor)
+
+    def add_segment(self, x, top_height, bottom_height, width, ramp=0):
+        """
+        セグメントを書き込む（左から順に追加する）
+
+        Args:
+            x: ワールド座標の開始X
+            top_height: 天井の高さ
+            bottom_height: 床の高さ
+            width: セグメントの幅
+            ramp: 左端からこの幅だけ、直前の列の高さから直線で変化させる（傾斜）
+        """
+        cw = self.column_width
+        right = x + width
+        first = int(x // cw)
+        last = int(-(-right // cw))  # 右端を含む列の次
+        ceiling = top_height
+        floor = SCREEN_HEIGHT - bottom_height
+
+        # 前のセグメントとの隙間と、これから書く列に残っている1周前の高さを消す
+        clear_start = first if self.end is None else self.end
+        self._fill(max(clear_start, last - self.columns), last, 0, SCREEN_HEIGHT)
+
+        start = first
+        if ramp > 0:
+            ramp_columns = max(1, int(ramp // cw))
+            previous = (first - 1) % self.columns
+            ceilings = np.linspace(self.ceiling[previous], ceiling, ramp_columns + 1)[1:]
+            floors = np.linspace(self.floor[previous], floor, ramp_columns + 1)[1:]
+            for k in range(min(ramp_columns, last - first)):
+                i = (first + k) % self.columns
+                self.ceiling[i] = int(round(ceilings[k]))
+                self.floor[i] = int(round(floors[k]))
+            start = first + ramp_columns
+        elif x % cw:
+            self._merge(first, ceiling, floor)
+            start = first + 1
+
+        end = last
+        if right % cw and end > start:
+            self._merge(last - 1, ceiling, floor)
+            end = last - 1
+        self._fill(start, end, ceiling, floor)
+        self.end = last if self.end is None else max(self.end, last)
+
+    def _span(self, start, end):
+        """ワールドの列番号 [start, end) の (天井の最大, 床の最小)"""
+        columns = self.columns
+        ceiling = 0
+        floor = SCREEN_HEIGHT
+        while start < end:
+            i = start % columns
+            n = min(end - start, columns - i)
+            ceiling = max(ceiling, int(self.ceiling[i:i + n].max()))
+            floor = min(floor, int(self.floor[i:i + n].min()))
+            start += n
+        return ceiling, floor
+
+    def collides_rect(self, rect, scroll=0):
+        """
+        Rectが地形と重なっているか（画面外の部分は判定しない）
+
+        Args:
+            rect: pygame.Rect（画面座標）
+            scroll: 画面の左端のワールド座標
+        """
+        left = max(rect.left, 0)
+        right = min(rect.right, SCREEN_WIDTH)
+        if left >= right or rect.height <= 0:
+            return False
+        cw = self.column_width
+        ceiling, floor = self._span(int((left + scroll) // cw), int(-(-(right + scroll) // cw)))
+        return rect.top < ceiling or rect.bottom > floor
+
+    def blocked(self, xs, ys, scroll=0):
+        """
+        点の配列のうち地形の中にあるもの（画面外は地形なし）
+
+        Args:
+            xs, ys: 画面座標の配列（同じ長さ）
+            scroll: 画面の左端のワールド座標
+
+        Returns:
+            numpy.ndarray: bool配列
+        """
+        xs = np.asarray(xs, dtype=np.float64)
+        ys = np.asarray(ys, dtype=np.float64)
+        index = ((xs + scroll) // self.column_width).astype(np.int64) % self.columns
+        inside = (xs >= 0) & (xs < SCREEN_WIDTH)
+        return inside & ((ys < self.ceiling[index]) | (ys >= self.floor[index]))
+
+
+if __name__ == "__main__":
+    # 1) 地形を流しながら、ランダムなRectの判定がセグメントのRect判定と一致することを確認
+    # 2) 弾の中心の地形判定：1発ずつのセグメント判定と、配列1回の判定の時間
+    import random
+    import timeit
+    from terrain_manager import TerrainManager
+
+    random.seed(0)
+    manager = TerrainManager(seed=7)
+    manager.set_wave(4)
+    checked = 0
+    for frame in range(6000):
+        if frame % 1000 == 0:
+            manager.set_pattern(frame // 1000 % 5)
+        manager.update()
+        for _ in range(5):
+            rect = pygame.Rect(random.randint(0, SCREEN_WIDTH - 40), random.randint(0, SCREEN_HEIGHT - 30),
+                               random.randint(1, 40), random.randint(1, 30))
+            expected = any(s.collides_with(rect.move(manager.scroll, 0)) for s in manager.segments)
+            assert manager.heightmap.collides_rect(rect, manager.scroll) == expected, f"mismatch at frame {frame}: {rect}"
+            checked += 1
+    restored = TerrainHeightmap.from_segments(manager.segments)
+    for _ in range(2000):
+        rect = pygame.Rect(random.randint(0, SCREEN_WIDTH - 40), random.randint(0, SCREEN_HEIGHT - 30), 20, 20)
+        assert restored.collides_rect(rect, manager.scroll) == manager.heightmap.collides_rect(rect, manager.scroll)
+    print(f"{checked} rects match segment collision over 6000 frames "
+          f"({manager.heightmap.columns} columns of {manager.heightmap.column_width} px)")
+
+    heightmap = manager.heightmap
+    player_rect = pygame.Rect(100, SCREEN_HEIGHT // 2, PLAYER_WIDTH, PLAYER_HEIGHT)
+    rect_segments_us = min(timeit.repeat(lambda: manager.check_collision(player_rect),
+                                         number=20000, repeat=5)) / 20000 * 1e6
+    rect_heightmap_us = min(timeit.repeat(lambda: heightmap.collides_rect(player_rect, manager.scroll),
+                                          number=20000, repeat=5)) / 20000 * 1e6
+    print(f"player rect vs terrain: segments {rect_segments_us:.2f} us, heightmap {rect_heightmap_us:.2f} us")
+    print(f"{'bullets':>8}{'per-bullet':>12}{'vectorized':>12}  (us per frame, bullet centers vs terrain)")
+    for count in (16, 64, 256, 1024):
+        points = [(random.uniform(0, SCREEN_WIDTH), random.uniform(0, SCREEN_HEIGHT)) for _ in range(count)]
+
+        def per_bullet():
+            hits = 0
+            for x, y in points:
+                segment = manager.column_at(x)
+                if segment is not None and (y < segment.top_height or
+                                            y >= SCREEN_HEIGHT - segment.bottom_height):
+                    hits += 1
+            return hits
+
+        def vectorized():
+            return int(manager.blocked([p[0] for p in points], [p[1] for p in points]).sum())
+
+        assert abs(per_bullet() - vectorized()) <= count // 100 + 1  # 列の境目の丸めの差だけ
+        scalar_us = min(timeit.repeat(per_bullet, number=200, repeat=5)) / 200 * 1e6
+        vector_us = min(timeit.repeat(vectorized, number=200, repeat=5)) / 200 * 1e6
+        print(f"{count:>8}{scalar_us:>12.1f}{vector_us:>12.1f}")
+
+    # 傾斜：直前の高さから100pxかけて変化する
+    ramp = TerrainHeightmap()
+    ramp.add_segment(0, 20, 20, 100)
+    ramp.add_segment(100, 120, 60, 100, ramp=100)
+    xs = np.arange(90, 210, 20)
+    print("ramp ceiling at x=" + ", ".join(f"{x}: {ramp.ceiling[int(x // ramp.column_width)]}" for x in xs))
@@ -1,19 +1,129 @@
+import math
 import random
+from bisect import bisect_right
 from constants import *
 from terrain import TerrainSegment
+from terrain_heightmap import TerrainHeightmap
+
+# === 地形パターン定義 ===
+# 各パターンは塊の乱数と直前のセグメントの高さ (top, bottom)（なければNone）から高さを決める
+
+def _pattern_open(rng, prev):
+    """パターン0: 開けた空間 - 初心者向け"""
+    top = rng.randint(0, 50)
+    bottom = rng.randint(0, 50)
+    return top, bottom
+
+
+def _pattern_narrow_top(rng, prev):
+    """パターン1: 上部が狭い"""
+    top = rng.randint(100, 200)
+    bottom = rng.randint(0, 50)
+    return top, bottom
+
+
+def _pattern_narrow_bottom(rng, prev):
+    """パターン2: 下部が狭い"""
+    top = rng.randint(0, 50)
+    bottom = rng.randint(100, 200)
+    return top, bottom
+
+
+def _pattern_narrow_middle(rng, prev):
+    """パターン3: 上下両方が狭い - 難易度高"""
+    top = rng.randint(120, 180)
+    bottom = rng.randint(120, 180)
+
+    # 最低限の通路幅を確保（150ピクセル）
+    if top + bottom > SCREEN_HEIGHT - 150:
+        top = min(top, 150)
+        bottom = SCREEN_HEIGHT - 150 - top
+
+    return top, bottom
+
+
+def _pattern_wavy(rng, prev):
+    """パターン4: 波型の変化"""
+    # 前のセグメントから滑らかに変化
+    if prev is not None:
+        top = prev[0] + rng.randint(-20, 20)
+        bottom = prev[1] + rng.randint(-20, 20)
+        top = max(0, min(top, 200))
+        bottom = max(0, min(bottom, 200))
+    else:
+        top = rng.randint(50, 100)
+        bottom = rng.randint(50, 100)
+
+    return top, bottom
+
+
+PATTERNS = (
+    _pattern_open,          # 0
+    _pattern_narrow_top,    # 1
+    _pattern_narrow_bottom, # 2
+    _pattern_narrow_middle, # 3
+    _pattern_wavy,          # 4
+)
+
+
+def generate_chunk(seed, key):
+    """
+    地形の塊（1セグメント分の高さと砲台の配置）を生成
+
+    乱数は (seed, 塊の番号) だけから作るので、同じキーならどのスレッドで
+    いつ生成しても同じ結果になる（TerrainStreamerの先読みと同期生成が一致する）。
+
+    Args:
+        seed: 地形の乱数の種（TerrainManager.seed）
+        key: (塊の番号, パターン番号, 砲台の出現率, セグメントの幅, 直前の高さ (top, bottom) or None)
+
+    Returns:
+        tuple: (top_height, bottom_height, turret) - turretは None / 'ceiling' / 'floor'
+    """
+    index, pattern, turret_chance, width, prev = key
+    rng = random.Random(f"{seed}:{index}")
+    top, bottom = PATTERNS[pattern](rng, prev)
+
+    turret = None
+    if turret_chance > 0 and rng.random() < turret_chance:
+        # 天井または床にランダム配置（十分な高さがある方を選択）
+        can_spawn_ceiling = top > 80  # TURRET_SIZE + margin
+        can_spawn_floor = bottom > 80  # TURRET_SIZE + margin
+        if can_spawn_ceiling and can_spawn_floor:
+            turret = 'ceiling' if rng.random() < 0.5 else 'floor'
+        elif can_spawn_ceiling:
+            turret = 'ceiling'
+        elif can_spawn_floor:
+            turret = 'floor'
+    return top, bottom, turret
+
+
+def next_chunk_key(key, chunk):
+    """同じパターンが続く場合の次の塊のキー"""
+    index, pattern, turret_chance, width, prev = key
+    return (index + 1, pattern, turret_chance, width, (chunk[0], chunk[1]))
+
 
 class TerrainManager:
-    def __init__(self):
-        """地形生成・管理クラス"""
-        self.segments = []
+    def __init__(self, seed=0):
+        """
+        地形生成・管理クラス
+
+        Args:
+            seed: 地形の乱数の種（同じ種・同じパターンの切り替えなら同じ地形になる）
+        """
+        self.segments = []  # ワールド座標で左から右へ並ぶ
+        self.scroll = 0     # 画面の左端のワールド座標（カメラ、毎フレーム TERRAIN_SCROLL_SPEED 進む）
         self.spawn_timer = 0
         self.spawn_interval = TERRAIN_SPAWN_INTERVAL
         self.segment_width = TERRAIN_SEGMENT_WIDTH
 
-        # 現在の地形パターン
+        # 地形の塊（セグメント）は種と通し番号だけで決まる（generate_chunk()）
+        self.seed = seed
+        self.chunk_index = 0
+
+        # 現在の地形パターン（切り替えはWaveManagerのイベントから set_pattern() で行う）
         self.current_pattern = 0  # 0=Open, 1=NarrowTop, 2=NarrowBottom, 3=NarrowMiddle, 4=Wavy
-        self.pattern_timer = 0
-        self.pattern_duration = PATTERN_DURATION_EASY
 
         # Wave進行（game.pyから設定される）
         self.current_wave = 1
@@ -21,170 +131,204 @@ class TerrainManager:
         # 新しく生成された砲台を一時保存
         self.new_turrets = []
 
-    def update(self):
-        """地形システムの更新"""
-        # 既存セグメントの更新
-        for segment in self.segments:
-            segment.update()
+        # セグメントと同じ地形の列ごとの高さ（当たり判定用、セーブデータには含めず復元時に作り直す）
+        self.heightmap = TerrainHeightmap()
 
-        # 非アクティブなセグメントを削除
-        self.segments = [s for s in self.segments if s.active]
+    def update(self, streamer=None):
+        """
+        地形システムの更新
+
+        Args:
+            streamer: 先読み済みの塊を受け取るTerrainStreamer（Noneならその場で生成）
+        """
+        # スクロール（セグメントはワールド座標に固定なので動かさない）
+        self.scroll += TERRAIN_SCROLL_SPEED
+
+        # 画面の左から出たセグメントを削除（左から並んでいるので先頭だけ見る）
+        segments = self.segments
+        while segments and segments[0].x + segments[0].width < self.scroll:
+            del segments[0]
 
         # 新しいセグメント生成
         self.spawn_timer += 1
         if self.spawn_timer >= self.spawn_interval:
             self.spawn_timer = 0
-            self.spawn_segment()
-
-        # パターン切り替え
-        self.pattern_timer += 1
-        if self.pattern_timer >= self.pattern_duration:
-            self.pattern_timer = 0
-            self._next_pattern()
+            self.spawn_segment(streamer)
 
-    def spawn_segment(self):
-        """現在のパターンに基づいて新しいセグメントを生成"""
+    def chunk_key(self):
+        """次に出す塊のキー（generate_chunk() の引数）"""
         # Wave 1は常にOpenパターン
         if self.current_wave == 1:
             pattern_index = 0
         else:
             pattern_index = self.current_pattern
 
-        patterns = [
-            self._pattern_open,          # 0
-            self._pattern_narrow_top,    # 1
-            self._pattern_narrow_bottom, # 2
-            self._pattern_narrow_middle, # 3
-            self._pattern_wavy          # 4
-        ]
+        # Wave 2以降、確率で砲台を配置
+        spawn_chances = [0, 0, TURRET_SPAWN_CHANCE_WAVE_2, TURRET_SPAWN_CHANCE_WAVE_3, TURRET_SPAWN_CHANCE_WAVE_4]
+        spawn_chance = spawn_chances[min(self.current_wave, 4)]
+
+        prev = None
+        if self.segments:
+            prev = (self.segments[-1].top_height, self.segments[-1].bottom_height)
+        return (self.chunk_index, pattern_index, spawn_chance, self.segment_width, prev)
 
-        top_h, bottom_h = patterns[pattern_index]()
-        segment = TerrainSegment(SCREEN_WIDTH, top_h, bottom_h, self.segment_width)
+    def spawn_segment(self, streamer=None):
+        """
+        現在のパターンに基づいて新しいセグメントを生成
+
+        Args:
+            streamer: TerrainStreamer（先読みが外れた・間に合わなかった塊はその場で生成する）
+        """
+        key = self.chunk_key()
+        chunk = streamer.take(self.seed, key) if streamer is not None else None
+        if chunk is None:
+            chunk = generate_chunk(self.seed, key)
+            if streamer is not None:
+                streamer.seek(self.seed, next_chunk_key(key, chunk))
+        self.chunk_index += 1
+
+        top_h, bottom_h, turret_position = chunk
+        segment = TerrainSegment(self.scroll + SCREEN_WIDTH, top_h, bottom_h, self.segment_width)
         self.segments.append(segment)
+        self.heightmap.add_segment(segment.x, top_h, bottom_h, segment.width)
 
-        # Wave 2以降、確率で砲台を配置
-        if self.current_wave >= 2:
-            spawn_chances = [0, 0, TURRET_SPAWN_CHANCE_WAVE_2, TURRET_SPAWN_CHANCE_WAVE_3, TURRET_SPAWN_CHANCE_WAVE_4]
-            spawn_chance = spawn_chances[min(self.current_wave, 4)]
+        if turret_position is not None:
+            self.new_turrets.append(self._spawn_turret_on_segment(segment, turret_position))
 
-            if random.random() < spawn_chance:
-                turret = self._spawn_turret_on_segment(segment)
-                if turret:
-                    self.new_turrets.append(turret)
+    def set_pattern(self, pattern):
+        """
+        地形パターンを切り替え（WaveManagerのパターン切り替えイベントから呼ばれる）
 
-    def _next_pattern(self):
-        """次のパターンへ切り替え（Wave別）"""
-        if self.current_wave == 1:
-            # Wave 1: Openパターンのみ
-            self.current_pattern = 0
-        elif self.current_wave == 2:
-            # Wave 2: Open(30%), NarrowTop(35%), NarrowBottom(35%)
-            rand = random.random()
-            if rand < 0.3:
-                self.current_pattern = 0  # Open
-            elif rand < 0.65:
-                self.current_pattern = 1  # NarrowTop
-            else:
-                self.current_pattern = 2  # NarrowBottom
-        elif self.current_wave == 3:
-            # Wave 3: NarrowTop(25%), NarrowBottom(25%), Wavy(50%)
-            rand = random.random()
-            if rand < 0.25:
-                self.current_pattern = 1  # NarrowTop
-            elif rand < 0.5:
-                self.current_pattern = 2  # NarrowBottom
-            else:
-                self.current_pattern = 4  # Wavy
-        else:
-            # Wave 4以降: すべて均等（各20%）
-            self.current_pattern = random.randint(0, 4)
+        Args:
+            pattern: パターン番号（0-4、Wave別の出現率はステージ定義で指定）
+        """
+        self.current_pattern = pattern
 
     def set_wave(self, wave):
         """
-        現在のWaveを設定（game.pyから呼ばれる）
+        現在のWaveを設定（WaveManagerのWave開始イベントから呼ばれる）
 
         Args:
             wave: 現在のWave番号（1-4）
         """
         self.current_wave = wave
 
-        # Wave別のパターン持続時間を設定
-        if wave == 1:
-            self.pattern_duration = 9999  # Wave 1は永続（実質パターン変更なし）
-        elif wave == 2:
-            self.pattern_duration = PATTERN_DURATION_EASY  # 10秒
-        elif wave == 3:
-            self.pattern_duration = PATTERN_DURATION_NORMAL  # 8秒
-        else:
-            self.pattern_duration = PATTERN_DURATION_HARD  # 6秒
-
-    # === 地形パターン定義 ===
-
-    def _pattern_open(self):
-        """パターン0: 開けた空間 - 初心者向け"""
-        top = random.randint(0, 50)
-        bottom = random.randint(0, 50)
-        return top, bottom
-
-    def _pattern_narrow_top(self):
-        """パターン1: 上部が狭い"""
-        top = random.randint(100, 200)
-        bottom = random.randint(0, 50)
-        return top, bottom
-
-    def _pattern_narrow_bottom(self):
-        """パターン2: 下部が狭い"""
-        top = random.randint(0, 50)
-        bottom = random.randint(100, 200)
-        return top, bottom
-
-    def _pattern_narrow_middle(self):
-        """パターン3: 上下両方が狭い - 難易度高"""
-        top = random.randint(120, 180)
-        bottom = random.randint(120, 180)
-
-        # 最低限の通路幅を確保（150ピクセル）
-        if top + bottom > SCREEN_HEIGHT - 150:
-            top = min(top, 150)
-            bottom = SCREEN_HEIGHT - 150 - top
-
-        return top, bottom
-
-    def _pattern_wavy(self):
-        """パターン4: 波型の変化"""
-        # 前のセグメントから滑らかに変化
-        if self.segments:
-            prev = self.segments[-1]
-            top = prev.top_height + random.randint(-20, 20)
-            bottom = prev.bottom_height + random.randint(-20, 20)
-            top = max(0, min(top, 200))
-            bottom = max(0, min(bottom, 200))
-        else:
-            top = random.randint(50, 100)
-            bottom = random.randint(50, 100)
-
-        return top, bottom
-
     def draw(self, screen):
         """すべての地形セグメントを描画"""
         for segment in self.segments:
-            segment.draw(screen)
+            segment.draw(screen, self.scroll)
 
     def check_collision(self, rect):
         """
         指定されたRectが地形と衝突しているか判定
 
+        Rect 1つならセグメントのRect判定のほうが速い（高さマップの区間の max/min は
+        numpy の呼び出しが2回かかる）。点の配列は blocked() でまとめて判定する。
+
         Args:
-            rect: 判定対象のpygame.Rect
+            rect: 判定対象のpygame.Rect（画面座標）
 
         Returns:
             bool: 衝突している場合True
         """
+        rect = rect.move(self.scroll, 0)  # ワールド座標へ
         for segment in self.segments:
             if segment.collides_with(rect):
                 return True
         return False
 
+    def blocked(self, xs, ys):
+        """
+        点の配列のうち地形の中にあるもの（弾の一括判定用、TerrainHeightmap.blocked()）
+
+        Returns:
+            numpy.ndarray: bool配列
+        """
+        return self.heightmap.blocked(xs, ys, self.scroll)
+
+    def column_at(self, x):
+        """
+        X座標（画面座標）の地形の列を返す
+
+        セグメントは左から右へ並んでいるので二分探索で引く。
+
+        Returns:
+            TerrainSegment or None: xを含むセグメント（隙間ならNone）
+        """
+        return self._segment_at(x + self.scroll)
+
+    def _segment_at(self, x):
+        """ワールド座標xを含むセグメント"""
+        segments = self.segments
+        i = bisect_right(segments, x, key=lambda s: s.x) - 1
+        if i >= 0 and x < segments[i].x + segments[i].width:
+            return segments[i]
+        return None
+
+    def raycast(self, x, y, dx, dy, max_distance):
+        """
+        レイが最初に地形に当たる距離
+
+        レイが横切るセグメント（列）だけを順に調べ、列ごとに天井・床の
+        高さとの交点を計算する。
+
+        Args:
+            x, y: レイの始点
+            dx, dy: レイの向き（正規化不要）
+            max_distance: レイの長さ
+
+        Returns:
+            float or None: 始点から当たる点までの距離（当たらなければNone）
+        """
+        length = math.hypot(dx, dy)
+        segments = self.segments
+        if length == 0 or not segments:
+            return None
+        dx /= length
+        dy /= length
+
+        x += self.scroll  # 以降はワールド座標
+        if dx == 0:
+            segment = self._segment_at(x)
+            columns = [segment] if segment is not None else []
+        else:
+            end_x = x + dx * max_distance
+            lo, hi = (x, end_x) if dx > 0 else (end_x, x)
+            first = max(bisect_right(segments, lo, key=lambda s: s.x) - 1, 0)
+            last = bisect_right(segments, hi, key=lambda s: s.x)
+            columns = segments[first:last]
+            if dx < 0:
+                columns = columns[::-1]
+
+        for segment in columns:
+            # レイがこの列に入っている距離の区間 [t0, t1]
+            if dx == 0:
+                t0, t1 = 0.0, max_distance
+            else:
+                t0 = (segment.x - x) / dx
+                t1 = (segment.x + segment.width - x) / dx
+                if t0 > t1:
+                    t0, t1 = t1, t0
+                t0 = max(t0, 0.0)
+                t1 = min(t1, max_distance)
+                if t0 >= t1:
+                    continue
+
+            ceiling = segment.top_height
+            floor = SCREEN_HEIGHT - segment.bottom_height
+            y0 = y + dy * t0
+            if y0 < ceiling or y0 >= floor:
+                return t0
+            if dy < 0 and ceiling > 0:
+                t = (ceiling - y) / dy
+                if t <= t1:
+                    return t
+            elif dy > 0 and segment.bottom_height > 0:
+                t = (floor - y) / dy
+                if t <= t1:
+                    return t
+        return None
+
     def get_safe_spawn_y(self):
         """
         敵の安全な出現Y座標を取得（地形と重ならない位置）
@@ -205,42 +349,28 @@ class TerrainManager:
         # デフォルト（地形がない場合、または範囲が無効な場合）
         return random.randint(100, SCREEN_HEIGHT - 100)
 
-    def _spawn_turret_on_segment(self, segment):
+    def _spawn_turret_on_segment(self, segment, position):
         """
         セグメントに砲台を配置
 
         Args:
             segment: 地形セグメント
+            position: 'ceiling' または 'floor'（generate_chunk() が決めた配置）
 
         Returns:
-            Enemy or None: 生成された砲台敵
+            Enemy: 生成された砲台敵
         """
         from enemy import Enemy
 
-        # 天井または床にランダム配置（十分な高さがある方を選択）
-        can_spawn_ceiling = segment.top_height > 80  # TURRET_SIZE + margin
-        can_spawn_floor = segment.bottom_height > 80  # TURRET_SIZE + margin
-
-        if not can_spawn_ceiling and not can_spawn_floor:
-            return None  # 地形が薄すぎて配置できない
-
-        # 両方配置可能な場合はランダム、片方のみの場合はそちらを選択
-        if can_spawn_ceiling and can_spawn_floor:
-            spawn_on_ceiling = random.random() < 0.5
-        else:
-            spawn_on_ceiling = can_spawn_ceiling
-
         # 砲台の位置を計算
-        turret_x = segment.x + segment.width // 2
+        turret_x = segment.x + segment.width // 2  # 砲台は地形と同じワールド座標に固定
 
-        if spawn_on_ceiling:
+        if position == 'ceiling':
             # 天井砲台
             turret_y = segment.top_height - TURRET_SIZE
-            position = 'ceiling'
         else:
             # 床砲台
             turret_y = SCREEN_HEIGHT - segment.bottom_height
-            position = 'floor'
 
         # 砲台敵を生成
         turret = Enemy(turret_x, turret_y, ENEMY_TYPE_TURRET)
@@ -254,8 +384,6 @@ class TerrainManager:
         else:  # Wave 4以降
             turret.shoot_interval = TURRET_INTERVAL_WAVE_4
 
-        turret.shoot_cooldown = turret.shoot_interval
-
         return turret
 
     def get_new_turrets(self):
@@ -268,3 +396,35 @@ class TerrainManager:
         turrets = self.new_turrets.copy()
         self.new_turrets.clear()
         return turrets
+
+
+if __name__ == "__main__":
+    # 列ごとのレイ判定を、レイ上を細かく刻んで地形と点判定した結果と比較
+    random.seed(0)
+    manager = TerrainManager()
+    manager.set_wave(4)
+    for pattern in (1, 2, 3, 4):
+        manager.set_pattern(pattern)
+        for _ in range(3):
+            manager.spawn_segment()
+            manager.scroll += manager.segment_width  # 1セグメント分スクロール
+
+    def solid(px, py):
+        segment = manager.column_at(px)
+        return segment is not None and (py < segment.top_height or
+                                         py >= SCREEN_HEIGHT - segment.bottom_height)
+
+    checked = 0
+    for _ in range(500):
+        x, y = random.uniform(0, SCREEN_WIDTH), random.uniform(0, SCREEN_HEIGHT)
+        dx, dy = random.choice(((1, 0), (-1, 0), (0, 1), (random.uniform(-1, 1), random.uniform(-1, 1))))
+        length = math.hypot(dx, dy)
+        if length == 0:
+            continue
+        hit = manager.raycast(x, y, dx, dy, 600)
+        sampled = next((t / 4 for t in range(2400)
+                        if solid(x + dx / length * t / 4, y + dy / length * t / 4)), None)
+        assert (hit is None) == (sampled is None) and (hit is None or abs(hit - sampled) <= 0.25), \
+            f"raycast mismatch at {(x, y, dx, dy)}: {hit} vs {sampled}"
+        checked += 1
+    print(f"{len(manager.segments)} segments, {checked} rays match point sampling")
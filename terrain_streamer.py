@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+地形の塊の先読み生成（ワーカースレッド）
+
+TerrainManager は塊（1セグメント分の高さと砲台の配置）を generate_chunk() で
+種と通し番号から決める。TerrainStreamer はワーカースレッドで次の塊を同じ関数で
+先に生成し、描画済みのサーフェスと一緒に上限付きのキューへ入れておく。
+ゲームのスレッドはキューから取り出すだけで、生成も描画も待たない。
+
+先読みは「今のパターンが続く」前提なので、パターンやWaveの切り替え・セグメントの
+幅の変更・ロールバックで外れることがある。外れた（または間に合わなかった）塊は
+ゲームのスレッドがその場で generate_chunk() する（高さと砲台の配置だけなので数μs）。
+同じ関数・同じキーなので結果は先読みと一致し、先読みの有無で地形は変わらない。
+サーフェスがまだない塊は TerrainSegment.draw() で直接描く。
+
+Usage:
+    python terrain_streamer.py       # 生成・描画の時間と、同期生成との一致の確認
+"""
+
+import queue
+import threading
+import time
+import pygame
+from constants import *
+from terrain import TerrainSegment
+from terrain_manager import generate_chunk, next_chunk_key
+
+
+def render_chunk(top_height, bottom_height, width):
+    """
+    塊を透明色付きのサーフェスに描画（TerrainSegment.draw() と同じ見た目）
+
+    左右に TERRAIN_CHUNK_MARGIN の余白を取り、(segment.x - TERRAIN_CHUNK_MARGIN, 0) に描く。
+    透明色はRLEで圧縮するので、天井と床の間の空白はblitでほぼ読み飛ばされる。
+    """
+    surface = pygame.Surface((width + 2 * TERRAIN_CHUNK_MARGIN, SCREEN_HEIGHT))
+    surface.fill(TERRAIN_CHUNK_COLORKEY)
+    TerrainSegment(TERRAIN_CHUNK_MARGIN, top_height, bottom_height, width).draw(surface)
+    surface.set_colorkey(TERRAIN_CHUNK_COLORKEY, pygame.RLEACCEL)
+    return surface
+
+
+class TerrainStreamer:
+    """
+    地形の塊を先読みするワーカースレッドと、描画済みのサーフェスのキャッシュ
+
+    Game.terrain_streamer に設定すると TerrainManager.update() が take() で塊を受け取り、
+    描画は draw() がキャッシュのサーフェスを使い、Game.shutdown() で close() される。
+    """
+
+    def __init__(self, lookahead=TERRAIN_STREAM_LOOKAHEAD, cache_size=TERRAIN_SURFACE_CACHE_SIZE):
+        """
+        Args:
+            lookahead: 先読みする塊の数（キューの上限）
+            cache_size: 描画済みのサーフェスを保持する数
+        """
+        self.chunks = queue.Queue(lookahead)
+        self.cache_size = cache_size
+        # (top, bottom, width) → サーフェス（ワーカーが追加・削除し、描画は読むだけ）
+        self.surfaces = {}
+
+        # 先読みの開始位置（seek() で世代を進め、古い世代の塊は捨てる）
+        self.generation = 0
+        self.start = None  # (世代, 種, キー)
+        self.wake = threading.Event()
+        self.closed = False
+
+        # 統計（take/seek はゲームのスレッド、generated/generate_ms はワーカーだけが更新する）
+        self.hits = 0
+        self.misses = 0
+        self.discarded = 0
+        self.generated = 0
+        self.generate_ms = 0.0
+
+        # RLEの圧縮は最初のblitで行われるので、ワーカーで捨てblitして済ませておく
+        self._scratch = pygame.Surface((1, 1))
+
+        self.worker = threading.Thread(target=self._generate_loop, name="terrain-streamer", daemon=True)
+        self.worker.start()
+
+    def take(self, seed, key):
+        """
+        キーの塊を取り出す（ゲームのスレッドから呼ぶ、ブロックしない）
+
+        Returns:
+            tuple or None: generate_chunk() と同じ値（先読みがない・外れたらNone）
+        """
+        while True:
+            try:
+                generation, chunk_seed, chunk_key, chunk = self.chunks.get_nowait()
+            except queue.Empty:
+                break
+            if generation != self.generation:
+                self.discarded += 1  # seek() 前の先読み
+                continue
+            if chunk_seed == seed and chunk_key == key:
+                self.hits += 1
+                return chunk
+            self.discarded += 1  # パターンの切り替えなどで先読みが外れた
+            break
+        self.misses += 1
+        return None
+
+    def seek(self, seed, key):
+        """
+        先読みをキーの塊からやり直す（ゲームのスレッドから呼ぶ）
+
+        Args:
+            seed: 地形の乱数の種
+            key: 次に必要になる塊のキー
+        """
+        self.generation += 1
+        self.start = (self.generation, seed, key)
+        self.wake.set()
+
+    def _generate_loop(self):
+        """ワーカースレッド：塊を生成・描画してキューへ（満杯なら空くまで待つ）"""
+        while True:
+            self.wake.wait()
+            self.wake.clear()
+            if self.closed:
+                return
+            generation, seed, key = self.start
+            while generation == self.generation and not self.closed:
+                start = time.perf_counter()
+                chunk = generate_chunk(seed, key)
+                self._render(chunk[0], chunk[1], key[3])
+                self.generate_ms += (time.perf_counter() - start) * 1000
+                self.generated += 1
+
+                item = (generation, seed, key, chunk)
+                while generation == self.generation and not self.closed:
+                    try:
+                        self.chunks.put(item, timeout=0.05)
+                        break
+                    except queue.Full:
+                        pass
+                key = next_chunk_key(key, chunk)
+
+    def _render(self, top_height, bottom_height, width):
+        surface_key = (top_height, bottom_height, width)
+        if surface_key in self.surfaces:
+            return
+        surface = render_chunk(top_height, bottom_height, width)
+        self._scratch.blit(surface, (0, 0))
+        surfaces = self.surfaces
+        surfaces[surface_key] = surface
+        if len(surfaces) > self.cache_size:
+            del surfaces[next(iter(surfaces))]  # いちばん古いもの
+
+    def draw(self, screen, segments, scroll=0):
+        """
+        セグメントを描画（描画済みの塊はblit、なければ直接描く）
+
+        Args:
+            screen: 描画先
+            segments: TerrainSegment または TerrainView の列（ワールド座標）
+            scroll: 画面の左端のワールド座標
+        """
+        surfaces = self.surfaces
+        for segment in segments:
+            surface = surfaces.get((segment.top_height, segment.bottom_height, segment.width))
+            if surface is None:
+                segment.draw(screen, scroll)
+            else:
+                screen.blit(surface, (int(segment.x - scroll) - TERRAIN_CHUNK_MARGIN, 0))
+
+    def close(self):
+        """ワーカースレッドを止める"""
+        self.closed = True
+        self.wake.set()
+        self.worker.join()
+
+    def summary(self):
+        """先読みの統計（main.pyの終了時の表示用）"""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'discarded': self.discarded,
+            'generated': self.generated,
+            'avg_generate_ms': self.generate_ms / max(self.generated, 1),
+            'surfaces': len(self.surfaces),
+        }
+
+
+if __name__ == "__main__":
+    # パターンを切り替えながら地形を流し、先読みあり・なしで同じ地形になることと、
+    # ゲームのスレッドでの塊の取得・地形の描画の時間を比べる
+    import os
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    from terrain_manager import TerrainManager
+
+    pygame.init()
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    frames = 20000
+    schedule = {0: (2, 0), 3000: (2, 1), 6000: (3, 4), 9000: (3, 3), 12000: (4, 2), 15000: (4, 4)}
+
+    def play(streamer):
+        manager = TerrainManager(seed=1234)
+        heights = []
+        spawn_ms = draw_ms = 0.0
+        for frame in range(frames):
+            if frame in schedule:
+                wave, pattern = schedule[frame]
+                manager.set_wave(wave)
+                manager.set_pattern(pattern)
+            start = time.perf_counter()
+            manager.update(streamer)
+            spawn_ms += (time.perf_counter() - start) * 1000
+            if manager.spawn_timer == 0:  # このフレームで塊を出した
+                last = manager.segments[-1]
+                heights.append((last.top_height, last.bottom_height, len(manager.get_new_turrets())))
+            start = time.perf_counter()
+            if streamer is None:
+                manager.draw(screen)
+            else:
+                streamer.draw(screen, manager.segments, manager.scroll)
+            draw_ms += (time.perf_counter() - start) * 1000
+            time.sleep(0.0002)  # フレームの合間（ワーカーが先読みを進める）
+        return heights, spawn_ms / frames, draw_ms / frames
+
+    sync_heights, sync_update_ms, sync_draw_ms = play(None)
+    streamer = TerrainStreamer()
+    stream_heights, stream_update_ms, stream_draw_ms = play(streamer)
+    streamer.close()
+    stats = streamer.summary()
+
+    assert sync_heights == stream_heights, "streamed terrain differs from synchronous generation"
+    # 描画済みの塊のblitは直接描いたものとピクセル単位で同じ
+    direct = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+    blitted = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+    segments = [TerrainSegment(x, top, bottom)
+                for x, (top, bottom, _) in zip(range(-50, SCREEN_WIDTH, 100), sync_heights[100:])]
+    for segment in segments:
+        segment.draw(direct)
+        blitted.blit(render_chunk(segment.top_height, segment.bottom_height, segment.width),
+                     (segment.x - TERRAIN_CHUNK_MARGIN, 0))
+    assert pygame.image.tobytes(direct, 'RGB') == pygame.image.tobytes(blitted, 'RGB'), "chunk surface differs"
+
+    print(f"{len(sync_heights)} chunks over {frames} frames: streamed terrain matches synchronous generation")
+    print(f"  update (incl. spawn)  sync {sync_update_ms * 1000:7.1f} us/frame   "
+          f"streamed {stream_update_ms * 1000:7.1f} us/frame")
+    print(f"  draw terrain          sync {sync_draw_ms * 1000:7.1f} us/frame   "
+          f"streamed {stream_draw_ms * 1000:7.1f} us/frame")
+    print(f"  streamer: {stats['hits']} hits, {stats['misses']} misses, {stats['discarded']} discarded, "
+          f"{stats['generated']} generated ({stats['avg_generate_ms']:.3f} ms each on the worker), "
+          f"{stats['surfaces']} cached surfaces")
+    pygame.quit()
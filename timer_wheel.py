@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+階層タイマーホイール
+
+エンティティごとのクールダウンや時限効果を毎フレームのカウントダウンではなく、
+発火フレームで登録して時刻が来たときだけ処理する。
+
+各エンティティは `timers` 辞書に {名前: (発火フレーム, 周期)} を持つ（savestateで
+そのまま保存される）。ホイールには (発火フレーム, エンティティ, 名前) を登録し、
+発火時に辞書の値と一致するものだけエンティティの on_timer(名前) を呼ぶ。
+取り消し・再設定は辞書を書き換えるだけで、古い登録は発火時に読み捨てる。
+
+Usage:
+    python timer_wheel.py            # 毎フレームのカウントダウンとの比較ベンチマーク
+"""
+
+from constants import *
+
+
+class TimerWheel:
+    """
+    階層タイマーホイール（下位ホイールが一周するたびに上位のスロットを下ろす）
+
+    1段目は1フレーム単位、2段目以降はスロット数倍の粒度。
+    最上段の範囲を超える発火フレームはoverflowに置き、最上段が一周するたびに見直す。
+    """
+
+    def __init__(self, slot_bits=TIMER_WHEEL_SLOT_BITS, levels=TIMER_WHEEL_LEVELS):
+        self.now = 0
+        self.slot_bits = slot_bits
+        self.slots = 1 << slot_bits
+        self.mask = self.slots - 1
+        self.levels = levels
+        self.wheels = [[[] for _ in range(self.slots)] for _ in range(levels)]
+        self.overflow = []
+        self.fired = 0  # 累計発火数
+
+    def schedule(self, owner, name, delay, period=0):
+        """
+        delayフレーム後に発火するタイマーを設定（同名のタイマーは置き換え）
+
+        Args:
+            owner: timers辞書と on_timer(name) を持つエンティティ
+            name: タイマー名
+            delay: 発火までのフレーム数（1以上）
+            period: 0より大きければ以後periodフレームごとに繰り返す
+        """
+        deadline = self.now + max(1, delay)
+        owner.timers[name] = (deadline, period)
+        self._insert(deadline, owner, name)
+
+    def cancel(self, owner, name):
+        """タイマーを取り消す（ホイール上の登録は発火時に読み捨てる）"""
+        owner.timers.pop(name, None)
+
+    def remaining(self, owner, name):
+        """発火までの残りフレーム数（未設定なら0、HUDの残り時間表示用）"""
+        entry = owner.timers.get(name)
+        return entry[0] - self.now if entry is not None else 0
+
+    def pending(self, owner, name):
+        """タイマーが設定中か"""
+        return name in owner.timers
+
+    def _insert(self, deadline, owner, name):
+        delta = deadline - self.now
+        bits = self.slot_bits
+        for level in range(self.levels):
+            if delta < 1 << (bits * (level + 1)):
+                self.wheels[level][(deadline >> (bits * level)) & self.mask].append((deadline, owner, name))
+                return
+        self.overflow.append((deadline, owner, name))
+
+    def _cascade(self, level):
+        """上位ホイールの現在スロットを下位へ配り直す"""
+        if level >= self.levels:
+            entries, self.overflow = self.overflow, []
+            for entry in entries:
+                self._insert(*entry)
+            return
+
+        index = (self.now >> (self.slot_bits * level)) & self.mask
+        if index == 0:
+            self._cascade(level + 1)
+        entries = self.wheels[level][index]
+        if entries:
+            self.wheels[level][index] = []
+            for entry in entries:
+                self._insert(*entry)
+
+    def advance(self):
+        """1フレーム進めて、時刻が来たタイマーを発火させる"""
+        self.now += 1
+        now = self.now
+        index = now & self.mask
+        if index == 0:
+            self._cascade(1)
+
+        entries = self.wheels[0][index]
+        if not entries:
+            return
+        self.wheels[0][index] = []
+
+        for deadline, owner, name in entries:
+            timers = owner.timers
+            entry = timers.get(name)
+            if entry is None or entry[0] != deadline:
+                continue  # 取り消し・再設定済み
+            if not getattr(owner, 'active', True):
+                del timers[name]  # 消えたエンティティの繰り返しタイマーを止める
+                continue
+
+            period = entry[1]
+            if period > 0:
+                timers[name] = (deadline + period, period)
+                self._insert(deadline + period, owner, name)
+            else:
+                del timers[name]
+            self.fired += 1
+            owner.on_timer(name)
+
+    def rebuild(self, now, owners):
+        """
+        時刻とエンティティのtimers辞書からホイールを作り直す（savestate復元用）
+
+        Args:
+            now: 復元後の現在フレーム
+            owners: timers辞書を持つエンティティのイテラブル
+        """
+        self.now = now
+        self.wheels = [[[] for _ in range(self.slots)] for _ in range(self.levels)]
+        self.overflow = []
+        for owner in owners:
+            for name, (deadline, _) in owner.timers.items():
+                self._insert(deadline, owner, name)
+
+    def __len__(self):
+        """ホイール上の登録数（読み捨て前の古い登録を含む）"""
+        return sum(len(slot) for wheel in self.wheels for slot in wheel) + len(self.overflow)
+
+
+if __name__ == "__main__":
+    # 敵5000体の射撃間隔を、毎フレームのカウントダウンとホイールで比較
+    import random
+    import time
+
+    class Counter:
+        def __init__(self, interval):
+            self.active = True
+            self.interval = interval
+            self.cooldown = interval
+            self.timers = {}
+            self.shots = 0
+
+        def on_timer(self, name):
+            self.shots += 1
+
+    random.seed(0)
+    frames = 600
+    intervals = [random.choice((30, 60, 90, 120)) for _ in range(5000)]
+
+    entities = [Counter(i) for i in intervals]
+    start = time.perf_counter()
+    for _ in range(frames):
+        for e in entities:
+            if e.cooldown > 0:
+                e.cooldown -= 1
+            else:
+                e.cooldown = e.interval
+                e.shots += 1
+    countdown = time.perf_counter() - start
+    countdown_shots = sum(e.shots for e in entities)
+
+    entities = [Counter(i) for i in intervals]
+    wheel = TimerWheel()
+    for e in entities:
+        wheel.schedule(e, 'shoot', e.interval + 1, e.interval + 1)
+    start = time.perf_counter()
+    for _ in range(frames):
+        wheel.advance()
+    wheeled = time.perf_counter() - start
+    wheel_shots = sum(e.shots for e in entities)
+
+    print(f"{len(entities)} timers, {frames} frames")
+    print(f"  countdown: {countdown / frames * 1000:.3f} ms/frame ({countdown_shots} shots)")
+    print(f"  wheel:     {wheeled / frames * 1000:.3f} ms/frame ({wheel_shots} shots)")
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+三角関数と周期パターンのルックアップテーブル
+
+time_alive だけで決まる周期関数は、1周期を標本化した表（PeriodicTable）を
+time_alive で引ける。表は最も近い標本を返すので、誤差は 1/(2×標本数) フレーム分の
+変化量以下になる。新しいパターンは precompute() で名前を付けて登録する。
+
+描画の回転する八角形（角度は整数度、45度周期）と爆発のパーティクルの方向
+（等間隔の角度）は取りうる値が少ないので、誤差なしの値をキャッシュする。
+
+CPythonでは math.sin / math.cos は1回のC関数呼び出しで、表を引く
+（浮動小数点の添字の計算・int()・リストの参照）ほうが遅い。そのため
+敵・ボスの移動（1〜2回の sin/cos）は表にせず、表は1回で複数の三角関数と
+変換をまとめて省けるところ（八角形の8頂点、爆発のパーティクル、ボスのパルス）
+だけで使う。移動パターンを表にした場合の誤差と速さは __main__ で比較できる。
+
+Usage:
+    python trig_tables.py            # スカラー計算との誤差と速さの比較
+"""
+
+import math
+from constants import *
+
+
+class PeriodicTable:
+    """
+    周期 period フレームの関数 func(t) を標本化した表
+
+    at(time_alive) は最も近い標本の値を返す（funcの戻り値はタプルでもよい）。
+    """
+
+    def __init__(self, func, period, samples_per_frame=TRIG_SAMPLES_PER_FRAME):
+        self.func = func
+        self.period = period
+        self.samples = max(1, int(math.ceil(period * samples_per_frame)))
+        self.scale = self.samples / period
+        self.table = [func(i / self.scale) for i in range(self.samples)]
+
+    def at(self, time_alive):
+        return self.table[int(time_alive * self.scale + 0.5) % self.samples]
+
+    def max_error(self, frames):
+        """0〜framesフレームでのスカラー計算との最大の差（タプルは成分ごと）"""
+        error = 0.0
+        for t in range(frames):
+            exact = self.func(t)
+            value = self.at(t)
+            if isinstance(exact, tuple):
+                error = max(error, max(abs(a - b) for a, b in zip(exact, value)))
+            else:
+                error = max(error, abs(exact - value))
+        return error
+
+
+_tables = {}
+
+
+def precompute(name, func, period, samples_per_frame=TRIG_SAMPLES_PER_FRAME):
+    """
+    パターンを標本化して登録（同名は置き換え）
+
+    Args:
+        name: パターン名（table(name) で引く）
+        func: time_alive（float）→ 値 の周期関数
+        period: 周期（フレーム）
+        samples_per_frame: 1フレームあたりの標本数
+
+    Returns:
+        PeriodicTable
+    """
+    table = _tables[name] = PeriodicTable(func, period, samples_per_frame)
+    return table
+
+
+def table(name):
+    """登録済みのパターン"""
+    return _tables[name]
+
+
+# ボスのパルスの半径（Enemy.draw()、整数への切り捨てが標本の境目で1ずれることがある）
+precompute('boss_pulse', lambda t: int(10 + abs(math.sin(t * 0.1) * 10)), 2 * math.pi / 0.1)
+
+
+_octagons = {}
+
+
+def octagon_offsets(radius, rotation):
+    """
+    中心からの正八角形の頂点（rotation度回転、45度周期なので45通り×半径）
+
+    Args:
+        radius: 外接円の半径
+        rotation: 回転角（整数度）
+    """
+    key = (radius, rotation % 45)
+    points = _octagons.get(key)
+    if points is None:
+        points = _octagons[key] = tuple(
+            (radius * math.cos(math.radians(i * 45 + key[1])), radius * math.sin(math.radians(i * 45 + key[1])))
+            for i in range(8))
+    return points
+
+
+_rings = {}
+
+
+def ring(count):
+    """円周を count 等分した方向の単位ベクトル（爆発のパーティクル）"""
+    vectors = _rings.get(count)
+    if vectors is None:
+        vectors = _rings[count] = tuple(
+            (math.cos(math.radians(360 / count * i)), math.sin(math.radians(360 / count * i)))
+            for i in range(count))
+    return vectors
+
+
+if __name__ == "__main__":
+    # 移動パターン（WAVE型・ボス1〜3）と描画のパターンを表にしたときの誤差と、
+    # Enemy.update() / draw() と同じ形のスカラー計算との1回あたりの時間の比較
+    import timeit
+
+    class Probe:
+        time_alive = 1234
+        x = 600.0
+        y = 300.0
+        initial_y = 300.0
+
+    e = Probe()
+    half = SCREEN_HEIGHT // 2
+    wave = PeriodicTable(lambda t: math.sin(t * 0.05) * 50, 2 * math.pi / 0.05)
+    boss_1 = PeriodicTable(lambda t: math.sin(t * 0.02) * 100, 2 * math.pi / 0.02)
+    boss_2 = PeriodicTable(lambda t: (math.cos(t * 0.015) * 50, math.sin(t * 0.03) * 80), 2 * math.pi / 0.015)
+    boss_3 = PeriodicTable(lambda t: (math.cos(t * 0.04) * 80, math.sin(t * 0.04) * 120), 2 * math.pi / 0.04)
+    pulse = table('boss_pulse')
+
+    def boss_2_scalar():
+        e.y = half + math.sin(e.time_alive * 0.03) * 80
+        e.x = 600 + math.cos(e.time_alive * 0.015) * 50
+
+    def boss_2_table():
+        dx, dy = boss_2.at(e.time_alive)
+        e.y = half + dy
+        e.x = 600 + dx
+
+    def boss_3_scalar():
+        angle = e.time_alive * 0.04
+        e.y = half + math.sin(angle) * 120
+        e.x = 600 + math.cos(angle) * 80
+
+    def boss_3_table():
+        dx, dy = boss_3.at(e.time_alive)
+        e.y = half + dy
+        e.x = 600 + dx
+
+    def octagon_scalar(t):
+        return [(100 + 40 * math.cos(math.radians(i * 45 + t * 2)),
+                 100 + 40 * math.sin(math.radians(i * 45 + t * 2))) for i in range(8)]
+
+    def octagon_table(t):
+        return [(100 + dx, 100 + dy) for dx, dy in octagon_offsets(40, t * 2)]
+
+    def ring_scalar():
+        return [(math.cos(math.radians(360 / 12 * i)), math.sin(math.radians(360 / 12 * i))) for i in range(12)]
+
+    frames = 36000  # 10分
+    # 八角形は45度ずらすと頂点の順番だけが変わるので、各頂点を最も近い頂点と比べる
+    octagon_error = max(min(max(abs(px - qx), abs(py - qy)) for qx, qy in octagon_scalar(t))
+                        for t in range(360) for px, py in octagon_table(t))
+    rows = [
+        ('wave enemy (move)', wave.samples, wave.max_error(frames),
+         lambda: setattr(e, 'y', e.initial_y + math.sin(e.time_alive * 0.05) * 50),
+         lambda: setattr(e, 'y', e.initial_y + wave.at(e.time_alive))),
+        ('boss_1 (move)', boss_1.samples, boss_1.max_error(frames),
+         lambda: setattr(e, 'y', half + math.sin(e.time_alive * 0.02) * 100),
+         lambda: setattr(e, 'y', half + boss_1.at(e.time_alive))),
+        ('boss_2 (move)', boss_2.samples, boss_2.max_error(frames), boss_2_scalar, boss_2_table),
+        ('boss_3 (move)', boss_3.samples, boss_3.max_error(frames), boss_3_scalar, boss_3_table),
+        ('boss pulse (draw)', pulse.samples, pulse.max_error(frames),
+         lambda: int(10 + abs(math.sin(e.time_alive * 0.1) * 10)), lambda: pulse.at(e.time_alive)),
+        ('boss octagon (draw)', 8, octagon_error, lambda: octagon_scalar(1234), lambda: octagon_table(1234)),
+        ('explosion ring (12)', 12, 0.0, ring_scalar, lambda: ring(12)),
+    ]
+    print(f"{'pattern':<22}{'samples':>8}{'max error':>11}{'scalar':>9}{'table':>8}  "
+          f"(ns per call; error over {frames} frames)")
+    for name, samples, error, scalar, lookup in rows:
+        scalar_ns = min(timeit.repeat(scalar, number=50000, repeat=7)) / 50000 * 1e9
+        table_ns = min(timeit.repeat(lookup, number=50000, repeat=7)) / 50000 * 1e9
+        print(f"{name:<22}{samples:>8}{error:>11.4f}{scalar_ns:>9.0f}{table_ns:>8.0f}")
@@ -1,181 +1,368 @@
+import heapq
+import json
+import math
+import os
 import random
+from collections import namedtuple
 from constants import *
 from enemy import Enemy
 
+# stages.json で使う名前と内部値の対応
+ENEMY_TYPES = {
+    'straight': ENEMY_TYPE_STRAIGHT,
+    'wave': ENEMY_TYPE_WAVE,
+    'charge': ENEMY_TYPE_CHARGE,
+    'tank': ENEMY_TYPE_TANK,
+    'boss_1': ENEMY_TYPE_BOSS_1,
+    'boss_2': ENEMY_TYPE_BOSS_2,
+    'boss_3': ENEMY_TYPE_BOSS_3,
+}
+TERRAIN_PATTERNS = {
+    'open': 0,
+    'narrow_top': 1,
+    'narrow_bottom': 2,
+    'narrow_middle': 3,
+    'wavy': 4,
+}
+
+# 予定イベントの種類
+EVENT_WAVE = 'wave'        # Wave開始（引数: Waveのインデックス）
+EVENT_SPAWN = 'spawn'      # 通常敵の出現
+EVENT_BOSS = 'boss'        # ボス出現
+EVENT_PATTERN = 'pattern'  # 地形パターン切り替え
+
+# コンパイル済みのステージ定義
+# 重み付きテーブルは [(累積の重み, 値), ...]、ランダムボスの種類は [(値, 開始時の重み, 最大難易度での重み), ...]
+WaveDef = namedtuple('WaveDef', [
+    'number', 'start', 'end', 'spawn_interval', 'spawn_jitter', 'enemy_count', 'enemies',
+    'boss_type', 'random_bosses', 'pattern_duration', 'patterns'])
+RandomBosses = namedtuple('RandomBosses', [
+    'max_simultaneous', 'min_interval', 'chance_start', 'chance_end', 'ramp', 'types'])
+StageDef = namedtuple('StageDef', ['name', 'waves'])
+
+_stages = {}
+
+
+def _weight_table(weights, names, context):
+    """{名前: 重み} を累積の重みテーブルに変換（合計は1に正規化）"""
+    total = float(sum(weights.values()))
+    if not weights or total <= 0:
+        raise ValueError(f"{context}: weights must not be empty")
+    table = []
+    cumulative = 0.0
+    for name, weight in weights.items():
+        if name not in names:
+            raise ValueError(f"{context}: unknown name '{name}'")
+        cumulative += weight / total
+        table.append((cumulative, names[name]))
+    return tuple(table)
+
+
+def _choose(table):
+    """累積の重みテーブルから1つ選ぶ（乱数は1回だけ引く）"""
+    rand = random.random()
+    for cumulative, value in table:
+        if rand < cumulative:
+            return value
+    return table[-1][1]
+
+
+def _compile_wave(data, context, spawn_interval):
+    """Wave定義1件をWaveDefに変換（spawn_interval は出現間隔の既定値）"""
+    random_bosses = data.get('random_bosses')
+    if random_bosses is not None:
+        chance_start, chance_end = random_bosses['chance']
+        types = []
+        for name, (weight_start, weight_end) in random_bosses['types'].items():
+            if name not in ENEMY_TYPES:
+                raise ValueError(f"{context}: unknown boss '{name}'")
+            types.append((ENEMY_TYPES[name], weight_start, weight_end))
+        random_bosses = RandomBosses(random_bosses['max_simultaneous'], random_bosses['min_interval'],
+                                     chance_start, chance_end, random_bosses['ramp'], tuple(types))
+
+    boss = data.get('boss')
+    if boss is not None and boss not in ENEMY_TYPES:
+        raise ValueError(f"{context}: unknown boss '{boss}'")
+
+    return WaveDef(
+        data['wave'],
+        data['start'],
+        data.get('end'),
+        data.get('spawn_interval', spawn_interval),
+        data.get('spawn_jitter', 0),
+        data.get('enemy_count'),
+        _weight_table(data['enemies'], ENEMY_TYPES, context + ' enemies'),
+        ENEMY_TYPES[boss] if boss is not None else None,
+        random_bosses,
+        data.get('pattern_duration'),
+        _weight_table(data.get('patterns', {'open': 1.0}), TERRAIN_PATTERNS, context + ' patterns'),
+    )
+
+
+def _stage_path(path):
+    """定義ファイル（Noneならモジュールと同じ場所の STAGE_FILE）"""
+    if path is None:
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), STAGE_FILE)
+    return path
+
+
+def _compile_stage(name, data, spawn_interval):
+    """ステージ1件をStageDefに変換"""
+    waves = tuple(_compile_wave(w, f"stage '{name}' wave {w.get('wave')}", spawn_interval)
+                  for w in data['waves'])
+    waves = tuple(sorted(waves, key=lambda w: w.start))
+    if not waves or waves[0].start != 0:
+        raise ValueError(f"stage '{name}': the first wave must start at frame 0")
+    return StageDef(name, waves)
+
+
+def load_stage(name=DEFAULT_STAGE, path=None):
+    """
+    ステージ定義を読み込む（名前ごとにキャッシュ）
+
+    Args:
+        name: stages.json 内のステージ名
+        path: 定義ファイル（Noneならモジュールと同じ場所の STAGE_FILE）
+
+    Returns:
+        StageDef
+    """
+    stage = _stages.get(name)
+    if stage is not None:
+        return stage
+
+    with open(_stage_path(path), encoding='utf-8') as f:
+        stages = json.load(f)
+    if name not in stages:
+        raise ValueError(f"unknown stage '{name}' (available: {', '.join(sorted(stages))})")
+
+    stage = _compile_stage(name, stages[name], ENEMY_SPAWN_INTERVAL)
+    _stages[name] = stage
+    return stage
+
+
+def compile_stages(path=None, spawn_interval=None):
+    """
+    定義ファイルのすべてのステージをコンパイル（キャッシュには入れない）
+
+    live_tuning の監視スレッドが読み直しに使い、できあがった辞書を
+    ゲームのスレッドが install_stages() で差し替える。
+
+    Args:
+        path: 定義ファイル（Noneならモジュールと同じ場所の STAGE_FILE）
+        spawn_interval: 出現間隔の既定値（Noneなら現在の ENEMY_SPAWN_INTERVAL）
+
+    Returns:
+        dict: ステージ名 → StageDef
+    """
+    if spawn_interval is None:
+        spawn_interval = ENEMY_SPAWN_INTERVAL
+    with open(_stage_path(path), encoding='utf-8') as f:
+        stages = json.load(f)
+    return {name: _compile_stage(name, data, spawn_interval) for name, data in stages.items()}
+
+
+def install_stages(stages):
+    """ステージ定義のキャッシュを compile_stages() の結果に差し替える（辞書ごと入れ替える）"""
+    global _stages
+    _stages = stages
+
+
 class WaveManager:
-    def __init__(self):
+    """
+    Wave進行・敵出現の管理
+
+    ステージ定義からWave開始・敵出現・ボス出現・地形パターン切り替えを
+    (フレーム, 連番, 種類, 引数) のイベントとして優先度付きキューに積み、
+    update()は先頭のイベントの時刻が来たときだけ処理する。
+    出現間隔の揺らぎやボス出現までの待ち時間は、イベントを積む時点で先に乱数を引いておく。
+    """
+
+    def __init__(self, stage=DEFAULT_STAGE):
+        self.stage = stage
         self.game_time = 0
-        self.spawn_timer = 0
-        self.current_wave = 1
+        self.wave_index = 0
+        self.current_wave = load_stage(stage).waves[0].number
         self.enemies_spawned_this_wave = 0
-        self.boss_spawned = False  # ボスが既に出現したかのフラグ（Wave 1-3用）
-        self.boss_active = False   # ボスがまだ生存しているかのフラグ（Wave 1-3用）
+        self.boss_spawned = False  # ボスが既に出現したかのフラグ（固定ボスのWave用）
+        self.boss_active = False   # ボスがまだ生存しているかのフラグ（固定ボスのWave用）
 
-        # Wave 4用の新規プロパティ
+        # ランダムボス（Wave 4）用
         self.last_boss_spawn_time = 0      # 最後にボスを出現させた時刻
         self.active_boss_count = 0          # 現在アクティブなボス数
-        self.wave4_start_time = 0           # Wave 4が始まった時刻
+        self.boss_ramp_start = 0            # 難易度上昇の起点（Wave開始時刻）
+        self.boss_pending = False           # 次のボス出現を予定済みか
+
+        # 予定イベントのヒープ（タプルのリストなのでsavestateでそのまま保存できる）
+        self.events = []
+        self.event_seq = 0
+        self._schedule_waves(0)
+
+    @property
+    def _wave(self):
+        return load_stage(self.stage).waves[self.wave_index]
 
-    def update(self):
+    def _push(self, frame, kind, arg=None):
+        heapq.heappush(self.events, (frame, self.event_seq, kind, arg))
+        self.event_seq += 1
+
+    def _drop_events(self, kinds):
+        """指定種類の予定を取り消す"""
+        self.events = [e for e in self.events if e[2] not in kinds]
+        heapq.heapify(self.events)
+
+    def _schedule_waves(self, time):
+        """指定時刻以降に始まるWaveの開始イベントを積む"""
+        for index, wave in enumerate(load_stage(self.stage).waves):
+            if wave.start >= time:
+                self._push(wave.start, EVENT_WAVE, index)
+
+    def next_event_time(self):
+        """次のイベントのフレーム（なければNone）"""
+        return self.events[0][0] if self.events else None
+
+    def update(self, terrain_manager=None):
+        """
+        1フレーム進め、時刻が来たイベントを処理する
+
+        Args:
+            terrain_manager: Wave変更・地形パターン切り替えの通知先
+
+        Returns:
+            list: このフレームに出現した敵
+        """
         self.game_time += 1
-        self.spawn_timer += 1
-
-        # Update current wave based on time
-        if self.game_time < WAVE_1_END:
-            new_wave = 1
-        elif self.game_time < WAVE_2_END:
-            new_wave = 2
-        elif self.game_time < WAVE_3_END:
-            new_wave = 3
-        else:
-            new_wave = 4
-
-        # Reset counter when wave changes
-        if new_wave != self.current_wave:
-            self.current_wave = new_wave
-            self.enemies_spawned_this_wave = 0
-            self.boss_spawned = False
-            self.boss_active = False
-
-            # Wave 4に入った時の初期化
-            if new_wave == 4:
-                self.wave4_start_time = self.game_time
-                self.active_boss_count = 0
-                self.last_boss_spawn_time = self.game_time
-
-    def should_spawn_enemy(self):
-        """Check if it's time to spawn an enemy"""
-        # Vary spawn interval slightly
-        spawn_interval = ENEMY_SPAWN_INTERVAL + random.randint(-20, 20)
-
-        if self.spawn_timer >= spawn_interval:
-            self.spawn_timer = 0
-            return True
-        return False
-
-    def should_spawn_boss_in_wave4(self):
-        """Wave 4でボスを出現させるべきかを判定"""
-        # Wave 4でない場合は出現しない
-        if self.current_wave != 4:
-            return False
-
-        # 同時出現制限チェック
-        if self.active_boss_count >= WAVE4_MAX_SIMULTANEOUS_BOSSES:
-            return False
-
-        # 最低出現間隔チェック
-        if self.game_time - self.last_boss_spawn_time < WAVE4_MIN_BOSS_INTERVAL:
-            return False
-
-        # Wave 4内での経過時間を計算
-        elapsed_in_wave4 = self.game_time - self.wave4_start_time
-        elapsed_seconds = elapsed_in_wave4 / 60.0
-
-        # 時間経過に応じた出現確率（5%から25%まで段階的に上昇）
-        boss_spawn_chance = min(
-            WAVE4_INITIAL_BOSS_CHANCE + (elapsed_seconds / (WAVE4_DIFFICULTY_RAMP_TIME / 60.0)) * (WAVE4_MAX_BOSS_CHANCE - WAVE4_INITIAL_BOSS_CHANCE),
-            WAVE4_MAX_BOSS_CHANCE
-        )
-
-        # 確率判定
-        return random.random() < boss_spawn_chance
-
-    def select_boss_type_for_wave4(self):
-        """Wave 4で出現させるボスの種類を選択"""
-        elapsed_in_wave4 = self.game_time - self.wave4_start_time
-        elapsed_seconds = elapsed_in_wave4 / 60.0
-
-        # 難易度係数 (0.0 ~ 1.0)
-        difficulty_factor = min(elapsed_seconds / (WAVE4_DIFFICULTY_RAMP_TIME / 60.0), 1.0)
-
-        # ボス種類の重み計算
-        boss_1_weight = max(0.70 - difficulty_factor * 0.55, 0.15)
-        boss_2_weight = 0.25 + difficulty_factor * 0.05
-        boss_3_weight = 0.05 + difficulty_factor * 0.50
-
-        # 重み付きランダム選択
-        rand = random.random()
-
-        if rand < boss_1_weight:
-            return ENEMY_TYPE_BOSS_1
-        elif rand < boss_1_weight + boss_2_weight:
-            return ENEMY_TYPE_BOSS_2
-        else:
-            return ENEMY_TYPE_BOSS_3
+        spawned = []
+        events = self.events
+        while events and events[0][0] <= self.game_time:
+            _, _, kind, arg = heapq.heappop(events)
+            if kind == EVENT_WAVE:
+                self._enter_wave(arg, terrain_manager)
+                events = self.events  # Wave開始で作り直される
+            elif kind == EVENT_SPAWN:
+                spawned.append(self._spawn_enemy())
+            elif kind == EVENT_BOSS:
+                spawned.append(self._spawn_boss())
+            elif kind == EVENT_PATTERN:
+                self._change_pattern(terrain_manager)
+        return spawned
 
-    def spawn_enemy(self):
-        """Spawn an enemy based on current wave"""
-        enemy_type = None
+    def _enter_wave(self, index, terrain_manager):
+        """Waveを開始し、そのWaveの最初のイベントを積む"""
+        self.wave_index = index
+        wave = self._wave
+        self.current_wave = wave.number
+        self.enemies_spawned_this_wave = 0
+        self.boss_spawned = False
+        self.boss_active = False
+        self.boss_pending = False
+
+        # 前のWaveの予定は破棄（Wave開始イベントだけ残す）
+        self.events = [e for e in self.events if e[2] == EVENT_WAVE]
+        heapq.heapify(self.events)
+
+        if wave.random_bosses is not None:
+            self.active_boss_count = 0
+            self.boss_ramp_start = self.game_time
+            self.last_boss_spawn_time = self.game_time
+            self._schedule_random_boss()
+
+        if wave.enemy_count != 0:
+            self._schedule_spawn()
+        elif wave.boss_type is not None:
+            self._push(self.game_time + 1, EVENT_BOSS)
+
+        if wave.pattern_duration:
+            self._push(self.game_time + wave.pattern_duration, EVENT_PATTERN)
+
+        if terrain_manager is not None:
+            terrain_manager.set_wave(wave.number)
+
+    def _schedule_spawn(self):
+        """次の通常敵の出現を積む（間隔の揺らぎはここで決める）"""
+        wave = self._wave
+        delay = wave.spawn_interval + random.randint(-wave.spawn_jitter, wave.spawn_jitter)
+        self._push(self.game_time + max(1, delay), EVENT_SPAWN)
+
+    def _spawn_enemy(self):
+        """通常敵を出現させ、次の出現（または規定数に達したらボス）を積む"""
+        wave = self._wave
         x = SCREEN_WIDTH + 50
         y = random.randint(50, SCREEN_HEIGHT - 100)
+        enemy_type = _choose(wave.enemies)
+        self.enemies_spawned_this_wave += 1
+
+        if wave.enemy_count is None or self.enemies_spawned_this_wave < wave.enemy_count:
+            self._schedule_spawn()
+        elif wave.boss_type is not None:
+            # 規定数を出し終えたら次のフレームでボス
+            self._push(self.game_time + 1, EVENT_BOSS)
 
-        # Wave 1: Only straight enemies + boss
-        if self.current_wave == 1:
-            if self.enemies_spawned_this_wave < 10:
-                if self.should_spawn_enemy():
-                    enemy_type = ENEMY_TYPE_STRAIGHT
-                    self.enemies_spawned_this_wave += 1
-            elif not self.boss_spawned:
-                # 10体倒した後にボスを出現
-                enemy_type = ENEMY_TYPE_BOSS_1
-                y = SCREEN_HEIGHT // 2  # ボスは中央に出現
-                self.boss_spawned = True
-                self.boss_active = True
-
-        # Wave 2: Wave pattern enemies + boss
-        elif self.current_wave == 2:
-            if self.enemies_spawned_this_wave < 8:
-                if self.should_spawn_enemy():
-                    enemy_type = ENEMY_TYPE_WAVE
-                    self.enemies_spawned_this_wave += 1
-            elif not self.boss_spawned:
-                # 8体倒した後にボスを出現
-                enemy_type = ENEMY_TYPE_BOSS_2
-                y = SCREEN_HEIGHT // 2
-                self.boss_spawned = True
-                self.boss_active = True
-
-        # Wave 3: Charge enemies + some straight + boss
-        elif self.current_wave == 3:
-            if self.enemies_spawned_this_wave < 10:
-                if self.should_spawn_enemy():
-                    if random.random() < 0.6:
-                        enemy_type = ENEMY_TYPE_CHARGE
-                    else:
-                        enemy_type = ENEMY_TYPE_STRAIGHT
-                    self.enemies_spawned_this_wave += 1
-            elif not self.boss_spawned:
-                # 10体倒した後にボスを出現
-                enemy_type = ENEMY_TYPE_BOSS_3
-                y = SCREEN_HEIGHT // 2
-                self.boss_spawned = True
-                self.boss_active = True
-
-        # Wave 4: All types mixed, infinite + ランダムボス出現
+        return Enemy(x, y, enemy_type)
+
+    def _spawn_boss(self):
+        """ボスを出現させる（ボスは中央に出現）"""
+        wave = self._wave
+        if wave.random_bosses is None:
+            enemy_type = wave.boss_type
+            self.boss_spawned = True
+            self.boss_active = True
         else:
-            # まずボス出現をチェック
-            if self.should_spawn_boss_in_wave4():
-                # ボスを出現
-                enemy_type = self.select_boss_type_for_wave4()
-                y = SCREEN_HEIGHT // 2
-                self.last_boss_spawn_time = self.game_time
-                self.active_boss_count += 1
-            elif self.should_spawn_enemy():
-                # 通常敵を出現
-                rand = random.random()
-                if rand < 0.3:
-                    enemy_type = ENEMY_TYPE_STRAIGHT
-                elif rand < 0.5:
-                    enemy_type = ENEMY_TYPE_WAVE
-                elif rand < 0.8:
-                    enemy_type = ENEMY_TYPE_CHARGE
-                else:
-                    enemy_type = ENEMY_TYPE_TANK
-
-        if enemy_type is not None:
-            return Enemy(x, y, enemy_type)
-
-        return None
+            enemy_type = self.select_random_boss_type()
+            self.active_boss_count += 1
+            self.last_boss_spawn_time = self.game_time
+            self.boss_pending = False
+            self._schedule_random_boss()
+        return Enemy(SCREEN_WIDTH + 50, SCREEN_HEIGHT // 2, enemy_type)
+
+    def _difficulty(self, time):
+        """ランダムボスWaveの難易度係数 (0.0 ~ 1.0)"""
+        return min((time - self.boss_ramp_start) / self._wave.random_bosses.ramp, 1.0)
+
+    def _schedule_random_boss(self):
+        """
+        次のランダムボス出現を積む
+
+        毎フレーム確率pで判定する代わりに、出現可能になった時点のpで
+        最初に当たるまでのフレーム数（幾何分布）を1回の乱数で引く。
+        """
+        bosses = self._wave.random_bosses
+        if self.boss_pending or self.active_boss_count >= bosses.max_simultaneous:
+            return
+
+        # 最低出現間隔が過ぎた時点から抽選開始
+        eligible = max(self.game_time + 1, self.last_boss_spawn_time + bosses.min_interval)
+        d = self._difficulty(eligible)
+        chance = bosses.chance_start + d * (bosses.chance_end - bosses.chance_start)
+        if chance <= 0:
+            return
+        if chance >= 1:
+            delay = 0
+        else:
+            delay = int(math.log(1.0 - random.random()) / math.log(1.0 - chance))
+
+        self._push(eligible + delay, EVENT_BOSS)
+        self.boss_pending = True
+
+    def select_random_boss_type(self):
+        """ランダムボスの種類を経過時間に応じた重みで選択"""
+        d = self._difficulty(self.game_time)
+        weights = [(enemy_type, w0 + d * (w1 - w0))
+                   for enemy_type, w0, w1 in self._wave.random_bosses.types]
+        rand = random.random() * sum(w for _, w in weights)
+        for enemy_type, weight in weights:
+            if rand < weight:
+                return enemy_type
+            rand -= weight
+        return weights[-1][0]
+
+    def _change_pattern(self, terrain_manager):
+        """地形パターンを切り替えて次の切り替えを積む"""
+        wave = self._wave
+        pattern = _choose(wave.patterns)
+        if terrain_manager is not None:
+            terrain_manager.set_pattern(pattern)
+        self._push(self.game_time + wave.pattern_duration, EVENT_PATTERN)
 
     def get_wave_text(self):
         """Get text describing current wave"""
@@ -183,25 +370,82 @@ class WaveManager:
 
     def on_boss_defeated(self):
         """ボスが撃破された時に呼ばれる"""
-        # Wave 1-3のボス撃破処理
-        if self.current_wave < 4:
+        if self._wave.random_bosses is None:
             if self.boss_active:
                 self.boss_active = False
                 # ボス撃破で次のWaveに強制進行
-                if self.current_wave == 1:
-                    self.game_time = WAVE_2_START
-                elif self.current_wave == 2:
-                    self.game_time = WAVE_3_START
-                elif self.current_wave == 3:
-                    self.game_time = WAVE_4_START
-        # Wave 4のボス撃破処理
+                waves = load_stage(self.stage).waves
+                if self.wave_index + 1 < len(waves):
+                    self._jump(waves[self.wave_index + 1].start)
         else:
-            self.active_boss_count = max(0, self.active_boss_count - 1)
+            self.decrease_active_boss_count()
+
+    def _jump(self, time):
+        """時刻を飛ばして予定を作り直す（次のupdate()で該当Waveが始まる）"""
+        self.game_time = time
+        self.events = []
+        self._schedule_waves(time)
+
+    def jump_to_wave(self, wave):
+        """指定Waveの開始時刻へ進める（次のupdate()でWaveが切り替わる）"""
+        waves = load_stage(self.stage).waves
+        self._jump(waves[max(0, min(wave - 1, len(waves) - 1))].start)
+
+    def register_boss(self):
+        """ステージの進行以外で配置したボスを管理下に入れる（シナリオ構築用）"""
+        wave = self._wave
+        if wave.random_bosses is None:
+            # 通常敵の出現を打ち切ってボス戦中の状態にする
+            self._drop_events((EVENT_SPAWN, EVENT_BOSS))
+            self.enemies_spawned_this_wave = wave.enemy_count or 0
+            self.boss_spawned = True
+            self.boss_active = True
+        else:
+            self._drop_events((EVENT_BOSS,))
+            self.active_boss_count += 1
+            self.last_boss_spawn_time = self.game_time
+            self.boss_pending = False
+            self._schedule_random_boss()
 
     def is_boss_active(self):
         """ボスが生存しているかを返す"""
         return self.boss_active
 
     def decrease_active_boss_count(self):
-        """アクティブなボス数を減らす（Wave 4用、外部から呼ばれる）"""
+        """アクティブなボス数を減らす（ランダムボスのWave用）"""
         self.active_boss_count = max(0, self.active_boss_count - 1)
+        self._schedule_random_boss()
+
+
+if __name__ == "__main__":
+    # ステージの時間割と、ヒープ方式のupdate()コスト
+    import time
+
+    stage = load_stage()
+    print(f"Stage '{stage.name}':")
+    for wave in stage.waves:
+        end = wave.end if wave.end is not None else '-'
+        count = wave.enemy_count if wave.enemy_count is not None else 'inf'
+        names = {v: k for k, v in ENEMY_TYPES.items()}
+        boss = 'random' if wave.random_bosses else names.get(wave.boss_type, '-')
+        print(f"  WAVE {wave.number}: frames {wave.start}-{end}, {count} enemies, boss {boss}, "
+              f"pattern every {wave.pattern_duration or '-'}")
+
+    random.seed(0)
+    frames = 60 * 60 * 10
+    wm = WaveManager()
+    spawned = 0
+    wakeups = 0
+    start = time.perf_counter()
+    for _ in range(frames):
+        due = wm.events and wm.events[0][0] <= wm.game_time + 1
+        enemies = wm.update()
+        wakeups += bool(due)
+        spawned += len(enemies)
+        for enemy in enemies:
+            if getattr(enemy, 'is_boss', False):
+                wm.on_boss_defeated()
+    elapsed = time.perf_counter() - start
+    print(f"\n{frames} frames ({frames // 3600} min): {wakeups} wake-ups, {spawned} spawns, "
+          f"final WAVE {wm.current_wave}, {len(wm.events)} queued events")
+    print(f"update(): {elapsed / frames * 1e6:.2f} us/frame avg")